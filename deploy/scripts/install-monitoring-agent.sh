@@ -67,6 +67,8 @@ echo "Installing dependencies..."
 $PYTHON_CMD -m pip install --quiet psutil requests 2>/dev/null || {
     apt-get update -qq && apt-get install -y -qq python3-pip python3-psutil python3-requests
 }
+# Optional: smaller uploads (the agent falls back to gzip JSON without it)
+$PYTHON_CMD -m pip install --quiet msgpack 2>/dev/null || true
 
 # Create install directory
 echo "Creating installation directory..."
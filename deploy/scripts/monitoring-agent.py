@@ -7,13 +7,15 @@ Deploy to any server: curl -sSL https://your-dashboard/agent/install.sh | bash
 import os
 import sys
 import json
+import gzip
 import time
 import socket
 import logging
 import argparse
 import subprocess
+from collections import deque
 from datetime import datetime
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional
 
 try:
     import psutil
@@ -27,6 +29,12 @@ try:
 except ImportError:
     REQUESTS_AVAILABLE = False
 
+try:
+    import msgpack
+    MSGPACK_AVAILABLE = True
+except ImportError:
+    MSGPACK_AVAILABLE = False
+
 logging.basicConfig(
     level=logging.INFO,
     format='%(asctime)s [%(levelname)s] %(message)s',
@@ -34,8 +42,11 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-AGENT_VERSION = "1.0.0"
+AGENT_VERSION = "1.1.0"
 DEFAULT_INTERVAL = 60
+DEFAULT_BUFFER_SIZE = 240  # reports kept while the dashboard is unreachable
+DEFAULT_BATCH_SIZE = 60  # reports per upload when draining the buffer
+PROTOCOL_VERSION = 2
 DEFAULT_DASHBOARD_URL = os.environ.get('DASHBOARD_URL', 'http://localhost:5000')
 DEFAULT_API_KEY = os.environ.get('MONITORING_API_KEY', '')
 
@@ -64,13 +75,22 @@ def get_uptime() -> Dict[str, Any]:
     }
 
 
-def get_cpu_metrics() -> Dict[str, Any]:
-    """Get CPU usage metrics"""
+def get_cpu_metrics(blocking: bool = True) -> Dict[str, Any]:
+    """
+    Get CPU usage metrics
+    
+    With blocking=False usage is measured since the previous call instead
+    of sampling for a second, so a long-running agent never sleeps here.
+    """
     if not PSUTIL_AVAILABLE:
         return {'error': 'psutil not available'}
     
-    cpu_percent = psutil.cpu_percent(interval=1)
-    cpu_per_core = psutil.cpu_percent(interval=0.1, percpu=True)
+    if blocking:
+        cpu_percent = psutil.cpu_percent(interval=1)
+        cpu_per_core = psutil.cpu_percent(interval=0.1, percpu=True)
+    else:
+        cpu_percent = psutil.cpu_percent(interval=None)
+        cpu_per_core = psutil.cpu_percent(interval=None, percpu=True)
     cpu_freq = psutil.cpu_freq()
     load_avg = psutil.getloadavg() if hasattr(psutil, 'getloadavg') else (0, 0, 0)
     
@@ -224,14 +244,14 @@ def get_temperatures() -> Dict[str, Any]:
         return {'error': str(e)}
 
 
-def collect_all_metrics(include_docker: bool = True) -> Dict[str, Any]:
+def collect_all_metrics(include_docker: bool = True, blocking: bool = True) -> Dict[str, Any]:
     """Collect all system metrics"""
     metrics = {
         'timestamp': datetime.utcnow().isoformat(),
         'hostname': get_hostname(),
         'agent_version': AGENT_VERSION,
         'uptime': get_uptime(),
-        'cpu': get_cpu_metrics(),
+        'cpu': get_cpu_metrics(blocking=blocking),
         'memory': get_memory_metrics(),
         'disk': get_disk_metrics(),
         'network': get_network_metrics(),
@@ -275,7 +295,127 @@ def send_to_dashboard(metrics: Dict[str, Any], dashboard_url: str, api_key: str)
         return False
 
 
-def run_agent(dashboard_url: str, api_key: str, interval: int = DEFAULT_INTERVAL):
+def compute_delta(base: Dict[str, Any], report: Dict[str, Any], path: Optional[List[str]] = None,
+                  delta: Optional[Dict[str, list]] = None) -> Dict[str, list]:
+    """
+    Describe report as changes to base: ``set`` holds [path, value] pairs
+    for new or changed values, ``unset`` the paths that disappeared.
+    Nested dicts are compared key by key; lists are replaced whole.
+    """
+    path = path or []
+    delta = delta if delta is not None else {'set': [], 'unset': []}
+    
+    for key, value in report.items():
+        old = base.get(key, None)
+        if isinstance(value, dict) and isinstance(old, dict):
+            compute_delta(old, value, path + [key], delta)
+        elif key not in base or old != value:
+            delta['set'].append([path + [key], value])
+    
+    for key in base:
+        if key not in report:
+            delta['unset'].append(path + [key])
+    
+    return delta
+
+
+class MetricsReporter:
+    """
+    Uploads reports over one persistent HTTP session
+    
+    Reports are queued, then sent in batches, each one delta-encoded
+    against the report before it. The first report in a batch is encoded
+    against the last report the dashboard acknowledged. Payloads are
+    msgpack when available, otherwise JSON, and always gzip-compressed.
+    While the dashboard is unreachable, reports stay queued up to
+    buffer_size (the oldest are dropped first) and go out in the next
+    successful upload.
+    """
+    
+    def __init__(self, dashboard_url: str, api_key: str, buffer_size: int = DEFAULT_BUFFER_SIZE,
+                 batch_size: int = DEFAULT_BATCH_SIZE, use_msgpack: bool = MSGPACK_AVAILABLE):
+        self.url = f"{dashboard_url}/api/monitoring/agent/report"
+        self.batch_size = batch_size
+        self.use_msgpack = use_msgpack
+        self.pending = deque(maxlen=buffer_size)
+        self.acked: Optional[Dict[str, Any]] = None
+        self.seq = 0
+        self.session = requests.Session()
+        self.session.headers.update({
+            'X-API-Key': api_key,
+            'X-Agent-Version': AGENT_VERSION,
+            'Content-Encoding': 'gzip'
+        })
+    
+    def add(self, report: Dict[str, Any]):
+        self.seq += 1
+        report['seq'] = self.seq
+        if len(self.pending) == self.pending.maxlen:
+            logger.warning("Report buffer full, dropping the oldest report")
+        self.pending.append(report)
+    
+    def encode(self, reports: List[Dict[str, Any]]) -> Dict[str, Any]:
+        entries = []
+        base = self.acked
+        for report in reports:
+            if base is None:
+                entries.append({'full': report})
+            else:
+                entries.append({'base': base['seq'], **compute_delta(base, report)})
+            base = report
+        return {
+            'v': PROTOCOL_VERSION,
+            'hostname': reports[-1].get('hostname'),
+            'agent_version': AGENT_VERSION,
+            'reports': entries
+        }
+    
+    def _post(self, payload: Dict[str, Any]):
+        if self.use_msgpack:
+            body = msgpack.packb(payload, use_bin_type=True)
+            content_type = 'application/msgpack'
+        else:
+            body = json.dumps(payload, separators=(',', ':')).encode()
+            content_type = 'application/json'
+        return self.session.post(self.url, data=gzip.compress(body, compresslevel=6),
+                                 headers={'Content-Type': content_type}, timeout=30)
+    
+    def flush(self) -> bool:
+        """Upload queued reports; returns False when some are still pending"""
+        while self.pending:
+            batch = list(self.pending)[:self.batch_size]
+            try:
+                response = self._post(self.encode(batch))
+            except Exception as e:
+                logger.error(f"Error sending metrics ({len(self.pending)} reports buffered): {e}")
+                return False
+            
+            if response.status_code == 409:
+                # The dashboard lost our base report; start over from a full one
+                logger.info("Dashboard requested a full report")
+                self.acked = None
+                continue
+            if response.status_code == 415 and self.use_msgpack:
+                logger.info("Dashboard does not accept msgpack, switching to JSON")
+                self.use_msgpack = False
+                continue
+            if response.status_code != 200:
+                logger.error(f"Failed to send metrics: {response.status_code} - {response.text[:200]}")
+                if 400 <= response.status_code < 500:
+                    # Retrying a rejected batch will not help
+                    for _ in batch:
+                        self.pending.popleft()
+                return False
+            
+            for _ in batch:
+                self.pending.popleft()
+            self.acked = batch[-1]
+            logger.debug(f"Sent {len(batch)} reports to dashboard")
+        return True
+
+
+def run_agent(dashboard_url: str, api_key: str, interval: int = DEFAULT_INTERVAL, mode: str = 'delta',
+              buffer_size: int = DEFAULT_BUFFER_SIZE, batch_size: int = DEFAULT_BATCH_SIZE):
     """Run the monitoring agent in a loop"""
     logger.info(f"Starting monitoring agent v{AGENT_VERSION}")
     logger.info(f"Hostname: {get_hostname()}")
@@ -286,14 +426,29 @@ def run_agent(dashboard_url: str, api_key: str, interval: int = DEFAULT_INTERVAL
         logger.error("psutil is not installed. Run: pip install psutil")
         sys.exit(1)
     
+    reporter = None
+    if mode == 'delta':
+        if not REQUESTS_AVAILABLE:
+            logger.error("requests library not available - cannot send metrics")
+            sys.exit(1)
+        reporter = MetricsReporter(dashboard_url, api_key, buffer_size, batch_size)
+        logger.info(f"Delta reporting ({'msgpack' if reporter.use_msgpack else 'JSON'} + gzip)")
+        # Prime the CPU counters so the first non-blocking reading is meaningful
+        get_cpu_metrics(blocking=False)
+    
     while True:
+        started = time.monotonic()
         try:
-            metrics = collect_all_metrics()
-            send_to_dashboard(metrics, dashboard_url, api_key)
+            if reporter:
+                reporter.add(collect_all_metrics(blocking=False))
+                reporter.flush()
+            else:
+                metrics = collect_all_metrics()
+                send_to_dashboard(metrics, dashboard_url, api_key)
         except Exception as e:
             logger.error(f"Error collecting/sending metrics: {e}")
         
-        time.sleep(interval)
+        time.sleep(max(0, interval - (time.monotonic() - started)))
 
 
 def main():
@@ -301,6 +456,12 @@ def main():
     parser.add_argument('--url', default=DEFAULT_DASHBOARD_URL, help='Dashboard URL')
     parser.add_argument('--key', default=DEFAULT_API_KEY, help='API key for authentication')
     parser.add_argument('--interval', type=int, default=DEFAULT_INTERVAL, help='Report interval in seconds')
+    parser.add_argument('--mode', choices=['delta', 'full'], default='delta',
+                        help='delta: compressed, delta-encoded batches (default); full: one JSON report per request')
+    parser.add_argument('--buffer-size', type=int, default=DEFAULT_BUFFER_SIZE,
+                        help='Reports kept while the dashboard is unreachable')
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+                        help='Maximum reports per upload')
     parser.add_argument('--once', action='store_true', help='Collect and print metrics once, then exit')
     parser.add_argument('--json', action='store_true', help='Output as JSON (with --once)')
     
@@ -324,7 +485,8 @@ def main():
     if not args.key:
         logger.warning("No API key provided. Set MONITORING_API_KEY env var or use --key")
     
-    run_agent(args.url, args.key, args.interval)
+    run_agent(args.url, args.key, args.interval, mode=args.mode,
+              buffer_size=args.buffer_size, batch_size=args.batch_size)
 
 
 if __name__ == '__main__':
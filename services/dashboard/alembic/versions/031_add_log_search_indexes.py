@@ -0,0 +1,43 @@
+"""Add trigram indexes for log message search
+
+Revision ID: 031_add_log_search_indexes
+Revises: 030_add_backup_management
+Create Date: 2026-01-05
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '031_add_log_search_indexes'
+down_revision = '030_add_backup_management'
+branch_labels = None
+depends_on = None
+
+
+TRGM_INDEXES = [
+    ('ix_log_entries_message_trgm', 'log_entries'),
+    ('ix_unified_logs_message_trgm', 'unified_logs'),
+]
+
+
+def upgrade():
+    conn = op.get_bind()
+    existing_tables = sa.inspect(conn).get_table_names()
+    
+    # CONCURRENTLY cannot run inside a transaction and keeps the log tables
+    # writable while the indexes build
+    with op.get_context().autocommit_block():
+        op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        for index_name, table_name in TRGM_INDEXES:
+            if table_name not in existing_tables:
+                continue
+            op.execute(
+                f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {index_name} "
+                f"ON {table_name} USING gin (message gin_trgm_ops)"
+            )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for index_name, _ in TRGM_INDEXES:
+            op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {index_name}")
@@ -0,0 +1,113 @@
+"""Partition unified_logs and log_entries by day
+
+Revision ID: 032_partition_log_tables
+Revises: 031_add_log_search_indexes
+Create Date: 2026-01-12
+
+"""
+from datetime import datetime, timedelta
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = '032_partition_log_tables'
+down_revision = '031_add_log_search_indexes'
+branch_labels = None
+depends_on = None
+
+
+LOG_TABLES = ['unified_logs', 'log_entries']
+
+# Existing rows older than this are copied into the default partition and
+# removed by the next retention run
+BACKFILL_DAYS = 90
+DAYS_AHEAD = 7
+
+
+def _table_exists(conn, table):
+    return table in sa.inspect(conn).get_table_names()
+
+
+def _is_partitioned(conn, table):
+    return conn.execute(sa.text("""
+        SELECT 1 FROM pg_partitioned_table pt
+        JOIN pg_class c ON c.oid = pt.partrelid
+        WHERE c.relname = :table
+    """), {'table': table}).first() is not None
+
+
+def _index_definitions(conn, table):
+    """CREATE INDEX statements for every non-unique index on a table"""
+    rows = conn.execute(sa.text("""
+        SELECT indexdef FROM pg_indexes
+        WHERE tablename = :table AND indexdef NOT LIKE 'CREATE UNIQUE INDEX%'
+    """), {'table': table}).all()
+    # Indexes on a partitioned parent are reported as "ON ONLY <table>"
+    return [row[0].replace(' ON ONLY ', ' ON ', 1) for row in rows]
+
+
+def _rebuild_table(conn, table, partitioned):
+    """Recreate a log table (partitioned or plain) and move its rows across"""
+    legacy = f"{table}_legacy"
+    index_defs = _index_definitions(conn, table)
+    sequence = conn.execute(
+        sa.text("SELECT pg_get_serial_sequence(:table, 'id')"), {'table': table}
+    ).scalar()
+    pk_name = sa.inspect(conn).get_pk_constraint(table)['name']
+    
+    op.execute(f"ALTER TABLE {table} RENAME TO {legacy}")
+    if pk_name:
+        op.execute(f"ALTER TABLE {legacy} RENAME CONSTRAINT {pk_name} TO {legacy}_pkey")
+    
+    if partitioned:
+        op.execute(
+            f"CREATE TABLE {table} (LIKE {legacy} INCLUDING DEFAULTS INCLUDING CONSTRAINTS) "
+            f"PARTITION BY RANGE (timestamp)"
+        )
+        op.execute(f"ALTER TABLE {table} ADD CONSTRAINT {table}_pkey PRIMARY KEY (id, timestamp)")
+        op.execute(f"CREATE TABLE {table}_default PARTITION OF {table} DEFAULT")
+        
+        first_day = conn.execute(sa.text(f"SELECT min(timestamp)::date FROM {legacy}")).scalar()
+        today = datetime.utcnow().date()
+        first_day = max(first_day or today, today - timedelta(days=BACKFILL_DAYS))
+        day = first_day
+        while day <= today + timedelta(days=DAYS_AHEAD):
+            op.execute(
+                f"CREATE TABLE {table}_p{day:%Y%m%d} PARTITION OF {table} "
+                f"FOR VALUES FROM ('{day.isoformat()}') TO ('{(day + timedelta(days=1)).isoformat()}')"
+            )
+            day += timedelta(days=1)
+    else:
+        op.execute(f"CREATE TABLE {table} (LIKE {legacy} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)")
+        op.execute(f"ALTER TABLE {table} ADD CONSTRAINT {table}_pkey PRIMARY KEY (id)")
+    
+    if sequence:
+        op.execute(f"ALTER SEQUENCE {sequence} OWNED BY {table}.id")
+    
+    op.execute(f"INSERT INTO {table} SELECT * FROM {legacy}")
+    op.execute(f"DROP TABLE {legacy}")
+    
+    # Index definitions still reference the original table name, which now
+    # belongs to the rebuilt table
+    for index_def in index_defs:
+        op.execute(index_def)
+
+
+def upgrade():
+    conn = op.get_bind()
+    op.execute("SET LOCAL statement_timeout = 0")
+    
+    for table in LOG_TABLES:
+        if not _table_exists(conn, table) or _is_partitioned(conn, table):
+            continue
+        _rebuild_table(conn, table, partitioned=True)
+
+
+def downgrade():
+    conn = op.get_bind()
+    op.execute("SET LOCAL statement_timeout = 0")
+    
+    for table in LOG_TABLES:
+        if not _table_exists(conn, table) or not _is_partitioned(conn, table):
+            continue
+        _rebuild_table(conn, table, partitioned=False)
@@ -0,0 +1,64 @@
+"""Add agent report and partitioned agent metric rollup tables
+
+Revision ID: 033_add_agent_metrics
+Revises: 032_partition_log_tables
+Create Date: 2026-01-20
+
+"""
+from datetime import datetime, timedelta
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision = '033_add_agent_metrics'
+down_revision = '032_partition_log_tables'
+branch_labels = None
+depends_on = None
+
+
+ROLLUP_TABLES = ['agent_metrics_1m', 'agent_metrics_5m', 'agent_metrics_1h']
+DAYS_AHEAD = 7
+
+
+def upgrade():
+    op.create_table(
+        'agent_reports',
+        sa.Column('hostname', sa.String(255), primary_key=True),
+        sa.Column('agent_version', sa.String(50), nullable=True),
+        sa.Column('agent_ip', sa.String(64), nullable=True),
+        sa.Column('data', postgresql.JSONB(), nullable=False),
+        sa.Column('received_at', sa.DateTime(), nullable=False),
+    )
+    
+    today = datetime.utcnow().date()
+    for table in ROLLUP_TABLES:
+        op.execute(f"""
+            CREATE TABLE {table} (
+                hostname VARCHAR(255) NOT NULL,
+                metric VARCHAR(128) NOT NULL,
+                timestamp TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+                count INTEGER NOT NULL DEFAULT 0,
+                sum DOUBLE PRECISION NOT NULL DEFAULT 0,
+                min DOUBLE PRECISION,
+                max DOUBLE PRECISION,
+                last DOUBLE PRECISION,
+                CONSTRAINT {table}_pkey PRIMARY KEY (hostname, metric, timestamp)
+            ) PARTITION BY RANGE (timestamp)
+        """)
+        op.execute(f"CREATE TABLE {table}_default PARTITION OF {table} DEFAULT")
+        op.execute(f"CREATE INDEX ix_{table}_timestamp ON {table} (timestamp)")
+        
+        for offset in range(DAYS_AHEAD + 1):
+            day = today + timedelta(days=offset)
+            op.execute(
+                f"CREATE TABLE {table}_p{day:%Y%m%d} PARTITION OF {table} "
+                f"FOR VALUES FROM ('{day.isoformat()}') TO ('{(day + timedelta(days=1)).isoformat()}')"
+            )
+
+
+def downgrade():
+    for table in ROLLUP_TABLES:
+        # Dropping the parent drops every partition with it
+        op.execute(f"DROP TABLE IF EXISTS {table}")
+    op.drop_table('agent_reports')
@@ -0,0 +1,43 @@
+"""Add bucket statistics index and incremental scan state tables
+
+Revision ID: 034_add_bucket_stats
+Revises: 033_add_agent_metrics
+Create Date: 2026-01-27
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision = '034_add_bucket_stats'
+down_revision = '033_add_agent_metrics'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'bucket_stats',
+        sa.Column('backend', sa.String(16), primary_key=True),
+        sa.Column('bucket', sa.String(255), primary_key=True),
+        sa.Column('prefix', sa.String(1024), primary_key=True, server_default=''),
+        sa.Column('size_bytes', sa.BigInteger(), nullable=False, server_default='0'),
+        sa.Column('object_count', sa.BigInteger(), nullable=False, server_default='0'),
+        sa.Column('scanned_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+    )
+    
+    op.create_table(
+        'bucket_stats_scans',
+        sa.Column('backend', sa.String(16), primary_key=True),
+        sa.Column('bucket', sa.String(255), primary_key=True),
+        sa.Column('marker', sa.Text(), nullable=True),
+        sa.Column('partial', postgresql.JSONB(), nullable=False, server_default='{}'),
+        sa.Column('started_at', sa.DateTime(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+    )
+
+
+def downgrade():
+    op.drop_table('bucket_stats_scans')
+    op.drop_table('bucket_stats')
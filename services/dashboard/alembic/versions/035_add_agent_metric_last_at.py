@@ -0,0 +1,28 @@
+"""Add sample time of the last value to agent metric rollups
+
+Revision ID: 035_add_agent_metric_last_at
+Revises: 034_add_bucket_stats
+Create Date: 2026-02-03
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '035_add_agent_metric_last_at'
+down_revision = '034_add_bucket_stats'
+branch_labels = None
+depends_on = None
+
+
+ROLLUP_TABLES = ['agent_metrics_1m', 'agent_metrics_5m', 'agent_metrics_1h']
+
+
+def upgrade():
+    # Columns added to the partitioned parent reach every partition
+    for table in ROLLUP_TABLES:
+        op.add_column(table, sa.Column('last_at', sa.DateTime(), nullable=True))
+
+
+def downgrade():
+    for table in ROLLUP_TABLES:
+        op.drop_column(table, 'last_at')
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Build seasonal (hour-of-week) anomaly baselines from existing service
+telemetry in one streaming pass.
+
+Run once after enabling ANOMALY_DETECTION_MODE=seasonal; the daily
+rebuild_seasonal_baselines task keeps them current afterwards.
+
+Usage:
+    python backfill_seasonal_baselines.py [--days N] [--service NAME ...]
+                                          [--batch-size N] [--incremental]
+"""
+
+import sys
+import os
+import argparse
+import logging
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(__file__))
+
+from services.db_service import db_service
+from services.anomaly_detection import anomaly_detector
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Build seasonal anomaly baselines from service telemetry'
+    )
+    parser.add_argument(
+        '--days',
+        type=int,
+        help='Only read the last N days of telemetry (default: all)'
+    )
+    parser.add_argument(
+        '--service',
+        action='append',
+        dest='services',
+        help='Limit to a service (repeatable)'
+    )
+    parser.add_argument(
+        '--batch-size',
+        type=int,
+        default=5000,
+        help='Telemetry rows fetched per round trip (default: 5000)'
+    )
+    parser.add_argument(
+        '--incremental',
+        action='store_true',
+        help='Merge only telemetry newer than the last build instead of rebuilding'
+    )
+
+    args = parser.parse_args()
+
+    if not db_service.is_available:
+        logger.error("Database is not available")
+        return 1
+
+    result = anomaly_detector.build_seasonal_baselines(
+        replace=not args.incremental,
+        days=args.days,
+        services=args.services,
+        batch_size=args.batch_size
+    )
+
+    if not result.get('success'):
+        logger.error(f"Backfill failed: {result.get('error')}")
+        return 1
+
+    logger.info(
+        f"Built {result['baselines']} seasonal baselines ({result['period_hours']}h period) "
+        f"from {result['rows_read']} telemetry rows"
+    )
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,112 @@
+"""Log Parsing Benchmark Script
+
+Measures lines/sec for log level and timestamp detection, comparing the
+previous per-pattern implementation with the shared LogClassifier.
+
+Usage: python benchmark_log_parsing.py [line_count]
+"""
+
+import re
+import sys
+import time
+import logging
+from datetime import datetime
+
+from services.log_classifier import LogClassifier
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+LEGACY_LEVEL_PATTERNS = {
+    'error': re.compile(r'\b(error|err|fatal|critical|exception|fail(ed)?)\b', re.I),
+    'warning': re.compile(r'\b(warn(ing)?|caution)\b', re.I),
+    'debug': re.compile(r'\b(debug|trace|verbose)\b', re.I),
+    'info': re.compile(r'\b(info|notice)\b', re.I),
+}
+
+LEGACY_TIMESTAMP_PATTERNS = [
+    re.compile(r'(\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}:\d{2}(?:\.\d+)?(?:Z|[+-]\d{2}:?\d{2})?)', re.I),
+    re.compile(r'(\w{3}\s+\d{1,2}\s+\d{2}:\d{2}:\d{2})', re.I),
+    re.compile(r'(\d{2}/\w{3}/\d{4}:\d{2}:\d{2}:\d{2})', re.I),
+]
+
+LEGACY_FORMATS = [
+    '%Y-%m-%dT%H:%M:%S.%fZ',
+    '%Y-%m-%dT%H:%M:%S.%f%z',
+    '%Y-%m-%dT%H:%M:%S%z',
+    '%Y-%m-%d %H:%M:%S.%f',
+    '%Y-%m-%d %H:%M:%S',
+    '%b %d %H:%M:%S',
+    '%d/%b/%Y:%H:%M:%S',
+]
+
+SAMPLE_LINES = [
+    '2024-05-01T12:00:00.123456Z INFO Starting worker process pid=42',
+    '2024-05-01 12:00:01 GET /api/health 200 3ms',
+    '2024-05-01T12:00:02.5+00:00 WARNING disk usage at 85%',
+    '10.0.0.1 - - [01/May/2024:12:00:03 +0000] "GET / HTTP/1.1" 200 512',
+    'May  1 12:00:04 host sshd[123]: Accepted publickey for root',
+    '2024-05-01T12:00:05Z ERROR Failed to connect to database: timeout',
+    'plain message without any markers',
+]
+
+
+def legacy_detect_level(message: str) -> str:
+    for level, pattern in LEGACY_LEVEL_PATTERNS.items():
+        if pattern.search(message):
+            return level
+    return 'info'
+
+
+def legacy_parse_timestamp(line: str):
+    for pattern in LEGACY_TIMESTAMP_PATTERNS:
+        match = pattern.search(line)
+        if match:
+            ts_str = match.group(1)
+            for fmt in LEGACY_FORMATS:
+                try:
+                    return datetime.strptime(ts_str, fmt)
+                except ValueError:
+                    continue
+    return None
+
+
+def run(label: str, detect, parse, lines) -> float:
+    start = time.perf_counter()
+    for source, line in lines:
+        detect(line)
+        parse(line, source)
+    elapsed = time.perf_counter() - start
+    rate = len(lines) / elapsed if elapsed else float('inf')
+    logger.info(f"{label}: {len(lines)} lines in {elapsed * 1000:.1f}ms ({rate:,.0f} lines/sec)")
+    return rate
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    lines = [
+        (f'source-{i % len(SAMPLE_LINES)}', SAMPLE_LINES[i % len(SAMPLE_LINES)])
+        for i in range(count)
+    ]
+
+    classifier = LogClassifier()
+
+    legacy_rate = run(
+        "Legacy per-pattern parsing",
+        legacy_detect_level,
+        lambda line, source: legacy_parse_timestamp(line),
+        lines
+    )
+    classifier_rate = run(
+        "LogClassifier single-pass parsing",
+        classifier.detect_level,
+        classifier.parse_timestamp,
+        lines
+    )
+
+    logger.info(f"Speedup: {classifier_rate / legacy_rate:.2f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -14,7 +14,7 @@ celery_app = Celery(
     'jarvis_workflow_engine',
     broker=Config.CELERY_BROKER_URL,
     backend=Config.CELERY_RESULT_BACKEND,
-    include=['workers.workflow_worker', 'workers.analysis_worker', 'workers.google_tasks', 'workers.plex_worker', 'workers.service_ops_worker', 'workers.storage_worker', 'workers.gaming_worker', 'workers.db_admin_worker', 'workers.nas_worker', 'workers.celery_tasks', 'workers.marketplace_tasks']
+    include=['workers.workflow_worker', 'workers.analysis_worker', 'workers.google_tasks', 'workers.plex_worker', 'workers.service_ops_worker', 'workers.storage_worker', 'workers.gaming_worker', 'workers.db_admin_worker', 'workers.nas_worker', 'workers.celery_tasks', 'workers.marketplace_tasks', 'workers.log_collector']
 )
 
 def check_redis_health():
@@ -91,11 +91,15 @@ celery_app.conf.update(
         'workers.service_ops_worker.restart_service_async': {'queue': 'service_ops'},
         'workers.service_ops_worker.health_check_all': {'queue': 'service_ops'},
         'workers.service_ops_worker.cleanup_old_telemetry': {'queue': 'service_ops'},
+        'workers.service_ops_worker.update_anomaly_baselines': {'queue': 'service_ops'},
+        'workers.service_ops_worker.rebuild_seasonal_baselines': {'queue': 'service_ops'},
+        'workers.service_ops_worker.maintain_agent_metric_partitions': {'queue': 'service_ops'},
         'workers.storage_worker.collect_storage_metrics': {'queue': 'storage'},
         'workers.storage_worker.scan_plex_directories': {'queue': 'storage'},
         'workers.storage_worker.check_database_sizes': {'queue': 'storage'},
         'workers.storage_worker.check_alert_thresholds': {'queue': 'storage'},
         'workers.storage_worker.cleanup_old_metrics': {'queue': 'storage'},
+        'workers.storage_worker.refresh_bucket_stats': {'queue': 'storage'},
         'workers.gaming_worker.discover_sunshine_hosts': {'queue': 'gaming'},
         'workers.gaming_worker.check_sunshine_health': {'queue': 'gaming'},
         'workers.gaming_worker.monitor_active_sessions': {'queue': 'gaming'},
@@ -30,10 +30,14 @@ class Config:
     # WebSocket settings
     WEBSOCKET_PING_INTERVAL = 25
     WEBSOCKET_PING_TIMEOUT = 60
+    WEBSOCKET_SEND_QUEUE_SIZE = int(os.environ.get('WEBSOCKET_SEND_QUEUE_SIZE', '256'))  # queued messages before a client is evicted
+    WEBSOCKET_SEND_STALL_TIMEOUT = float(os.environ.get('WEBSOCKET_SEND_STALL_TIMEOUT', '30'))  # seconds one send may block
     DASHBOARD_API_KEY = os.environ.get('DASHBOARD_API_KEY', secrets.token_urlsafe(32))
     
     # Docker settings
     DOCKER_HOST = os.environ.get('DOCKER_HOST', 'unix:///var/run/docker.sock')
+    DOCKER_SNAPSHOT_TTL = float(os.environ.get('DOCKER_SNAPSHOT_TTL', '5'))  # seconds container stats are reused
+    DOCKER_STATS_WORKERS = int(os.environ.get('DOCKER_STATS_WORKERS', '16'))  # concurrent inspect/stats calls
     
     # SSH settings for remote execution
     SSH_HOST = os.environ.get('SSH_HOST', 'localhost')
@@ -80,6 +84,10 @@ class Config:
     DB_ADMIN_ALLOWED_HOSTS = os.environ.get('DB_ADMIN_ALLOWED_HOSTS', 'discord-bot-db,localhost').split(',')
     DB_BACKUP_RETENTION_DAYS = int(os.environ.get('DB_BACKUP_RETENTION_DAYS', '30'))
     DB_BACKUP_SCHEDULE = os.environ.get('DB_BACKUP_SCHEDULE', '0 2 * * *')  # 2 AM daily
+    DB_BACKUP_PART_SIZE = int(os.environ.get('DB_BACKUP_PART_SIZE', str(16 * 1024 * 1024)))  # multipart upload part size, min 5 MiB
+    DB_BACKUP_PARALLEL_JOBS = int(os.environ.get('DB_BACKUP_PARALLEL_JOBS', '1'))  # >1 = pg_dump -j directory-format dumps
+    DB_BACKUP_SPOOL_DIR = os.environ.get('DB_BACKUP_SPOOL_DIR') or None  # scratch space for directory-format dumps and restore verification
+    DB_BACKUP_TIMEOUT = int(os.environ.get('DB_BACKUP_TIMEOUT', '3600'))  # seconds per dump or restore
     DB_ADMIN_ENCRYPTION_KEY = os.environ.get('DB_ADMIN_ENCRYPTION_KEY', '')
     # Generate with: python -c "from cryptography.fernet import Fernet; print(Fernet.generate_key().decode())"
     
@@ -106,6 +114,52 @@ class Config:
     TELEMETRY_COLLECTION_INTERVAL = int(os.environ.get('TELEMETRY_COLLECTION_INTERVAL', '30'))  # seconds
     STORAGE_SCAN_INTERVAL = int(os.environ.get('STORAGE_SCAN_INTERVAL', '3600'))  # 1 hour
     STORAGE_ALERT_THRESHOLD = float(os.environ.get('STORAGE_ALERT_THRESHOLD', '80.0'))  # percent
+    HOST_METRICS_INTERVAL = float(os.environ.get('HOST_METRICS_INTERVAL', '2'))  # seconds between host samples
+    HOST_METRICS_HISTORY = int(os.environ.get('HOST_METRICS_HISTORY', '300'))  # samples kept per process
+    AGENT_METRICS_RETENTION_1M_DAYS = int(os.environ.get('AGENT_METRICS_RETENTION_1M_DAYS', '2'))
+    AGENT_METRICS_RETENTION_5M_DAYS = int(os.environ.get('AGENT_METRICS_RETENTION_5M_DAYS', '14'))
+    AGENT_METRICS_RETENTION_1H_DAYS = int(os.environ.get('AGENT_METRICS_RETENTION_1H_DAYS', '180'))
+    AGENT_METRICS_MAX_POINTS = int(os.environ.get('AGENT_METRICS_MAX_POINTS', '500'))  # per series in range queries
+    AGENT_METRICS_LOCAL_BUCKETS = int(os.environ.get('AGENT_METRICS_LOCAL_BUCKETS', '1440'))  # per series when the DB is down
+    AGENT_REPORT_MAX_BYTES = int(os.environ.get('AGENT_REPORT_MAX_BYTES', str(8 * 1024 * 1024)))  # decompressed upload limit
+    AI_CACHE_MAX_ENTRIES = int(os.environ.get('AI_CACHE_MAX_ENTRIES', '1000'))  # in-memory responses per process
+    AI_CACHE_MEMORY_TTL = float(os.environ.get('AI_CACHE_MEMORY_TTL', '3600'))  # seconds before re-checking the DB row
+    AI_CACHE_NEGATIVE_TTL = float(os.environ.get('AI_CACHE_NEGATIVE_TTL', '60'))  # seconds a DB miss is remembered
+    AI_CACHE_HIT_FLUSH_INTERVAL = float(os.environ.get('AI_CACHE_HIT_FLUSH_INTERVAL', '5'))  # seconds between hit_count writes
+    AI_CACHE_SEMANTIC = os.environ.get('AI_CACHE_SEMANTIC', 'false').lower() == 'true'  # embedding-similarity lookups
+    AI_CACHE_SEMANTIC_THRESHOLD = float(os.environ.get('AI_CACHE_SEMANTIC_THRESHOLD', '0.95'))  # min cosine similarity
+    AI_CACHE_EMBEDDING_MODEL = os.environ.get('AI_CACHE_EMBEDDING_MODEL', 'text-embedding-3-small')
+    AGENT_CONSULT_TIMEOUT = float(os.environ.get('AGENT_CONSULT_TIMEOUT', '120'))  # seconds per specialist LLM call
+    AGENT_CONSULT_MAX_WORKERS = int(os.environ.get('AGENT_CONSULT_MAX_WORKERS', '4'))  # 1 consults specialists serially
+    ALERT_RULE_CACHE_TTL = float(os.environ.get('ALERT_RULE_CACHE_TTL', '60'))  # seconds compiled rules are trusted
+    ALERT_NOTIFICATION_WORKERS = int(os.environ.get('ALERT_NOTIFICATION_WORKERS', '4'))
+    ALERT_NOTIFICATION_QUEUE_SIZE = int(os.environ.get('ALERT_NOTIFICATION_QUEUE_SIZE', '1000'))
+    ALERT_HOST_COOLDOWN = int(os.environ.get('ALERT_HOST_COOLDOWN', '300'))  # seconds between agent threshold alerts
+    ANOMALY_SAMPLE_INTERVAL = float(os.environ.get('ANOMALY_SAMPLE_INTERVAL', '10'))  # seconds between baseline samples
+    ANOMALY_PERSIST_INTERVAL = float(os.environ.get('ANOMALY_PERSIST_INTERVAL', '60'))  # seconds between baseline writes
+    ANOMALY_BASELINE_WINDOW_SAMPLES = int(os.environ.get('ANOMALY_BASELINE_WINDOW_SAMPLES', '8640'))  # ~24h at 10s
+    ANOMALY_BASELINE_CACHE_TTL = float(os.environ.get('ANOMALY_BASELINE_CACHE_TTL', '60'))  # seconds
+    ANOMALY_EWMA_ALPHA = float(os.environ.get('ANOMALY_EWMA_ALPHA', '0.05'))
+    ANOMALY_DETECTION_MODE = os.environ.get('ANOMALY_DETECTION_MODE', 'global')  # 'global' or 'seasonal'
+    ANOMALY_SEASONAL_PERIOD_HOURS = int(os.environ.get('ANOMALY_SEASONAL_PERIOD_HOURS', '168'))  # hour-of-week
+    ANOMALY_SEASONAL_MIN_SAMPLES = int(os.environ.get('ANOMALY_SEASONAL_MIN_SAMPLES', '30'))  # per bucket before it is used
+    ANOMALY_SEASONAL_MAX_BUCKET_SAMPLES = int(os.environ.get('ANOMALY_SEASONAL_MAX_BUCKET_SAMPLES', '1000'))
+    
+    # Log ingestion (write-behind persistence for LogService)
+    LOG_PERSIST_QUEUE_SIZE = int(os.environ.get('LOG_PERSIST_QUEUE_SIZE', '20000'))
+    LOG_PERSIST_BATCH_SIZE = int(os.environ.get('LOG_PERSIST_BATCH_SIZE', '500'))
+    LOG_PERSIST_FLUSH_INTERVAL = float(os.environ.get('LOG_PERSIST_FLUSH_INTERVAL', '1.0'))  # seconds
+    LOG_PERSIST_BLOCK_TIMEOUT = float(os.environ.get('LOG_PERSIST_BLOCK_TIMEOUT', '0'))  # 0 = drop when full
+    LOG_PARTITION_DAYS_AHEAD = int(os.environ.get('LOG_PARTITION_DAYS_AHEAD', '7'))  # daily log partitions created in advance
+    
+    # Cache (in-process LRU tier in front of Redis)
+    CACHE_LOCAL_MAX_ENTRIES = int(os.environ.get('CACHE_LOCAL_MAX_ENTRIES', '2048'))
+    CACHE_LOCAL_TTL = int(os.environ.get('CACHE_LOCAL_TTL', '15'))  # seconds a worker may serve its local copy
+    CACHE_BREAKER_THRESHOLD = int(os.environ.get('CACHE_BREAKER_THRESHOLD', '3'))  # consecutive Redis failures
+    CACHE_BREAKER_COOLDOWN = float(os.environ.get('CACHE_BREAKER_COOLDOWN', '30'))  # seconds before retrying Redis
+    CACHE_LOCK_TIMEOUT = float(os.environ.get('CACHE_LOCK_TIMEOUT', '10'))  # recompute lock lifetime
+    CACHE_EARLY_REFRESH_BETA = float(os.environ.get('CACHE_EARLY_REFRESH_BETA', '1.0'))  # 0 disables early refresh
+    CACHE_NAMESPACE_VERSION_TTL = float(os.environ.get('CACHE_NAMESPACE_VERSION_TTL', '2'))  # seconds a worker trusts its namespace versions
     
     # MinIO configuration (Local Storage)
     MINIO_ENDPOINT = os.environ.get('MINIO_ENDPOINT', 'minio:9000')
@@ -120,6 +174,22 @@ class Config:
     CLOUD_S3_REGION = os.environ.get('CLOUD_S3_REGION', 'us-west-002')
     CLOUD_S3_SECURE = os.environ.get('CLOUD_S3_SECURE', 'True').lower() == 'true'
     
+    # Bucket sync
+    STORAGE_SYNC_WORKERS = int(os.environ.get('STORAGE_SYNC_WORKERS', '8'))  # concurrent object copies
+    STORAGE_SYNC_PART_SIZE = int(os.environ.get('STORAGE_SYNC_PART_SIZE', str(64 * 1024 * 1024)))  # multipart part size, min 5MB
+    STORAGE_SYNC_BANDWIDTH_LIMIT = int(os.environ.get('STORAGE_SYNC_BANDWIDTH_LIMIT', '0'))  # bytes/sec across workers, 0 = unlimited
+    STORAGE_SYNC_MANIFEST_TTL = int(os.environ.get('STORAGE_SYNC_MANIFEST_TTL', str(30 * 86400)))  # seconds a sync manifest is kept
+    
+    # Bulk object cleanup
+    STORAGE_DELETE_BATCH_SIZE = int(os.environ.get('STORAGE_DELETE_BATCH_SIZE', '1000'))  # keys per DeleteObjects request, max 1000
+    STORAGE_CLEANUP_WORKERS = int(os.environ.get('STORAGE_CLEANUP_WORKERS', '8'))  # prefixes cleaned concurrently
+    
+    # Bucket statistics index
+    BUCKET_STATS_SCAN_BATCH = int(os.environ.get('BUCKET_STATS_SCAN_BATCH', '100000'))  # objects listed per bucket per run
+    BUCKET_STATS_SCAN_SECONDS = float(os.environ.get('BUCKET_STATS_SCAN_SECONDS', '120'))  # listing budget per refresh run
+    BUCKET_STATS_MAX_PREFIXES = int(os.environ.get('BUCKET_STATS_MAX_PREFIXES', '500'))  # top-level prefixes tracked per bucket
+    BUCKET_STATS_REFRESH_INTERVAL = float(os.environ.get('BUCKET_STATS_REFRESH_INTERVAL', '600'))  # seconds between refresh runs
+    
     # Upload limits
     MAX_UPLOAD_SIZE = int(os.environ.get('MAX_UPLOAD_SIZE', 500 * 1024 * 1024))  # 500MB default
     ALLOWED_EXTENSIONS = os.environ.get('ALLOWED_EXTENSIONS', 'zip,tar,gz,html,css,js,py,php,java,go,rs,dockerfile,sh,bash').split(',')
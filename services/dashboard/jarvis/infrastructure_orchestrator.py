@@ -162,8 +162,8 @@ class InfrastructureOrchestrator:
             logger.warning(f"AI service not available: {e}")
         
         try:
-            from services.fleet_service import FleetManager
-            self.fleet_manager = FleetManager()
+            from services.fleet_service import fleet_manager
+            self.fleet_manager = fleet_manager
         except Exception as e:
             logger.warning(f"Fleet manager not available: {e}")
     
@@ -907,28 +907,17 @@ Respond in JSON format:
         
         results = {}
         
-        for host_id in hosts:
-            try:
-                result = self.fleet_manager.execute_command(
-                    host_id,
-                    f"mkdir -p ~/deployments/{plan.id}"
-                )
-                
-                if result.get("success"):
-                    results[host_id] = {
-                        "status": "success",
-                        "message": f"Deployment initiated on {host_id}"
-                    }
-                else:
-                    results[host_id] = {
-                        "status": "failed",
-                        "error": result.get("error", "Unknown error")
-                    }
-                    
-            except Exception as e:
+        host_results = self.fleet_manager.execute_on_hosts(hosts, f"mkdir -p ~/deployments/{plan.id}")
+        for host_id, result in host_results.items():
+            if result.get("success"):
+                results[host_id] = {
+                    "status": "success",
+                    "message": f"Deployment initiated on {host_id}"
+                }
+            else:
                 results[host_id] = {
                     "status": "failed",
-                    "error": str(e)
+                    "error": result.get("error", "Unknown error")
                 }
         
         return {
@@ -68,6 +68,8 @@ from .automation_workflow import (
 )
 from .backups import Backup, BackupSchedule
 from .logs import LogEntry, LogStream, LogLevel, SourceType
+from .agent_metrics import AgentReport, AgentMetric1m, AgentMetric5m, AgentMetric1h
+from .bucket_stats import BucketStats, BucketStatsScan
 
 __all__ = [
     'Base',
@@ -185,5 +187,11 @@ __all__ = [
     'LogEntry',
     'LogStream',
     'LogLevel',
-    'SourceType'
+    'SourceType',
+    'AgentReport',
+    'AgentMetric1m',
+    'AgentMetric5m',
+    'AgentMetric1h',
+    'BucketStats',
+    'BucketStatsScan'
 ]
@@ -0,0 +1,69 @@
+"""Agent Metrics Models - Latest reports and rolled-up time series from monitoring agents"""
+from datetime import datetime
+from sqlalchemy import Column, String, Integer, DateTime, Float
+from sqlalchemy.dialects.postgresql import JSONB
+from . import Base
+
+
+class AgentReport(Base):
+    """Most recent full report from each monitoring agent"""
+    __tablename__ = 'agent_reports'
+    
+    hostname = Column(String(255), primary_key=True)
+    agent_version = Column(String(50), nullable=True)
+    agent_ip = Column(String(64), nullable=True)
+    data = Column(JSONB, nullable=False)
+    received_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    
+    def to_dict(self):
+        return {
+            'hostname': self.hostname,
+            'agent_version': self.agent_version,
+            'agent_ip': self.agent_ip,
+            'received_at': self.received_at.isoformat() if self.received_at else None,
+            'data': self.data
+        }
+
+
+class _AgentMetricRollup:
+    """
+    One bucket of a metric: count/sum/min/max/last of every point that fell
+    in ``[timestamp, timestamp + resolution)``; ``last`` is the point
+    sampled at ``last_at``, so late batches cannot replace a newer value
+    
+    Tables are RANGE partitioned by day on ``timestamp`` (migration 033).
+    """
+    hostname = Column(String(255), primary_key=True)
+    metric = Column(String(128), primary_key=True)
+    timestamp = Column(DateTime, primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+    sum = Column(Float, nullable=False, default=0.0)
+    min = Column(Float, nullable=True)
+    max = Column(Float, nullable=True)
+    last = Column(Float, nullable=True)
+    last_at = Column(DateTime, nullable=True)
+    
+    def to_dict(self):
+        return {
+            'timestamp': self.timestamp.isoformat() if self.timestamp else None,
+            'count': self.count,
+            'avg': self.sum / self.count if self.count else None,
+            'min': self.min,
+            'max': self.max,
+            'last': self.last
+        }
+
+
+class AgentMetric1m(_AgentMetricRollup, Base):
+    """One-minute agent metric rollups"""
+    __tablename__ = 'agent_metrics_1m'
+
+
+class AgentMetric5m(_AgentMetricRollup, Base):
+    """Five-minute agent metric rollups"""
+    __tablename__ = 'agent_metrics_5m'
+
+
+class AgentMetric1h(_AgentMetricRollup, Base):
+    """Hourly agent metric rollups"""
+    __tablename__ = 'agent_metrics_1h'
@@ -0,0 +1,42 @@
+"""Bucket Stats Models - Indexed object storage size and count aggregates"""
+from datetime import datetime
+from sqlalchemy import Column, String, DateTime, BigInteger, Text
+from sqlalchemy.dialects.postgresql import JSONB
+from . import Base
+
+
+class BucketStats(Base):
+    """
+    Size and object count of a bucket (``prefix`` '') or of one top-level
+    prefix within it, as of the last completed scan plus any changes the
+    dashboard made since
+    """
+    __tablename__ = 'bucket_stats'
+    
+    backend = Column(String(16), primary_key=True)
+    bucket = Column(String(255), primary_key=True)
+    prefix = Column(String(1024), primary_key=True, default='')
+    size_bytes = Column(BigInteger, nullable=False, default=0)
+    object_count = Column(BigInteger, nullable=False, default=0)
+    scanned_at = Column(DateTime, nullable=True)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def to_dict(self):
+        return {
+            'size_bytes': self.size_bytes,
+            'object_count': self.object_count,
+            'scanned_at': self.scanned_at.isoformat() if self.scanned_at else None,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
+
+
+class BucketStatsScan(Base):
+    """An in-progress incremental scan: where the listing stopped and what it has summed so far"""
+    __tablename__ = 'bucket_stats_scans'
+    
+    backend = Column(String(16), primary_key=True)
+    bucket = Column(String(255), primary_key=True)
+    marker = Column(Text, nullable=True)
+    partial = Column(JSONB, nullable=False, default=dict)
+    started_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
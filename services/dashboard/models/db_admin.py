@@ -53,7 +53,7 @@ class DBBackupJob(Base):
     status = Column(String(50), nullable=False, default='pending')  # 'pending', 'running', 'completed', 'failed'
     storage_path = Column(String(1000), nullable=True)  # MinIO path
     file_size = Column(BigInteger, nullable=True)
-    compression = Column(String(50), nullable=True)  # 'gzip', 'none'
+    compression = Column(String(50), nullable=True)  # 'gzip', 'zstd', 'none'
     error_message = Column(Text, nullable=True)
     backup_metadata = Column(JSONB, nullable=True)
     created_at = Column(DateTime(timezone=True), default=datetime.utcnow, nullable=False)
@@ -66,7 +66,8 @@ class AnomalyBaseline(Base):
                 'std_dev': self.std_dev,
                 'min': self.min_value,
                 'max': self.max_value,
-                'sample_count': self.sample_count
+                'sample_count': self.sample_count,
+                'ewma': (self.metadata_json or {}).get('ewma')
             },
             'percentiles': {
                 'p25': self.percentile_25,
@@ -23,7 +23,12 @@ class SourceType(enum.Enum):
 
 
 class LogEntry(Base):
-    """Log entry from various sources"""
+    """
+    Log entry from various sources
+    
+    On PostgreSQL the table is range-partitioned by day on timestamp
+    (migration 032, maintained by services.log_partitions).
+    """
     __tablename__ = 'log_entries'
     
     id = Column(Integer, primary_key=True)
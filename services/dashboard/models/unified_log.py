@@ -10,6 +10,9 @@ class UnifiedLog(Base):
     """
     Unified log storage model
     Stores logs from all Docker containers and services in a centralized table
+    
+    On PostgreSQL the table is range-partitioned by day on timestamp
+    (migration 032, maintained by services.log_partitions).
     """
     __tablename__ = 'unified_logs'
     
@@ -8,6 +8,8 @@ import logging
 import json
 import uuid
 
+from services.pagination import decode_cursor
+
 logger = logging.getLogger(__name__)
 
 activity_bp = Blueprint('activity', __name__, url_prefix='/api/activity')
@@ -44,6 +46,7 @@ def list_events():
     - start_date: ISO date string
     - end_date: ISO date string
     - grouped: boolean (group by date for timeline)
+    - cursor: keyset cursor (empty for the first page, then next_cursor)
     """
     try:
         from services.activity_service import activity_service
@@ -58,6 +61,13 @@ def list_events():
         end_date_str = request.args.get('end_date')
         search = request.args.get('search')
         grouped = request.args.get('grouped', 'false').lower() == 'true'
+        cursor = request.args.get('cursor')
+        
+        if cursor:
+            try:
+                decode_cursor(cursor)
+            except ValueError as e:
+                return jsonify({'success': False, 'error': str(e)}), 400
         
         start_date = None
         end_date = None
@@ -95,7 +105,8 @@ def list_events():
                 user_id=user_id,
                 start_date=start_date,
                 end_date=end_date,
-                search=search
+                search=search,
+                cursor=cursor
             )
         
         return jsonify({
@@ -6,6 +6,8 @@ from flask import Blueprint, jsonify, request, render_template
 from datetime import datetime
 import logging
 
+from services.pagination import decode_cursor
+
 logger = logging.getLogger(__name__)
 
 alert_bp = Blueprint('alerts', __name__, url_prefix='/api/alerts')
@@ -217,12 +219,27 @@ def get_history():
     """
     GET /api/alerts/history
     Get alert history, optionally filtered by alert_id
+    Pass cursor= (empty for the first page, then next_cursor) for keyset pagination
     """
     try:
         from services.alert_service import alert_service
         
         alert_id = request.args.get('alert_id')
         limit = int(request.args.get('limit', 100))
+        cursor = request.args.get('cursor')
+        
+        if cursor is not None:
+            if cursor:
+                try:
+                    decode_cursor(cursor)
+                except ValueError as e:
+                    return jsonify({'success': False, 'error': str(e)}), 400
+            
+            page = alert_service.get_alert_history_page(alert_id=alert_id, limit=limit, cursor=cursor)
+            return jsonify({
+                'success': 'error' not in page,
+                **page
+            })
         
         history = alert_service.get_alert_history(alert_id=alert_id, limit=limit)
         
@@ -421,7 +438,8 @@ def monitor_status():
         
         return jsonify({
             'success': True,
-            'running': alert_service.is_monitor_running()
+            'running': alert_service.is_monitor_running(),
+            'engine': alert_service.get_engine_stats()
         })
     except Exception as e:
         logger.error(f"Error getting monitor status: {e}")
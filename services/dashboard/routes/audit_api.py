@@ -5,6 +5,7 @@ Endpoints for viewing and managing audit logs
 from flask import Blueprint, jsonify, request
 from services.db_service import db_service
 from services.audit_service import audit_service
+from services.pagination import decode_cursor, apply_keyset, split_keyset_page
 from utils.auth import require_auth
 from utils.rbac import require_permission
 from models.rbac import Permission
@@ -48,6 +49,8 @@ def get_audit_logs():
         limit: int - Number of results (default: 50, max: 500)
         offset: int - Pagination offset (default: 0)
         sort: str - Sort order (asc or desc, default: desc)
+        cursor: str - Keyset cursor (empty for the first page, then next_cursor);
+            newest-first pages without offset or total count
     
     Returns:
         JSON array of audit log entries
@@ -70,6 +73,13 @@ def get_audit_logs():
         limit = min(request.args.get('limit', 50, type=int), 500)
         offset = request.args.get('offset', 0, type=int)
         sort_order = request.args.get('sort', 'desc')
+        cursor = request.args.get('cursor')
+        
+        if cursor:
+            try:
+                decode_cursor(cursor)
+            except ValueError as e:
+                return make_response(False, message=str(e), status_code=400)
         
         with db_service.get_session() as session:
             query = select(AuditLog)
@@ -114,6 +124,19 @@ def get_audit_logs():
             if conditions:
                 query = query.where(and_(*conditions))
             
+            if cursor is not None:
+                query = apply_keyset(query, AuditLog.timestamp, AuditLog.id, cursor, limit)
+                logs = session.execute(query).scalars().all()
+                logs, next_cursor = split_keyset_page(logs, AuditLog.timestamp, AuditLog.id, limit)
+                return make_response(True, {
+                    'logs': [log.to_dict() for log in logs],
+                    'pagination': {
+                        'limit': limit,
+                        'next_cursor': next_cursor,
+                        'has_more': next_cursor is not None
+                    }
+                })
+            
             if sort_order == 'asc':
                 query = query.order_by(AuditLog.timestamp.asc())
             else:
@@ -72,6 +72,7 @@ def create_backup():
         destination_type: Storage type - 'local', 'minio', or 's3' (default: 'local')
         compression: 'gzip' or 'none' (default: 'gzip')
         metadata: Additional metadata object (optional)
+        engine: 'archive' or 'chunked' for a deduplicated incremental snapshot (optional)
     
     Returns:
         JSON with backup details
@@ -103,6 +104,12 @@ def create_backup():
                 'error': "Invalid destination_type. Must be 'local', 'minio', or 's3'"
             }), 400
         
+        if data.get('engine') not in (None, 'archive', 'chunked'):
+            return jsonify({
+                'success': False,
+                'error': "Invalid engine. Must be 'archive' or 'chunked'"
+            }), 400
+        
         result = backup_service.create_backup(
             name=data['name'],
             backup_type=data['backup_type'],
@@ -110,7 +117,8 @@ def create_backup():
             destination=data.get('destination'),
             destination_type=destination_type,
             compression=data.get('compression', 'gzip'),
-            metadata=data.get('metadata')
+            metadata=data.get('metadata'),
+            engine=data.get('engine')
         )
         
         if result['success']:
@@ -311,6 +319,7 @@ def cleanup_old_backups():
     
     JSON body:
         schedule_id: Optional schedule ID to clean up (cleans all if not provided)
+        dry_run: Only report what would be deleted (default: false)
     
     Returns:
         JSON with cleanup results
@@ -321,7 +330,9 @@ def cleanup_old_backups():
         data = request.get_json() or {}
         schedule_id = data.get('schedule_id')
         
-        result = backup_service.cleanup_old_backups(schedule_id)
+        dry_run = bool(data.get('dry_run', False))
+        
+        result = backup_service.cleanup_old_backups(schedule_id, dry_run=dry_run)
         return jsonify(result)
         
     except Exception as e:
@@ -516,7 +527,8 @@ def run_scheduled_backup(schedule_id):
                 source=schedule.source,
                 destination=schedule.destination if schedule.destination else None,
                 compression=schedule.compression or 'gzip',
-                metadata={'schedule_id': str(schedule.id), 'manual_trigger': True}
+                metadata={'schedule_id': str(schedule.id), 'manual_trigger': True},
+                engine=(schedule.schedule_metadata or {}).get('engine')
             )
             
             schedule.last_run = datetime.utcnow()
@@ -399,7 +399,8 @@ def create_backup(credential_id):
     
     JSON body:
         backup_type: Type of backup ('full', 'schema_only', 'data_only')
-        compression: Compression type ('gzip', 'none') - default: gzip
+        compression: Compression type ('gzip', 'zstd', 'none') - default: gzip
+        parallel_jobs: pg_dump worker count (optional, >1 uses directory format)
         async: Whether to run async (default: true)
         
     Returns:
@@ -410,6 +411,7 @@ def create_backup(credential_id):
         
         backup_type = data.get('backup_type', 'full')
         compression = data.get('compression', 'gzip')
+        parallel_jobs = data.get('parallel_jobs')
         run_async = data.get('async', True)
         
         if backup_type not in ['full', 'schema_only', 'data_only']:
@@ -421,7 +423,8 @@ def create_backup(credential_id):
         result = db_admin_service.backup_database(
             db_credential_id=uuid.UUID(credential_id),
             backup_type=backup_type,
-            compression=compression
+            compression=compression,
+            parallel_jobs=int(parallel_jobs) if parallel_jobs else None
         )
         
         if not result['success']:
@@ -151,6 +151,59 @@ def execute_command(host_id):
         return make_response(False, message=str(e), status_code=500)
 
 
+@fleet_bp.route('/api/fleet/command', methods=['POST'])
+@require_auth
+@require_permission(Permission.MANAGE_DOCKER)
+def execute_fleet_command():
+    """
+    POST /api/fleet/command
+    Execute a shell command on several hosts concurrently
+    
+    Request body:
+        {
+            "command": "docker ps",
+            "host_ids": ["host1", "host2"],  // optional, defaults to all hosts
+            "timeout": 30  // optional, seconds per host
+        }
+    
+    Returns:
+        JSON object with one command result per host
+    """
+    try:
+        data = request.get_json() or {}
+        command = data.get('command', '').strip()
+        host_ids = data.get('host_ids') or [h['host_id'] for h in fleet_manager._host_configs()]
+        timeout = data.get('timeout')
+        
+        if not command:
+            return make_response(False, message='Command is required', status_code=400)
+        
+        if len(command) > 1000:
+            return make_response(False, message='Command too long (max 1000 chars)', status_code=400)
+        
+        invalid = [host_id for host_id in host_ids if not validate_host_id(host_id)]
+        if invalid:
+            return make_response(False, message=f'Invalid host ID format: {", ".join(invalid)}', status_code=400)
+        
+        logger.info(f"Executing command on {len(host_ids)} hosts: {command[:50]}...")
+        
+        results = fleet_manager.execute_on_hosts(host_ids, command, timeout or 60)
+        succeeded = sum(1 for r in results.values() if r.get('success'))
+        
+        return make_response(True, {
+            'results': results,
+            'summary': {
+                'total': len(results),
+                'succeeded': succeeded,
+                'failed': len(results) - succeeded
+            }
+        })
+        
+    except Exception as e:
+        logger.error(f"Error executing fleet command: {e}")
+        return make_response(False, message=str(e), status_code=500)
+
+
 @fleet_bp.route('/api/fleet/hosts/<host_id>/containers', methods=['GET'])
 @require_auth
 @require_permission(Permission.VIEW_DOCKER)
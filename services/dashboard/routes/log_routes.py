@@ -20,6 +20,8 @@ except ImportError:
     def require_auth(f):
         return f
 
+from services.pagination import decode_cursor
+
 try:
     from services.log_service import log_service
 except ImportError:
@@ -40,6 +42,9 @@ def query_logs():
     """
     GET /api/logs
     Query logs with filters
+    
+    Pass cursor= (empty for the first page, then next_cursor) for keyset
+    pagination instead of offset.
     """
     try:
         source = request.args.get('source')
@@ -51,6 +56,13 @@ def query_logs():
         limit = request.args.get('limit', 100, type=int)
         offset = request.args.get('offset', 0, type=int)
         stream_id = request.args.get('stream_id', type=int)
+        cursor = request.args.get('cursor')
+        
+        if cursor:
+            try:
+                decode_cursor(cursor)
+            except ValueError as e:
+                return jsonify({'success': False, 'error': str(e)}), 400
         
         start_dt = None
         end_dt = None
@@ -80,7 +92,8 @@ def query_logs():
             container_name=container,
             limit=min(limit, 1000),
             offset=offset,
-            stream_id=stream_id
+            stream_id=stream_id,
+            cursor=cursor
         )
         
         return jsonify({
@@ -3,11 +3,10 @@ System Monitoring Dashboard Routes
 Real-time system metrics with SSE streaming support
 """
 from flask import Blueprint, jsonify, request, render_template, Response
-from datetime import datetime
+from datetime import datetime, timedelta
 import logging
 import json
-import time
-import threading
+import queue
 import os
 
 logger = logging.getLogger(__name__)
@@ -28,156 +27,39 @@ except ImportError:
     PSUTIL_AVAILABLE = False
     logger.warning("psutil not available - local metrics disabled")
 
+from services.host_metrics import host_metrics_sampler
+from services.agent_metrics_store import agent_metrics_store, extract_points
+from services.agent_report_codec import (
+    AgentReportError, DeltaBaseMismatch, PROTOCOL_VERSION, decode_body, expand_reports, sampled_at
+)
+
 
 def get_cpu_metrics():
-    """Get CPU usage metrics"""
+    """Get CPU usage metrics from the shared host sampler"""
     if not PSUTIL_AVAILABLE:
         return {'error': 'psutil not available'}
-    
-    try:
-        cpu_percent = psutil.cpu_percent(interval=0.1)
-        cpu_per_core = psutil.cpu_percent(interval=0.1, percpu=True)
-        cpu_freq = psutil.cpu_freq()
-        cpu_count = psutil.cpu_count()
-        cpu_count_logical = psutil.cpu_count(logical=True)
-        
-        return {
-            'total_percent': cpu_percent,
-            'per_core': cpu_per_core,
-            'frequency': {
-                'current': cpu_freq.current if cpu_freq else 0,
-                'min': cpu_freq.min if cpu_freq else 0,
-                'max': cpu_freq.max if cpu_freq else 0
-            } if cpu_freq else None,
-            'cores_physical': cpu_count,
-            'cores_logical': cpu_count_logical,
-            'load_avg': list(psutil.getloadavg()) if hasattr(psutil, 'getloadavg') else None
-        }
-    except Exception as e:
-        logger.error(f"Error getting CPU metrics: {e}")
-        return {'error': str(e)}
+    return host_metrics_sampler.latest()['cpu']
 
 
 def get_memory_metrics():
-    """Get RAM usage metrics"""
+    """Get RAM usage metrics from the shared host sampler"""
     if not PSUTIL_AVAILABLE:
         return {'error': 'psutil not available'}
-    
-    try:
-        mem = psutil.virtual_memory()
-        swap = psutil.swap_memory()
-        
-        return {
-            'ram': {
-                'total': mem.total,
-                'available': mem.available,
-                'used': mem.used,
-                'free': mem.free,
-                'percent': mem.percent,
-                'total_gb': round(mem.total / (1024**3), 2),
-                'used_gb': round(mem.used / (1024**3), 2),
-                'available_gb': round(mem.available / (1024**3), 2)
-            },
-            'swap': {
-                'total': swap.total,
-                'used': swap.used,
-                'free': swap.free,
-                'percent': swap.percent,
-                'total_gb': round(swap.total / (1024**3), 2),
-                'used_gb': round(swap.used / (1024**3), 2)
-            }
-        }
-    except Exception as e:
-        logger.error(f"Error getting memory metrics: {e}")
-        return {'error': str(e)}
+    return host_metrics_sampler.latest()['memory']
 
 
 def get_disk_metrics():
-    """Get disk usage metrics for all mount points"""
+    """Get disk usage metrics for all mount points from the shared host sampler"""
     if not PSUTIL_AVAILABLE:
         return {'error': 'psutil not available'}
-    
-    try:
-        disks = []
-        partitions = psutil.disk_partitions(all=False)
-        
-        for partition in partitions:
-            try:
-                usage = psutil.disk_usage(partition.mountpoint)
-                disks.append({
-                    'device': partition.device,
-                    'mountpoint': partition.mountpoint,
-                    'fstype': partition.fstype,
-                    'total': usage.total,
-                    'used': usage.used,
-                    'free': usage.free,
-                    'percent': usage.percent,
-                    'total_gb': round(usage.total / (1024**3), 2),
-                    'used_gb': round(usage.used / (1024**3), 2),
-                    'free_gb': round(usage.free / (1024**3), 2)
-                })
-            except (PermissionError, OSError):
-                continue
-        
-        disk_io = psutil.disk_io_counters()
-        io_stats = None
-        if disk_io:
-            io_stats = {
-                'read_bytes': disk_io.read_bytes,
-                'write_bytes': disk_io.write_bytes,
-                'read_count': disk_io.read_count,
-                'write_count': disk_io.write_count,
-                'read_gb': round(disk_io.read_bytes / (1024**3), 2),
-                'write_gb': round(disk_io.write_bytes / (1024**3), 2)
-            }
-        
-        return {
-            'partitions': disks,
-            'io': io_stats
-        }
-    except Exception as e:
-        logger.error(f"Error getting disk metrics: {e}")
-        return {'error': str(e)}
+    return host_metrics_sampler.latest()['disk']
 
 
 def get_network_metrics():
-    """Get network I/O metrics"""
+    """Get network I/O metrics from the shared host sampler"""
     if not PSUTIL_AVAILABLE:
         return {'error': 'psutil not available'}
-    
-    try:
-        net_io = psutil.net_io_counters()
-        net_io_per_nic = psutil.net_io_counters(pernic=True)
-        
-        interfaces = []
-        for nic, stats in net_io_per_nic.items():
-            interfaces.append({
-                'name': nic,
-                'bytes_sent': stats.bytes_sent,
-                'bytes_recv': stats.bytes_recv,
-                'packets_sent': stats.packets_sent,
-                'packets_recv': stats.packets_recv,
-                'sent_mb': round(stats.bytes_sent / (1024**2), 2),
-                'recv_mb': round(stats.bytes_recv / (1024**2), 2)
-            })
-        
-        connections = len(psutil.net_connections(kind='inet'))
-        
-        return {
-            'total': {
-                'bytes_sent': net_io.bytes_sent,
-                'bytes_recv': net_io.bytes_recv,
-                'packets_sent': net_io.packets_sent,
-                'packets_recv': net_io.packets_recv,
-                'sent_gb': round(net_io.bytes_sent / (1024**3), 2),
-                'recv_gb': round(net_io.bytes_recv / (1024**3), 2)
-            },
-            'interfaces': interfaces,
-            'connections': connections
-        }
-    except Exception as e:
-        logger.error(f"Error getting network metrics: {e}")
-        return {'error': str(e)}
+    return host_metrics_sampler.latest()['network']
 
 
 def get_process_metrics(limit=15):
@@ -334,6 +216,57 @@ def get_processes():
     })
 
 
+@monitoring_bp.route('/cache', methods=['GET'])
+@require_auth
+def get_cache_stats():
+    """
+    GET /api/monitoring/cache
+    Get cache tier and per-namespace hit/miss/eviction counters for this worker
+    """
+    from services.cache_service import cache_service
+    
+    return jsonify({
+        'success': True,
+        'data': cache_service.get_stats(),
+        'timestamp': datetime.now().isoformat()
+    })
+
+
+@monitoring_bp.route('/websockets', methods=['GET'])
+@require_auth
+def get_websocket_stats():
+    """
+    GET /api/monitoring/websockets
+    Get WebSocket connection counts and per-room send metrics for this worker
+    """
+    from services.websocket_service import websocket_service
+    
+    return jsonify({
+        'success': True,
+        'data': {
+            'connections': websocket_service.get_connection_count(),
+            'rooms': websocket_service.get_room_metrics()
+        },
+        'timestamp': datetime.now().isoformat()
+    })
+
+
+_last_stream_payload = {'sampled_at': None, 'payload': None}
+
+
+def _stream_payload(sample: dict) -> str:
+    """SSE frame for a host sample, cached so concurrent streams share one encoding"""
+    if _last_stream_payload['sampled_at'] != sample['sampled_at']:
+        metrics = {
+            'timestamp': sample['timestamp'],
+            'cpu': sample['cpu'],
+            'memory': sample['memory'],
+            'network': sample['network']
+        }
+        _last_stream_payload.update(sampled_at=sample['sampled_at'], payload=f"data: {json.dumps(metrics)}\n\n")
+    return _last_stream_payload['payload']
+
+
 @monitoring_bp.route('/stream', methods=['GET'])
 @require_auth
 def stream_metrics():
@@ -342,22 +275,21 @@ def stream_metrics():
     Server-Sent Events endpoint for real-time metrics streaming
     """
     def generate():
-        while True:
-            try:
-                metrics = {
-                    'timestamp': datetime.now().isoformat(),
-                    'cpu': get_cpu_metrics(),
-                    'memory': get_memory_metrics(),
-                    'network': get_network_metrics()
-                }
-                yield f"data: {json.dumps(metrics)}\n\n"
-                time.sleep(2)
-            except GeneratorExit:
-                break
-            except Exception as e:
-                logger.error(f"SSE stream error: {e}")
-                yield f"data: {json.dumps({'error': str(e)})}\n\n"
-                time.sleep(5)
+        # One sampler feeds every open stream; each sample is encoded once
+        subscriber = host_metrics_sampler.subscribe()
+        try:
+            yield _stream_payload(host_metrics_sampler.latest())
+            while True:
+                try:
+                    sample = subscriber.get(timeout=30)
+                except queue.Empty:
+                    yield ": keepalive\n\n"
+                    continue
+                yield _stream_payload(sample)
+        except GeneratorExit:
+            pass
+        finally:
+            host_metrics_sampler.unsubscribe(subscriber)
     
     return Response(
         generate(),
@@ -376,65 +308,52 @@ def get_remote_metrics(host_id):
     """
     GET /api/monitoring/remote/<host_id>/metrics
     Get metrics from a remote host via SSH (Tailscale)
+    
+    Runs one shell command over the fleet's pooled SSH connection rather
+    than starting a remote Python interpreter.
     """
     try:
-        from services.fleet_service import fleet_service
+        from services.fleet_service import fleet_manager
         
-        host = fleet_service.get_host(host_id)
-        if not host:
+        if not fleet_manager._get_host_config(host_id):
             return jsonify({
                 'success': False,
                 'error': f'Host {host_id} not found'
             }), 404
         
-        ssh_command = '''python3 -c "
-import json, psutil
-from datetime import datetime
-data = {
-    'timestamp': datetime.now().isoformat(),
-    'cpu': {
-        'percent': psutil.cpu_percent(interval=0.1),
-        'per_core': psutil.cpu_percent(interval=0.1, percpu=True),
-        'cores': psutil.cpu_count()
-    },
-    'memory': {
-        'percent': psutil.virtual_memory().percent,
-        'total_gb': round(psutil.virtual_memory().total / (1024**3), 2),
-        'used_gb': round(psutil.virtual_memory().used / (1024**3), 2)
-    },
-    'disk': {
-        'percent': psutil.disk_usage('/').percent,
-        'total_gb': round(psutil.disk_usage('/').total / (1024**3), 2)
-    }
-}
-print(json.dumps(data))
-"'''
-        
-        result = fleet_service.execute_ssh_command(host_id, ssh_command)
-        
-        if result.get('success'):
-            metrics = json.loads(result.get('output', '{}'))
-            return jsonify({
-                'success': True,
-                'host_id': host_id,
-                'data': metrics
-            })
-        else:
+        status = fleet_manager.get_host_status(host_id)
+        if not status:
             return jsonify({
                 'success': False,
-                'error': result.get('error', 'SSH command failed')
-            }), 500
+                'error': f'Cannot connect to host {host_id}'
+            }), 502
+        
+        return jsonify({
+            'success': True,
+            'host_id': host_id,
+            'data': {
+                'timestamp': status['timestamp'],
+                'cpu': {
+                    'percent': status.get('cpu_percent'),
+                    'cores': status.get('cpu_cores')
+                },
+                'memory': {
+                    'percent': status.get('memory_percent'),
+                    'total_gb': status.get('memory_total_gb'),
+                    'used_gb': status.get('memory_used_gb')
+                },
+                'disk': {
+                    'percent': status.get('disk_percent'),
+                    'total_gb': status.get('disk_total_gb')
+                }
+            }
+        })
             
     except ImportError:
         return jsonify({
             'success': False,
             'error': 'Fleet service not available'
         }), 503
-    except json.JSONDecodeError as e:
-        return jsonify({
-            'success': False,
-            'error': f'Failed to parse remote metrics: {e}'
-        }), 500
     except Exception as e:
         logger.error(f"Error getting remote metrics: {e}")
         return jsonify({
@@ -443,13 +362,17 @@ print(json.dumps(data))
         }), 500
 
 
-_agent_metrics_cache = {}
-
 @monitoring_bp.route('/agent/report', methods=['POST'])
 def receive_agent_metrics():
     """
     POST /api/monitoring/agent/report
     Receive metrics from remote monitoring agents
+    
+    Accepts a single JSON report (agents before 1.1) or a version 2 batch:
+    gzip-compressed JSON or msgpack holding reports delta-encoded against
+    the last acknowledged one. Batches are answered with the ``seq`` of
+    the newest stored report, or 409 with ``resync`` when a delta's base
+    is unknown.
     """
     try:
         api_key = request.headers.get('X-API-Key', '')
@@ -458,19 +381,28 @@ def receive_agent_metrics():
         if expected_key and api_key != expected_key:
             return jsonify({'success': False, 'error': 'Invalid API key'}), 401
         
-        data = request.get_json()
-        if not data:
+        try:
+            data = decode_body(request.get_data(cache=False), request.content_type,
+                               request.headers.get('Content-Encoding'))
+        except AgentReportError as e:
+            return jsonify({'success': False, 'error': str(e)}), e.status_code
+        
+        if not data or not isinstance(data, dict):
             return jsonify({'success': False, 'error': 'No data provided'}), 400
         
+        if data.get('v') == PROTOCOL_VERSION:
+            return _receive_agent_batch(data)
+        
         hostname = data.get('hostname', 'unknown')
-        data['received_at'] = datetime.utcnow().isoformat()
+        received_at = datetime.utcnow()
+        data['received_at'] = received_at.isoformat()
         data['agent_ip'] = request.remote_addr
         
-        _agent_metrics_cache[hostname] = data
+        agent_metrics_store.ingest(hostname, data, received_at=received_at, agent_ip=request.remote_addr)
         
         logger.info(f"Received metrics from agent: {hostname}")
         
-        check_agent_thresholds(hostname, data)
+        _evaluate_agent_alerts(hostname, data)
         
         return jsonify({'success': True, 'message': f'Metrics received from {hostname}'})
     except Exception as e:
@@ -478,29 +410,85 @@ def receive_agent_metrics():
         return jsonify({'success': False, 'error': str(e)}), 500
 
 
+def _receive_agent_batch(payload: dict):
+    """Expand and store a version 2 batch of agent reports"""
+    hostname = payload.get('hostname') or 'unknown'
+    entries = payload.get('reports') or []
+    
+    # The delta base is only needed (and only read) when the batch opens with a delta
+    base = None
+    if entries and isinstance(entries[0], dict) and 'full' not in entries[0]:
+        base = agent_metrics_store.latest(hostname)
+    
+    try:
+        reports = expand_reports(payload, base)
+    except DeltaBaseMismatch as e:
+        logger.info(f"Agent {hostname} must resync: {e}")
+        return jsonify({'success': False, 'error': str(e), 'resync': True}), 409
+    except AgentReportError as e:
+        return jsonify({'success': False, 'error': str(e)}), e.status_code
+    
+    received_at = datetime.utcnow()
+    batch = []
+    for report in reports:
+        report = dict(report, hostname=hostname, received_at=received_at.isoformat(),
+                      agent_ip=request.remote_addr)
+        batch.append((sampled_at(report, received_at), report))
+    
+    agent_metrics_store.ingest_many(hostname, batch, received_at=received_at, agent_ip=request.remote_addr)
+    
+    logger.debug(f"Received {len(batch)} reports from agent: {hostname}")
+    
+    # Buffered reports only feed the history; alerts look at the newest one
+    latest = batch[-1][1]
+    _evaluate_agent_alerts(hostname, latest)
+    
+    return jsonify({
+        'success': True,
+        'accepted': len(batch),
+        'acked': latest.get('seq')
+    })
+
+
+def _evaluate_agent_alerts(hostname: str, data: dict):
+    check_agent_thresholds(hostname, data)
+    
+    from services.alert_service import alert_service
+    alert_service.evaluate_agent_metrics(hostname, data)
+
+
 @monitoring_bp.route('/agents', methods=['GET'])
 @require_auth
 def list_agents():
     """
     GET /api/monitoring/agents
-    List all reporting monitoring agents
+    List all reporting monitoring agents with their last hour of CPU and
+    memory (per-minute averages)
     """
-    agents = []
-    for hostname, data in _agent_metrics_cache.items():
-        agents.append({
-            'hostname': hostname,
-            'last_seen': data.get('received_at'),
-            'agent_version': data.get('agent_version'),
-            'cpu_percent': data.get('cpu', {}).get('percent'),
-            'memory_percent': data.get('memory', {}).get('ram', {}).get('percent'),
-            'uptime': data.get('uptime', {}).get('uptime_human')
+    try:
+        reports = agent_metrics_store.list_reports()
+        trends = agent_metrics_store.trends()
+        
+        agents = []
+        for hostname, data in sorted(reports.items()):
+            agents.append({
+                'hostname': hostname,
+                'last_seen': data.get('received_at'),
+                'agent_version': data.get('agent_version'),
+                'cpu_percent': data.get('cpu', {}).get('percent'),
+                'memory_percent': data.get('memory', {}).get('ram', {}).get('percent'),
+                'uptime': data.get('uptime', {}).get('uptime_human'),
+                'trend': trends.get(hostname, {})
+            })
+        
+        return jsonify({
+            'success': True,
+            'agents': agents,
+            'count': len(agents)
         })
-    
-    return jsonify({
-        'success': True,
-        'agents': agents,
-        'count': len(agents)
-    })
+    except Exception as e:
+        logger.error(f"Error listing agents: {e}")
+        return jsonify({'success': False, 'error': str(e)}), 500
 
 
 @monitoring_bp.route('/agents/<hostname>', methods=['GET'])
@@ -510,16 +498,56 @@ def get_agent_metrics(hostname):
     GET /api/monitoring/agents/<hostname>
     Get full metrics from a specific agent
     """
-    if hostname not in _agent_metrics_cache:
+    data = agent_metrics_store.latest(hostname)
+    if data is None:
         return jsonify({'success': False, 'error': f'Agent {hostname} not found'}), 404
     
     return jsonify({
         'success': True,
         'hostname': hostname,
-        'data': _agent_metrics_cache[hostname]
+        'data': data,
+        'metrics': sorted(extract_points(data))
     })
 
 
+@monitoring_bp.route('/agents/<hostname>/series', methods=['GET'])
+@require_auth
+def get_agent_series(hostname):
+    """
+    GET /api/monitoring/agents/<hostname>/series
+    Rolled-up time series for graphs
+    
+    Query params:
+        metric: Metric name, repeatable (default: cpu.percent and memory.percent)
+        start: ISO start time (default: now - hours)
+        end: ISO end time (default: now)
+        hours: Range length when start is omitted (default: 1)
+        resolution: 1m, 5m or 1h (default: picked from the range)
+    """
+    try:
+        metrics = request.args.getlist('metric') or ['cpu.percent', 'memory.percent']
+        resolution = request.args.get('resolution')
+        
+        try:
+            end = request.args.get('end')
+            end_dt = datetime.fromisoformat(end.replace('Z', '+00:00')) if end else datetime.utcnow()
+            start = request.args.get('start')
+            if start:
+                start_dt = datetime.fromisoformat(start.replace('Z', '+00:00'))
+            else:
+                start_dt = end_dt - timedelta(hours=request.args.get('hours', 1, type=float))
+        except ValueError as e:
+            return jsonify({'success': False, 'error': f'Invalid time range: {e}'}), 400
+        
+        result = agent_metrics_store.query_range(hostname, metrics, start_dt, end_dt, resolution=resolution)
+        if not result.get('success'):
+            return jsonify(result), 400
+        return jsonify(result)
+    except Exception as e:
+        logger.error(f"Error querying series for agent {hostname}: {e}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+
 def check_agent_thresholds(hostname: str, data: dict):
     """Check agent metrics against alert thresholds and trigger notifications"""
     try:
@@ -535,7 +563,8 @@ def check_agent_thresholds(hostname: str, data: dict):
                     hostname=hostname,
                     alert_type='disk',
                     value=disk_percent,
-                    details=f"Disk {disk.get('mountpoint')} at {disk_percent}%"
+                    details=f"Disk {disk.get('mountpoint')} at {disk_percent}%",
+                    subject=disk.get('mountpoint')
                 )
         
         if cpu_percent > 90:
@@ -619,8 +648,8 @@ def list_monitored_hosts():
     List all hosts available for monitoring
     """
     try:
-        from services.fleet_service import fleet_service
-        hosts = fleet_service.list_hosts()
+        from services.fleet_service import fleet_manager
+        hosts = fleet_manager.list_hosts()
         return jsonify({
             'success': True,
             'hosts': hosts,
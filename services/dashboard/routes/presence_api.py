@@ -9,6 +9,8 @@ import psutil
 from datetime import datetime
 from functools import wraps
 
+from services.host_metrics import host_metrics_sampler
+
 presence_bp = Blueprint('presence', __name__, url_prefix='/api/homelab')
 
 SERVICE_AUTH_TOKEN = os.environ.get('SERVICE_AUTH_TOKEN', 'dev-token')
@@ -27,9 +29,10 @@ def require_service_auth(f):
 def get_system_stats():
     """Get current system statistics."""
     try:
-        cpu_percent = psutil.cpu_percent(interval=0.1)
-        memory = psutil.virtual_memory()
-        disk = psutil.disk_usage('/')
+        sample = host_metrics_sampler.latest()
+        cpu_percent = sample['cpu']['total_percent']
+        memory_percent = sample['memory']['ram']['percent']
+        disk_percent = sample['disk']['root']['percent']
         boot_time = datetime.fromtimestamp(psutil.boot_time())
         uptime = datetime.now() - boot_time
         
@@ -44,8 +47,8 @@ def get_system_stats():
         
         return {
             'cpu': round(cpu_percent, 1),
-            'memory': round(memory.percent, 1),
-            'disk': round(disk.percent, 1),
+            'memory': round(memory_percent, 1),
+            'disk': round(disk_percent, 1),
             'uptime': uptime_str
         }
     except Exception as e:
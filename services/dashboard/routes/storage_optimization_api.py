@@ -229,6 +229,7 @@ def trigger_cleanup():
         bucket: Bucket name (required)
         prefix: Object prefix to filter (default: "")
         days: Delete objects older than this many days (required)
+        dry_run: Only estimate what would be deleted (default: false)
     
     Returns:
         JSON with cleanup results
@@ -268,7 +269,9 @@ def trigger_cleanup():
                 'error': f'Invalid days parameter: {str(e)}'
             }), 400
         
-        result = minio_lifecycle_service.cleanup_old_files(bucket, prefix, days)
+        dry_run = bool(data.get('dry_run', False))
+        
+        result = minio_lifecycle_service.cleanup_old_files(bucket, prefix, days, dry_run=dry_run)
         
         if not result.get('success'):
             return jsonify(result), 500
@@ -7,7 +7,8 @@ from flask import Blueprint, request, jsonify, session, render_template, send_fi
 from services.storage_monitor import storage_monitor
 from services.storage_service import storage_service
 from services.db_service import db_service
-from services.cache_service import cache_service
+from services.cache_service import cache_service, cached
+from services.websocket_service import websocket_service
 from workers.storage_worker import (
     collect_storage_metrics,
     scan_plex_directories,
@@ -35,6 +36,7 @@ def storage_page():
 
 @storage_bp.route('/api/storage/metrics', methods=['GET'])
 @login_required
+@cached(ttl=cache_service.TTL_5_MIN, key='storage:metrics:current')
 def get_current_metrics():
     """
     Get current storage usage across all types
@@ -43,14 +45,6 @@ def get_current_metrics():
         JSON with current metrics for Plex, databases, Docker, and MinIO
     """
     try:
-        # Try to get from cache first
-        cache_key = 'storage:metrics:current'
-        cached = cache_service.get(cache_key)
-        if cached:
-            logger.debug("Returning cached storage metrics")
-            return jsonify(cached)
-        
-        # Query database if not cached
         metrics = storage_monitor.get_current_metrics()
         
         result = {
@@ -59,9 +53,6 @@ def get_current_metrics():
             'timestamp': datetime.utcnow().isoformat()
         }
         
-        # Cache for 5 minutes
-        cache_service.set(cache_key, result, ttl=cache_service.TTL_5_MIN)
-        
         return jsonify(result)
     
     except Exception as e:
@@ -285,7 +276,7 @@ def create_or_update_alert():
     """
     try:
         # Invalidate alerts cache on mutation
-        cache_service.delete_pattern('storage:alerts:*')
+        cache_service.invalidate_namespace('storage:alerts')
         data = request.get_json()
         
         if not data:
@@ -836,6 +827,7 @@ def sync_bucket():
         bucket: Bucket name
         source: Source backend ('local' or 'cloud')
         destination: Destination backend ('local' or 'cloud')
+        dst_bucket: Destination bucket name (default: same as bucket)
         delete_extra: Whether to delete objects that exist only in destination (default: false)
         
     Returns:
@@ -855,7 +847,11 @@ def sync_bucket():
         destination = data.get('destination', 'cloud')
         delete_extra = data.get('delete_extra', False)
         
-        result = storage_service.sync_bucket(bucket, source, destination, delete_extra)
+        result = storage_service.sync_bucket(
+            bucket, source, destination, delete_extra,
+            on_progress=_publish_sync_progress(source, destination),
+            dst_bucket=data.get('dst_bucket')
+        )
         
         return jsonify(result)
     
@@ -867,8 +863,60 @@ def sync_bucket():
         }), 500
 
 
+def _publish_sync_progress(source: str, destination: str):
+    """Progress callback that relays sync snapshots to the system WebSocket room"""
+    def publish(progress):
+        websocket_service.broadcast_to_system({
+            'type': 'storage_sync_progress',
+            'source': source,
+            'destination': destination,
+            **progress
+        })
+    return publish
+
+
+@storage_bp.route('/api/storage/sync/status', methods=['GET'])
+@login_required
+def get_sync_status():
+    """
+    Get progress of the running or most recent sync of a bucket
+    
+    Query params:
+        bucket: Bucket name
+        source: Source backend (default: 'local')
+        destination: Destination backend (default: 'cloud')
+        dst_bucket: Destination bucket name (default: same as bucket)
+        
+    Returns:
+        JSON with object and byte counts and the sync state
+    """
+    try:
+        bucket = request.args.get('bucket')
+        if not bucket:
+            return jsonify({
+                'success': False,
+                'error': 'Bucket name is required'
+            }), 400
+        
+        result = storage_service.get_sync_status(
+            bucket,
+            request.args.get('source', 'local'),
+            request.args.get('destination', 'cloud'),
+            request.args.get('dst_bucket')
+        )
+        return jsonify(result), 200 if result['success'] else 404
+    
+    except Exception as e:
+        logger.error(f"Error getting sync status: {e}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
 @storage_bp.route('/api/storage/stats', methods=['GET'])
 @login_required
+@cached(ttl=cache_service.TTL_5_MIN, key=lambda: f"storage:unified:stats:{request.args.get('backend', 'all')}")
 def get_storage_stats():
     """
     Get storage usage statistics
@@ -881,16 +929,7 @@ def get_storage_stats():
     """
     try:
         backend = request.args.get('backend', 'all')
-        
-        cache_key = f'storage:unified:stats:{backend}'
-        cached = cache_service.get(cache_key)
-        if cached:
-            return jsonify(cached)
-        
         result = storage_service.get_storage_stats(backend)
-        
-        cache_service.set(cache_key, result, ttl=cache_service.TTL_5_MIN)
-        
         return jsonify(result)
     
     except Exception as e:
@@ -924,7 +963,7 @@ def mirror_to_cloud():
         
         bucket = data['bucket']
         
-        result = storage_service.mirror_to_cloud(bucket)
+        result = storage_service.mirror_to_cloud(bucket, on_progress=_publish_sync_progress('local', 'cloud'))
         
         return jsonify(result)
     
@@ -8,6 +8,7 @@ import json
 import time
 
 from services.unified_logging_service import unified_logging_service
+from services.pagination import decode_cursor
 from workers.log_collector import collect_container_logs, rotate_old_logs
 
 logger = logging.getLogger(__name__)
@@ -40,6 +41,8 @@ def get_logs():
         search: Search in message content (optional)
         limit: Max logs to return (default: 100, max: 1000)
         offset: Offset for pagination (default: 0)
+        cursor: Keyset cursor (empty for the first page, then next_cursor);
+            replaces offset for constant-cost deep pagination (optional)
     
     Returns:
         JSON with logs and pagination info
@@ -52,6 +55,16 @@ def get_logs():
         limit = int(request.args.get('limit', 100))
         limit = min(limit, 1000)
         offset = int(request.args.get('offset', 0))
+        cursor = request.args.get('cursor')
+        
+        if cursor:
+            try:
+                decode_cursor(cursor)
+            except ValueError as e:
+                return jsonify({
+                    'success': False,
+                    'error': str(e)
+                }), 400
         
         start_date = None
         if request.args.get('start_date'):
@@ -80,7 +93,8 @@ def get_logs():
             end_date=end_date,
             search=search,
             limit=limit,
-            offset=offset
+            offset=offset,
+            cursor=cursor
         )
         
         if not result.get('success'):
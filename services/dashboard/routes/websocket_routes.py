@@ -71,7 +71,7 @@ def workflow_updates(workflow_id):
                     message = json.loads(data)
                     if message.get('type') == 'ping':
                         websocket_service.update_ping_time(ws)
-                        ws.send(json.dumps({'type': 'pong', 'timestamp': message.get('timestamp')}))
+                        websocket_service.send(ws, {'type': 'pong', 'timestamp': message.get('timestamp')})
                     elif message.get('type') == 'pong':
                         websocket_service.update_ping_time(ws)
                 except json.JSONDecodeError:
@@ -115,7 +115,7 @@ def task_notifications():
                     message = json.loads(data)
                     if message.get('type') == 'ping':
                         websocket_service.update_ping_time(ws)
-                        ws.send(json.dumps({'type': 'pong', 'timestamp': message.get('timestamp')}))
+                        websocket_service.send(ws, {'type': 'pong', 'timestamp': message.get('timestamp')})
                     elif message.get('type') == 'pong':
                         websocket_service.update_ping_time(ws)
                 except json.JSONDecodeError:
@@ -160,7 +160,7 @@ def deployment_progress(deployment_id):
                     message = json.loads(data)
                     if message.get('type') == 'ping':
                         websocket_service.update_ping_time(ws)
-                        ws.send(json.dumps({'type': 'pong', 'timestamp': message.get('timestamp')}))
+                        websocket_service.send(ws, {'type': 'pong', 'timestamp': message.get('timestamp')})
                     elif message.get('type') == 'pong':
                         websocket_service.update_ping_time(ws)
                 except json.JSONDecodeError:
@@ -204,7 +204,7 @@ def system_events():
                     message = json.loads(data)
                     if message.get('type') == 'ping':
                         websocket_service.update_ping_time(ws)
-                        ws.send(json.dumps({'type': 'pong', 'timestamp': message.get('timestamp')}))
+                        websocket_service.send(ws, {'type': 'pong', 'timestamp': message.get('timestamp')})
                     elif message.get('type') == 'pong':
                         websocket_service.update_ping_time(ws)
                 except json.JSONDecodeError:
@@ -163,9 +163,10 @@ class ActivityService:
         user_id: str = None,
         start_date: datetime = None,
         end_date: datetime = None,
-        search: str = None
+        search: str = None,
+        cursor: str = None
     ) -> Dict[str, Any]:
-        """Query events with filters and pagination"""
+        """Query events with filters and pagination (keyset when cursor is given)"""
         try:
             from models.activity import ActivityEvent, EventSeverity, SourceService
             
@@ -214,6 +215,18 @@ class ActivityService:
                         (ActivityEvent.event_type.ilike(search_term))
                     )
                 
+                if cursor is not None:
+                    from services.pagination import apply_keyset, split_keyset_page
+                    
+                    events = apply_keyset(query, ActivityEvent.created_at, ActivityEvent.id, cursor, limit).all()
+                    events, next_cursor = split_keyset_page(events, ActivityEvent.created_at, ActivityEvent.id, limit)
+                    return {
+                        'events': [e.to_dict() for e in events],
+                        'limit': limit,
+                        'next_cursor': next_cursor,
+                        'has_more': next_cursor is not None
+                    }
+                
                 total = query.count()
                 
                 events = query.order_by(ActivityEvent.created_at.desc()).offset(offset).limit(limit).all()
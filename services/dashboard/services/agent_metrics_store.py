@@ -0,0 +1,415 @@
+"""
+Agent Metrics Store
+Durable latest reports and downsampled time series for remote monitoring
+agents, shared by every dashboard worker
+"""
+import logging
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Any, Iterable, Tuple
+
+from sqlalchemy import case, func, or_, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from config import Config
+from models.agent_metrics import AgentReport, AgentMetric1m, AgentMetric5m, AgentMetric1h
+from services.db_service import db_service
+from services.log_partitions import LogPartitionManager
+
+logger = logging.getLogger(__name__)
+
+
+# Resolution name -> (bucket seconds, rollup model), finest first
+RESOLUTIONS = OrderedDict([
+    ('1m', (60, AgentMetric1m)),
+    ('5m', (300, AgentMetric5m)),
+    ('1h', (3600, AgentMetric1h)),
+])
+
+# Monotonic counters; range queries also return a per-second rate for these
+COUNTER_METRICS = {'network.bytes_sent', 'network.bytes_recv'}
+
+TREND_METRICS = ['cpu.percent', 'memory.percent']
+
+
+def _number(value) -> Optional[float]:
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return None
+    return float(value)
+
+
+def extract_points(data: Dict[str, Any]) -> Dict[str, float]:
+    """
+    Flatten an agent report into ``metric name -> value``
+    
+    Disk usage is recorded per mountpoint as ``disk.percent:<mountpoint>``.
+    """
+    cpu = data.get('cpu') or {}
+    memory = data.get('memory') or {}
+    network = data.get('network') or {}
+    candidates = {
+        'cpu.percent': cpu.get('percent'),
+        'cpu.load_1m': cpu.get('load_avg_1m'),
+        'memory.percent': (memory.get('ram') or {}).get('percent'),
+        'swap.percent': (memory.get('swap') or {}).get('percent'),
+        'network.bytes_sent': network.get('bytes_sent'),
+        'network.bytes_recv': network.get('bytes_recv'),
+        'uptime.seconds': (data.get('uptime') or {}).get('uptime_seconds'),
+        'docker.running': (data.get('docker') or {}).get('running'),
+    }
+    
+    for disk in (data.get('disk') or {}).get('partitions') or []:
+        if disk.get('mountpoint'):
+            candidates[f"disk.percent:{disk['mountpoint']}"[:128]] = disk.get('percent')
+    
+    temperatures = [
+        _number(entry.get('current'))
+        for entries in ((data.get('temperatures') or {}).get('sensors') or {}).values()
+        for entry in entries or []
+    ]
+    temperatures = [t for t in temperatures if t is not None]
+    if temperatures:
+        candidates['temperature.max'] = max(temperatures)
+    
+    points = {}
+    for metric, value in candidates.items():
+        value = _number(value)
+        if value is not None:
+            points[metric] = value
+    return points
+
+
+def _fold(buckets: Dict, key, values: List[float]):
+    """Merge ``[count, sum, min, max, last, last_at]`` into ``buckets[key]``"""
+    current = buckets.get(key)
+    if current is None:
+        buckets[key] = values
+        return
+    current[0] += values[0]
+    current[1] += values[1]
+    current[2] = min(current[2], values[2])
+    current[3] = max(current[3], values[3])
+    if values[5] >= current[5]:
+        # Batches can arrive out of order; keep the most recently sampled value
+        current[4], current[5] = values[4], values[5]
+
+
+def _utc_naive(value: datetime) -> datetime:
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def bucket_start(value: datetime, seconds: int) -> datetime:
+    value = _utc_naive(value)
+    epoch = int((value - datetime(1970, 1, 1)).total_seconds())
+    return datetime(1970, 1, 1) + timedelta(seconds=epoch - epoch % seconds)
+
+
+class AgentMetricsStore:
+    """
+    Ingests agent reports into PostgreSQL and answers range queries
+    
+    Each report upserts the agent's latest snapshot into ``agent_reports``
+    and folds every numeric metric into 1m/5m/1h rollup buckets
+    (count/sum/min/max/last) with one ``INSERT ... ON CONFLICT`` per
+    resolution, so no separate downsampling job is needed. The rollup
+    tables are daily partitioned and each resolution keeps its own
+    retention. When the database is unavailable the same rollups are kept
+    in a bounded in-process store so the monitoring pages keep working.
+    """
+    
+    def __init__(self, retention_days: Optional[Dict[str, int]] = None,
+                 local_max_buckets: Optional[int] = None):
+        self.retention_days = retention_days or {
+            '1m': Config.AGENT_METRICS_RETENTION_1M_DAYS,
+            '5m': Config.AGENT_METRICS_RETENTION_5M_DAYS,
+            '1h': Config.AGENT_METRICS_RETENTION_1H_DAYS,
+        }
+        self.local_max_buckets = local_max_buckets or Config.AGENT_METRICS_LOCAL_BUCKETS
+        self.max_points = Config.AGENT_METRICS_MAX_POINTS
+        self.partitions = LogPartitionManager(tables={
+            model.__tablename__: self.retention_days[name]
+            for name, (_, model) in RESOLUTIONS.items()
+        })
+        self._lock = threading.Lock()
+        self._local_reports: Dict[str, Dict[str, Any]] = {}
+        self._local_series: Dict[Tuple[str, str, str], 'OrderedDict[datetime, List[float]]'] = {}
+    
+    def ingest(self, hostname: str, data: Dict[str, Any], received_at: Optional[datetime] = None,
+               agent_ip: Optional[str] = None) -> Dict[str, Any]:
+        """Store a report as the agent's latest snapshot and roll its metrics up"""
+        received_at = _utc_naive(received_at or datetime.utcnow())
+        return self.ingest_many(hostname, [(received_at, data)], received_at=received_at, agent_ip=agent_ip)
+    
+    def ingest_many(self, hostname: str, reports: List[Tuple[datetime, Dict[str, Any]]],
+                    received_at: Optional[datetime] = None, agent_ip: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Store a batch of reports from one agent in a single transaction
+        
+        Args:
+            hostname: Agent hostname
+            reports: ``(sampled_at, report)`` pairs, oldest first; each
+                report's metrics are bucketed by its own sample time
+            received_at: When the batch arrived (default now)
+            agent_ip: Address the batch came from
+        
+        Only the last report becomes the agent's latest snapshot, and all
+        points are pre-aggregated per bucket so each resolution is still
+        one upsert however many reports the batch holds.
+        """
+        if not reports:
+            return {'success': True, 'store': None, 'points': 0}
+        received_at = _utc_naive(received_at or datetime.utcnow())
+        samples = [(_utc_naive(sampled_at), extract_points(data)) for sampled_at, data in reports]
+        rollups = self._rollup(samples)
+        latest = reports[-1][1]
+        point_count = sum(len(points) for _, points in samples)
+        
+        if db_service.is_available:
+            try:
+                with db_service.get_session() as session:
+                    self._write(session, hostname, latest, received_at, agent_ip, rollups)
+                return {'success': True, 'store': 'database', 'points': point_count}
+            except Exception as e:
+                logger.error(f"Error storing metrics for agent {hostname}, keeping them locally: {e}")
+        
+        self._ingest_local(hostname, latest, rollups)
+        return {'success': True, 'store': 'local', 'points': point_count}
+    
+    @staticmethod
+    def _rollup(samples: List[Tuple[datetime, Dict[str, float]]]) -> Dict[str, Dict[Tuple[str, datetime], List[float]]]:
+        """Fold points into ``resolution -> (metric, bucket) -> [count, sum, min, max, last, last_at]``"""
+        rollups = {}
+        for resolution, (seconds, _) in RESOLUTIONS.items():
+            buckets: Dict[Tuple[str, datetime], List[float]] = {}
+            for sampled_at, points in samples:
+                bucket = bucket_start(sampled_at, seconds)
+                for metric, value in points.items():
+                    _fold(buckets, (metric, bucket), [1, value, value, value, value, sampled_at])
+            rollups[resolution] = buckets
+        return rollups
+    
+    def _write(self, session, hostname: str, data: Dict[str, Any], received_at: datetime,
+               agent_ip: Optional[str], rollups: Dict[str, Dict[Tuple[str, datetime], List[float]]]):
+        report = pg_insert(AgentReport).values(
+            hostname=hostname,
+            agent_version=data.get('agent_version'),
+            agent_ip=agent_ip,
+            data=data,
+            received_at=received_at
+        )
+        session.execute(report.on_conflict_do_update(
+            index_elements=[AgentReport.hostname],
+            set_={
+                'agent_version': report.excluded.agent_version,
+                'agent_ip': report.excluded.agent_ip,
+                'data': report.excluded.data,
+                'received_at': report.excluded.received_at
+            }
+        ))
+        
+        for resolution, (_, model) in RESOLUTIONS.items():
+            buckets = rollups[resolution]
+            if not buckets:
+                continue
+            stmt = pg_insert(model).values([
+                {'hostname': hostname, 'metric': metric, 'timestamp': bucket,
+                 'count': b[0], 'sum': b[1], 'min': b[2], 'max': b[3], 'last': b[4], 'last_at': b[5]}
+                for (metric, bucket), b in buckets.items()
+            ])
+            table = model.__table__
+            session.execute(stmt.on_conflict_do_update(
+                index_elements=[table.c.hostname, table.c.metric, table.c.timestamp],
+                set_={
+                    'count': table.c.count + stmt.excluded.count,
+                    'sum': table.c.sum + stmt.excluded.sum,
+                    'min': func.least(table.c.min, stmt.excluded.min),
+                    'max': func.greatest(table.c.max, stmt.excluded.max),
+                    'last': case(
+                        (or_(table.c.last_at.is_(None), stmt.excluded.last_at >= table.c.last_at),
+                         stmt.excluded.last),
+                        else_=table.c.last
+                    ),
+                    'last_at': func.greatest(table.c.last_at, stmt.excluded.last_at)
+                }
+            ))
+    
+    def _ingest_local(self, hostname: str, data: Dict[str, Any],
+                      rollups: Dict[str, Dict[Tuple[str, datetime], List[float]]]):
+        with self._lock:
+            self._local_reports[hostname] = data
+            for resolution, buckets in rollups.items():
+                for (metric, bucket), values in sorted(buckets.items(), key=lambda item: item[0][1]):
+                    series = self._local_series.setdefault((hostname, resolution, metric), OrderedDict())
+                    if bucket not in series:
+                        series[bucket] = list(values)
+                        while len(series) > self.local_max_buckets:
+                            series.popitem(last=False)
+                    else:
+                        _fold(series, bucket, values)
+    
+    def latest(self, hostname: str) -> Optional[Dict[str, Any]]:
+        """The most recent report from an agent, or None if it never reported"""
+        if db_service.is_available:
+            try:
+                with db_service.get_session() as session:
+                    data = session.execute(
+                        select(AgentReport.data).where(AgentReport.hostname == hostname)
+                    ).scalar_one_or_none()
+                if data is not None:
+                    return data
+            except Exception as e:
+                logger.error(f"Error loading latest report for agent {hostname}: {e}")
+        with self._lock:
+            return self._local_reports.get(hostname)
+    
+    def list_reports(self) -> Dict[str, Dict[str, Any]]:
+        """Latest report of every agent, keyed by hostname"""
+        with self._lock:
+            reports = dict(self._local_reports)
+        if db_service.is_available:
+            try:
+                with db_service.get_session() as session:
+                    for hostname, data in session.execute(select(AgentReport.hostname, AgentReport.data)):
+                        reports[hostname] = data
+            except Exception as e:
+                logger.error(f"Error listing agent reports: {e}")
+        return reports
+    
+    def trends(self, metrics: Iterable[str] = TREND_METRICS, minutes: int = 60) -> Dict[str, Dict[str, List]]:
+        """
+        Per-minute averages of a few metrics for every agent in one query
+        
+        Returns:
+            ``{hostname: {metric: [avg, ...]}}`` ordered oldest first
+        """
+        metrics = list(metrics)
+        since = bucket_start(datetime.utcnow() - timedelta(minutes=minutes), 60)
+        trends: Dict[str, Dict[str, List]] = {}
+        
+        if db_service.is_available:
+            try:
+                with db_service.get_session() as session:
+                    rows = session.execute(
+                        select(AgentMetric1m.hostname, AgentMetric1m.metric, AgentMetric1m.sum, AgentMetric1m.count)
+                        .where(AgentMetric1m.metric.in_(metrics), AgentMetric1m.timestamp >= since)
+                        .order_by(AgentMetric1m.hostname, AgentMetric1m.metric, AgentMetric1m.timestamp)
+                    ).all()
+                for hostname, metric, total, count in rows:
+                    trends.setdefault(hostname, {}).setdefault(metric, []).append(
+                        round(total / count, 2) if count else None
+                    )
+                return trends
+            except Exception as e:
+                logger.error(f"Error loading agent trends: {e}")
+        
+        with self._lock:
+            for (hostname, resolution, metric), series in self._local_series.items():
+                if resolution != '1m' or metric not in metrics:
+                    continue
+                trends.setdefault(hostname, {})[metric] = [
+                    round(b[1] / b[0], 2) for ts, b in series.items() if ts >= since
+                ]
+        return trends
+    
+    def pick_resolution(self, start: datetime, end: datetime, max_points: Optional[int] = None) -> str:
+        """Finest resolution that covers the range within retention and ``max_points``"""
+        max_points = max_points or self.max_points
+        span = max((end - start).total_seconds(), 1)
+        oldest_needed = datetime.utcnow() - start
+        for name, (seconds, _) in RESOLUTIONS.items():
+            if span / seconds <= max_points and oldest_needed <= timedelta(days=self.retention_days[name]):
+                return name
+        return next(reversed(RESOLUTIONS))
+    
+    def query_range(self, hostname: str, metrics: List[str], start: datetime, end: Optional[datetime] = None,
+                    resolution: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Rolled-up points for an agent's metrics between ``start`` and ``end``
+        
+        Args:
+            hostname: Agent hostname
+            metrics: Metric names (see ``extract_points``)
+            start: Range start (UTC)
+            end: Range end (UTC), defaults to now
+            resolution: '1m', '5m' or '1h'; picked from the range when omitted
+        
+        Returns:
+            Dictionary with one list of ``{timestamp, count, avg, min, max,
+            last}`` points per metric; counters also carry ``rate`` per second
+        """
+        start = _utc_naive(start)
+        end = _utc_naive(end or datetime.utcnow())
+        if resolution is None:
+            resolution = self.pick_resolution(start, end)
+        if resolution not in RESOLUTIONS:
+            return {'success': False, 'error': f"Unknown resolution '{resolution}'"}
+        seconds, model = RESOLUTIONS[resolution]
+        first_bucket = bucket_start(start, seconds)
+        
+        series: Dict[str, List[Dict[str, Any]]] = {metric: [] for metric in metrics}
+        source = 'local'
+        if db_service.is_available:
+            try:
+                with db_service.get_session() as session:
+                    rows = session.execute(
+                        select(model)
+                        .where(model.hostname == hostname, model.metric.in_(metrics),
+                               model.timestamp >= first_bucket, model.timestamp < end)
+                        .order_by(model.metric, model.timestamp)
+                    ).scalars().all()
+                    for row in rows:
+                        series[row.metric].append(row.to_dict())
+                source = 'database'
+            except Exception as e:
+                logger.error(f"Error querying metrics for agent {hostname}: {e}")
+        
+        if source == 'local':
+            with self._lock:
+                for metric in metrics:
+                    buckets = self._local_series.get((hostname, resolution, metric)) or {}
+                    series[metric] = [
+                        {'timestamp': ts.isoformat(), 'count': b[0], 'avg': b[1] / b[0],
+                         'min': b[2], 'max': b[3], 'last': b[4]}
+                        for ts, b in buckets.items() if first_bucket <= ts < end
+                    ]
+        
+        for metric in metrics:
+            if metric in COUNTER_METRICS:
+                self._add_rates(series[metric])
+        
+        return {
+            'success': True,
+            'hostname': hostname,
+            'resolution': resolution,
+            'step_seconds': seconds,
+            'start': first_bucket.isoformat(),
+            'end': end.isoformat(),
+            'source': source,
+            'series': series
+        }
+    
+    @staticmethod
+    def _add_rates(points: List[Dict[str, Any]]):
+        previous = None
+        for point in points:
+            point['rate'] = None
+            timestamp = datetime.fromisoformat(point['timestamp'])
+            if previous is not None and point['last'] is not None and previous[1] is not None:
+                elapsed = (timestamp - previous[0]).total_seconds()
+                delta = point['last'] - previous[1]
+                # A negative delta means the agent's counters reset (reboot)
+                if elapsed > 0 and delta >= 0:
+                    point['rate'] = delta / elapsed
+            previous = (timestamp, point['last'])
+    
+    def maintain(self) -> Dict[str, Any]:
+        """Pre-create upcoming rollup partitions and drop expired ones"""
+        return self.partitions.maintain()
+
+
+agent_metrics_store = AgentMetricsStore()
+
+__all__ = ['AgentMetricsStore', 'agent_metrics_store', 'extract_points', 'bucket_start', 'RESOLUTIONS']
@@ -1,17 +1,36 @@
 """Agent Orchestration Service - Multi-Agent Collaboration System"""
 import logging
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError, as_completed
+from dataclasses import dataclass
 from typing import List, Dict, Optional
 from datetime import datetime
 import json
 from psycopg2.errors import UndefinedTable
 
+from config import Config
 from services.ai_service import AIService
 from services.db_service import db_service
+from services.websocket_service import websocket_service
 from models.agent import Agent, AgentTask, AgentConversation, AgentType, AgentStatus
 from sqlalchemy import select
 
 logger = logging.getLogger(__name__)
 
+
+@dataclass
+class AgentProfile:
+    """Detached copy of the agent fields LLM calls need, so no session is held while they run"""
+    id: int
+    name: str
+    agent_type: str
+    system_prompt: Optional[str]
+    model: Optional[str]
+    
+    @classmethod
+    def from_agent(cls, agent: Agent) -> 'AgentProfile':
+        return cls(agent.id, agent.name, agent.agent_type, agent.system_prompt, agent.model)
+
+
 class AgentOrchestrator:
     """
     Orchestrates multi-agent collaboration for autonomous troubleshooting.
@@ -208,7 +227,15 @@ When analyzing security:
             return None
     
     def execute_task(self, task_id: int) -> Dict:
-        """Execute a task using agent collaboration"""
+        """
+        Execute a task using agent collaboration
+        
+        The task is claimed in a short transaction and the database session
+        is released while the LLM calls run. Specialists are consulted
+        concurrently, each bounded by AGENT_CONSULT_TIMEOUT, and each answer
+        is pushed to the tasks WebSocket room as it arrives. Conversations
+        and the result are written in one transaction at the end.
+        """
         if not db_service.is_available:
             return {"success": False, "error": "Database not available"}
         
@@ -232,11 +259,11 @@ When analyzing security:
                         "approved": False
                     }
                 
-                # Get orchestrator agent
-                orchestrator = session.execute(
-                    select(Agent).where(Agent.agent_type == AgentType.ORCHESTRATOR.value)
-                ).scalars().first()
-                
+                agents = {
+                    agent.agent_type: AgentProfile.from_agent(agent)
+                    for agent in session.execute(select(Agent)).scalars().all()
+                }
+                orchestrator = agents.get(AgentType.ORCHESTRATOR.value)
                 if not orchestrator:
                     return {"success": False, "error": "Orchestrator agent not found"}
                 
@@ -244,83 +271,161 @@ When analyzing security:
                 task.status = 'in_progress'
                 task.started_at = datetime.utcnow()
                 task.assigned_agent_id = orchestrator.id
-                orchestrator.status = AgentStatus.THINKING.value
-                orchestrator.last_active = datetime.utcnow()
+                self._set_agent_status(session, orchestrator.id, AgentStatus.THINKING.value)
+                description = task.description
+                context = task.context
                 session.commit()
-                
-                try:
-                    # Phase 1: Orchestrator analyzes the problem
-                    orchestrator_analysis = self._agent_think(
-                        orchestrator, 
-                        task.description, 
-                        task.context
-                    )
-                    
-                    # Phase 2: Determine which specialist agents to consult
-                    required_agents = self._determine_required_agents(orchestrator_analysis)
-                    
-                    # Phase 3: Consult specialist agents in parallel
-                    specialist_responses = {}
-                    for agent_type in required_agents:
-                        agent = session.execute(
-                            select(Agent).where(Agent.agent_type == agent_type)
-                        ).scalars().first()
-                        
-                        if agent:
-                            response = self._agent_think(agent, task.description, task.context)
-                            specialist_responses[agent.name] = response
-                            
-                            # Log conversation
-                            self._log_conversation(session, task, orchestrator, agent, response)
-                    
-                    # Phase 4: Synthesize findings
-                    synthesis = self._synthesize_findings(
-                        orchestrator, 
-                        orchestrator_analysis, 
-                        specialist_responses
-                    )
-                    
-                    # Phase 5: Generate action plan
-                    action_plan = self._generate_action_plan(orchestrator, synthesis)
-                    
-                    # Update task result
-                    task.result = {
-                        'orchestrator_analysis': orchestrator_analysis,
-                        'specialist_responses': specialist_responses,
-                        'synthesis': synthesis,
-                        'action_plan': action_plan
-                    }
-                    task.status = 'completed'
-                    task.completed_at = datetime.utcnow()
-                    orchestrator.status = AgentStatus.IDLE.value
-                    orchestrator.last_active = datetime.utcnow()
-                    
-                    session.commit()
-                    
-                    logger.info(f"Task {task_id} completed successfully")
-                    return {
-                        'success': True,
-                        'task_id': task.id,
-                        'result': task.result
-                    }
-                    
-                except Exception as e:
-                    logger.error(f"Error executing task {task_id}: {e}", exc_info=True)
-                    task.status = 'failed'
-                    task.result = {'error': str(e)}
-                    orchestrator.status = AgentStatus.FAILED.value
-                    session.commit()
-                    
-                    return {
-                        'success': False,
-                        'error': str(e)
-                    }
-                    
         except Exception as e:
             logger.error(f"Failed to execute task: {e}", exc_info=True)
             return {"success": False, "error": str(e)}
+        
+        self._publish_task_event(task_id, 'started')
+        
+        try:
+            # Phase 1: Orchestrator analyzes the problem
+            orchestrator_analysis = self._agent_think(orchestrator, description, context)
+            
+            # Phase 2: Determine which specialist agents to consult
+            required_agents = self._determine_required_agents(orchestrator_analysis)
+            specialists = [agents[agent_type] for agent_type in required_agents if agent_type in agents]
+            
+            # Phase 3: Consult specialist agents in parallel
+            specialist_responses, specialist_errors = self._consult_specialists(
+                task_id, specialists, description, context
+            )
+            
+            # Phase 4: Synthesize findings
+            synthesis = self._synthesize_findings(
+                orchestrator, 
+                orchestrator_analysis, 
+                specialist_responses
+            )
+            
+            # Phase 5: Generate action plan
+            action_plan = self._generate_action_plan(orchestrator, synthesis)
+            
+            result = {
+                'orchestrator_analysis': orchestrator_analysis,
+                'specialist_responses': specialist_responses,
+                'synthesis': synthesis,
+                'action_plan': action_plan
+            }
+            if specialist_errors:
+                result['specialist_errors'] = specialist_errors
+            
+            with db_service.get_session() as session:
+                task = session.get(AgentTask, task_id)
+                for specialist in specialists:
+                    if specialist.name in specialist_responses:
+                        self._log_conversation(
+                            session, task, orchestrator, specialist, specialist_responses[specialist.name]
+                        )
+                task.result = result
+                task.status = 'completed'
+                task.completed_at = datetime.utcnow()
+                self._set_agent_status(session, orchestrator.id, AgentStatus.IDLE.value)
+                session.commit()
+            
+            self._publish_task_event(task_id, 'completed')
+            logger.info(f"Task {task_id} completed successfully")
+            return {
+                'success': True,
+                'task_id': task_id,
+                'result': result
+            }
+            
+        except Exception as e:
+            logger.error(f"Error executing task {task_id}: {e}", exc_info=True)
+            try:
+                with db_service.get_session() as session:
+                    task = session.get(AgentTask, task_id)
+                    if task:
+                        task.status = 'failed'
+                        task.result = {'error': str(e)}
+                    self._set_agent_status(session, orchestrator.id, AgentStatus.FAILED.value)
+                    session.commit()
+            except Exception as db_error:
+                logger.error(f"Failed to record failure of task {task_id}: {db_error}")
+            
+            self._publish_task_event(task_id, 'failed', error=str(e))
+            return {
+                'success': False,
+                'error': str(e)
+            }
+    
+    def _consult_specialists(self, task_id: int, specialists: List[AgentProfile], problem: str,
+                             context: Dict) -> tuple:
+        """
+        Ask each specialist for its analysis concurrently
+        
+        Returns:
+            ``(responses, errors)`` keyed by agent name, responses in
+            consultation order. Specialists that fail or do not answer within
+            AGENT_CONSULT_TIMEOUT go into ``errors``.
+        """
+        if not specialists:
+            return {}, {}
+        
+        timeout = Config.AGENT_CONSULT_TIMEOUT
+        workers = max(1, min(Config.AGENT_CONSULT_MAX_WORKERS, len(specialists)))
+        # Waves of `workers` calls run back to back, each allowed the full per-agent timeout
+        deadline = timeout * -(-len(specialists) // workers)
+        answers, errors = {}, {}
+        
+        executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='agent-consult')
+        try:
+            futures = {
+                executor.submit(self._agent_think, specialist, problem, context): specialist
+                for specialist in specialists
+            }
+            try:
+                for future in as_completed(futures, timeout=deadline):
+                    specialist = futures[future]
+                    try:
+                        answers[specialist.name] = future.result()
+                    except Exception as e:
+                        logger.error(f"Specialist {specialist.name} failed on task {task_id}: {e}")
+                        errors[specialist.name] = str(e)
+                        self._publish_task_event(task_id, 'consultation', agent=specialist, error=str(e))
+                        continue
+                    self._publish_task_event(task_id, 'consultation', agent=specialist,
+                                             response=answers[specialist.name])
+            except FutureTimeoutError:
+                for future, specialist in futures.items():
+                    if not future.done():
+                        logger.warning(f"Specialist {specialist.name} timed out on task {task_id}")
+                        errors[specialist.name] = f"Timed out after {timeout:g}s"
+                        self._publish_task_event(task_id, 'consultation', agent=specialist,
+                                                 error=errors[specialist.name])
+        finally:
+            # Do not wait for calls that timed out; their answers are discarded
+            executor.shutdown(wait=False, cancel_futures=True)
+        
+        responses = {s.name: answers[s.name] for s in specialists if s.name in answers}
+        return responses, errors
+    
+    def _set_agent_status(self, session, agent_id: int, status: str):
+        agent = session.get(Agent, agent_id)
+        if agent:
+            agent.status = status
+            agent.last_active = datetime.utcnow()
+    
+    def _publish_task_event(self, task_id: int, event: str, agent: Optional[AgentProfile] = None, **data):
+        """Push task progress to subscribers of the tasks WebSocket room"""
+        message = {
+            'type': f'agent_task_{event}',
+            'task_id': task_id,
+            'timestamp': datetime.utcnow().isoformat(),
+            **data
+        }
+        if agent is not None:
+            message['agent'] = {'name': agent.name, 'agent_type': agent.agent_type}
+        try:
+            websocket_service.broadcast_to_tasks(message)
+        except Exception as e:
+            logger.error(f"Failed to publish task event: {e}")
     
-    def _agent_think(self, agent: Agent, problem: str, context: Dict) -> str:
+    def _agent_think(self, agent: AgentProfile, problem: str, context: Dict) -> str:
         """Have an agent analyze a problem"""
         prompt = f"""
 Problem: {problem}
@@ -366,7 +471,7 @@ Be specific and actionable.
         
         return required_agents
     
-    def _synthesize_findings(self, orchestrator: Agent, 
+    def _synthesize_findings(self, orchestrator: AgentProfile, 
                            initial_analysis: str, 
                            specialist_responses: Dict[str, str]) -> str:
         """Synthesize findings from multiple agents"""
@@ -397,7 +502,7 @@ Synthesize these findings into a coherent diagnosis:
         
         return self.ai_service.chat(prompt, messages, model=orchestrator.model)
     
-    def _generate_action_plan(self, orchestrator: Agent, synthesis: str) -> Dict:
+    def _generate_action_plan(self, orchestrator: AgentProfile, synthesis: str) -> Dict:
         """Generate actionable remediation plan"""
         prompt = f"""
 Based on this analysis:
@@ -440,8 +545,8 @@ Generate a step-by-step action plan in JSON format:
             logger.warning(f"Failed to parse action plan as JSON: {e}")
             return {"error": "Failed to parse action plan", "raw": response}
     
-    def _log_conversation(self, session, task: AgentTask, from_agent: Agent, 
-                         to_agent: Agent, message: str):
+    def _log_conversation(self, session, task: AgentTask, from_agent: AgentProfile, 
+                         to_agent: AgentProfile, message: str):
         """Log agent-to-agent conversation"""
         conversation = AgentConversation(
             task_id=task.id,
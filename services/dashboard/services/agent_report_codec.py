@@ -0,0 +1,159 @@
+"""
+Agent Report Codec
+Decodes compact uploads from monitoring agents: gzip-compressed JSON or
+msgpack bodies carrying batches of reports delta-encoded against the
+last report the dashboard acknowledged
+"""
+import json
+import zlib
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+try:
+    import msgpack
+    MSGPACK_AVAILABLE = True
+except ImportError:
+    MSGPACK_AVAILABLE = False
+
+from config import Config
+
+PROTOCOL_VERSION = 2
+MSGPACK_CONTENT_TYPES = ('application/msgpack', 'application/x-msgpack')
+
+
+class AgentReportError(ValueError):
+    """An upload that cannot be decoded; ``status_code`` is the HTTP reply"""
+    
+    def __init__(self, message: str, status_code: int = 400):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class DeltaBaseMismatch(AgentReportError):
+    """A delta refers to a report the dashboard does not hold; the agent must resend in full"""
+    
+    def __init__(self, message: str):
+        super().__init__(message, 409)
+
+
+def decode_body(body: bytes, content_type: Optional[str], content_encoding: Optional[str],
+                max_bytes: Optional[int] = None) -> Any:
+    """
+    Decompress and parse a report upload
+    
+    Decompressed size is capped so a small gzip body cannot expand into
+    an arbitrarily large payload.
+    """
+    max_bytes = max_bytes or Config.AGENT_REPORT_MAX_BYTES
+    if (content_encoding or '').strip().lower() == 'gzip':
+        decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        try:
+            body = decompressor.decompress(body, max_bytes)
+        except zlib.error as e:
+            raise AgentReportError(f"Invalid gzip body: {e}")
+        if decompressor.unconsumed_tail:
+            raise AgentReportError(f"Report exceeds {max_bytes} bytes", 413)
+    elif len(body) > max_bytes:
+        raise AgentReportError(f"Report exceeds {max_bytes} bytes", 413)
+    
+    mimetype = (content_type or '').split(';')[0].strip().lower()
+    if mimetype in MSGPACK_CONTENT_TYPES:
+        if not MSGPACK_AVAILABLE:
+            raise AgentReportError("msgpack payloads are not supported by this dashboard", 415)
+        try:
+            return msgpack.unpackb(body, raw=False)
+        except Exception as e:
+            raise AgentReportError(f"Invalid msgpack body: {e}")
+    
+    try:
+        return json.loads(body)
+    except ValueError as e:
+        raise AgentReportError(f"Invalid JSON body: {e}")
+
+
+def apply_delta(base: Dict[str, Any], delta: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Rebuild a report from ``base`` and a delta of ``set`` ``[path, value]``
+    pairs and ``unset`` paths
+    
+    Only the dicts along changed paths are copied; untouched sub-dicts are
+    shared with ``base``, which is never modified.
+    """
+    result = dict(base)
+    copied = {id(result)}
+    
+    def parent(path):
+        node = result
+        for key in path[:-1]:
+            child = node.get(key)
+            if not isinstance(child, dict):
+                child = {}
+            elif id(child) not in copied:
+                child = dict(child)
+            copied.add(id(child))
+            node[key] = child
+            node = child
+        return node
+    
+    for path, value in delta.get('set') or []:
+        if not path:
+            raise AgentReportError("Empty path in report delta")
+        parent(path)[path[-1]] = value
+    for path in delta.get('unset') or []:
+        if not path:
+            raise AgentReportError("Empty path in report delta")
+        parent(path).pop(path[-1], None)
+    return result
+
+
+def expand_reports(payload: Dict[str, Any], base: Optional[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Turn a batch upload into full reports, oldest first
+    
+    Each entry is either ``{'full': report}`` or a delta against the
+    previous report in the batch (the first against ``base``, the last
+    report the dashboard stored for this agent). Deltas name their base
+    by the ``seq`` the agent stamped on it.
+    
+    Raises:
+        DeltaBaseMismatch: When a delta's base is not the report it follows
+    """
+    entries = payload.get('reports')
+    if not isinstance(entries, list) or not entries:
+        raise AgentReportError("Batch contains no reports")
+    
+    reports = []
+    current = base
+    for entry in entries:
+        if not isinstance(entry, dict):
+            raise AgentReportError("Batch entry is not an object")
+        if 'full' in entry:
+            current = entry['full']
+        else:
+            if current is None or current.get('seq') != entry.get('base'):
+                raise DeltaBaseMismatch(
+                    f"Delta base {entry.get('base')} does not match stored report "
+                    f"{current.get('seq') if current else None}"
+                )
+            current = apply_delta(current, entry)
+        if not isinstance(current, dict):
+            raise AgentReportError("Report is not an object")
+        reports.append(current)
+    return reports
+
+
+def sampled_at(report: Dict[str, Any], now: datetime) -> datetime:
+    """When the agent took a report, clamped so clock skew cannot put it in the future"""
+    try:
+        timestamp = datetime.fromisoformat(str(report.get('timestamp')))
+    except ValueError:
+        return now
+    if timestamp.tzinfo is not None:
+        timestamp = timestamp.replace(tzinfo=None) - timestamp.utcoffset()
+    return min(timestamp, now)
+
+
+__all__ = [
+    'AgentReportError', 'DeltaBaseMismatch', 'PROTOCOL_VERSION',
+    'decode_body', 'apply_delta', 'expand_reports', 'sampled_at'
+]
@@ -3,16 +3,172 @@ Alert Service - Threshold monitoring and notification system
 Includes background thread for automatic metric monitoring
 """
 import logging
+import operator
 import os
+import queue
 import requests
 import threading
 import time
+from dataclasses import dataclass, field
 from datetime import datetime, timedelta
-from typing import Dict, Any, Optional, List
+from typing import Callable, Dict, Any, Optional, List, Tuple
 import uuid
 
+from config import Config
+
 logger = logging.getLogger(__name__)
 
+CONDITIONS: Dict[str, Callable[[float, float], bool]] = {
+    'gt': operator.gt,
+    'lt': operator.lt,
+    'eq': lambda value, threshold: abs(value - threshold) < 0.001,
+    'ne': lambda value, threshold: abs(value - threshold) >= 0.001,
+    'gte': operator.ge,
+    'lte': operator.le,
+}
+
+# Cache namespace whose version changes whenever alert rules change
+RULES_NAMESPACE = 'alerts:rules'
+
+LOCAL_ALERT_TYPES = ('cpu', 'memory', 'disk')
+
+# Seconds between sweeps of expired in-process cooldowns
+COOLDOWN_PRUNE_INTERVAL = 60
+
+
+@dataclass
+class AlertRule:
+    """
+    An enabled MonitoringAlert compiled for evaluation
+    
+    Targets of the form ``agent:<hostname>`` (or ``agent:*`` for every
+    reporting host, and ``agent:<hostname>:<mountpoint>`` for disk rules)
+    are evaluated against monitoring-agent reports; anything else is
+    evaluated against the local host.
+    """
+    id: str
+    name: str
+    alert_type: str
+    condition: str
+    threshold: float
+    target: Optional[str]
+    cooldown_seconds: float
+    notifications: List[Tuple[str, str]] = field(default_factory=list)
+    last_triggered: Optional[float] = None
+    agent_host: Optional[str] = None
+    agent_mount: Optional[str] = None
+    
+    def __post_init__(self):
+        self._check = CONDITIONS.get(self.condition, lambda value, threshold: False)
+        if self.target and self.target.startswith('agent:'):
+            host, _, mount = self.target[len('agent:'):].partition(':')
+            self.agent_host = host or '*'
+            self.agent_mount = mount or None
+    
+    def matches(self, value: float) -> bool:
+        return self._check(value, self.threshold)
+    
+    @classmethod
+    def from_model(cls, alert) -> 'AlertRule':
+        return cls(
+            id=str(alert.id),
+            name=alert.name,
+            alert_type=alert.alert_type.value,
+            condition=alert.condition.value,
+            threshold=alert.threshold,
+            target=alert.target,
+            cooldown_seconds=(alert.cooldown_minutes or 0) * 60,
+            notifications=[
+                (n.notification_type.value, n.destination)
+                for n in alert.notifications if n.enabled
+            ],
+            last_triggered=(alert.last_triggered - datetime(1970, 1, 1)).total_seconds()
+            if alert.last_triggered else None
+        )
+
+
+class NotificationDispatcher:
+    """
+    Sends alert notifications off the evaluation path
+    
+    Jobs go onto a bounded queue drained by a few worker threads, so a
+    slow webhook never holds a database transaction or delays the next
+    evaluation cycle. Delivery results are written back to alert history
+    in batches. Threads start lazily and are restarted after a fork.
+    """
+    
+    def __init__(self, service: 'AlertService', workers: int, queue_size: int):
+        self.service = service
+        self.workers = workers
+        self.queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self._threads: List[threading.Thread] = []
+        self._pid: Optional[int] = None
+        self._lock = threading.Lock()
+        self._results: List[Tuple[str, List[Dict]]] = []
+        self._results_lock = threading.Lock()
+        self.stats = {'sent': 0, 'failed': 0, 'dropped': 0}
+    
+    def _ensure_started(self):
+        if self._pid == os.getpid() and all(t.is_alive() for t in self._threads):
+            return
+        with self._lock:
+            if self._pid == os.getpid() and all(t.is_alive() for t in self._threads):
+                return
+            if self._pid != os.getpid():
+                # Threads started before a fork do not exist in the child
+                self._threads = []
+                self._pid = os.getpid()
+            self._threads = [t for t in self._threads if t.is_alive()]
+            while len(self._threads) < self.workers:
+                thread = threading.Thread(target=self._run, daemon=True,
+                                          name=f"AlertNotifier-{len(self._threads)}")
+                thread.start()
+                self._threads.append(thread)
+    
+    def submit(self, history_id: Optional[str], send: Callable[[], List[Dict]]) -> bool:
+        """Queue a notification job; returns False if the queue is full"""
+        self._ensure_started()
+        try:
+            self.queue.put_nowait((history_id, send))
+            return True
+        except queue.Full:
+            self.stats['dropped'] += 1
+            logger.warning("Alert notification queue full, dropping notification")
+            return False
+    
+    def _run(self):
+        while True:
+            try:
+                history_id, send = self.queue.get(timeout=1.0)
+            except queue.Empty:
+                self._flush_results()
+                continue
+            try:
+                results = send()
+            except Exception as e:
+                logger.error(f"Alert notification job failed: {e}")
+                results = [{'success': False, 'error': str(e)}]
+            finally:
+                self.queue.task_done()
+            
+            if any(r.get('success') for r in results):
+                self.stats['sent'] += 1
+            elif results:
+                self.stats['failed'] += 1
+            
+            if history_id:
+                with self._results_lock:
+                    self._results.append((history_id, results))
+                    full = len(self._results) >= 50
+                if full or self.queue.empty():
+                    self._flush_results()
+    
+    def _flush_results(self):
+        with self._results_lock:
+            pending, self._results = self._results, []
+        if pending:
+            self.service._record_notification_results(pending)
+
 
 class AlertService:
     """Service for monitoring alerts and notifications with background monitoring"""
@@ -23,6 +179,20 @@ class AlertService:
         self._monitor_thread: Optional[threading.Thread] = None
         self._monitor_running = False
         self._monitor_interval = int(os.environ.get('ALERT_CHECK_INTERVAL', 60))
+        
+        self._rules: Optional[List[AlertRule]] = None
+        self._rules_version: Optional[int] = None
+        self._rules_loaded_at = 0.0
+        self._rules_lock = threading.Lock()
+        self.rule_cache_ttl = Config.ALERT_RULE_CACHE_TTL
+        # (rule id, subject) -> epoch seconds when its cooldown ends, used when Redis is down
+        self._cooldown_until: Dict[Tuple[str, str], float] = {}
+        self._cooldown_lock = threading.Lock()
+        self._cooldowns_pruned_at = 0.0
+        self._http = requests.Session()
+        self.dispatcher = NotificationDispatcher(
+            self, Config.ALERT_NOTIFICATION_WORKERS, Config.ALERT_NOTIFICATION_QUEUE_SIZE
+        )
     
     def start_background_monitor(self, interval: Optional[int] = None) -> Dict:
         """Start the background monitoring thread"""
@@ -162,7 +332,8 @@ class AlertService:
                 
                 session.flush()
                 result = alert.to_dict()
-                
+            
+            self.invalidate_rules()
             return {'success': True, 'alert': result}
         except Exception as e:
             logger.error(f"Error creating alert: {e}")
@@ -217,7 +388,8 @@ class AlertService:
                 
                 session.flush()
                 result = alert.to_dict()
-                
+            
+            self.invalidate_rules()
             return {'success': True, 'alert': result}
         except Exception as e:
             logger.error(f"Error updating alert {alert_id}: {e}")
@@ -239,7 +411,8 @@ class AlertService:
                 
                 alert_name = alert.name
                 session.delete(alert)
-                
+            
+            self.invalidate_rules()
             return {'success': True, 'message': f'Alert "{alert_name}" deleted'}
         except Exception as e:
             logger.error(f"Error deleting alert {alert_id}: {e}")
@@ -264,6 +437,40 @@ class AlertService:
             logger.error(f"Error getting alert history: {e}")
             return []
     
+    def get_alert_history_page(
+        self,
+        alert_id: Optional[str] = None,
+        limit: int = 100,
+        cursor: Optional[str] = None
+    ) -> Dict:
+        """Get one keyset page of alert history, newest first"""
+        try:
+            from models.monitoring_alerts import MonitoringAlertHistory
+            from services.pagination import apply_keyset, split_keyset_page
+            
+            session_ctx = self.get_db_session()
+            if not session_ctx:
+                return {'history': [], 'next_cursor': None, 'has_more': False}
+            
+            with session_ctx as session:
+                query = session.query(MonitoringAlertHistory)
+                if alert_id:
+                    query = query.filter(MonitoringAlertHistory.alert_id == alert_id)
+                history = apply_keyset(
+                    query, MonitoringAlertHistory.triggered_at, MonitoringAlertHistory.id, cursor, limit
+                ).all()
+                history, next_cursor = split_keyset_page(
+                    history, MonitoringAlertHistory.triggered_at, MonitoringAlertHistory.id, limit
+                )
+                return {
+                    'history': [h.to_dict() for h in history],
+                    'next_cursor': next_cursor,
+                    'has_more': next_cursor is not None
+                }
+        except Exception as e:
+            logger.error(f"Error getting alert history page: {e}")
+            return {'history': [], 'next_cursor': None, 'has_more': False, 'error': str(e)}
+    
     def acknowledge_alert(self, history_id: str, user: str = 'system') -> Dict:
         """Acknowledge an alert history entry"""
         try:
@@ -315,29 +522,19 @@ class AlertService:
     
     def check_condition(self, value: float, condition: str, threshold: float) -> bool:
         """Check if a value meets the alert condition"""
-        if condition == 'gt':
-            return value > threshold
-        elif condition == 'lt':
-            return value < threshold
-        elif condition == 'eq':
-            return abs(value - threshold) < 0.001
-        elif condition == 'ne':
-            return abs(value - threshold) >= 0.001
-        elif condition == 'gte':
-            return value >= threshold
-        elif condition == 'lte':
-            return value <= threshold
-        return False
+        check = CONDITIONS.get(condition)
+        return check(value, threshold) if check else False
     
     def get_metric_value(self, alert_type: str, target: Optional[str] = None) -> Optional[float]:
         """Get current metric value for an alert type"""
         try:
             import psutil
+            from services.host_metrics import host_metrics_sampler
             
             if alert_type == 'cpu':
-                return psutil.cpu_percent(interval=0.1)
+                return host_metrics_sampler.latest()['cpu']['total_percent']
             elif alert_type == 'memory':
-                return psutil.virtual_memory().percent
+                return host_metrics_sampler.latest()['memory']['ram']['percent']
             elif alert_type == 'disk':
                 if target:
                     try:
@@ -355,81 +552,246 @@ class AlertService:
             logger.error(f"Error getting metric for {alert_type}: {e}")
             return None
     
-    def can_trigger(self, alert_id: str, cooldown_minutes: int) -> bool:
-        """Check if alert can be triggered based on cooldown"""
+    def trigger_alert(self, alert_id: str, value: float) -> Dict:
+        """Trigger an alert and queue its notifications"""
+        rule = next((r for r in self.get_rules() if r.id == alert_id), None)
+        if rule is None:
+            # Disabled alerts are not in the rule cache but can still be fired manually
+            rules = self._load_rules(alert_ids=[alert_id])
+            if not rules:
+                return {'success': False, 'error': 'Alert not found'}
+            rule = rules[0]
+        
+        fired = self._fire([(rule, '', value)], enforce_cooldown=False)
+        if not fired:
+            return {'success': False, 'error': 'Failed to record alert'}
+        return {'success': True, 'history': fired[0]['history'], 'notifications': fired[0]['notifications']}
+    
+    def invalidate_rules(self):
+        """Drop compiled rules here and, via the cache namespace version, in other workers"""
+        self._rules = None
+        from services.cache_service import cache_service
+        cache_service.invalidate_namespace(RULES_NAMESPACE)
+    
+    def get_rules(self) -> List[AlertRule]:
+        """
+        Get compiled enabled rules
+        
+        Rules are reloaded when another worker changed them (cache
+        namespace version) or after ALERT_RULE_CACHE_TTL seconds, which
+        covers changes made while Redis was unavailable.
+        """
+        from services.cache_service import cache_service
+        version = cache_service.namespace_version(RULES_NAMESPACE)
+        if (self._rules is not None and self._rules_version == version
+                and time.monotonic() - self._rules_loaded_at < self.rule_cache_ttl):
+            return self._rules
+        
+        with self._rules_lock:
+            if (self._rules is not None and self._rules_version == version
+                    and time.monotonic() - self._rules_loaded_at < self.rule_cache_ttl):
+                return self._rules
+            rules = self._load_rules()
+            if rules is None:
+                return self._rules or []
+            self._rules, self._rules_version, self._rules_loaded_at = rules, version, time.monotonic()
+            logger.debug(f"Compiled {len(rules)} alert rules")
+            return rules
+    
+    def _load_rules(self, alert_ids: Optional[List[str]] = None) -> Optional[List[AlertRule]]:
+        """Load and compile alerts (enabled ones unless IDs are given) with their notifications"""
         try:
+            from sqlalchemy.orm import selectinload
             from models.monitoring_alerts import MonitoringAlert
             
             session_ctx = self.get_db_session()
             if not session_ctx:
-                return False
+                return None
             
             with session_ctx as session:
-                alert = session.query(MonitoringAlert).filter_by(id=alert_id).first()
-                if not alert:
-                    return False
-                
-                if not alert.last_triggered:
-                    return True
-                
-                cooldown = timedelta(minutes=cooldown_minutes)
-                return datetime.utcnow() - alert.last_triggered > cooldown
+                query = session.query(MonitoringAlert).options(selectinload(MonitoringAlert.notifications))
+                if alert_ids:
+                    query = query.filter(MonitoringAlert.id.in_([uuid.UUID(str(a)) for a in alert_ids]))
+                else:
+                    query = query.filter(MonitoringAlert.enabled == True)
+                return [AlertRule.from_model(alert) for alert in query.all()]
         except Exception as e:
-            logger.error(f"Error checking cooldown for {alert_id}: {e}")
-            return False
+            logger.error(f"Error loading alert rules: {e}")
+            return None
     
-    def trigger_alert(self, alert_id: str, value: float) -> Dict:
-        """Trigger an alert and send notifications"""
+    def _claim_cooldown(self, rule: AlertRule, subject: str) -> bool:
+        """Claim the right to fire a rule for a subject, honouring its cooldown across workers"""
+        if rule.cooldown_seconds <= 0:
+            return True
+        
+        from services.cache_service import cache_service
+        claimed = cache_service.claim(f"alerts:cooldown:{rule.id}:{subject}", rule.cooldown_seconds)
+        
+        key = (rule.id, subject)
+        if claimed is None:
+            # Redis unavailable: fall back to this process's memory and the stored trigger time
+            last = rule.last_triggered if not subject else None
+            return self._claim_local_cooldown(key, rule.cooldown_seconds, last)
+        if claimed:
+            self._claim_local_cooldown(key, rule.cooldown_seconds, force=True)
+        return claimed
+    
+    def _release_cooldown(self, rule: AlertRule, subject: str):
+        """Give back a cooldown claimed for a firing that could not be recorded"""
+        if rule.cooldown_seconds <= 0:
+            return
+        
+        from services.cache_service import cache_service
+        cache_service.release(f"alerts:cooldown:{rule.id}:{subject}")
+        with self._cooldown_lock:
+            self._cooldown_until.pop((rule.id, subject), None)
+    
+    def _claim_host_cooldown(self, key: str) -> bool:
+        """Cooldown for built-in agent threshold alerts, shared across workers when Redis is up"""
+        from services.cache_service import cache_service
+        cooldown = Config.ALERT_HOST_COOLDOWN
+        claimed = cache_service.claim(f"alerts:cooldown:host:{key}", cooldown)
+        if claimed is None:
+            return self._claim_local_cooldown(('host', key), cooldown)
+        return claimed
+    
+    def _claim_local_cooldown(self, key: Tuple[str, str], cooldown: float, last: Optional[float] = None,
+                              force: bool = False) -> bool:
+        """
+        Claim a cooldown in this process's memory
+        
+        ``last`` is a trigger time to honour when the key is not tracked yet;
+        ``force`` starts the cooldown without checking it. Entries whose
+        cooldown has ended are swept out at most every
+        COOLDOWN_PRUNE_INTERVAL seconds.
+        """
+        now = time.time()
+        with self._cooldown_lock:
+            if now - self._cooldowns_pruned_at >= COOLDOWN_PRUNE_INTERVAL:
+                self._cooldown_until = {k: until for k, until in self._cooldown_until.items() if until > now}
+                self._cooldowns_pruned_at = now
+            until = self._cooldown_until.get(key, last + cooldown if last is not None else None)
+            if not force and until is not None and now < until:
+                return False
+            self._cooldown_until[key] = now + cooldown
+            return True
+    
+    def _fire(self, candidates: List[Tuple[AlertRule, str, float]], enforce_cooldown: bool = True) -> List[Dict]:
+        """
+        Trigger rules whose condition matched
+        
+        Cooldowns are claimed first, history rows and trigger counters for
+        all remaining rules are written in one transaction, and
+        notifications are handed to the dispatcher. If the write fails the
+        claims are released so the next evaluation can fire again.
+        
+        Args:
+            candidates: (rule, subject, value) where subject names the agent host/mount ('' for local)
+        """
+        firing = [c for c in candidates if not enforce_cooldown or self._claim_cooldown(c[0], c[1])]
+        if not firing:
+            return []
+        
+        histories = self._record_firings(firing)
+        if histories is None:
+            if enforce_cooldown:
+                for rule, subject, _ in firing:
+                    self._release_cooldown(rule, subject)
+            return []
+        
+        fired = []
+        for (rule, subject, value), history in zip(firing, histories):
+            queued = 0
+            if rule.notifications:
+                name = f"{rule.name} ({subject})" if subject else rule.name
+                queued = int(self.dispatcher.submit(history['id'], self._notification_job(rule, name, value)))
+            fired.append({'rule': rule, 'subject': subject, 'value': value,
+                          'history': history, 'notifications': {'queued': queued}})
+        return fired
+    
+    def _record_firings(self, firing: List[Tuple[AlertRule, str, float]]) -> Optional[List[Dict]]:
+        """Write history rows and bump trigger counters for a batch of firings"""
         try:
-            from models.monitoring_alerts import (
-                MonitoringAlert, MonitoringAlertHistory, MonitoringAlertNotification
-            )
+            from models.monitoring_alerts import MonitoringAlert, MonitoringAlertHistory
             
             session_ctx = self.get_db_session()
             if not session_ctx:
-                return {'success': False, 'error': 'Database not available'}
+                return None
             
+            now = datetime.utcnow()
             with session_ctx as session:
-                alert = session.query(MonitoringAlert).filter_by(id=alert_id).first()
-                if not alert:
-                    return {'success': False, 'error': 'Alert not found'}
+                counts: Dict[str, int] = {}
+                histories = []
+                for rule, subject, value in firing:
+                    counts[rule.id] = counts.get(rule.id, 0) + 1
+                    histories.append(MonitoringAlertHistory(
+                        id=uuid.uuid4(),
+                        alert_id=uuid.UUID(rule.id),
+                        value=value,
+                        threshold=rule.threshold,
+                        triggered_at=now,
+                        notification_sent=False,
+                        notification_result={
+                            'status': 'queued' if rule.notifications else 'none',
+                            'subject': subject or None
+                        }
+                    ))
+                session.add_all(histories)
                 
-                history = MonitoringAlertHistory(
-                    alert_id=alert.id,
-                    value=value,
-                    threshold=alert.threshold,
-                    triggered_at=datetime.utcnow()
-                )
-                session.add(history)
-                
-                alert.last_triggered = datetime.utcnow()
-                alert.trigger_count = (alert.trigger_count or 0) + 1
-                
-                notification_results = []
-                for notif in alert.notifications:
-                    if notif.enabled:
-                        result = self.send_notification(
-                            notification_type=notif.notification_type.value,
-                            destination=notif.destination,
-                            alert_name=alert.name,
-                            alert_type=alert.alert_type.value,
-                            value=value,
-                            threshold=alert.threshold,
-                            condition=alert.condition.value,
-                            target=alert.target
-                        )
-                        notification_results.append(result)
-                
-                history.notification_sent = any(r.get('success') for r in notification_results)
-                history.notification_result = notification_results
+                alerts = session.query(MonitoringAlert).filter(
+                    MonitoringAlert.id.in_([uuid.UUID(rule_id) for rule_id in counts])
+                ).all()
+                for alert in alerts:
+                    alert.last_triggered = now
+                    alert.trigger_count = (alert.trigger_count or 0) + counts[str(alert.id)]
                 
                 session.flush()
-                result = history.to_dict()
-                
-            return {'success': True, 'history': result, 'notifications': notification_results}
+                return [h.to_dict() for h in histories]
         except Exception as e:
-            logger.error(f"Error triggering alert {alert_id}: {e}")
-            return {'success': False, 'error': str(e)}
+            logger.error(f"Error recording {len(firing)} alert triggers: {e}")
+            return None
+    
+    def _notification_job(self, rule: AlertRule, name: str, value: float) -> Callable[[], List[Dict]]:
+        def send() -> List[Dict]:
+            return [
+                self.send_notification(
+                    notification_type=notification_type,
+                    destination=destination,
+                    alert_name=name,
+                    alert_type=rule.alert_type,
+                    value=value,
+                    threshold=rule.threshold,
+                    condition=rule.condition,
+                    target=rule.target
+                )
+                for notification_type, destination in rule.notifications
+            ]
+        return send
+    
+    def _record_notification_results(self, results: List[Tuple[str, List[Dict]]]):
+        """Store delivery results for a batch of history rows"""
+        try:
+            from models.monitoring_alerts import MonitoringAlertHistory
+            
+            session_ctx = self.get_db_session()
+            if not session_ctx:
+                return
+            
+            by_id = dict(results)
+            with session_ctx as session:
+                rows = session.query(MonitoringAlertHistory).filter(
+                    MonitoringAlertHistory.id.in_([uuid.UUID(h) for h in by_id])
+                ).all()
+                for row in rows:
+                    delivered = by_id[str(row.id)]
+                    row.notification_sent = any(r.get('success') for r in delivered)
+                    row.notification_result = {
+                        **(row.notification_result or {}),
+                        'status': 'sent' if row.notification_sent else 'failed',
+                        'results': delivered
+                    }
+        except Exception as e:
+            logger.error(f"Error recording notification results: {e}")
     
     def send_notification(
         self,
@@ -534,7 +896,7 @@ class AlertService:
                 'username': 'Homelab Monitor'
             }
             
-            response = requests.post(webhook_url, json=payload, timeout=10)
+            response = self._http.post(webhook_url, json=payload, timeout=10)
             response.raise_for_status()
             
             logger.info(f"Discord notification sent for alert: {alert_name}")
@@ -604,56 +966,95 @@ class AlertService:
             return {'success': False, 'error': str(e)}
     
     def check_all_alerts(self) -> Dict:
-        """Check all enabled alerts against current metrics"""
+        """Check all enabled local-host alerts against current metrics"""
         try:
-            from models.monitoring_alerts import MonitoringAlert
-            
-            session_ctx = self.get_db_session()
-            if not session_ctx:
-                return {'success': False, 'error': 'Database not available', 'checked': 0, 'triggered': 0}
+            rules = [r for r in self.get_rules() if r.alert_type in LOCAL_ALERT_TYPES and not r.agent_host]
             
+            # Sample each distinct metric once per cycle, however many rules use it
+            values: Dict[Tuple[str, str], Optional[float]] = {}
+            candidates = []
             checked = 0
-            triggered = 0
-            results = []
+            for rule in rules:
+                key = (rule.alert_type, rule.target or '')
+                if key not in values:
+                    values[key] = self.get_metric_value(rule.alert_type, rule.target)
+                value = values[key]
+                if value is None:
+                    continue
+                checked += 1
+                if rule.matches(value):
+                    candidates.append((rule, '', value))
             
-            with session_ctx as session:
-                alerts = session.query(MonitoringAlert).filter(
-                    MonitoringAlert.enabled == True
-                ).all()
-                
-                for alert in alerts:
-                    if alert.alert_type.value in ['cpu', 'memory', 'disk']:
-                        value = self.get_metric_value(alert.alert_type.value, alert.target)
-                        if value is not None:
-                            checked += 1
-                            condition_met = self.check_condition(
-                                value, 
-                                alert.condition.value, 
-                                alert.threshold
-                            )
-                            
-                            if condition_met and self.can_trigger(str(alert.id), alert.cooldown_minutes):
-                                result = self.trigger_alert(str(alert.id), value)
-                                if result.get('success'):
-                                    triggered += 1
-                                results.append({
-                                    'alert_id': str(alert.id),
-                                    'alert_name': alert.name,
-                                    'value': value,
-                                    'threshold': alert.threshold,
-                                    'triggered': result.get('success', False)
-                                })
+            fired = self._fire(candidates)
+            results = [{
+                'alert_id': f['rule'].id,
+                'alert_name': f['rule'].name,
+                'value': f['value'],
+                'threshold': f['rule'].threshold,
+                'triggered': True
+            } for f in fired]
             
             return {
                 'success': True,
                 'checked': checked,
-                'triggered': triggered,
+                'triggered': len(fired),
                 'results': results
             }
         except Exception as e:
             logger.error(f"Error checking alerts: {e}")
             return {'success': False, 'error': str(e), 'checked': 0, 'triggered': 0}
     
+    def evaluate_agent_metrics(self, hostname: str, data: Dict) -> Dict:
+        """
+        Evaluate agent-targeted rules against one monitoring-agent report
+        
+        Called when the report arrives, so it runs in whichever worker
+        received it; cooldowns are shared through Redis.
+        """
+        try:
+            rules = [r for r in self.get_rules() if r.agent_host in (hostname, '*')]
+            if not rules:
+                return {'success': True, 'checked': 0, 'triggered': 0}
+            
+            metrics = {
+                'cpu': data.get('cpu', {}).get('percent'),
+                'memory': data.get('memory', {}).get('ram', {}).get('percent')
+            }
+            partitions = data.get('disk', {}).get('partitions', [])
+            
+            candidates = []
+            checked = 0
+            for rule in rules:
+                if rule.alert_type == 'disk':
+                    observed = [
+                        (f"{hostname}:{p.get('mountpoint')}", p.get('percent'))
+                        for p in partitions
+                        if rule.agent_mount in (None, p.get('mountpoint'))
+                    ]
+                else:
+                    observed = [(hostname, metrics.get(rule.alert_type))]
+                for subject, value in observed:
+                    if value is None:
+                        continue
+                    checked += 1
+                    if rule.matches(value):
+                        candidates.append((rule, subject, value))
+            
+            fired = self._fire(candidates)
+            return {'success': True, 'checked': checked, 'triggered': len(fired)}
+        except Exception as e:
+            logger.error(f"Error evaluating agent alerts for {hostname}: {e}")
+            return {'success': False, 'error': str(e), 'checked': 0, 'triggered': 0}
+    
+    def get_engine_stats(self) -> Dict:
+        """Rule cache and notification dispatcher counters"""
+        return {
+            'rules_cached': len(self._rules) if self._rules is not None else 0,
+            'rules_version': self._rules_version,
+            'notification_queue': self.dispatcher.queue.qsize(),
+            'notifications': dict(self.dispatcher.stats)
+        }
+    
     def get_stats(self) -> Dict:
         """Get alert statistics"""
         try:
@@ -707,13 +1108,20 @@ class AlertService:
         hostname: str,
         alert_type: str,
         value: float,
-        details: str = ''
+        details: str = '',
+        subject: Optional[str] = None
     ) -> Dict:
         """
         Trigger an alert for a specific remote host (from monitoring agents).
-        Sends Discord notification if webhook is configured.
+        Queues a Discord notification if webhook is configured; repeats for
+        the same host, type and subject (e.g. a mountpoint) are suppressed
+        for ALERT_HOST_COOLDOWN seconds.
         """
         try:
+            cooldown_key = f"{hostname}:{alert_type}:{subject or ''}"
+            if not self._claim_host_cooldown(cooldown_key):
+                return {'success': True, 'host': hostname, 'alert_type': alert_type, 'suppressed': True}
+            
             logger.warning(f"[Alert] {hostname}: {alert_type} alert - {details}")
             
             if self.discord_webhook_url:
@@ -751,12 +1159,17 @@ class AlertService:
                     'username': 'Homelab Monitor'
                 }
                 
-                try:
-                    response = requests.post(self.discord_webhook_url, json=payload, timeout=10)
-                    response.raise_for_status()
-                    logger.info(f"Discord alert sent for {hostname}")
-                except Exception as e:
-                    logger.error(f"Failed to send Discord alert: {e}")
+                def send() -> List[Dict]:
+                    try:
+                        response = self._http.post(self.discord_webhook_url, json=payload, timeout=10)
+                        response.raise_for_status()
+                        logger.info(f"Discord alert sent for {hostname}")
+                        return [{'success': True, 'status_code': response.status_code}]
+                    except Exception as e:
+                        logger.error(f"Failed to send Discord alert: {e}")
+                        return [{'success': False, 'error': str(e)}]
+                
+                self.dispatcher.submit(None, send)
             
             return {'success': True, 'host': hostname, 'alert_type': alert_type}
         except Exception as e:
@@ -4,12 +4,16 @@ Monitor CPU, memory, disk usage patterns and detect anomalies
 """
 import logging
 import math
-from datetime import datetime, timedelta
+import threading
+import time
+from datetime import datetime, timedelta, timezone
 from typing import Dict, List, Optional, Tuple
-from collections import defaultdict
+
+import numpy as np
 
 from services.service_ops import service_ops
 from services.db_service import db_service
+from services.streaming_stats import RunningStats, QuantileSketch, merge_moments
 from config import Config
 
 logger = logging.getLogger(__name__)
@@ -24,6 +28,17 @@ class AnomalyDetector:
     - Alert when metrics deviate from baseline
     - Anomaly scoring algorithm using z-score and IQR
     - Automatic baseline learning
+    
+    Baselines are learned from a stream: observe() updates Welford
+    mean/variance, an EWMA and a quantile sketch in O(1), and
+    persist_baselines() periodically merges those summaries into
+    AnomalyBaseline. Detection scores every metric in one NumPy pass
+    against baselines loaded with a single query.
+    
+    In 'seasonal' mode (ANOMALY_DETECTION_MODE) each metric is compared
+    with the baseline for its hour of the period (hour-of-week by
+    default), built in bulk from service telemetry, so recurring spikes
+    such as nightly backups stop scoring as anomalies.
     """
     
     METRICS = ['cpu_percent', 'memory_percent', 'disk_percent', 'restart_count']
@@ -37,11 +52,26 @@ class AnomalyDetector:
     
     DEFAULT_SENSITIVITY = 2.0
     
+    # Metrics that can be rebuilt from the service_telemetry table
+    SEASONAL_METRICS = ['cpu_percent', 'memory_percent', 'restart_count']
+    
     def __init__(self):
         self.config = Config()
-        self._baseline_cache = {}
-        self._cache_ttl = 300
-        self._last_cache_update = None
+        self.ewma_alpha = Config.ANOMALY_EWMA_ALPHA
+        self.persist_interval = Config.ANOMALY_PERSIST_INTERVAL
+        self.window_samples = Config.ANOMALY_BASELINE_WINDOW_SAMPLES
+        self._cache_ttl = Config.ANOMALY_BASELINE_CACHE_TTL
+        self._baseline_cache: Dict[Tuple[str, str], Dict] = {}
+        self._cache_loaded_at = 0.0
+        self._cache_lock = threading.Lock()
+        # Samples observed since the last persist, per (service, metric)
+        self._pending: Dict[Tuple[str, str], Tuple[RunningStats, QuantileSketch]] = {}
+        self._pending_lock = threading.Lock()
+        self._last_persist = time.monotonic()
+        self.detection_mode = Config.ANOMALY_DETECTION_MODE
+        self.seasonal_period_hours = Config.ANOMALY_SEASONAL_PERIOD_HOURS
+        self.seasonal_min_samples = Config.ANOMALY_SEASONAL_MIN_SAMPLES
+        self.seasonal_max_bucket_samples = Config.ANOMALY_SEASONAL_MAX_BUCKET_SAMPLES
     
     def collect_current_metrics(self) -> Dict[str, Dict]:
         """
@@ -77,6 +107,47 @@ class AnomalyDetector:
         
         return metrics
     
+    def _load_baselines(self, force: bool = False) -> Dict[Tuple[str, str], Dict]:
+        """Load every baseline in one query, reusing the result for the cache TTL"""
+        if not force and time.monotonic() - self._cache_loaded_at < self._cache_ttl:
+            return self._baseline_cache
+        
+        with self._cache_lock:
+            if not force and time.monotonic() - self._cache_loaded_at < self._cache_ttl:
+                return self._baseline_cache
+            try:
+                from models.jarvis_ai import AnomalyBaseline
+                
+                with db_service.get_session() as session:
+                    baselines = {
+                        (row.service_name, row.metric_name): self._baseline_dict(row)
+                        for row in session.query(AnomalyBaseline).all()
+                    }
+                self._baseline_cache = baselines
+            except Exception as e:
+                logger.error(f"Failed to load anomaly baselines: {e}")
+            # Retry after the TTL rather than on every call when the DB is down
+            self._cache_loaded_at = time.monotonic()
+            return self._baseline_cache
+    
+    @staticmethod
+    def _baseline_dict(row) -> Dict:
+        """Baseline row as a dict, with seasonal buckets reduced to mean/std lists"""
+        result = row.to_dict()
+        seasonal = (row.metadata_json or {}).get('seasonal')
+        if seasonal:
+            counts = np.asarray(seasonal['count'], dtype=float)
+            variances = np.divide(np.asarray(seasonal['m2'], dtype=float), counts,
+                                  out=np.zeros_like(counts), where=counts > 1)
+            result['seasonal'] = {
+                'period_hours': seasonal['period_hours'],
+                'count': seasonal['count'],
+                'mean': seasonal['mean'],
+                'std': np.sqrt(variances).tolist(),
+                'through': seasonal.get('through')
+            }
+        return result
+    
     def get_baseline(self, service_name: str, metric_name: str) -> Optional[Dict]:
         """
         Get baseline statistics for a service metric
@@ -88,30 +159,158 @@ class AnomalyDetector:
         Returns:
             Baseline statistics or None if not found
         """
-        cache_key = f"{service_name}:{metric_name}"
+        return self._load_baselines().get((service_name, metric_name))
+    
+    def observe(self, service_name: str, metric_name: str, value: float):
+        """Add one sample to the streaming baseline (O(1), no database access)"""
+        key = (service_name, metric_name)
+        with self._pending_lock:
+            pending = self._pending.get(key)
+            if pending is None:
+                pending = self._pending[key] = (RunningStats(self.ewma_alpha), QuantileSketch())
+            pending[0].update(value)
+            pending[1].add(value)
+    
+    def observe_metrics(self, metrics: Dict[str, Dict]) -> int:
+        """
+        Add current samples for every service to the streaming baselines
+        
+        Args:
+            metrics: Metrics as returned by collect_current_metrics
+            
+        Returns:
+            Number of samples observed
+        """
+        observed = 0
+        for service_name, service_metrics in metrics.items():
+            for metric_name in self.METRICS:
+                value = service_metrics.get(metric_name)
+                if isinstance(value, (int, float)) and math.isfinite(value):
+                    self.observe(service_name, metric_name, float(value))
+                    observed += 1
+        return observed
+    
+    def persist_baselines(self, force: bool = False) -> int:
+        """
+        Merge pending samples into the stored baselines
+        
+        Runs at most once per ANOMALY_PERSIST_INTERVAL unless forced. Each
+        process only writes the samples it observed since its last
+        persist, merged into the stored summary under a row lock, so
+        several Celery workers can feed the same baselines.
         
-        if self._last_cache_update and cache_key in self._baseline_cache:
-            if (datetime.utcnow() - self._last_cache_update).seconds < self._cache_ttl:
-                return self._baseline_cache[cache_key]
+        Returns:
+            Number of baselines written
+        """
+        if not force and time.monotonic() - self._last_persist < self.persist_interval:
+            return 0
+        
+        with self._pending_lock:
+            pending, self._pending = self._pending, {}
+            self._last_persist = time.monotonic()
+        if not pending:
+            return 0
         
         try:
             from models.jarvis_ai import AnomalyBaseline
             
             with db_service.get_session() as session:
-                baseline = session.query(AnomalyBaseline).filter(
-                    AnomalyBaseline.service_name == service_name,
-                    AnomalyBaseline.metric_name == metric_name
-                ).first()
+                rows = session.query(AnomalyBaseline).filter(
+                    AnomalyBaseline.service_name.in_({service for service, _ in pending})
+                ).with_for_update().all()
+                existing = {(row.service_name, row.metric_name): row for row in rows}
                 
-                if baseline:
-                    result = baseline.to_dict()
-                    self._baseline_cache[cache_key] = result
-                    self._last_cache_update = datetime.utcnow()
-                    return result
+                written = {}
+                for key, (stats, sketch) in pending.items():
+                    row = existing.get(key)
+                    if row is None:
+                        row = AnomalyBaseline(
+                            service_name=key[0],
+                            metric_name=key[1],
+                            mean_value=0.0,
+                            std_dev=0.0,
+                            sensitivity=self.DEFAULT_SENSITIVITY,
+                            time_window_hours=self._window_hours()
+                        )
+                        session.add(row)
+                        total_stats, total_sketch = RunningStats(self.ewma_alpha), QuantileSketch()
+                    else:
+                        total_stats, total_sketch = self._row_state(row)
+                    total_stats.merge(stats)
+                    total_sketch.merge(sketch)
+                    
+                    # Exponential forgetting keeps the baseline to roughly one window of samples
+                    if total_stats.count > self.window_samples:
+                        factor = self.window_samples / total_stats.count
+                        total_stats.scale(factor)
+                        total_sketch.scale(factor)
+                    
+                    self._write_row(row, total_stats, total_sketch)
+                    written[key] = row
+                
+                session.flush()
+                results = {key: self._baseline_dict(row) for key, row in written.items()}
+            
+            self._baseline_cache = {**self._baseline_cache, **results}
+            logger.debug(f"Persisted {len(results)} anomaly baselines")
+            return len(results)
         except Exception as e:
-            logger.error(f"Failed to get baseline for {service_name}/{metric_name}: {e}")
-        
-        return None
+            logger.error(f"Failed to persist anomaly baselines: {e}")
+            # Keep the samples so they are merged on the next attempt
+            with self._pending_lock:
+                for key, (stats, sketch) in pending.items():
+                    newer = self._pending.get(key)
+                    if newer is not None:
+                        stats.merge(newer[0])
+                        sketch.merge(newer[1])
+                    self._pending[key] = (stats, sketch)
+            return 0
+    
+    def _window_hours(self) -> int:
+        return max(1, round(self.window_samples * Config.ANOMALY_SAMPLE_INTERVAL / 3600))
+    
+    def _row_state(self, row) -> Tuple[RunningStats, QuantileSketch]:
+        """Stored streaming state for a baseline row (rebuilt from columns for older rows)"""
+        metadata = row.metadata_json or {}
+        if 'stats' in metadata:
+            stats = RunningStats.from_dict(metadata['stats'])
+        else:
+            stats = RunningStats.from_summary(
+                row.sample_count or 0, row.mean_value, row.std_dev,
+                row.min_value, row.max_value, row.last_sample_value, self.ewma_alpha
+            )
+        sketch = QuantileSketch.from_dict(metadata['sketch']) if 'sketch' in metadata else QuantileSketch()
+        return stats, sketch
+    
+    def _write_row(self, row, stats: RunningStats, sketch: QuantileSketch):
+        """Copy a streaming summary into the baseline columns and metadata"""
+        n = stats.count
+        std_dev = stats.std_dev
+        sensitivity = row.sensitivity or self.DEFAULT_SENSITIVITY
+        p25, p50, p75, p95, p99 = sketch.quantiles([0.25, 0.5, 0.75, 0.95, 0.99])
+        
+        row.mean_value = stats.mean
+        row.std_dev = std_dev
+        row.min_value = stats.min
+        row.max_value = stats.max
+        row.percentile_25 = p25 if n >= 4 else None
+        row.percentile_50 = p50 if n >= 2 else None
+        row.percentile_75 = p75 if n >= 4 else None
+        row.percentile_95 = p95 if n >= 20 else None
+        row.percentile_99 = p99 if n >= 100 else None
+        row.sample_count = int(round(n))
+        row.last_sample_value = stats.last
+        row.anomaly_threshold_low = max(0, stats.mean - sensitivity * std_dev)
+        row.anomaly_threshold_high = stats.mean + sensitivity * std_dev
+        row.sensitivity = sensitivity
+        row.updated_at = datetime.utcnow()
+        # Reassign so SQLAlchemy sees the JSON column change
+        row.metadata_json = {
+            **(row.metadata_json or {}),
+            'stats': stats.to_dict(),
+            'sketch': sketch.to_dict(),
+            'ewma': stats.ewma
+        }
     
     def update_baseline(
         self,
@@ -121,7 +320,7 @@ class AnomalyDetector:
         time_window_hours: int = 24
     ) -> Optional[Dict]:
         """
-        Update baseline statistics for a service metric
+        Replace baseline statistics for a service metric from a batch of values
         
         Args:
             service_name: Name of the service
@@ -135,33 +334,10 @@ class AnomalyDetector:
         if not values:
             return None
         
-        n = len(values)
-        mean_value = sum(values) / n
-        
-        variance = sum((x - mean_value) ** 2 for x in values) / n if n > 1 else 0
-        std_dev = math.sqrt(variance)
-        
-        sorted_values = sorted(values)
-        min_value = sorted_values[0]
-        max_value = sorted_values[-1]
-        
-        def percentile(data, p):
-            k = (len(data) - 1) * p / 100
-            f = math.floor(k)
-            c = math.ceil(k)
-            if f == c:
-                return data[int(k)]
-            return data[int(f)] * (c - k) + data[int(c)] * (k - f)
-        
-        p25 = percentile(sorted_values, 25) if n >= 4 else None
-        p50 = percentile(sorted_values, 50) if n >= 2 else None
-        p75 = percentile(sorted_values, 75) if n >= 4 else None
-        p95 = percentile(sorted_values, 95) if n >= 20 else None
-        p99 = percentile(sorted_values, 99) if n >= 100 else None
-        
-        sensitivity = self.DEFAULT_SENSITIVITY
-        threshold_low = mean_value - (sensitivity * std_dev)
-        threshold_high = mean_value + (sensitivity * std_dev)
+        values = np.asarray(values, dtype=float)
+        stats = RunningStats.from_values(values, self.ewma_alpha)
+        sketch = QuantileSketch()
+        sketch.add_many(values)
         
         try:
             from models.jarvis_ai import AnomalyBaseline
@@ -172,50 +348,23 @@ class AnomalyDetector:
                     AnomalyBaseline.metric_name == metric_name
                 ).first()
                 
-                if baseline:
-                    baseline.mean_value = mean_value
-                    baseline.std_dev = std_dev
-                    baseline.min_value = min_value
-                    baseline.max_value = max_value
-                    baseline.percentile_25 = p25
-                    baseline.percentile_50 = p50
-                    baseline.percentile_75 = p75
-                    baseline.percentile_95 = p95
-                    baseline.percentile_99 = p99
-                    baseline.sample_count = n
-                    baseline.last_sample_value = values[-1] if values else None
-                    baseline.anomaly_threshold_low = max(0, threshold_low)
-                    baseline.anomaly_threshold_high = threshold_high
-                    baseline.sensitivity = sensitivity
-                    baseline.time_window_hours = time_window_hours
-                    baseline.updated_at = datetime.utcnow()
-                else:
+                if not baseline:
                     baseline = AnomalyBaseline(
                         service_name=service_name,
                         metric_name=metric_name,
-                        mean_value=mean_value,
-                        std_dev=std_dev,
-                        min_value=min_value,
-                        max_value=max_value,
-                        percentile_25=p25,
-                        percentile_50=p50,
-                        percentile_75=p75,
-                        percentile_95=p95,
-                        percentile_99=p99,
-                        sample_count=n,
-                        last_sample_value=values[-1] if values else None,
-                        anomaly_threshold_low=max(0, threshold_low),
-                        anomaly_threshold_high=threshold_high,
-                        sensitivity=sensitivity,
-                        time_window_hours=time_window_hours
+                        mean_value=0.0,
+                        std_dev=0.0
                     )
                     session.add(baseline)
                 
+                baseline.sensitivity = self.DEFAULT_SENSITIVITY
+                baseline.time_window_hours = time_window_hours
+                self._write_row(baseline, stats, sketch)
+                
                 session.flush()
-                result = baseline.to_dict()
+                result = self._baseline_dict(baseline)
             
-            cache_key = f"{service_name}:{metric_name}"
-            self._baseline_cache[cache_key] = result
+            self._baseline_cache = {**self._baseline_cache, (service_name, metric_name): result}
             
             return result
         except Exception as e:
@@ -239,46 +388,80 @@ class AnomalyDetector:
         Returns:
             Tuple of (is_anomaly, score, severity, direction)
         """
-        baseline = self.get_baseline(service_name, metric_name)
-        
-        if not baseline:
-            return (False, 0.0, 'unknown', 'normal')
-        
-        stats = baseline.get('statistics', {})
-        thresholds = baseline.get('thresholds', {})
-        
-        mean_value = stats.get('mean', 0)
-        std_dev = stats.get('std_dev', 0)
-        
-        if std_dev == 0:
-            return (False, 0.0, 'unknown', 'normal')
-        
-        z_score = abs(value - mean_value) / std_dev
-        
-        is_anomaly = False
-        direction = 'normal'
-        
-        threshold_low = thresholds.get('low')
-        threshold_high = thresholds.get('high')
-        
-        if threshold_low is not None and value < threshold_low:
-            is_anomaly = True
-            direction = 'below'
-        elif threshold_high is not None and value > threshold_high:
-            is_anomaly = True
-            direction = 'above'
-        elif z_score > thresholds.get('sensitivity', self.DEFAULT_SENSITIVITY):
-            is_anomaly = True
-            direction = 'above' if value > mean_value else 'below'
+        return self._evaluate([(service_name, metric_name, value)])[0][:4]
+    
+    def _evaluate(
+        self,
+        samples: List[Tuple[str, str, float]],
+        at: Optional[float] = None
+    ) -> List[Tuple[bool, float, str, str, float, float]]:
+        """
+        Score many (service, metric, value) samples against their baselines in one pass
         
-        severity = 'normal'
-        if is_anomaly:
-            for sev, threshold in sorted(self.SEVERITY_THRESHOLDS.items(), key=lambda x: x[1], reverse=True):
-                if z_score >= threshold:
-                    severity = sev
-                    break
+        Returns:
+            Per sample: (is_anomaly, score, severity, direction, baseline mean, baseline std)
+        """
+        if not samples:
+            return []
         
-        return (is_anomaly, z_score, severity, direction)
+        baselines = self._load_baselines()
+        seasonal_mode = self.detection_mode == 'seasonal'
+        hour = int((time.time() if at is None else at) // 3600)
+        size = len(samples)
+        values = np.empty(size)
+        means = np.zeros(size)
+        stds = np.zeros(size)
+        lows = np.full(size, np.nan)
+        highs = np.full(size, np.nan)
+        sensitivities = np.full(size, self.DEFAULT_SENSITIVITY)
+        
+        for i, (service_name, metric_name, value) in enumerate(samples):
+            values[i] = value
+            baseline = baselines.get((service_name, metric_name))
+            if not baseline:
+                continue
+            stats = baseline.get('statistics', {})
+            thresholds = baseline.get('thresholds', {})
+            means[i] = stats.get('mean') or 0.0
+            stds[i] = stats.get('std_dev') or 0.0
+            if thresholds.get('low') is not None:
+                lows[i] = thresholds['low']
+            if thresholds.get('high') is not None:
+                highs[i] = thresholds['high']
+            if thresholds.get('sensitivity'):
+                sensitivities[i] = thresholds['sensitivity']
+            
+            seasonal = baseline.get('seasonal') if seasonal_mode else None
+            if seasonal:
+                bucket = hour % seasonal['period_hours']
+                # Sparse buckets fall back to the global baseline
+                if seasonal['count'][bucket] >= self.seasonal_min_samples:
+                    means[i] = seasonal['mean'][bucket]
+                    stds[i] = seasonal['std'][bucket]
+                    lows[i] = max(0, means[i] - sensitivities[i] * stds[i])
+                    highs[i] = means[i] + sensitivities[i] * stds[i]
+        
+        # Metrics without a baseline or with zero spread are never anomalous
+        scored = stds > 0
+        z_scores = np.zeros(size)
+        np.divide(np.abs(values - means), stds, out=z_scores, where=scored)
+        below = values < lows
+        above = values > highs
+        is_anomaly = scored & (below | above | (z_scores > sensitivities))
+        
+        direction = np.where(below, 'below', np.where(above, 'above', np.where(values > means, 'above', 'below')))
+        direction = np.where(is_anomaly, direction, 'normal')
+        
+        levels = sorted(self.SEVERITY_THRESHOLDS.items(), key=lambda x: x[1], reverse=True)
+        severity = np.select([z_scores >= threshold for _, threshold in levels], [name for name, _ in levels], 'normal')
+        severity = np.where(is_anomaly, severity, 'normal')
+        severity = np.where(scored, severity, 'unknown')
+        
+        return [
+            (bool(is_anomaly[i]), float(z_scores[i]), str(severity[i]), str(direction[i]),
+             float(means[i]), float(stds[i]))
+            for i in range(size)
+        ]
     
     def detect_all_anomalies(self, metrics: Dict[str, Dict] = None) -> List[Dict]:
         """
@@ -293,40 +476,232 @@ class AnomalyDetector:
         if metrics is None:
             metrics = self.collect_current_metrics()
         
-        anomalies = []
-        
+        samples = []
         for service_name, service_metrics in metrics.items():
             for metric_name in self.METRICS:
-                if metric_name not in service_metrics:
-                    continue
-                
                 value = service_metrics.get(metric_name)
                 if value is None:
                     continue
-                
-                is_anomaly, score, severity, direction = self.detect_anomaly(
-                    service_name, metric_name, value
+                samples.append((service_name, metric_name, value))
+        
+        anomalies = []
+        detected_at = datetime.utcnow().isoformat()
+        for (service_name, metric_name, value), result in zip(samples, self._evaluate(samples)):
+            is_anomaly, score, severity, direction, baseline_mean, baseline_std = result
+            if not is_anomaly:
+                continue
+            anomalies.append({
+                'service_name': service_name,
+                'metric_name': metric_name,
+                'value': value,
+                'baseline_mean': baseline_mean,
+                'baseline_std': baseline_std,
+                'anomaly_score': score,
+                'severity': severity,
+                'direction': direction,
+                'detected_at': detected_at
+            })
+        
+        if anomalies:
+            self._record_anomaly_events(anomalies)
+        
+        return anomalies
+    
+    def build_seasonal_baselines(
+        self,
+        replace: bool = False,
+        days: Optional[int] = None,
+        services: Optional[List[str]] = None,
+        batch_size: int = 5000
+    ) -> Dict:
+        """
+        Build hour-of-period baselines from stored service telemetry
+        
+        Telemetry is streamed in batches of ``batch_size`` rows; each batch
+        is reduced with NumPy to count/mean/M2 per (service, metric,
+        bucket) and merged into running totals, so memory use does not
+        grow with the table. Unless ``replace`` is set, only telemetry
+        newer than the last build is read and merged into the existing
+        buckets, which lets baselines outlive telemetry retention. Each
+        (service, metric) keeps its own watermark; a pair without one is
+        built from the full history.
+        
+        Args:
+            replace: Rebuild from scratch instead of extending existing buckets
+            days: Only read the last N days of telemetry
+            services: Limit the build to these services
+            batch_size: Rows fetched per round trip
+            
+        Returns:
+            Dict with rows read and baselines written
+        """
+        period = self.seasonal_period_hours
+        until = datetime.now(timezone.utc)
+        
+        try:
+            from sqlalchemy import and_, func, or_, select
+            from models.jarvis_ai import AnomalyBaseline
+            from models.service_ops import ServiceTelemetry
+            
+            with db_service.get_session() as session:
+                query = session.query(AnomalyBaseline).filter(
+                    AnomalyBaseline.metric_name.in_(self.SEASONAL_METRICS)
                 )
+                if services:
+                    query = query.filter(AnomalyBaseline.service_name.in_(services))
+                existing = {(row.service_name, row.metric_name): row for row in query.all()}
+                
+                totals: Dict[Tuple[str, str], Tuple[np.ndarray, np.ndarray, np.ndarray]] = {}
+                through: Dict[Tuple[str, str], float] = {}
+                if not replace:
+                    for key, row in existing.items():
+                        seasonal = (row.metadata_json or {}).get('seasonal')
+                        if not seasonal or seasonal.get('period_hours') != period:
+                            continue
+                        totals[key] = tuple(np.asarray(seasonal[k], dtype=float) for k in ('count', 'mean', 'm2'))
+                        through[key] = seasonal['through']
+                
+                statement = select(
+                    ServiceTelemetry.service_name,
+                    func.extract('epoch', ServiceTelemetry.timestamp),
+                    ServiceTelemetry.cpu_percent,
+                    ServiceTelemetry.memory_usage,
+                    ServiceTelemetry.memory_limit,
+                    ServiceTelemetry.restart_count
+                ).where(ServiceTelemetry.timestamp <= until)
+                if days:
+                    statement = statement.where(ServiceTelemetry.timestamp >= until - timedelta(days=days))
+                watermarks = self._service_watermarks(through)
+                if watermarks:
+                    # Services with a watermark for every metric only need newer
+                    # rows; any other service is read from the start
+                    statement = statement.where(or_(
+                        ServiceTelemetry.service_name.notin_(list(watermarks)),
+                        *[
+                            and_(
+                                ServiceTelemetry.service_name == service_name,
+                                ServiceTelemetry.timestamp > datetime.fromtimestamp(mark, timezone.utc)
+                            )
+                            for service_name, mark in watermarks.items()
+                        ]
+                    ))
+                if services:
+                    statement = statement.where(ServiceTelemetry.service_name.in_(services))
+                
+                rows_read = 0
+                result = session.execute(statement.execution_options(yield_per=batch_size))
+                for batch in result.partitions():
+                    rows_read += len(batch)
+                    self._accumulate_seasonal(batch, totals, through, period)
                 
-                if is_anomaly:
-                    baseline = self.get_baseline(service_name, metric_name)
+                # persist_baselines may have rewritten the streaming state in these
+                # rows during the backfill; reload them under its row lock so only
+                # the 'seasonal' key below replaces what is stored
+                existing = {
+                    (row.service_name, row.metric_name): row
+                    for row in query.with_for_update().populate_existing().all()
+                }
+                
+                for key, (counts, means, m2s) in totals.items():
+                    # Cap each bucket so old weeks fade out instead of dominating
+                    factor = np.minimum(1.0, self.seasonal_max_bucket_samples / np.maximum(counts, 1.0))
+                    counts, m2s = counts * factor, m2s * factor
                     
-                    anomaly = {
-                        'service_name': service_name,
-                        'metric_name': metric_name,
-                        'value': value,
-                        'baseline_mean': baseline.get('statistics', {}).get('mean') if baseline else None,
-                        'baseline_std': baseline.get('statistics', {}).get('std_dev') if baseline else None,
-                        'anomaly_score': score,
-                        'severity': severity,
-                        'direction': direction,
-                        'detected_at': datetime.utcnow().isoformat()
-                    }
-                    anomalies.append(anomaly)
+                    row = existing.get(key)
+                    if row is None:
+                        # Global statistics for the new row come from the buckets combined
+                        total_count = counts.sum()
+                        mean = float((counts * means).sum() / total_count) if total_count else 0.0
+                        m2 = m2s.sum() + (counts * (means - mean) ** 2).sum()
+                        std_dev = math.sqrt(m2 / total_count) if total_count > 1 else 0.0
+                        row = AnomalyBaseline(
+                            service_name=key[0],
+                            metric_name=key[1],
+                            mean_value=mean,
+                            std_dev=std_dev,
+                            sample_count=int(round(total_count)),
+                            sensitivity=self.DEFAULT_SENSITIVITY,
+                            anomaly_threshold_low=max(0, mean - self.DEFAULT_SENSITIVITY * std_dev),
+                            anomaly_threshold_high=mean + self.DEFAULT_SENSITIVITY * std_dev,
+                            time_window_hours=self._window_hours()
+                        )
+                        session.add(row)
                     
-                    self._record_anomaly_event(anomaly)
+                    row.metadata_json = {
+                        **(row.metadata_json or {}),
+                        'seasonal': {
+                            'period_hours': period,
+                            'count': counts.tolist(),
+                            'mean': means.tolist(),
+                            'm2': m2s.tolist(),
+                            'through': until.timestamp()
+                        }
+                    }
+            
+            # Pick up the new buckets on the next detection
+            self._cache_loaded_at = 0.0
+            logger.info(f"Built seasonal baselines for {len(totals)} metrics from {rows_read} telemetry rows")
+            return {
+                'success': True,
+                'rows_read': rows_read,
+                'baselines': len(totals),
+                'period_hours': period
+            }
+        except Exception as e:
+            logger.error(f"Failed to build seasonal baselines: {e}")
+            return {'success': False, 'error': str(e)}
+    
+    def _service_watermarks(self, through: Dict[Tuple[str, str], float]) -> Dict[str, float]:
+        """Oldest watermark per service, for services with one for every seasonal metric"""
+        watermarks = {}
+        for service_name in {key[0] for key in through}:
+            marks = [through.get((service_name, metric)) for metric in self.SEASONAL_METRICS]
+            if None not in marks:
+                watermarks[service_name] = min(marks)
+        return watermarks
+    
+    def _accumulate_seasonal(
+        self,
+        batch,
+        totals: Dict[Tuple[str, str], Tuple[np.ndarray, np.ndarray, np.ndarray]],
+        through: Dict[Tuple[str, str], float],
+        period: int
+    ):
+        """Reduce one batch of telemetry rows into the per-bucket running totals"""
+        names = np.array([row[0] for row in batch], dtype=object)
+        epochs = np.array([row[1] for row in batch], dtype=float)
+        memory_usage = np.array([row[3] for row in batch], dtype=float)
+        memory_limit = np.array([row[4] for row in batch], dtype=float)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            memory_percent = np.where(memory_limit > 0, memory_usage / memory_limit * 100, np.nan)
+        columns = {
+            'cpu_percent': np.array([row[2] for row in batch], dtype=float),
+            'memory_percent': memory_percent,
+            'restart_count': np.array([row[5] for row in batch], dtype=float)
+        }
+        buckets = (epochs // 3600).astype(np.int64) % period
         
-        return anomalies
+        for service_name in set(names.tolist()):
+            service_mask = names == service_name
+            
+            for metric_name, values in columns.items():
+                key = (service_name, metric_name)
+                mask = service_mask & ~np.isnan(values)
+                if key in through:
+                    # Already merged by a previous incremental build
+                    mask &= epochs > through[key]
+                if not mask.any():
+                    continue
+                selected, selected_buckets = values[mask], buckets[mask]
+                counts = np.bincount(selected_buckets, minlength=period).astype(float)
+                sums = np.bincount(selected_buckets, weights=selected, minlength=period)
+                means = np.divide(sums, counts, out=np.zeros(period), where=counts > 0)
+                m2s = np.bincount(selected_buckets, weights=(selected - means[selected_buckets]) ** 2, minlength=period)
+                
+                if key in totals:
+                    totals[key] = merge_moments(*totals[key], counts, means, m2s)
+                else:
+                    totals[key] = (counts, means, m2s)
     
     def get_anomaly_events(
         self,
@@ -487,28 +862,29 @@ class AnomalyDetector:
             'calculated_at': datetime.utcnow().isoformat()
         }
     
-    def _record_anomaly_event(self, anomaly: Dict) -> Optional[int]:
-        """Record an anomaly event to the database"""
+    def _record_anomaly_events(self, anomalies: List[Dict]) -> int:
+        """Record anomaly events to the database in one transaction"""
         try:
             from models.jarvis_ai import AnomalyEvent
             
             with db_service.get_session() as session:
-                event = AnomalyEvent(
-                    service_name=anomaly['service_name'],
-                    metric_name=anomaly['metric_name'],
-                    value=anomaly['value'],
-                    baseline_mean=anomaly.get('baseline_mean'),
-                    baseline_std=anomaly.get('baseline_std'),
-                    anomaly_score=anomaly['anomaly_score'],
-                    direction=anomaly['direction'],
-                    severity=anomaly['severity']
-                )
-                session.add(event)
-                session.flush()
-                return event.id
+                session.add_all([
+                    AnomalyEvent(
+                        service_name=anomaly['service_name'],
+                        metric_name=anomaly['metric_name'],
+                        value=anomaly['value'],
+                        baseline_mean=anomaly.get('baseline_mean'),
+                        baseline_std=anomaly.get('baseline_std'),
+                        anomaly_score=anomaly['anomaly_score'],
+                        direction=anomaly['direction'],
+                        severity=anomaly['severity']
+                    )
+                    for anomaly in anomalies
+                ])
+            return len(anomalies)
         except Exception as e:
-            logger.error(f"Failed to record anomaly event: {e}")
-            return None
+            logger.error(f"Failed to record anomaly events: {e}")
+            return 0
 
 
 anomaly_detector = AnomalyDetector()
@@ -22,6 +22,33 @@ MINIO_SECRET_KEY = os.environ.get('MINIO_SECRET_KEY', '')
 MINIO_BUCKET = os.environ.get('MINIO_BACKUP_BUCKET', 'backups')
 MINIO_SECURE = os.environ.get('MINIO_SECURE', 'false').lower() == 'true'
 
+# Deduplicated snapshot repository (engine='chunked')
+BACKUP_ENGINE = os.environ.get('BACKUP_ENGINE', 'archive')  # default engine: 'archive' or 'chunked'
+BACKUP_REPOSITORY_PREFIX = os.environ.get('BACKUP_REPOSITORY_PREFIX', 'repository')
+BACKUP_CHUNK_WORKERS = int(os.environ.get('BACKUP_CHUNK_WORKERS', str(min(4, max(1, (os.cpu_count() or 2) // 2)))))  # compression threads per backup
+BACKUP_CHUNK_IO_WORKERS = int(os.environ.get('BACKUP_CHUNK_IO_WORKERS', '8'))  # parallel chunk uploads/downloads
+
+CHUNKED_BACKUP_TYPES = ('files', 'studio_project', 'full', 'incremental', 'configs')
+STUDIO_EXCLUDE_PATTERNS = {'.git', 'node_modules', '__pycache__', '.env', 'venv', '.venv'}
+
+
+class _HashingWriter:
+    """File wrapper that checksums an archive while it is written"""
+    
+    def __init__(self, f):
+        self.f = f
+        self.sha256 = hashlib.sha256()
+    
+    def write(self, data):
+        self.sha256.update(data)
+        return self.f.write(data)
+    
+    def tell(self):
+        return self.f.tell()
+    
+    def flush(self):
+        self.f.flush()
+
 
 class BackupService:
     """Service for managing system backups"""
@@ -35,6 +62,7 @@ class BackupService:
             (self.backup_dir / subdir).mkdir(exist_ok=True)
         
         self._minio_client = None
+        self._chunk_store = None
     
     @property
     def minio_client(self):
@@ -60,6 +88,20 @@ class BackupService:
         """Check if MinIO/S3 is configured and available"""
         return self.minio_client is not None
     
+    @property
+    def chunk_store(self):
+        """Lazy-load the deduplicated snapshot repository"""
+        if self._chunk_store is None and self.minio_client is not None:
+            from services.chunk_store import ChunkStore
+            self._chunk_store = ChunkStore(
+                self.minio_client,
+                MINIO_BUCKET,
+                prefix=BACKUP_REPOSITORY_PREFIX,
+                workers=BACKUP_CHUNK_WORKERS,
+                io_workers=BACKUP_CHUNK_IO_WORKERS
+            )
+        return self._chunk_store
+    
     def upload_to_minio(self, local_path: str, remote_path: Optional[str] = None) -> Dict[str, Any]:
         """Upload a backup file to MinIO/S3"""
         if not self.is_minio_available():
@@ -169,7 +211,8 @@ class BackupService:
                       destination: Optional[str] = None,
                       destination_type: str = 'local',
                       compression: str = 'gzip',
-                      metadata: Optional[Dict] = None) -> Dict[str, Any]:
+                      metadata: Optional[Dict] = None,
+                      engine: Optional[str] = None) -> Dict[str, Any]:
         """
         Create a new backup
         
@@ -181,6 +224,8 @@ class BackupService:
             destination_type: Storage type - 'local', 'minio', or 's3'
             compression: Compression type (gzip, none)
             metadata: Additional metadata
+            engine: 'archive' for a tarball or 'chunked' for an incremental,
+                deduplicated snapshot in MinIO (file backups only)
             
         Returns:
             Dict with backup result and details
@@ -205,6 +250,13 @@ class BackupService:
         ext = '.sql.gz' if backup_type == 'database' else '.tar.gz'
         local_destination = str(self.backup_dir / type_dir / f"{safe_name}_{timestamp}{ext}")
         
+        engine = engine or BACKUP_ENGINE
+        if engine == 'chunked' and backup_type not in CHUNKED_BACKUP_TYPES:
+            engine = 'archive'
+        if engine == 'chunked':
+            local_destination = None
+            destination = destination or f"s3://{MINIO_BUCKET}/{BACKUP_REPOSITORY_PREFIX}/snapshots/"
+        
         if not destination:
             destination = local_destination
         
@@ -221,7 +273,7 @@ class BackupService:
                         status='running',
                         started_at=datetime.utcnow(),
                         compression=compression,
-                        backup_metadata=metadata or {}
+                        backup_metadata={**(metadata or {}), 'engine': engine}
                     )
                     session.add(backup_record)
                     session.commit()
@@ -229,7 +281,9 @@ class BackupService:
                 logger.error(f"Failed to create backup record: {e}")
         
         try:
-            if backup_type == 'database':
+            if engine == 'chunked':
+                result = self._backup_chunked(source, backup_type)
+            elif backup_type == 'database':
                 result = self._backup_database(source, local_destination, compression)
             elif backup_type == 'docker_volume':
                 result = self._backup_docker_volume(source, local_destination, compression)
@@ -242,7 +296,10 @@ class BackupService:
             remote_url = None
             final_destination = local_destination
             
-            if result['success'] and destination_type in ('minio', 's3'):
+            if result['success'] and engine == 'chunked':
+                remote_url = result['remote_url']
+                final_destination = remote_url
+            elif result['success'] and destination_type in ('minio', 's3'):
                 object_name = f"{type_dir}/{safe_name}_{timestamp}{ext}"
                 minio_result = self.upload_to_minio(local_destination, object_name)
                 
@@ -269,8 +326,9 @@ class BackupService:
                         record.destination = final_destination
                         
                         backup_meta = record.backup_metadata or {}
-                        backup_meta['destination_type'] = destination_type
-                        backup_meta['local_path'] = local_destination
+                        backup_meta['destination_type'] = 'minio' if engine == 'chunked' else destination_type
+                        if local_destination:
+                            backup_meta['local_path'] = local_destination
                         if remote_url:
                             backup_meta['remote_url'] = remote_url
                         if result.get('metadata'):
@@ -318,6 +376,57 @@ class BackupService:
                 'error': str(e)
             }
     
+    def _latest_snapshot(self, source: str) -> Optional[str]:
+        """Snapshot id of the newest completed chunked backup of a source"""
+        from services.db_service import db_service
+        from models.backups import Backup
+        from sqlalchemy import select
+        
+        if not db_service.is_available:
+            return None
+        
+        try:
+            with db_service.get_session() as session:
+                metadata = session.execute(
+                    select(Backup.backup_metadata).where(
+                        Backup.source == source,
+                        Backup.status == 'completed',
+                        Backup.backup_metadata['engine'].astext == 'chunked'
+                    ).order_by(Backup.created_at.desc()).limit(1)
+                ).scalar_one_or_none()
+                return (metadata or {}).get('snapshot_id')
+        except Exception as e:
+            logger.warning(f"Failed to look up parent snapshot for {source}: {e}")
+            return None
+    
+    def _backup_chunked(self, source: str, backup_type: str) -> Dict[str, Any]:
+        """Store an incremental, deduplicated snapshot of files in MinIO"""
+        try:
+            if self.chunk_store is None:
+                return {'success': False, 'error': 'Chunked backups require MinIO storage'}
+            
+            parent = self._latest_snapshot(source)
+            exclude = STUDIO_EXCLUDE_PATTERNS if backup_type == 'studio_project' else ()
+            snapshot = self.chunk_store.backup(source, parent=parent, exclude=exclude)
+            stats = snapshot['stats']
+            
+            return {
+                'success': True,
+                'size_bytes': stats['stored_bytes'],
+                'checksum': snapshot['checksum'],
+                'remote_url': f"s3://{MINIO_BUCKET}/{snapshot['object_name']}",
+                'metadata': {
+                    'snapshot_id': snapshot['snapshot_id'],
+                    'parent_snapshot': snapshot['parent'],
+                    'source_path': source,
+                    **stats
+                }
+            }
+            
+        except Exception as e:
+            logger.error(f"Chunked backup failed: {e}")
+            return {'success': False, 'error': str(e)}
+    
     def _backup_database(self, database_name: str, destination: str, compression: str) -> Dict[str, Any]:
         """Create a PostgreSQL database dump"""
         try:
@@ -406,19 +515,21 @@ class BackupService:
             mode = 'w:gz' if compression == 'gzip' else 'w'
             file_count = 0
             
-            with tarfile.open(destination, mode) as tar:
-                if source_path.is_dir():
-                    for item in source_path.rglob('*'):
-                        if item.is_file():
-                            arcname = item.relative_to(source_path.parent)
-                            tar.add(str(item), arcname=str(arcname))
-                            file_count += 1
-                else:
-                    tar.add(str(source_path), arcname=source_path.name)
-                    file_count = 1
+            with open(destination, 'wb') as f:
+                writer = _HashingWriter(f)
+                with tarfile.open(fileobj=writer, mode=mode) as tar:
+                    if source_path.is_dir():
+                        for item in source_path.rglob('*'):
+                            if item.is_file():
+                                arcname = item.relative_to(source_path.parent)
+                                tar.add(str(item), arcname=str(arcname))
+                                file_count += 1
+                    else:
+                        tar.add(str(source_path), arcname=source_path.name)
+                        file_count = 1
             
             size_bytes = os.path.getsize(destination)
-            checksum = self._calculate_checksum(destination)
+            checksum = writer.sha256.hexdigest()
             
             return {
                 'success': True,
@@ -491,19 +602,19 @@ class BackupService:
             mode = 'w:gz' if compression == 'gzip' else 'w'
             file_count = 0
             
-            exclude_patterns = {'.git', 'node_modules', '__pycache__', '.env', 'venv', '.venv'}
-            
-            with tarfile.open(destination, mode) as tar:
-                for item in source_path.rglob('*'):
-                    if any(excl in item.parts for excl in exclude_patterns):
-                        continue
-                    if item.is_file():
-                        arcname = item.relative_to(source_path.parent)
-                        tar.add(str(item), arcname=str(arcname))
-                        file_count += 1
+            with open(destination, 'wb') as f:
+                writer = _HashingWriter(f)
+                with tarfile.open(fileobj=writer, mode=mode) as tar:
+                    for item in source_path.rglob('*'):
+                        if any(excl in item.parts for excl in STUDIO_EXCLUDE_PATTERNS):
+                            continue
+                        if item.is_file():
+                            arcname = item.relative_to(source_path.parent)
+                            tar.add(str(item), arcname=str(arcname))
+                            file_count += 1
             
             size_bytes = os.path.getsize(destination)
-            checksum = self._calculate_checksum(destination)
+            checksum = writer.sha256.hexdigest()
             
             return {
                 'success': True,
@@ -543,7 +654,10 @@ class BackupService:
                 if not backup:
                     return {'success': False, 'error': 'Backup not found'}
                 
-                if not os.path.exists(backup.destination):
+                backup_meta = backup.backup_metadata or {}
+                chunked = backup_meta.get('engine') == 'chunked'
+                
+                if not chunked and not os.path.exists(backup.destination):
                     return {'success': False, 'error': 'Backup file not found on disk'}
                 
                 backup.status = 'restoring'
@@ -552,7 +666,9 @@ class BackupService:
                 restore_target = target_path or backup.source
                 
                 try:
-                    if backup.backup_type == 'database':
+                    if chunked:
+                        result = self._restore_snapshot(backup_meta.get('snapshot_id'), restore_target)
+                    elif backup.backup_type == 'database':
                         result = self._restore_database(backup.destination, restore_target, backup.compression)
                     elif backup.backup_type == 'docker_volume':
                         result = self._restore_docker_volume(backup.destination, restore_target)
@@ -630,6 +746,22 @@ class BackupService:
             logger.error(f"Database restore failed: {e}")
             return {'success': False, 'error': str(e)}
     
+    def _restore_snapshot(self, snapshot_id: str, target_path: str) -> Dict[str, Any]:
+        """Restore files from a chunked snapshot, laid out like an extracted archive"""
+        try:
+            if self.chunk_store is None:
+                return {'success': False, 'error': 'MinIO storage not available'}
+            
+            target = Path(target_path)
+            target.mkdir(parents=True, exist_ok=True)
+            
+            result = self.chunk_store.restore(snapshot_id, str(target.parent))
+            return {'success': True, **result}
+            
+        except Exception as e:
+            logger.error(f"Snapshot restore failed: {e}")
+            return {'success': False, 'error': str(e)}
+    
     def _restore_files(self, backup_path: str, target_path: str) -> Dict[str, Any]:
         """Restore files from a tar archive"""
         try:
@@ -774,7 +906,11 @@ class BackupService:
                 
                 if delete_file and backup.destination:
                     try:
-                        if os.path.exists(backup.destination):
+                        remote_prefix = f"s3://{MINIO_BUCKET}/"
+                        if backup.destination.startswith(remote_prefix):
+                            # Snapshot chunks are reclaimed by the next cleanup's prune
+                            self.delete_from_minio(backup.destination[len(remote_prefix):])
+                        elif os.path.exists(backup.destination):
                             os.remove(backup.destination)
                     except Exception as e:
                         logger.warning(f"Failed to delete backup file: {e}")
@@ -788,9 +924,16 @@ class BackupService:
             logger.error(f"Failed to delete backup: {e}")
             return {'success': False, 'error': str(e)}
     
-    def cleanup_old_backups(self, schedule_id: Optional[str] = None) -> Dict[str, Any]:
-        """Delete backups older than retention period"""
+    def cleanup_old_backups(self, schedule_id: Optional[str] = None, dry_run: bool = False) -> Dict[str, Any]:
+        """
+        Delete backups older than retention period
+        
+        Local files are removed one by one; copies uploaded to MinIO are
+        removed with multi-object delete requests. A backup record is kept
+        when its MinIO copy could not be deleted, so the next run retries it.
+        """
         from services.db_service import db_service
+        from services.object_cleanup import delete_objects
         from models.backups import Backup, BackupSchedule
         from sqlalchemy import select, and_
         
@@ -799,6 +942,7 @@ class BackupService:
         
         deleted_count = 0
         freed_bytes = 0
+        remote_prefix = f"s3://{MINIO_BUCKET}/"
         
         try:
             with db_service.get_session() as session:
@@ -814,37 +958,90 @@ class BackupService:
                 else:
                     schedules = session.execute(select(BackupSchedule)).scalars().all()
                 
+                old_backups = []
                 for schedule in schedules:
                     cutoff_date = datetime.utcnow() - timedelta(days=schedule.retention_days)
                     
-                    old_backups = session.execute(
+                    old_backups.extend(session.execute(
                         select(Backup).where(
                             and_(
                                 Backup.schedule_id == schedule.id,
                                 Backup.created_at < cutoff_date
                             )
                         )
-                    ).scalars().all()
+                    ).scalars().all())
+                
+                remote_objects = {}
+                for backup in old_backups:
+                    if backup.destination and backup.destination.startswith(remote_prefix):
+                        remote_objects[backup.destination[len(remote_prefix):]] = backup.size_bytes or 0
+                
+                has_snapshots = any(
+                    (backup.backup_metadata or {}).get('engine') == 'chunked' for backup in old_backups
+                )
+                
+                remote = None
+                if remote_objects and self.minio_client:
+                    remote = delete_objects(
+                        self.minio_client, MINIO_BUCKET, remote_objects.items(), dry_run=dry_run
+                    )
+                
+                for backup in old_backups:
+                    object_name = None
+                    if backup.destination and backup.destination.startswith(remote_prefix):
+                        object_name = backup.destination[len(remote_prefix):]
+                        if remote is None or object_name in remote.failed:
+                            continue
+                        freed_bytes += backup.size_bytes or 0
                     
-                    for backup in old_backups:
-                        if backup.destination and os.path.exists(backup.destination):
-                            try:
-                                freed_bytes += os.path.getsize(backup.destination)
-                                os.remove(backup.destination)
-                            except Exception as e:
-                                logger.warning(f"Failed to delete file: {e}")
-                        
+                    local_path = (backup.backup_metadata or {}).get('local_path') if object_name else backup.destination
+                    if local_path and os.path.exists(local_path):
+                        try:
+                            size = os.path.getsize(local_path)
+                            if not dry_run:
+                                os.remove(local_path)
+                            if not object_name:
+                                freed_bytes += size
+                        except Exception as e:
+                            logger.warning(f"Failed to delete file: {e}")
+                    
+                    if not dry_run:
                         session.delete(backup)
-                        deleted_count += 1
+                    deleted_count += 1
                 
-                session.commit()
+                if dry_run:
+                    session.rollback()
+                else:
+                    session.commit()
                 
-                return {
+                pruned = None
+                prune_skipped = None
+                if has_snapshots and not dry_run and self.chunk_store is not None:
+                    from services.chunk_store import RepositoryLockedError
+                    try:
+                        pruned = self.chunk_store.prune()
+                    except RepositoryLockedError as e:
+                        # A backup is running; the next cleanup prunes instead
+                        logger.info(f"Skipping chunk prune: {e}")
+                        prune_skipped = str(e)
+                
+                result = {
                     'success': True,
+                    'dry_run': dry_run,
                     'deleted_count': deleted_count,
                     'freed_bytes': freed_bytes,
                     'freed_human': self._format_size(freed_bytes)
                 }
+                if remote is not None:
+                    result['remote_deleted_count'] = remote.deleted
+                    result['remote_delete_requests'] = remote.requests
+                    result['errors'] = remote.errors
+                if pruned is not None:
+                    result['pruned_chunks'] = pruned['deleted_chunks']
+                    result['pruned_bytes'] = pruned['freed_bytes']
+                if prune_skipped is not None:
+                    result['prune_skipped'] = prune_skipped
+                return result
                 
         except Exception as e:
             logger.error(f"Cleanup failed: {e}")
@@ -0,0 +1,287 @@
+"""
+Backup Streaming
+Pipes a dump command's output through an incremental compressor straight
+into a multipart object upload, and an object back through a decompressor
+into a restore command, so memory use does not grow with database size
+"""
+import hashlib
+import logging
+import subprocess
+import tempfile
+import threading
+import zlib
+from typing import Any, BinaryIO, Dict, List, Optional
+
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+
+from minio import Minio
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 1024 * 1024
+MIN_PART_SIZE = 5 * 1024 * 1024  # S3 multipart minimum
+COMPRESSION_SUFFIXES = {'gzip': '.gz', 'zstd': '.zst', 'none': ''}
+
+
+class BackupStreamError(Exception):
+    """A dump or restore command failed; the message carries its stderr"""
+    pass
+
+
+class _Passthrough:
+    def compress(self, data: bytes) -> bytes:
+        return data
+    
+    def decompress(self, data: bytes) -> bytes:
+        return data
+    
+    def flush(self) -> bytes:
+        return b''
+
+
+def _compressor(compression: str):
+    if compression == 'gzip':
+        return zlib.compressobj(6, zlib.DEFLATED, 31)
+    if compression == 'zstd':
+        if not ZSTD_AVAILABLE:
+            raise BackupStreamError('zstd compression requires the zstandard package')
+        return zstandard.ZstdCompressor(level=3, threads=-1).compressobj()
+    return _Passthrough()
+
+
+def _decompressor(compression: str):
+    if compression == 'gzip':
+        return zlib.decompressobj(31)
+    if compression == 'zstd':
+        if not ZSTD_AVAILABLE:
+            raise BackupStreamError('zstd compression requires the zstandard package')
+        return zstandard.ZstdDecompressor().decompressobj()
+    return _Passthrough()
+
+
+class CompressingReader:
+    """
+    File-like view of ``source`` compressed on the fly
+    
+    At most one ``read`` request plus one source chunk is buffered, and a
+    SHA-256 of the compressed bytes is kept as they are handed out.
+    """
+    
+    def __init__(self, source: BinaryIO, compression: str, chunk_size: int = CHUNK_SIZE):
+        self.source = source
+        self.chunk_size = chunk_size
+        self.compressor = _compressor(compression)
+        self.sha256 = hashlib.sha256()
+        self.raw_bytes = 0
+        self.compressed_bytes = 0
+        self._buffer = bytearray()
+        self._eof = False
+    
+    def read(self, size: int = -1) -> bytes:
+        while not self._eof and (size < 0 or len(self._buffer) < size):
+            chunk = self.source.read(self.chunk_size)
+            if chunk:
+                self.raw_bytes += len(chunk)
+                self._buffer += self.compressor.compress(chunk)
+            else:
+                self._buffer += self.compressor.flush()
+                self._eof = True
+        if size < 0 or size >= len(self._buffer):
+            data = bytes(self._buffer)
+            self._buffer.clear()
+        else:
+            data = bytes(self._buffer[:size])
+            del self._buffer[:size]
+        self.sha256.update(data)
+        self.compressed_bytes += len(data)
+        return data
+
+
+class _Command:
+    """A child process with stderr spooled to disk and a kill-on-timeout watchdog"""
+    
+    def __init__(self, cmd: List[str], env: Optional[Dict[str, str]], timeout: float, **popen_args):
+        self.cmd = cmd
+        self.timeout = timeout
+        self.stderr = tempfile.TemporaryFile()
+        self.process = subprocess.Popen(cmd, env=env, stderr=self.stderr, **popen_args)
+        self.timed_out = False
+        self._watchdog = threading.Timer(timeout, self._kill)
+        self._watchdog.daemon = True
+        self._watchdog.start()
+    
+    def _kill(self):
+        self.timed_out = True
+        self.process.kill()
+    
+    def abort(self):
+        if self.process.poll() is None:
+            self.process.kill()
+        self.finish(check=False)
+    
+    def finish(self, check: bool = True) -> int:
+        """Wait for the process and raise if it failed or timed out"""
+        try:
+            returncode = self.process.wait()
+        finally:
+            self._watchdog.cancel()
+        self.stderr.seek(0)
+        error = self.stderr.read().decode(errors='replace').strip()
+        self.stderr.close()
+        if check and self.timed_out:
+            raise subprocess.TimeoutExpired(self.cmd, self.timeout)
+        if check and returncode != 0:
+            raise BackupStreamError(error or f"{self.cmd[0]} exited with status {returncode}")
+        return returncode
+
+
+def stream_command_to_object(cmd: List[str], client: Minio, bucket: str, object_name: str,
+                             compression: str = 'gzip', part_size: int = 16 * 1024 * 1024,
+                             env: Optional[Dict[str, str]] = None, timeout: float = 3600) -> Dict[str, Any]:
+    """
+    Upload the stdout of ``cmd``, compressed, as ``bucket/object_name``
+    
+    The object is written as a multipart upload of ``part_size`` parts
+    while the command is still producing output. If the command fails the
+    uploaded object is removed again.
+    
+    Returns:
+        Dict with size_bytes (stored), raw_size_bytes and sha256 (of the stored bytes)
+    """
+    command = _Command(cmd, env, timeout, stdout=subprocess.PIPE)
+    reader = CompressingReader(command.process.stdout, compression)
+    try:
+        client.put_object(
+            bucket,
+            object_name,
+            reader,
+            length=-1,
+            part_size=max(part_size, MIN_PART_SIZE),
+            num_parallel_uploads=1,
+            content_type='application/octet-stream'
+        )
+    except Exception:
+        command.abort()
+        raise
+    
+    try:
+        command.finish()
+    except Exception:
+        try:
+            client.remove_object(bucket, object_name)
+        except Exception as e:
+            logger.warning(f"Failed to remove incomplete backup {object_name}: {e}")
+        raise
+    
+    return {
+        'size_bytes': reader.compressed_bytes,
+        'raw_size_bytes': reader.raw_bytes,
+        'sha256': reader.sha256.hexdigest()
+    }
+
+
+def _download(client: Minio, bucket: str, object_name: str, sink: BinaryIO) -> str:
+    """Copy an object into ``sink`` chunk by chunk; returns its SHA-256"""
+    sha256 = hashlib.sha256()
+    response = client.get_object(bucket, object_name)
+    try:
+        for chunk in response.stream(CHUNK_SIZE):
+            sha256.update(chunk)
+            sink.write(chunk)
+    finally:
+        response.close()
+        response.release_conn()
+    return sha256.hexdigest()
+
+
+def _feed_command(chunks, cmd: List[str], compression: str, env: Optional[Dict[str, str]],
+                  timeout: float) -> Dict[str, Any]:
+    """Decompress ``chunks`` into the stdin of ``cmd`` and wait for it to succeed"""
+    decompressor = _decompressor(compression)
+    size = 0
+    raw_size = 0
+    command = _Command(cmd, env, timeout, stdin=subprocess.PIPE, stdout=subprocess.DEVNULL)
+    try:
+        for chunk in chunks:
+            size += len(chunk)
+            data = decompressor.decompress(chunk)
+            raw_size += len(data)
+            command.process.stdin.write(data)
+        tail = decompressor.flush()
+        raw_size += len(tail)
+        command.process.stdin.write(tail)
+        command.process.stdin.close()
+    except BrokenPipeError:
+        # The command exited early; its stderr explains why
+        pass
+    except Exception:
+        command.abort()
+        raise
+    
+    command.finish()
+    return {
+        'size_bytes': size,
+        'raw_size_bytes': raw_size
+    }
+
+
+def stream_object_to_command(client: Minio, bucket: str, object_name: str, cmd: List[str],
+                             compression: str = 'gzip', env: Optional[Dict[str, str]] = None,
+                             timeout: float = 3600, expected_sha256: Optional[str] = None,
+                             verify_first: bool = True, spool_dir: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Feed ``bucket/object_name``, decompressed, to the stdin of ``cmd``
+    
+    Memory use stays bounded by the chunk size. When
+    ``expected_sha256`` is given and ``verify_first`` is set, the object is
+    first downloaded to a temporary file in ``spool_dir`` and verified, and
+    ``cmd`` only starts once the checksum matches, so a corrupt backup is
+    never applied. With ``verify_first=False`` the checksum is checked after
+    ``cmd`` has consumed the stream, which only suits commands whose output
+    is thrown away on failure (e.g. extracting into scratch space).
+    
+    Returns:
+        Dict with size_bytes (stored), raw_size_bytes and verified (whether
+        the checksum was checked before the command ran)
+    """
+    if expected_sha256 and verify_first:
+        with tempfile.TemporaryFile(dir=spool_dir) as spool:
+            if _download(client, bucket, object_name, spool) != expected_sha256:
+                raise BackupStreamError(f"Checksum mismatch for {object_name}: backup object is corrupt")
+            spool.seek(0)
+            result = _feed_command(iter(lambda: spool.read(CHUNK_SIZE), b''), cmd, compression, env, timeout)
+        result['verified'] = True
+        return result
+    
+    sha256 = hashlib.sha256()
+    response = client.get_object(bucket, object_name)
+    
+    def chunks():
+        for chunk in response.stream(CHUNK_SIZE):
+            sha256.update(chunk)
+            yield chunk
+    
+    try:
+        result = _feed_command(chunks(), cmd, compression, env, timeout)
+    finally:
+        response.close()
+        response.release_conn()
+    
+    if expected_sha256 and sha256.hexdigest() != expected_sha256:
+        raise BackupStreamError(f"Checksum mismatch for {object_name}: backup object is corrupt")
+    result['verified'] = False
+    return result
+
+
+__all__ = [
+    'stream_command_to_object',
+    'stream_object_to_command',
+    'CompressingReader',
+    'BackupStreamError',
+    'COMPRESSION_SUFFIXES',
+    'ZSTD_AVAILABLE'
+]
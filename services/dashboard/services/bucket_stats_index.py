@@ -0,0 +1,346 @@
+"""
+Bucket Statistics Index
+Per-bucket and per-prefix size/count aggregates kept in PostgreSQL so
+storage pages do not list every object on every request
+"""
+import time
+import logging
+from datetime import datetime
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from sqlalchemy import select, update, delete
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from config import Config
+from models.bucket_stats import BucketStats, BucketStatsScan
+
+logger = logging.getLogger(__name__)
+
+BUCKET_TOTAL = ''
+ROOT_PREFIX = 'root'
+OTHER_PREFIX = '(other)'
+SCAN_CLAIM_TTL = Config.CELERY_TASK_TIME_LIMIT  # a queued bucket scan never outlives its task
+
+
+def scan_claim_key(backend: str, bucket: str) -> str:
+    """Redis marker held while a requested scan of one bucket is queued or running"""
+    return f"bucket_stats:scan:{backend}:{bucket}"
+
+
+def prefix_of(key: str) -> str:
+    """First path segment of a key; top-level objects are grouped under 'root'"""
+    return key.split('/', 1)[0] if '/' in key else ROOT_PREFIX
+
+
+def scan_page(objects: Iterable, partial: Dict[str, list], max_keys: int, deadline: float,
+              max_prefixes: int) -> Tuple[Optional[str], int, bool]:
+    """
+    Fold listed objects into ``partial`` ({prefix: [size, count]}) until
+    ``max_keys`` objects or ``deadline`` (monotonic) is reached
+    
+    Prefixes beyond ``max_prefixes`` are summed under '(other)'.
+    
+    Returns:
+        ``(last key folded, objects folded, whether the listing was exhausted)``
+    """
+    marker = None
+    folded = 0
+    for obj in objects:
+        if getattr(obj, 'is_dir', False):
+            continue
+        prefix = prefix_of(obj.object_name)
+        if prefix not in partial and len(partial) >= max_prefixes:
+            prefix = OTHER_PREFIX
+        totals = partial.setdefault(prefix, [0, 0])
+        totals[0] += obj.size or 0
+        totals[1] += 1
+        marker = obj.object_name
+        folded += 1
+        if folded >= max_keys or time.monotonic() >= deadline:
+            return marker, folded, False
+    return marker, folded, True
+
+
+class BucketStatsIndex:
+    """
+    Bucket size index refreshed by a resumable incremental listing
+    
+    ``refresh`` lists each bucket a page at a time within a time budget,
+    persisting the continuation marker and running sums in
+    ``bucket_stats_scans``; when a listing completes, its sums replace the
+    bucket's rows in ``bucket_stats``. A bucket with hundreds of thousands
+    of objects is therefore re-counted over several runs without any one
+    run or request listing it all. Uploads and deletes made through the
+    dashboard adjust the published rows immediately, and the next
+    completed scan corrects any drift from changes made elsewhere.
+    """
+    
+    def __init__(self, scan_batch: Optional[int] = None, scan_seconds: Optional[float] = None,
+                 max_prefixes: Optional[int] = None):
+        self.scan_batch = scan_batch or Config.BUCKET_STATS_SCAN_BATCH
+        self.scan_seconds = scan_seconds or Config.BUCKET_STATS_SCAN_SECONDS
+        self.max_prefixes = max_prefixes or Config.BUCKET_STATS_MAX_PREFIXES
+    
+    def _db_available(self) -> bool:
+        from services.db_service import db_service
+        return db_service.is_available
+    
+    def _session(self):
+        from services.db_service import db_service
+        if not db_service.is_available:
+            return None
+        return db_service.get_session()
+    
+    def get_buckets(self, backend: str) -> Optional[Dict[str, Dict[str, Any]]]:
+        """
+        Indexed stats for every bucket of a backend, with a ``prefixes``
+        breakdown, or None when the index cannot be read
+        """
+        session_cm = self._session()
+        if session_cm is None:
+            return None
+        try:
+            with session_cm as session:
+                rows = session.execute(
+                    select(BucketStats).where(BucketStats.backend == backend)
+                ).scalars().all()
+                buckets: Dict[str, Dict[str, Any]] = {}
+                prefixes: Dict[str, Dict[str, Any]] = {}
+                for row in rows:
+                    if row.prefix == BUCKET_TOTAL:
+                        buckets[row.bucket] = row.to_dict()
+                    else:
+                        prefixes.setdefault(row.bucket, {})[row.prefix] = {
+                            'size_bytes': row.size_bytes,
+                            'object_count': row.object_count
+                        }
+                for bucket, stats in buckets.items():
+                    stats['prefixes'] = prefixes.get(bucket, {})
+                return buckets
+        except Exception as e:
+            logger.error(f"Failed to read bucket stats index: {e}")
+            return None
+    
+    def get_bucket(self, backend: str, bucket: str, client=None) -> Optional[Dict[str, Any]]:
+        """
+        Indexed stats for one bucket
+        
+        A bucket that has never been indexed is never listed inside the
+        request. When a ``client`` is given, a scan of the bucket is queued
+        (once, however many requests ask) and the sums of its scan so far
+        are returned with ``pending`` set.
+        """
+        stats = (self.get_buckets(backend) or {}).get(bucket)
+        if stats is None and client is not None and self._db_available():
+            self._queue_scan(backend, bucket)
+            stats = self._pending(backend, bucket)
+        return stats
+    
+    def _queue_scan(self, backend: str, bucket: str):
+        from services.cache_service import cache_service
+        
+        key = scan_claim_key(backend, bucket)
+        if not cache_service.claim(key, SCAN_CLAIM_TTL):
+            # Already queued, or Redis is down; the periodic refresh scans unindexed buckets first
+            return
+        try:
+            from workers.storage_worker import refresh_bucket_stats
+            refresh_bucket_stats.delay(backend=backend, bucket=bucket)
+        except Exception as e:
+            cache_service.release(key)
+            logger.warning(f"Failed to queue stats scan of {backend} bucket '{bucket}': {e}")
+    
+    def _pending(self, backend: str, bucket: str) -> Optional[Dict[str, Any]]:
+        """Running sums of an unfinished scan, shaped like an indexed entry"""
+        session_cm = self._session()
+        if session_cm is None:
+            return None
+        try:
+            with session_cm as session:
+                state = session.get(BucketStatsScan, (backend, bucket))
+                partial = dict(state.partial) if state and state.partial else {}
+                updated_at = state.updated_at if state else None
+        except Exception as e:
+            logger.error(f"Failed to read bucket scan state: {e}")
+            return None
+        return {
+            'size_bytes': sum(t[0] for t in partial.values()),
+            'object_count': sum(t[1] for t in partial.values()),
+            'scanned_at': None,
+            'updated_at': updated_at.isoformat() if updated_at else None,
+            'pending': True,
+            'prefixes': {
+                prefix: {'size_bytes': size, 'object_count': count}
+                for prefix, (size, count) in partial.items()
+            }
+        }
+    
+    def scan(self, backend: str, client, bucket: str, max_keys: Optional[float] = None,
+             time_budget: Optional[float] = None) -> bool:
+        """
+        Continue the incremental scan of one bucket
+        
+        Returns:
+            True when the listing completed and the bucket's stats were published
+        """
+        session_cm = self._session()
+        if session_cm is None:
+            return False
+        max_keys = max_keys or self.scan_batch
+        deadline = time.monotonic() + (time_budget or self.scan_seconds)
+        
+        with session_cm as session:
+            state = session.get(BucketStatsScan, (backend, bucket))
+            marker = state.marker if state else None
+            partial = dict(state.partial) if state and state.partial else {}
+            started_at = state.started_at if state else datetime.utcnow()
+        
+        objects = client.list_objects(bucket, recursive=True, start_after=marker) if marker \
+            else client.list_objects(bucket, recursive=True)
+        last, folded, complete = scan_page(objects, partial, max_keys, deadline, self.max_prefixes)
+        
+        with self._session() as session:
+            if complete:
+                self._publish(session, backend, bucket, partial, started_at)
+                session.execute(delete(BucketStatsScan).where(
+                    BucketStatsScan.backend == backend, BucketStatsScan.bucket == bucket
+                ))
+                logger.info(f"Indexed {backend} bucket '{bucket}': "
+                            f"{sum(t[1] for t in partial.values())} objects")
+            else:
+                stmt = pg_insert(BucketStatsScan).values(
+                    backend=backend, bucket=bucket, marker=last or marker, partial=partial,
+                    started_at=started_at, updated_at=datetime.utcnow()
+                )
+                session.execute(stmt.on_conflict_do_update(
+                    index_elements=['backend', 'bucket'],
+                    set_={'marker': stmt.excluded.marker, 'partial': stmt.excluded.partial,
+                          'updated_at': stmt.excluded.updated_at}
+                ))
+                logger.debug(f"Bucket '{bucket}' scan paused after {folded} objects at '{last}'")
+        return complete
+    
+    def _publish(self, session, backend: str, bucket: str, partial: Dict[str, list], scanned_at: datetime):
+        now = datetime.utcnow()
+        session.execute(delete(BucketStats).where(
+            BucketStats.backend == backend, BucketStats.bucket == bucket
+        ))
+        rows = [{
+            'backend': backend, 'bucket': bucket, 'prefix': BUCKET_TOTAL,
+            'size_bytes': sum(t[0] for t in partial.values()),
+            'object_count': sum(t[1] for t in partial.values()),
+            'scanned_at': scanned_at, 'updated_at': now
+        }]
+        rows.extend(
+            {'backend': backend, 'bucket': bucket, 'prefix': prefix, 'size_bytes': size,
+             'object_count': count, 'scanned_at': scanned_at, 'updated_at': now}
+            for prefix, (size, count) in partial.items()
+        )
+        session.execute(pg_insert(BucketStats).values(rows))
+    
+    def index_bucket(self, backend: str, client, bucket: str, time_budget: float) -> bool:
+        """
+        Scan one bucket a page at a time until it is indexed or
+        ``time_budget`` runs out; an unfinished scan resumes on the next
+        refresh
+        
+        Returns:
+            True when the bucket's stats were published
+        """
+        deadline = time.monotonic() + time_budget
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            if self.scan(backend, client, bucket, time_budget=min(remaining, self.scan_seconds)):
+                return True
+    
+    def refresh(self, backend: str, client) -> Dict[str, Any]:
+        """
+        Advance the scans of a backend's buckets within one time budget,
+        least recently scanned first, and drop buckets that no longer exist
+        """
+        if not self._db_available():
+            return {'success': False, 'error': 'Database not available'}
+        
+        try:
+            names = [b.name for b in client.list_buckets()]
+        except Exception as e:
+            logger.error(f"Failed to list {backend} buckets for indexing: {e}")
+            return {'success': False, 'error': str(e)}
+        
+        indexed = self.get_buckets(backend) or {}
+        self.forget(backend, [name for name in indexed if name not in names])
+        names.sort(key=lambda name: (name in indexed, (indexed.get(name) or {}).get('scanned_at') or ''))
+        
+        deadline = time.monotonic() + self.scan_seconds
+        completed, advanced, errors = [], [], []
+        for name in names:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                if self.scan(backend, client, name, time_budget=remaining):
+                    completed.append(name)
+                else:
+                    advanced.append(name)
+            except Exception as e:
+                logger.error(f"Failed to index {backend} bucket '{name}': {e}")
+                errors.append({'bucket': name, 'error': str(e)})
+        
+        return {
+            'success': True,
+            'backend': backend,
+            'completed': completed,
+            'in_progress': advanced,
+            'errors': errors
+        }
+    
+    def apply_delta(self, backend: str, bucket: str, key: str, size_delta: int, count_delta: int):
+        """Adjust an indexed bucket for a change the dashboard itself made"""
+        session_cm = self._session()
+        if session_cm is None or (not size_delta and not count_delta):
+            return
+        try:
+            with session_cm as session:
+                now = datetime.utcnow()
+                indexed = session.execute(
+                    update(BucketStats)
+                    .where(BucketStats.backend == backend, BucketStats.bucket == bucket,
+                           BucketStats.prefix == BUCKET_TOTAL)
+                    .values(size_bytes=BucketStats.size_bytes + size_delta,
+                            object_count=BucketStats.object_count + count_delta,
+                            updated_at=now)
+                ).rowcount
+                if not indexed:
+                    # Never scanned; the first scan will count this object
+                    return
+                stmt = pg_insert(BucketStats).values(
+                    backend=backend, bucket=bucket, prefix=prefix_of(key),
+                    size_bytes=max(size_delta, 0), object_count=max(count_delta, 0), updated_at=now
+                )
+                session.execute(stmt.on_conflict_do_update(
+                    index_elements=['backend', 'bucket', 'prefix'],
+                    set_={'size_bytes': BucketStats.size_bytes + size_delta,
+                          'object_count': BucketStats.object_count + count_delta,
+                          'updated_at': now}
+                ))
+        except Exception as e:
+            logger.debug(f"Failed to update bucket stats for '{bucket}': {e}")
+    
+    def forget(self, backend: str, buckets: Iterable[str]):
+        buckets = list(buckets)
+        session_cm = self._session()
+        if not buckets or session_cm is None:
+            return
+        try:
+            with session_cm as session:
+                for model in (BucketStats, BucketStatsScan):
+                    session.execute(delete(model).where(model.backend == backend, model.bucket.in_(buckets)))
+        except Exception as e:
+            logger.error(f"Failed to drop bucket stats for {buckets}: {e}")
+
+
+bucket_stats_index = BucketStatsIndex()
+
+__all__ = ['bucket_stats_index', 'BucketStatsIndex', 'scan_page', 'prefix_of', 'scan_claim_key']
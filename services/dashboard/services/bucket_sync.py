@@ -0,0 +1,367 @@
+"""
+Bucket Sync Engine
+Copies a bucket between storage backends with a bounded worker pool,
+streaming object bodies straight from source to destination, and records
+what it copied in a manifest so an interrupted sync resumes where it left off
+"""
+import json
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from minio import Minio
+from minio.commonconfig import CopySource, ComposeSource
+
+from services.object_cleanup import delete_objects
+
+logger = logging.getLogger(__name__)
+
+MAX_COPY_OBJECT_SIZE = 5 * 1024 ** 3  # single-request server-side copy limit
+READ_CHUNK_SIZE = 1024 * 1024
+
+
+class BandwidthLimiter:
+    """
+    Token bucket shared by every transfer of a sync
+    
+    ``consume`` books the bytes against the configured rate and sleeps
+    until they are paid for, so the aggregate rate across workers stays
+    at ``bytes_per_second``. A rate of 0 disables limiting.
+    """
+    
+    def __init__(self, bytes_per_second: float = 0):
+        self.bytes_per_second = bytes_per_second
+        self._lock = threading.Lock()
+        self._available_at = time.monotonic()
+    
+    def consume(self, nbytes: int):
+        if not self.bytes_per_second or nbytes <= 0:
+            return
+        with self._lock:
+            now = time.monotonic()
+            self._available_at = max(self._available_at, now) + nbytes / self.bytes_per_second
+            delay = self._available_at - now
+        if delay > 0:
+            time.sleep(delay)
+
+
+class _ThrottledStream:
+    """File-like view of a GET response that reads in small chunks under a bandwidth limit"""
+    
+    def __init__(self, response, limiter: BandwidthLimiter, on_read: Callable[[int], None]):
+        self._response = response
+        self._limiter = limiter
+        self._on_read = on_read
+    
+    def read(self, size: int = -1) -> bytes:
+        chunks = []
+        remaining = size if size is not None and size >= 0 else None
+        while remaining is None or remaining > 0:
+            chunk = self._response.read(READ_CHUNK_SIZE if remaining is None else min(remaining, READ_CHUNK_SIZE))
+            if not chunk:
+                break
+            self._limiter.consume(len(chunk))
+            self._on_read(len(chunk))
+            chunks.append(chunk)
+            if remaining is not None:
+                remaining -= len(chunk)
+        return b''.join(chunks)
+
+
+class SyncManifest:
+    """
+    Record of objects a sync has copied: source etag and the etag the
+    destination assigned
+    
+    Destination etags differ from source etags whenever the copy was a
+    multipart upload or the destination encrypts, so the manifest is what
+    lets later runs recognise an object as already synced. Stored as a
+    Redis hash when Redis is reachable, otherwise kept in memory for the
+    life of the process. Redis errors are reported to ``breaker`` when
+    one is given, so a failing server is skipped by later syncs.
+    """
+    
+    _memory: Dict[str, Dict[str, Tuple[str, str]]] = {}
+    _memory_status: Dict[str, Dict[str, Any]] = {}
+    
+    def __init__(self, bucket: str, source: str, destination: str, redis_client=None, ttl: int = 7 * 86400,
+                 breaker=None):
+        self.key = f"storage:sync:{source}:{destination}:{bucket}"
+        self.status_key = f"{self.key}:status"
+        self.ttl = ttl
+        self._redis = redis_client
+        self._breaker = breaker
+        self._lock = threading.Lock()
+        self._entries: Optional[Dict[str, Tuple[str, str]]] = None
+    
+    def load(self) -> Dict[str, Tuple[str, str]]:
+        """Read the whole manifest once per sync"""
+        if self._redis is not None:
+            try:
+                raw = self._redis.hgetall(self.key)
+                self._entries = {
+                    (k.decode() if isinstance(k, bytes) else k): tuple(json.loads(v))
+                    for k, v in raw.items()
+                }
+                return self._entries
+            except Exception as e:
+                logger.warning(f"Sync manifest unavailable in Redis, using process memory: {e}")
+                self._redis_failed()
+                self._redis = None
+        self._entries = SyncManifest._memory.setdefault(self.key, {})
+        return self._entries
+    
+    def _redis_failed(self):
+        if self._breaker is not None:
+            self._breaker.record_failure()
+    
+    def matches(self, key: str, src_etag: str, dst_etag: Optional[str]) -> bool:
+        entry = (self._entries or {}).get(key)
+        return entry is not None and entry[0] == src_etag and entry[1] == dst_etag
+    
+    def record(self, key: str, src_etag: str, dst_etag: Optional[str]):
+        with self._lock:
+            if self._entries is not None:
+                self._entries[key] = (src_etag, dst_etag)
+        if self._redis is not None:
+            try:
+                self._redis.pipeline().hset(self.key, key, json.dumps([src_etag, dst_etag])) \
+                    .expire(self.key, self.ttl).execute()
+            except Exception as e:
+                logger.warning(f"Failed to record '{key}' in sync manifest: {e}")
+                self._redis_failed()
+    
+    def forget(self, keys: List[str]):
+        if not keys:
+            return
+        with self._lock:
+            for key in keys:
+                (self._entries or {}).pop(key, None)
+        if self._redis is not None:
+            try:
+                self._redis.hdel(self.key, *keys)
+            except Exception as e:
+                logger.warning(f"Failed to prune sync manifest: {e}")
+                self._redis_failed()
+    
+    def save_status(self, status: Dict[str, Any]):
+        if self._redis is not None:
+            try:
+                self._redis.set(self.status_key, json.dumps(status, default=str), ex=self.ttl)
+                return
+            except Exception as e:
+                logger.debug(f"Failed to store sync status: {e}")
+                self._redis_failed()
+        SyncManifest._memory_status[self.status_key] = status
+    
+    def get_status(self) -> Optional[Dict[str, Any]]:
+        if self._redis is not None:
+            try:
+                raw = self._redis.get(self.status_key)
+                return json.loads(raw) if raw else None
+            except Exception as e:
+                logger.debug(f"Failed to read sync status: {e}")
+                self._redis_failed()
+        return SyncManifest._memory_status.get(self.status_key)
+
+
+def _merge_listings(src: Iterator, dst: Iterator) -> Iterator[Tuple[Optional[Any], Optional[Any]]]:
+    """
+    Pair up two listings by key
+    
+    S3 lists keys in UTF-8 byte order, which is also code point order, so
+    both listings are walked once in step without holding either in memory.
+    """
+    src_obj = next(src, None)
+    dst_obj = next(dst, None)
+    while src_obj is not None or dst_obj is not None:
+        if dst_obj is None or (src_obj is not None and src_obj.object_name < dst_obj.object_name):
+            yield src_obj, None
+            src_obj = next(src, None)
+        elif src_obj is None or dst_obj.object_name < src_obj.object_name:
+            yield None, dst_obj
+            dst_obj = next(dst, None)
+        else:
+            yield src_obj, dst_obj
+            src_obj = next(src, None)
+            dst_obj = next(dst, None)
+
+
+class BucketSyncEngine:
+    """
+    One-way sync of a bucket from ``src_client`` to ``dst_client``
+    
+    Objects are copied by up to ``workers`` threads. Within one server
+    (``same_server``) objects are copied server side; otherwise the GET
+    body is piped into a multipart PUT one ``part_size`` part at a time,
+    so memory use is bounded by workers x part_size regardless of object
+    size. Extra destination objects are removed with batched
+    multi-object deletes.
+    """
+    
+    def __init__(self, src_client: Minio, dst_client: Minio, manifest: SyncManifest, workers: int = 8,
+                 part_size: int = 64 * 1024 * 1024, bandwidth_limit: float = 0, same_server: bool = False,
+                 on_progress: Optional[Callable[[Dict[str, Any]], None]] = None, progress_interval: float = 2.0):
+        self.src_client = src_client
+        self.dst_client = dst_client
+        self.manifest = manifest
+        self.workers = max(1, workers)
+        self.part_size = part_size
+        self.limiter = BandwidthLimiter(bandwidth_limit)
+        self.same_server = same_server
+        self.on_progress = on_progress
+        self.progress_interval = progress_interval
+        self._lock = threading.Lock()
+        self._last_progress = 0.0
+        self.progress: Dict[str, Any] = {}
+    
+    def _count(self, **amounts):
+        with self._lock:
+            for name, amount in amounts.items():
+                self.progress[name] += amount
+    
+    def _report(self, force: bool = False):
+        now = time.monotonic()
+        if not force and now - self._last_progress < self.progress_interval:
+            return
+        self._last_progress = now
+        with self._lock:
+            snapshot = dict(self.progress)
+        snapshot['updated_at'] = datetime.utcnow().isoformat()
+        self.manifest.save_status(snapshot)
+        if self.on_progress:
+            try:
+                self.on_progress(snapshot)
+            except Exception as e:
+                logger.debug(f"Sync progress callback failed: {e}")
+    
+    def _copy(self, bucket: str, dst_bucket: str, obj) -> Optional[str]:
+        """Copy one object, returning the destination etag"""
+        key = obj.object_name
+        if self.same_server:
+            if obj.size > MAX_COPY_OBJECT_SIZE:
+                result = self.dst_client.compose_object(dst_bucket, key, [ComposeSource(bucket, key)])
+            else:
+                result = self.dst_client.copy_object(dst_bucket, key, CopySource(bucket, key))
+            self._count(bytes_copied=obj.size)
+            return result.etag
+        
+        response = self.src_client.get_object(bucket, key)
+        try:
+            stream = _ThrottledStream(response, self.limiter, lambda n: self._count(bytes_copied=n))
+            result = self.dst_client.put_object(
+                dst_bucket,
+                key,
+                stream,
+                obj.size,
+                content_type=response.headers.get('Content-Type') or 'application/octet-stream',
+                part_size=self.part_size,
+                num_parallel_uploads=1
+            )
+            return result.etag
+        finally:
+            response.close()
+            response.release_conn()
+    
+    def _copy_task(self, bucket: str, dst_bucket: str, obj) -> Optional[Dict[str, str]]:
+        try:
+            dst_etag = self._copy(bucket, dst_bucket, obj)
+        except Exception as e:
+            logger.error(f"Failed to sync '{obj.object_name}' in bucket '{bucket}': {e}")
+            self._count(failed=1)
+            return {"key": obj.object_name, "error": str(e)}
+        self.manifest.record(obj.object_name, obj.etag, dst_etag)
+        self._count(copied=1)
+        return None
+    
+    def run(self, bucket: str, delete_extra: bool = False, dst_bucket: Optional[str] = None) -> Dict[str, Any]:
+        dst_bucket = dst_bucket or bucket
+        started = time.monotonic()
+        self.progress = {
+            'state': 'running', 'bucket': bucket, 'started_at': datetime.utcnow().isoformat(),
+            'scanned': 0, 'copied': 0, 'skipped': 0, 'resumed': 0, 'failed': 0, 'deleted': 0,
+            'bytes_copied': 0, 'bytes_total': 0
+        }
+        
+        try:
+            return self._run(bucket, dst_bucket, delete_extra, started)
+        except Exception as e:
+            self.progress.update({'state': 'failed', 'error': str(e)})
+            self._report(force=True)
+            raise
+    
+    def _run(self, bucket: str, dst_bucket: str, delete_extra: bool, started: float) -> Dict[str, Any]:
+        if not self.dst_client.bucket_exists(dst_bucket):
+            self.dst_client.make_bucket(dst_bucket)
+        self.manifest.load()
+        self._report(force=True)
+        
+        errors: List[Dict[str, str]] = []
+        extra: List[Tuple[str, int]] = []
+        dst_count = 0
+        in_flight = set()
+        executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='bucket-sync')
+        
+        def collect(done):
+            for future in done:
+                error = future.result()
+                if error:
+                    errors.append(error)
+        
+        try:
+            listings = _merge_listings(
+                iter(self.src_client.list_objects(bucket, recursive=True)),
+                iter(self.dst_client.list_objects(dst_bucket, recursive=True))
+            )
+            for src_obj, dst_obj in listings:
+                if dst_obj is not None:
+                    dst_count += 1
+                if src_obj is None:
+                    extra.append((dst_obj.object_name, dst_obj.size or 0))
+                    continue
+                
+                self._count(scanned=1)
+                if dst_obj is not None:
+                    if dst_obj.etag == src_obj.etag:
+                        self._count(skipped=1)
+                        continue
+                    if self.manifest.matches(src_obj.object_name, src_obj.etag, dst_obj.etag):
+                        self._count(skipped=1, resumed=1)
+                        continue
+                
+                self._count(bytes_total=src_obj.size or 0)
+                # Keep listing only a little ahead of the copies
+                if len(in_flight) >= self.workers * 2:
+                    done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                    collect(done)
+                in_flight.add(executor.submit(self._copy_task, bucket, dst_bucket, src_obj))
+                self._report()
+            
+            done, _ = wait(in_flight)
+            collect(done)
+        finally:
+            executor.shutdown(wait=True)
+        
+        if delete_extra and extra:
+            totals = delete_objects(self.dst_client, dst_bucket, extra)
+            for message in totals.errors:
+                logger.warning(f"Sync of bucket '{bucket}': {message}")
+            errors.extend({"key": key, "error": "Delete failed"} for key in sorted(totals.failed))
+            deleted = [key for key, _ in extra if key not in totals.failed]
+            self.manifest.forget(deleted)
+            self._count(deleted=len(deleted))
+        
+        self.progress['state'] = 'completed' if not errors else 'completed_with_errors'
+        self.progress['duration_seconds'] = round(time.monotonic() - started, 2)
+        self._report(force=True)
+        
+        result = dict(self.progress)
+        result['errors'] = errors
+        result['total_dest_objects'] = dst_count + result['copied'] - result['deleted']
+        return result
+
+
+__all__ = ['BucketSyncEngine', 'BandwidthLimiter', 'SyncManifest']
@@ -1,36 +1,251 @@
-"""Redis Cache Service with Connection Pooling and Graceful Degradation"""
+"""Two-Tier Cache Service (in-process LRU + Redis) with Graceful Degradation"""
 import logging
 import json
+import math
+import random
+import threading
+import time
+import uuid
+import fnmatch
+import functools
 import redis
-from typing import Any, Optional
+from collections import OrderedDict, defaultdict
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
 from datetime import timedelta
 import os
 
+from config import Config
+
 logger = logging.getLogger(__name__)
 
 
+class LocalLRUCache:
+    """
+    Bounded per-process LRU tier
+    
+    Entries hold the serialized envelope so callers always get a fresh copy
+    and cannot mutate what other requests will read.
+    """
+    
+    def __init__(self, max_entries: int, on_evict: Optional[Callable[[str], None]] = None):
+        self.max_entries = max_entries
+        self._entries: 'OrderedDict[str, Tuple[str, float]]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._on_evict = on_evict
+        self.evictions = 0
+    
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            raw, expires_at = entry
+            if expires_at <= time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return raw
+    
+    def set(self, key: str, raw: str, ttl: float):
+        if self.max_entries <= 0 or ttl <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (raw, time.time() + ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                evicted, _ = self._entries.popitem(last=False)
+                self.evictions += 1
+                if self._on_evict:
+                    self._on_evict(evicted)
+    
+    def delete(self, key: str):
+        with self._lock:
+            self._entries.pop(key, None)
+    
+    def delete_pattern(self, pattern: str) -> int:
+        with self._lock:
+            matched = [k for k in self._entries if fnmatch.fnmatchcase(k, pattern)]
+            for k in matched:
+                del self._entries[k]
+            return len(matched)
+    
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class CircuitBreaker:
+    """
+    Stops calling Redis after repeated failures
+    
+    After ``threshold`` consecutive failures the breaker opens and every
+    call short-circuits for ``cooldown`` seconds. The next call after the
+    cooldown is let through (half-open); success closes the breaker and a
+    failure opens it again.
+    """
+    
+    def __init__(self, threshold: int, cooldown: float):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._lock = threading.Lock()
+    
+    @property
+    def state(self) -> str:
+        if self._opened_at is None:
+            return 'closed'
+        if time.monotonic() - self._opened_at >= self.cooldown:
+            return 'half_open'
+        return 'open'
+    
+    def allow(self) -> bool:
+        return self.state != 'open'
+    
+    def record_success(self):
+        if self._failures or self._opened_at is not None:
+            with self._lock:
+                self._failures = 0
+                self._opened_at = None
+    
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._failures >= self.threshold or self._opened_at is not None:
+                self._opened_at = time.monotonic()
+    
+    def trip(self):
+        """Open the breaker immediately"""
+        with self._lock:
+            self._failures = max(self._failures, self.threshold)
+            self._opened_at = time.monotonic()
+
+
+class KeyLocks:
+    """
+    One lock per key, discarded once no thread holds or waits on it
+    
+    Keeps memory bounded by the number of keys in flight rather than every
+    key ever computed.
+    """
+    
+    def __init__(self):
+        # key -> [lock, threads holding or waiting]
+        self._locks: Dict[str, list] = {}
+        self._guard = threading.Lock()
+    
+    def acquire(self, key: str, blocking: bool = True) -> bool:
+        with self._guard:
+            entry = self._locks.get(key)
+            if entry is None:
+                entry = self._locks[key] = [threading.Lock(), 0]
+            entry[1] += 1
+        if entry[0].acquire(blocking):
+            return True
+        self._discard(key, entry)
+        return False
+    
+    def release(self, key: str):
+        with self._guard:
+            entry = self._locks[key]
+            entry[0].release()
+        self._discard(key, entry)
+    
+    def _discard(self, key: str, entry: list):
+        with self._guard:
+            entry[1] -= 1
+            if entry[1] == 0 and self._locks.get(key) is entry:
+                del self._locks[key]
+    
+    def __len__(self) -> int:
+        return len(self._locks)
+
+
 class CacheService:
-    """Redis cache service with graceful degradation"""
+    """
+    Two-tier cache: a bounded in-process LRU in front of Redis
+    
+    Reads check the local tier first, then Redis; values found in Redis are
+    kept locally for at most ``CACHE_LOCAL_TTL`` seconds so invalidations
+    from other workers are picked up quickly. Redis health is tracked by a
+    circuit breaker fed by real calls instead of a PING per operation.
+    
+    ``get_or_set`` and the ``cached`` decorator add stampede protection:
+    one caller per key recomputes (a thread lock within the process and a
+    Redis lock across workers), and entries are refreshed probabilistically
+    before they expire (XFetch), weighted by how long the value took to
+    compute.
+    
+    Keys are grouped into namespaces by their leading ``:`` segments (up to
+    NAMESPACE_DEPTH, e.g. ``storage`` and ``storage:metrics`` for
+    ``storage:metrics:current``). Each namespace has a version counter in
+    Redis that is embedded in the stored key, so invalidating a namespace
+    is a single INCR; superseded entries are never read again and expire
+    on their own TTL. Workers re-read namespace versions at most every
+    ``CACHE_NAMESPACE_VERSION_TTL`` seconds.
+    """
     
     TTL_5_MIN = 300
     TTL_1_HOUR = 3600
     TTL_24_HOUR = 86400
     
-    def __init__(self):
-        """Initialize Redis connection with connection pooling"""
+    LOCK_SUFFIX = ':lock'
+    NAMESPACE_DEPTH = 2
+    NAMESPACE_VERSION_PREFIX = 'cache:ns:'
+    ROOT_NAMESPACE = '_root'
+    SCAN_BATCH_SIZE = 500
+    
+    _RELEASE_LOCK_SCRIPT = """
+        if redis.call('get', KEYS[1]) == ARGV[1] then
+            return redis.call('del', KEYS[1])
+        end
+        return 0
+    """
+    
+    def __init__(self, redis_url: Optional[str] = None, local_max_entries: Optional[int] = None,
+                 local_ttl: Optional[float] = None):
+        """Initialize the local tier and the Redis connection pool"""
+        self._redis_url = redis_url or os.environ.get('REDIS_URL', 'redis://redis:6379/0')
         self._redis_client = None
-        self._available = False
+        self._release_lock = None
         self._is_dev_mode = os.environ.get('FLASK_ENV') == 'development' or os.environ.get('REPLIT_DEPLOYMENT') is None
+        
+        self.local = LocalLRUCache(
+            Config.CACHE_LOCAL_MAX_ENTRIES if local_max_entries is None else local_max_entries,
+            on_evict=lambda key: self._count(key, 'evictions')
+        )
+        self.local_ttl = Config.CACHE_LOCAL_TTL if local_ttl is None else local_ttl
+        self.breaker = CircuitBreaker(Config.CACHE_BREAKER_THRESHOLD, Config.CACHE_BREAKER_COOLDOWN)
+        self.lock_timeout = Config.CACHE_LOCK_TIMEOUT
+        self.early_refresh_beta = Config.CACHE_EARLY_REFRESH_BETA
+        self.namespace_version_ttl = Config.CACHE_NAMESPACE_VERSION_TTL
+        
+        # namespace -> (version, monotonic time it was read)
+        self._namespace_versions: Dict[str, Tuple[int, float]] = {}
+        self._namespace_stats: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+        
+        self._key_locks = KeyLocks()
+        self._stats = {
+            'local_hits': 0,
+            'redis_hits': 0,
+            'misses': 0,
+            'recomputes': 0,
+            'early_refreshes': 0,
+            'invalidations': 0,
+            'redis_errors': 0,
+        }
+        
         self._connect()
     
     def _connect(self):
         """Establish Redis connection"""
         try:
-            redis_url = os.environ.get('REDIS_URL', 'redis://redis:6379/0')
-            
             # Create connection pool
             pool = redis.ConnectionPool.from_url(
-                redis_url,
+                self._redis_url,
                 max_connections=50,
                 socket_timeout=5,
                 socket_connect_timeout=5,
@@ -38,36 +253,128 @@ class CacheService:
                 decode_responses=True
             )
             
-            self._redis_client = redis.Redis(connection_pool=pool)
+            client = redis.Redis(connection_pool=pool)
             
-            # Test connection
-            self._redis_client.ping()
-            self._available = True
+            # Test connection once; afterwards the circuit breaker tracks health
+            client.ping()
+            self._redis_client = client
+            self._release_lock = client.register_script(self._RELEASE_LOCK_SCRIPT)
+            self.breaker.record_success()
             logger.info("Redis cache service initialized successfully")
-            
+        
         except Exception as e:
             if self._is_dev_mode:
                 logger.debug(f"Redis not available in dev mode (expected): {e}")
             else:
-                logger.warning(f"Redis connection failed: {e}. Operating without cache.")
+                logger.warning(f"Redis connection failed: {e}. Operating with local cache only.")
             self._redis_client = None
-            self._available = False
+            self.breaker.trip()
     
     @property
     def is_available(self) -> bool:
-        """Check if Redis is available"""
-        if not self._available:
+        """Check if Redis is usable (circuit breaker closed or half-open)"""
+        if not self.breaker.allow():
             return False
-        
+        if self._redis_client is None:
+            # Reconnect at most once per breaker cooldown
+            self._connect()
+        return self._redis_client is not None
+    
+    @property
+    def redis_client(self):
+        """Shared Redis connection for other services, or None while the circuit breaker is open"""
+        return self._redis_client if self.is_available else None
+    
+    def _redis_call(self, operation: str, key: str, func: Callable, default: Any = None) -> Any:
+        """Run a Redis command through the circuit breaker"""
+        if not self.is_available:
+            return default
         try:
-            if self._redis_client:
-                self._redis_client.ping()
-                return True
+            result = func(self._redis_client)
+            self.breaker.record_success()
+            return result
         except Exception as e:
-            logger.warning(f"Redis health check failed: {e}")
-            self._available = False
+            self._stats['redis_errors'] += 1
+            self.breaker.record_failure()
+            logger.warning(f"Cache {operation} failed for key '{key}': {e}")
+            return default
+    
+    @staticmethod
+    def _encode(value: Any, ttl: int, delta: float) -> str:
+        return json.dumps({'v': value, 'd': round(delta, 4), 'x': time.time() + ttl})
+    
+    @staticmethod
+    def _decode(raw: str) -> Tuple[Any, float, Optional[float]]:
+        """Return (value, compute seconds, expiry epoch) from a stored entry"""
+        data = json.loads(raw)
+        if isinstance(data, dict) and data.keys() == {'v', 'd', 'x'}:
+            return data['v'], data['d'], data['x']
+        # Entry written before values were wrapped
+        return data, 0.0, None
+    
+    @classmethod
+    def _namespaces(cls, key: str) -> List[str]:
+        """Namespaces a key belongs to, outermost first"""
+        parts = key.split(':')
+        return [':'.join(parts[:depth]) for depth in range(1, min(len(parts) - 1, cls.NAMESPACE_DEPTH) + 1)]
+    
+    def _stats_namespace(self, key: str) -> str:
+        namespaces = self._namespaces(key)
+        return namespaces[-1] if namespaces else self.ROOT_NAMESPACE
+    
+    def _count(self, key: str, metric: str):
+        if metric in self._stats:
+            self._stats[metric] += 1
+        self._namespace_stats[self._stats_namespace(key)][metric] += 1
+    
+    def _versions(self, namespaces: List[str]) -> List[int]:
+        """Current version of each namespace, read from Redis when stale"""
+        now = time.monotonic()
+        stale = [
+            ns for ns in namespaces
+            if ns not in self._namespace_versions
+            or now - self._namespace_versions[ns][1] >= self.namespace_version_ttl
+        ]
+        if stale:
+            values = self._redis_call(
+                'namespace version', stale[0],
+                lambda r: r.mget([self.NAMESPACE_VERSION_PREFIX + ns for ns in stale])
+            )
+            if values is not None:
+                for ns, value in zip(stale, values):
+                    self._namespace_versions[ns] = (int(value or 0), now)
+        return [self._namespace_versions.get(ns, (0, now))[0] for ns in namespaces]
+    
+    def _storage_key(self, key: str) -> str:
+        """Key as stored, with the versions of its namespaces appended"""
+        namespaces = self._namespaces(key)
+        if not namespaces:
+            return key
+        return f"{key}#v{'.'.join(str(v) for v in self._versions(namespaces))}"
+    
+    def _get_entry(self, key: str) -> Optional[Tuple[Any, float, Optional[float]]]:
+        key = self._storage_key(key)
+        raw = self.local.get(key)
+        if raw is not None:
+            self._count(key, 'local_hits')
+            return self._decode(raw)
         
-        return False
+        raw = self._redis_call('get', key, lambda r: r.get(key))
+        if raw is None:
+            self._count(key, 'misses')
+            return None
+        
+        try:
+            entry = self._decode(raw)
+        except ValueError as e:
+            logger.warning(f"Cache entry for key '{key}' is not valid JSON: {e}")
+            return None
+        
+        self._count(key, 'redis_hits')
+        expires_at = entry[2]
+        remaining = self.local_ttl if expires_at is None else min(self.local_ttl, expires_at - time.time())
+        self.local.set(key, raw, remaining)
+        return entry
     
     def get(self, key: str) -> Optional[Any]:
         """
@@ -75,26 +382,18 @@ class CacheService:
         
         Args:
             key: Cache key
-            
+        
         Returns:
             Cached value or None if not found or cache unavailable
         """
-        if not self.is_available:
-            return None
-        
         try:
-            value = self._redis_client.get(key)
-            if value is None:
-                return None
-            
-            # Deserialize JSON
-            return json.loads(value)
-            
+            entry = self._get_entry(key)
         except Exception as e:
             logger.warning(f"Cache get failed for key '{key}': {e}")
             return None
+        return entry[0] if entry else None
     
-    def set(self, key: str, value: Any, ttl: int = TTL_5_MIN) -> bool:
+    def set(self, key: str, value: Any, ttl: int = TTL_5_MIN, compute_time: float = 0.0) -> bool:
         """
         Set value in cache with TTL
         
@@ -102,24 +401,23 @@ class CacheService:
             key: Cache key
             value: Value to cache (must be JSON serializable)
             ttl: Time to live in seconds
-            
+            compute_time: Seconds it took to produce the value, used to
+                schedule probabilistic early refresh
+        
         Returns:
-            True if successful, False otherwise
+            True if the value reached Redis, False otherwise (the local tier
+            is still populated)
         """
-        if not self.is_available:
-            return False
-        
         try:
-            # Serialize to JSON
-            serialized = json.dumps(value)
-            
-            # Set with expiration
-            self._redis_client.setex(key, ttl, serialized)
-            return True
-            
-        except Exception as e:
+            raw = self._encode(value, ttl, compute_time)
+        except (TypeError, ValueError) as e:
             logger.warning(f"Cache set failed for key '{key}': {e}")
             return False
+        
+        key = self._storage_key(key)
+        self._count(key, 'sets')
+        self.local.set(key, raw, min(ttl, self.local_ttl))
+        return bool(self._redis_call('set', key, lambda r: r.setex(key, ttl, raw), default=False))
     
     def delete(self, key: str) -> bool:
         """
@@ -127,43 +425,120 @@ class CacheService:
         
         Args:
             key: Cache key to delete
-            
+        
         Returns:
             True if successful, False otherwise
         """
-        if not self.is_available:
-            return False
+        key = self._storage_key(key)
+        self.local.delete(key)
+        return self._redis_call('delete', key, lambda r: r.delete(key) >= 0, default=False)
+    
+    def invalidate_namespace(self, namespace: str) -> bool:
+        """
+        Invalidate every key in a namespace in O(1)
         
-        try:
-            self._redis_client.delete(key)
-            return True
-            
-        except Exception as e:
-            logger.warning(f"Cache delete failed for key '{key}': {e}")
+        Bumps the namespace version so existing entries are no longer
+        addressed; they expire on their own TTL. Local copies in this
+        process are dropped immediately, other workers stop using theirs
+        within CACHE_NAMESPACE_VERSION_TTL seconds.
+        
+        Args:
+            namespace: Key prefix without the trailing colon (e.g. 'storage:metrics')
+        
+        Returns:
+            True if the new version reached Redis, False otherwise
+        """
+        self.local.delete_pattern(f"{namespace}:*")
+        self._stats['invalidations'] += 1
+        self._namespace_stats[namespace]['invalidations'] += 1
+        
+        version = self._redis_call(
+            'invalidate', namespace,
+            lambda r: r.incr(self.NAMESPACE_VERSION_PREFIX + namespace)
+        )
+        if version is None:
             return False
+        self._namespace_versions[namespace] = (int(version), time.monotonic())
+        return True
+    
+    def namespace_version(self, namespace: str) -> int:
+        """
+        Current version of a namespace (0 if never invalidated)
+        
+        Lets in-process caches outside CacheService notice invalidations
+        made by other workers.
+        """
+        return self._versions([namespace])[0]
+    
+    def claim(self, key: str, ttl: int) -> Optional[bool]:
+        """
+        Atomically set a marker key unless it already exists (SET NX EX)
+        
+        Args:
+            key: Raw Redis key (not namespaced or versioned)
+            ttl: Seconds until the marker expires
+        
+        Returns:
+            True if claimed, False if already held, None if Redis is unavailable
+        """
+        return self._redis_call(
+            'claim', key,
+            lambda r: bool(r.set(key, '1', nx=True, ex=max(1, int(ttl)))),
+            default=None
+        )
+    
+    def release(self, key: str) -> bool:
+        """
+        Drop a marker set by claim so it can be claimed again
+        
+        Args:
+            key: Raw Redis key passed to claim
+        
+        Returns:
+            True if the marker was removed
+        """
+        return bool(self._redis_call('release', key, lambda r: r.delete(key) > 0, default=False))
     
     def delete_pattern(self, pattern: str) -> int:
         """
         Delete all keys matching pattern
         
+        Patterns of the form '<namespace>:*' (e.g. 'storage:*' or
+        'storage:metrics:*') invalidate the namespace instead of touching
+        keys. Any other pattern, including an exact key, is matched against
+        stored keys (with or without their '#v' version suffix) with an
+        incremental SCAN, never KEYS.
+        
         Args:
             pattern: Redis pattern (e.g., 'storage:*')
-            
+        
         Returns:
-            Number of keys deleted
+            Number of keys deleted (0 for namespace invalidations, whose
+            superseded keys are left to expire)
         """
-        if not self.is_available:
+        prefix = pattern[:-2] if pattern.endswith(':*') else None
+        if prefix and not any(c in prefix for c in '*?[') and prefix.count(':') < self.NAMESPACE_DEPTH:
+            self.invalidate_namespace(prefix)
             return 0
         
-        try:
-            keys = self._redis_client.keys(pattern)
-            if keys:
-                return self._redis_client.delete(*keys)
-            return 0
-            
-        except Exception as e:
-            logger.warning(f"Cache delete pattern failed for '{pattern}': {e}")
-            return 0
+        # Namespaced keys are stored as '<key>#v<versions>', see _storage_key
+        patterns = [pattern, pattern + '#v*']
+        local_deleted = sum(self.local.delete_pattern(p) for p in patterns)
+        
+        def _delete(r):
+            deleted = 0
+            batch = []
+            for match in patterns:
+                for key in r.scan_iter(match=match, count=self.SCAN_BATCH_SIZE):
+                    batch.append(key)
+                    if len(batch) >= self.SCAN_BATCH_SIZE:
+                        deleted += r.unlink(*batch)
+                        batch = []
+            if batch:
+                deleted += r.unlink(*batch)
+            return deleted
+        
+        return self._redis_call('delete pattern', pattern, _delete, default=local_deleted)
     
     def exists(self, key: str) -> bool:
         """
@@ -171,18 +546,14 @@ class CacheService:
         
         Args:
             key: Cache key
-            
+        
         Returns:
             True if key exists, False otherwise
         """
-        if not self.is_available:
-            return False
-        
-        try:
-            return self._redis_client.exists(key) > 0
-        except Exception as e:
-            logger.warning(f"Cache exists check failed for key '{key}': {e}")
-            return False
+        key = self._storage_key(key)
+        if self.local.get(key) is not None:
+            return True
+        return self._redis_call('exists', key, lambda r: r.exists(key) > 0, default=False)
     
     def ttl(self, key: str) -> int:
         """
@@ -190,41 +561,216 @@ class CacheService:
         
         Args:
             key: Cache key
-            
+        
         Returns:
             Remaining seconds, -1 if no expiry, -2 if key doesn't exist
         """
-        if not self.is_available:
-            return -2
+        key = self._storage_key(key)
+        return self._redis_call('TTL check', key, lambda r: r.ttl(key), default=-2)
+    
+    def _should_refresh_early(self, compute_time: float, expires_at: Optional[float]) -> bool:
+        """XFetch: refresh with rising probability as expiry approaches"""
+        if expires_at is None or compute_time <= 0 or self.early_refresh_beta <= 0:
+            return False
+        return time.time() - compute_time * self.early_refresh_beta * math.log(1.0 - random.random()) >= expires_at
+    
+    def _acquire_remote_lock(self, key: str) -> Optional[str]:
+        """Take the cross-worker recompute lock; returns its token or None"""
+        token = uuid.uuid4().hex
+        acquired = self._redis_call(
+            'lock', key,
+            lambda r: r.set(key + self.LOCK_SUFFIX, token, nx=True, px=int(self.lock_timeout * 1000))
+        )
+        return token if acquired else None
+    
+    def _release_remote_lock(self, key: str, token: str):
+        self._redis_call('unlock', key, lambda r: self._release_lock(keys=[key + self.LOCK_SUFFIX], args=[token]))
+    
+    def _recompute(self, key: str, compute: Callable[[], Any], ttl: int) -> Any:
+        start = time.perf_counter()
+        value = compute()
+        elapsed = time.perf_counter() - start
+        self._stats['recomputes'] += 1
+        if value is not None:
+            self.set(key, value, ttl, compute_time=elapsed)
+        return value
+    
+    def get_or_set(self, key: str, compute: Callable[[], Any], ttl: int = TTL_5_MIN) -> Any:
+        """
+        Return the cached value for key, computing and storing it on a miss
+        
+        Only one caller per key runs ``compute`` at a time. Others wait for
+        that result (up to the lock timeout) instead of recomputing. While a
+        value is still fresh, a single caller may refresh it early and the
+        rest keep getting the cached copy. ``None`` results are not cached.
         
+        Args:
+            key: Cache key
+            compute: Zero-argument callable producing a JSON serializable value
+            ttl: Time to live in seconds
+        """
         try:
-            return self._redis_client.ttl(key)
+            entry = self._get_entry(key)
         except Exception as e:
-            logger.warning(f"Cache TTL check failed for key '{key}': {e}")
-            return -2
+            logger.warning(f"Cache get failed for key '{key}': {e}")
+            entry = None
+        
+        if entry is not None:
+            value, compute_time, expires_at = entry
+            if not self._should_refresh_early(compute_time, expires_at):
+                return value
+            # Early refresh: whoever gets the lock recomputes, everyone else
+            # keeps serving the current value
+            if not self._key_locks.acquire(key, blocking=False):
+                return value
+            try:
+                token = None
+                if self.is_available:
+                    token = self._acquire_remote_lock(key)
+                    if token is None:
+                        return value
+                try:
+                    self._stats['early_refreshes'] += 1
+                    return self._recompute(key, compute, ttl)
+                finally:
+                    if token is not None:
+                        self._release_remote_lock(key, token)
+            finally:
+                self._key_locks.release(key)
+        
+        self._key_locks.acquire(key)
+        try:
+            # Another thread may have filled the key while we waited
+            raw = self.local.get(self._storage_key(key))
+            if raw is not None:
+                return self._decode(raw)[0]
+            
+            if not self.is_available:
+                return self._recompute(key, compute, ttl)
+            
+            token = self._acquire_remote_lock(key)
+            deadline = time.monotonic() + self.lock_timeout
+            while token is None and time.monotonic() < deadline:
+                # Another worker is computing; poll for its result
+                time.sleep(0.05)
+                value = self.get(key)
+                if value is not None:
+                    return value
+                token = self._acquire_remote_lock(key)
+            
+            try:
+                return self._recompute(key, compute, ttl)
+            finally:
+                if token is not None:
+                    self._release_remote_lock(key, token)
+        finally:
+            self._key_locks.release(key)
+    
+    def cached(self, ttl: int = TTL_5_MIN, key: Union[str, Callable[..., str], None] = None):
+        """
+        Decorator caching a function's result through get_or_set
+        
+        Args:
+            ttl: Time to live in seconds
+            key: Cache key. A string is formatted with the call's keyword
+                arguments; a callable receives the call's arguments and
+                returns the key. Defaults to the function's qualified name
+                plus its arguments.
+        
+        Flask view functions may be decorated directly: JSON responses with
+        status 200 are cached and rebuilt with ``jsonify``, while error
+        tuples and other responses pass through uncached.
+        """
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                if callable(key):
+                    cache_key = key(*args, **kwargs)
+                elif key is not None:
+                    cache_key = key.format(**kwargs)
+                else:
+                    cache_key = _default_key(func, args, kwargs)
+                
+                uncached = []
+                
+                def compute():
+                    result = func(*args, **kwargs)
+                    json_body = _cacheable_json(result)
+                    if json_body is _NOT_CACHEABLE:
+                        uncached.append(result)
+                        return None
+                    if json_body is not None:
+                        return {'__response__': json_body}
+                    return result
+                
+                value = self.get_or_set(cache_key, compute, ttl)
+                if uncached:
+                    return uncached[0]
+                if isinstance(value, dict) and value.keys() == {'__response__'}:
+                    from flask import jsonify
+                    return jsonify(value['__response__'])
+                return value
+            
+            return wrapper
+        return decorator
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get hit/miss counters for both tiers and the Redis breaker state"""
+        lookups = self._stats['local_hits'] + self._stats['redis_hits'] + self._stats['misses']
+        hits = self._stats['local_hits'] + self._stats['redis_hits']
+        return {
+            **self._stats,
+            'hit_rate': round(hits / lookups * 100, 2) if lookups else 0.0,
+            'local_entries': len(self.local),
+            'local_max_entries': self.local.max_entries,
+            'local_evictions': self.local.evictions,
+            'redis_connected': self._redis_client is not None,
+            'breaker_state': self.breaker.state,
+            'namespaces': self.get_namespace_stats(),
+        }
+    
+    def get_namespace_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Get hit/miss/set/eviction/invalidation counters per namespace"""
+        stats = {}
+        for namespace, counters in list(self._namespace_stats.items()):
+            hits = counters['local_hits'] + counters['redis_hits']
+            lookups = hits + counters['misses']
+            stats[namespace] = {
+                'local_hits': counters['local_hits'],
+                'redis_hits': counters['redis_hits'],
+                'misses': counters['misses'],
+                'sets': counters['sets'],
+                'evictions': counters['evictions'],
+                'invalidations': counters['invalidations'],
+                'hit_rate': round(hits / lookups * 100, 2) if lookups else 0.0,
+                'version': self._namespace_versions.get(namespace, (0, 0))[0],
+            }
+        return stats
     
     def invalidate_storage_metrics(self):
         """Invalidate all storage metrics caches"""
-        return self.delete_pattern('storage:metrics:*')
+        return self.invalidate_namespace('storage:metrics')
     
     def invalidate_marketplace_apps(self):
         """Invalidate marketplace apps cache"""
-        return self.delete_pattern('marketplace:apps:*')
+        return self.invalidate_namespace('marketplace:apps')
     
     def invalidate_agent_tasks(self):
         """Invalidate agent tasks cache"""
-        return self.delete_pattern('agents:tasks:*')
+        return self.invalidate_namespace('agents:tasks')
     
     def invalidate_google_services(self):
         """Invalidate Google services status cache"""
-        return self.delete_pattern('google:status:*')
+        return self.invalidate_namespace('google:status')
     
     def invalidate_deployment_stats(self):
         """Invalidate deployment statistics cache"""
-        return self.delete_pattern('deployments:stats:*')
+        return self.invalidate_namespace('deployments:stats')
     
     def flush_all(self):
         """Flush entire cache (use with caution)"""
+        self.local.clear()
+        self._namespace_versions.clear()
         if not self.is_available:
             return False
         
@@ -237,5 +783,38 @@ class CacheService:
             return False
 
 
+_NOT_CACHEABLE = object()
+
+
+def _default_key(func: Callable, args: tuple, kwargs: dict) -> str:
+    parts = [repr(a) for a in args] + [f"{k}={v!r}" for k, v in sorted(kwargs.items())]
+    return f"cached:{func.__module__}.{func.__qualname__}:({','.join(parts)})"
+
+
+def _cacheable_json(result: Any) -> Any:
+    """
+    Classify a decorated function's return value
+    
+    Returns the JSON body for a successful Flask JSON response,
+    _NOT_CACHEABLE for tuples and any other response, and None for plain
+    values which are cached as-is.
+    """
+    if isinstance(result, tuple):
+        return _NOT_CACHEABLE
+    if hasattr(result, 'get_json') and hasattr(result, 'status_code'):
+        if result.status_code != 200 or not result.is_json:
+            return _NOT_CACHEABLE
+        body = result.get_json(silent=True)
+        if body is None or (isinstance(body, dict) and body.get('success') is False):
+            return _NOT_CACHEABLE
+        return body
+    return None
+
+
 # Global cache service instance
 cache_service = CacheService()
+
+
+def cached(ttl: int = CacheService.TTL_5_MIN, key: Union[str, Callable[..., str], None] = None):
+    """Decorator caching a function's result in the global cache service"""
+    return cache_service.cached(ttl=ttl, key=key)
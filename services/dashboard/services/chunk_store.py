@@ -0,0 +1,483 @@
+"""
+Chunk Store
+Deduplicated, content-addressed backup repository in MinIO: files are
+split at content-defined boundaries, each distinct chunk is compressed and
+stored once under its SHA-256, and a snapshot is a manifest listing every
+file's chunks
+"""
+import gzip
+import hashlib
+import json
+import logging
+import os
+import socket
+import threading
+import uuid
+import zlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from io import BytesIO
+from pathlib import Path
+from typing import Any, BinaryIO, Dict, Iterable, Iterator, List, Optional
+
+import numpy as np
+
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+
+from minio import Minio
+from minio.error import S3Error
+
+from services.object_cleanup import delete_objects
+
+logger = logging.getLogger(__name__)
+
+MIN_CHUNK_SIZE = 512 * 1024
+MAX_CHUNK_SIZE = 8 * 1024 * 1024
+CHUNK_MASK_BITS = 20  # boundary odds of 1 in 2**20 per byte past the minimum
+WINDOW = 32  # bytes that determine the rolling hash at each position
+SCAN_BLOCK = 1024 * 1024
+LOCK_REFRESH_SECONDS = 300  # a held lock object is rewritten this often
+LOCK_STALE_AFTER = timedelta(minutes=30)  # locks not refreshed for this long belong to dead processes
+
+# Fixed so that the same content always splits at the same boundaries
+_GEAR = np.random.RandomState(0x4E4542).randint(0, 2 ** 32, size=256, dtype=np.uint64).astype(np.uint32)
+
+
+class ChunkStoreError(Exception):
+    """A snapshot or chunk is missing or does not match its checksum"""
+    pass
+
+
+class RepositoryLockedError(ChunkStoreError):
+    """Another process holds a conflicting lock on the repository"""
+    pass
+
+
+def _gear_hashes(data: np.ndarray) -> np.ndarray:
+    """
+    Gear rolling hash of every position: the sum of ``GEAR[byte] << age``
+    over the last 32 bytes, mod 2**32
+    
+    Each position depends only on its own window, so the hashes of a block
+    are computed with 32 vectorised passes instead of a per-byte loop.
+    """
+    gear = _GEAR[data]
+    hashes = gear.copy()
+    for age in range(1, min(WINDOW, len(data))):
+        hashes[age:] += gear[:-age] << np.uint32(age)
+    return hashes
+
+
+def find_boundary(buffer: bytes, min_size: int = MIN_CHUNK_SIZE, max_size: int = MAX_CHUNK_SIZE,
+                  mask_bits: int = CHUNK_MASK_BITS) -> int:
+    """
+    Length of the first chunk in ``buffer``: just past the first position
+    at or beyond ``min_size`` whose hash has its top ``mask_bits`` bits
+    clear, capped at ``max_size``
+    """
+    min_size = max(min_size, WINDOW)
+    end = min(len(buffer), max_size)
+    if end <= min_size:
+        return end
+    data = np.frombuffer(buffer, dtype=np.uint8, count=end)
+    shift = np.uint32(32 - mask_bits)
+    position = min_size
+    while position < end:
+        block_end = min(end, position + SCAN_BLOCK)
+        hashes = _gear_hashes(data[position - WINDOW + 1:block_end])[WINDOW - 1:]
+        hits = np.flatnonzero((hashes >> shift) == 0)
+        if hits.size:
+            return position + int(hits[0]) + 1
+        position = block_end
+    return end
+
+
+def iter_chunks(stream: BinaryIO, min_size: int = MIN_CHUNK_SIZE, max_size: int = MAX_CHUNK_SIZE,
+                mask_bits: int = CHUNK_MASK_BITS) -> Iterator[bytes]:
+    """Split a stream into content-defined chunks, holding at most one ``max_size`` buffer"""
+    buffer = b''
+    while True:
+        while len(buffer) < max_size:
+            data = stream.read(max_size - len(buffer))
+            if not data:
+                break
+            buffer += data
+        if not buffer:
+            return
+        cut = find_boundary(buffer, min_size, max_size, mask_bits)
+        yield buffer[:cut]
+        buffer = buffer[cut:]
+
+
+def pack_chunk(data: bytes) -> bytes:
+    """Compress a chunk behind a one-byte codec tag; incompressible data is stored as is"""
+    if ZSTD_AVAILABLE:
+        packed = b'Z' + zstandard.ZstdCompressor(level=3).compress(data)
+    else:
+        packed = b'G' + zlib.compress(data, 6)
+    return packed if len(packed) < len(data) + 1 else b'N' + data
+
+
+def unpack_chunk(blob: bytes) -> bytes:
+    codec, body = blob[:1], blob[1:]
+    if codec == b'Z':
+        if not ZSTD_AVAILABLE:
+            raise ChunkStoreError('Chunk is zstd-compressed but the zstandard package is not installed')
+        return zstandard.ZstdDecompressor().decompress(body)
+    if codec == b'G':
+        return zlib.decompress(body)
+    if codec == b'N':
+        return body
+    raise ChunkStoreError(f"Unknown chunk codec {codec!r}")
+
+
+class ChunkStore:
+    """
+    Restic-style snapshot repository under ``prefix`` in a MinIO bucket
+    
+    ``backup`` chunks each file, hashing chunks and files as they are read,
+    and uploads only chunks the repository does not hold yet; compression
+    runs in a thread pool, since zstd and zlib release the GIL. Given a
+    parent snapshot, files whose size and mtime are unchanged reuse the
+    parent's chunk list without being read, so an incremental run moves
+    only changed data. ``restore`` fetches
+    chunks in parallel and verifies every chunk and file checksum.
+    
+    Backups hold a shared lock and ``prune`` an exclusive one, kept as
+    objects under ``locks/`` so that gunicorn workers and Celery tasks
+    on any host see each other.
+    """
+    
+    def __init__(self, client: Minio, bucket: str, prefix: str = 'repository', workers: int = 4,
+                 io_workers: int = 8, min_size: int = MIN_CHUNK_SIZE, max_size: int = MAX_CHUNK_SIZE,
+                 mask_bits: int = CHUNK_MASK_BITS):
+        self.client = client
+        self.bucket = bucket
+        self.prefix = prefix.strip('/')
+        self.workers = workers
+        self.io_workers = io_workers
+        self.min_size = min_size
+        self.max_size = max_size
+        self.mask_bits = mask_bits
+    
+    def _chunk_name(self, chunk_id: str) -> str:
+        return f"{self.prefix}/chunks/{chunk_id[:2]}/{chunk_id}"
+    
+    def snapshot_name(self, snapshot_id: str) -> str:
+        return f"{self.prefix}/snapshots/{snapshot_id}.json.gz"
+    
+    def _lock_name(self, kind: str) -> str:
+        return f"{self.prefix}/locks/{kind}-{uuid.uuid4().hex}"
+    
+    def _write_lock(self, name: str):
+        body = json.dumps({
+            'host': socket.gethostname(),
+            'pid': os.getpid(),
+            'refreshed_at': datetime.utcnow().isoformat()
+        }).encode()
+        self.client.put_object(self.bucket, name, BytesIO(body), len(body), content_type='application/json')
+    
+    def _refresh_lock(self, name: str, stop: threading.Event):
+        while not stop.wait(LOCK_REFRESH_SECONDS):
+            try:
+                self._write_lock(name)
+            except Exception as e:
+                logger.warning(f"Failed to refresh repository lock {name}: {e}")
+    
+    @contextmanager
+    def lock(self, exclusive: bool = False):
+        """
+        Hold a shared or exclusive repository lock for the duration of the block
+        
+        The lock object is written first and the other locks are listed
+        afterwards, so of two processes racing for conflicting locks at
+        least one sees the other and backs off with
+        ``RepositoryLockedError``. Locks older than ``LOCK_STALE_AFTER``
+        are ignored; held locks are refreshed well before that.
+        """
+        name = self._lock_name('exclusive' if exclusive else 'shared')
+        self._write_lock(name)
+        try:
+            stale_before = datetime.now(timezone.utc) - LOCK_STALE_AFTER
+            for obj in self.client.list_objects(self.bucket, prefix=f"{self.prefix}/locks/", recursive=True):
+                if obj.object_name == name:
+                    continue
+                if obj.last_modified is not None and obj.last_modified < stale_before:
+                    continue
+                if exclusive or obj.object_name.rsplit('/', 1)[-1].startswith('exclusive-'):
+                    raise RepositoryLockedError(f"Repository is locked by {obj.object_name}")
+            
+            stop = threading.Event()
+            refresher = threading.Thread(target=self._refresh_lock, args=(name, stop),
+                                         name='chunk-lock-refresh', daemon=True)
+            refresher.start()
+            try:
+                yield
+            finally:
+                stop.set()
+                refresher.join()
+        finally:
+            try:
+                self.client.remove_object(self.bucket, name)
+            except Exception as e:
+                logger.warning(f"Failed to release repository lock {name}: {e}")
+    
+    def _compression_pool(self):
+        if self.workers <= 1:
+            return None
+        # Threads, not processes: backups run in gunicorn and Celery workers whose
+        # sampler and writer threads make forking unsafe, and a process pool
+        # would pickle every chunk across a pipe twice
+        return ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='chunk-pack')
+    
+    def has_chunk(self, chunk_id: str) -> bool:
+        try:
+            self.client.stat_object(self.bucket, self._chunk_name(chunk_id))
+            return True
+        except S3Error as e:
+            if e.code in ('NoSuchKey', 'NotFound'):
+                return False
+            raise
+    
+    def _read_object(self, name: str) -> bytes:
+        response = self.client.get_object(self.bucket, name)
+        try:
+            return response.read()
+        finally:
+            response.close()
+            response.release_conn()
+    
+    def _read_chunk(self, chunk_id: str) -> bytes:
+        data = unpack_chunk(self._read_object(self._chunk_name(chunk_id)))
+        if hashlib.sha256(data).hexdigest() != chunk_id:
+            raise ChunkStoreError(f"Chunk {chunk_id} is corrupt")
+        return data
+    
+    def load_snapshot(self, snapshot_id: str) -> Dict[str, Any]:
+        return json.loads(gzip.decompress(self._read_object(self.snapshot_name(snapshot_id))))
+    
+    def _iter_files(self, source: Path, exclude: Iterable[str]) -> Iterator[Path]:
+        if source.is_file():
+            yield source
+            return
+        exclude = set(exclude)
+        for item in sorted(source.rglob('*')):
+            if exclude and any(part in exclude for part in item.relative_to(source).parts):
+                continue
+            if item.is_file():
+                yield item
+    
+    def backup(self, source: str, parent: Optional[str] = None, exclude: Iterable[str] = ()) -> Dict[str, Any]:
+        """
+        Store a snapshot of ``source`` and return its id, manifest object,
+        manifest checksum and transfer statistics
+        
+        Paths are recorded relative to the source's parent directory, as
+        in the tar archives.
+        """
+        source_path = Path(source)
+        if not source_path.exists():
+            raise ChunkStoreError(f"Source path does not exist: {source}")
+        
+        # Chunks reused from the parent or found by has_chunk() must outlive
+        # any prune until this snapshot's manifest lists them
+        with self.lock():
+            return self._backup(source, source_path, parent, exclude)
+    
+    def _backup(self, source: str, source_path: Path, parent: Optional[str],
+                exclude: Iterable[str]) -> Dict[str, Any]:
+        parent_files: Dict[str, Dict[str, Any]] = {}
+        known = set()
+        if parent:
+            try:
+                for entry in self.load_snapshot(parent)['files']:
+                    parent_files[entry['path']] = entry
+                    known.update(entry['chunks'])
+            except Exception as e:
+                logger.warning(f"Parent snapshot {parent} unavailable, running a full backup: {e}")
+                parent = None
+        
+        stats = {'file_count': 0, 'reused_files': 0, 'total_bytes': 0, 'bytes_read': 0,
+                 'chunk_count': 0, 'new_chunks': 0, 'new_chunk_bytes': 0, 'stored_bytes': 0}
+        files: List[Dict[str, Any]] = []
+        scheduled = set()
+        uploads = []
+        in_flight = threading.BoundedSemaphore(self.io_workers * 2)
+        compression_pool = self._compression_pool()
+        upload_pool = ThreadPoolExecutor(max_workers=self.io_workers, thread_name_prefix='chunk-upload')
+        
+        def store(chunk_id: str, data: bytes) -> int:
+            try:
+                blob = compression_pool.submit(pack_chunk, data).result() if compression_pool else pack_chunk(data)
+                self.client.put_object(self.bucket, self._chunk_name(chunk_id), BytesIO(blob), len(blob),
+                                       content_type='application/octet-stream')
+                return len(blob)
+            finally:
+                in_flight.release()
+        
+        try:
+            for path in self._iter_files(source_path, exclude):
+                info = path.stat()
+                relative = str(path.relative_to(source_path.parent))
+                previous = parent_files.get(relative)
+                stats['file_count'] += 1
+                stats['total_bytes'] += info.st_size
+                
+                if previous and previous['size'] == info.st_size and previous['mtime_ns'] == info.st_mtime_ns:
+                    files.append({**previous, 'mode': info.st_mode})
+                    stats['reused_files'] += 1
+                    stats['chunk_count'] += len(previous['chunks'])
+                    continue
+                
+                chunks = []
+                file_hash = hashlib.sha256()
+                with open(path, 'rb') as f:
+                    for data in iter_chunks(f, self.min_size, self.max_size, self.mask_bits):
+                        chunk_id = hashlib.sha256(data).hexdigest()
+                        file_hash.update(data)
+                        chunks.append(chunk_id)
+                        stats['bytes_read'] += len(data)
+                        if chunk_id in known or chunk_id in scheduled:
+                            continue
+                        if self.has_chunk(chunk_id):
+                            known.add(chunk_id)
+                            continue
+                        scheduled.add(chunk_id)
+                        stats['new_chunks'] += 1
+                        stats['new_chunk_bytes'] += len(data)
+                        in_flight.acquire()
+                        uploads.append(upload_pool.submit(store, chunk_id, data))
+                
+                stats['chunk_count'] += len(chunks)
+                files.append({
+                    'path': relative,
+                    'size': info.st_size,
+                    'mtime_ns': info.st_mtime_ns,
+                    'mode': info.st_mode,
+                    'sha256': file_hash.hexdigest(),
+                    'chunks': chunks
+                })
+            
+            stats['stored_bytes'] = sum(upload.result() for upload in uploads)
+        finally:
+            upload_pool.shutdown(wait=True)
+            if compression_pool:
+                compression_pool.shutdown(wait=True)
+        
+        snapshot_id = f"{datetime.utcnow().strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:8]}"
+        body = gzip.compress(json.dumps({
+            'id': snapshot_id,
+            'source': source,
+            'parent': parent,
+            'created_at': datetime.utcnow().isoformat(),
+            'stats': stats,
+            'files': files
+        }).encode())
+        object_name = self.snapshot_name(snapshot_id)
+        self.client.put_object(self.bucket, object_name, BytesIO(body), len(body), content_type='application/gzip')
+        
+        logger.info(f"Snapshot {snapshot_id} of {source}: {stats['file_count']} files, "
+                    f"{stats['new_chunks']} new chunks ({stats['stored_bytes']} bytes stored)")
+        
+        return {
+            'snapshot_id': snapshot_id,
+            'parent': parent,
+            'object_name': object_name,
+            'checksum': hashlib.sha256(body).hexdigest(),
+            'stats': stats
+        }
+    
+    def _fetch_ordered(self, pool: ThreadPoolExecutor, chunk_ids: List[str]) -> Iterator[bytes]:
+        """Yield chunks in order while keeping a bounded number of reads in flight"""
+        pending = deque()
+        for chunk_id in chunk_ids:
+            pending.append(pool.submit(self._read_chunk, chunk_id))
+            if len(pending) >= self.io_workers * 2:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+    
+    def restore(self, snapshot_id: str, target: str) -> Dict[str, Any]:
+        """Write a snapshot's files under ``target``, verifying every checksum"""
+        manifest = self.load_snapshot(snapshot_id)
+        root = Path(target).resolve()
+        restored = 0
+        restored_bytes = 0
+        
+        with ThreadPoolExecutor(max_workers=self.io_workers, thread_name_prefix='chunk-restore') as pool:
+            for entry in manifest['files']:
+                destination = (root / entry['path']).resolve()
+                if root not in destination.parents:
+                    raise ChunkStoreError(f"Refusing to restore outside the target: {entry['path']}")
+                destination.parent.mkdir(parents=True, exist_ok=True)
+                
+                file_hash = hashlib.sha256()
+                with open(destination, 'wb') as out:
+                    for data in self._fetch_ordered(pool, entry['chunks']):
+                        file_hash.update(data)
+                        out.write(data)
+                if file_hash.hexdigest() != entry['sha256']:
+                    raise ChunkStoreError(f"Restored file {entry['path']} does not match its checksum")
+                
+                os.chmod(destination, entry['mode'] & 0o7777)
+                os.utime(destination, ns=(entry['mtime_ns'], entry['mtime_ns']))
+                restored += 1
+                restored_bytes += entry['size']
+        
+        return {'snapshot_id': snapshot_id, 'file_count': restored, 'size_bytes': restored_bytes}
+    
+    def prune(self, grace: timedelta = timedelta(hours=24)) -> Dict[str, Any]:
+        """
+        Delete chunks no remaining snapshot references
+        
+        Runs under the exclusive lock, so no backup can be reusing chunks
+        it has not listed in a manifest yet; raises
+        ``RepositoryLockedError`` while one is running. Chunks newer than
+        ``grace`` are still kept in case a backup's lock went stale.
+        """
+        with self.lock(exclusive=True):
+            return self._prune(grace)
+    
+    def _prune(self, grace: timedelta) -> Dict[str, Any]:
+        referenced = set()
+        snapshots = 0
+        for obj in self.client.list_objects(self.bucket, prefix=f"{self.prefix}/snapshots/", recursive=True):
+            snapshot_id = obj.object_name.rsplit('/', 1)[-1][:-len('.json.gz')]
+            for entry in self.load_snapshot(snapshot_id)['files']:
+                referenced.update(entry['chunks'])
+            snapshots += 1
+        
+        cutoff = datetime.now(timezone.utc) - grace
+        unreferenced = (
+            (obj.object_name, obj.size)
+            for obj in self.client.list_objects(self.bucket, prefix=f"{self.prefix}/chunks/", recursive=True)
+            if obj.object_name.rsplit('/', 1)[-1] not in referenced
+            and (obj.last_modified is None or obj.last_modified <= cutoff)
+        )
+        totals = delete_objects(self.client, self.bucket, unreferenced)
+        
+        logger.info(f"Pruned {totals.deleted} unreferenced chunks ({totals.deleted_bytes} bytes) "
+                    f"across {snapshots} snapshots")
+        return {
+            'snapshots': snapshots,
+            'deleted_chunks': totals.deleted,
+            'freed_bytes': totals.deleted_bytes,
+            'errors': totals.errors
+        }
+
+
+__all__ = [
+    'ChunkStore',
+    'ChunkStoreError',
+    'RepositoryLockedError',
+    'iter_chunks',
+    'find_boundary',
+    'pack_chunk',
+    'unpack_chunk'
+]
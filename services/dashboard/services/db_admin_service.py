@@ -7,15 +7,20 @@ import os
 import logging
 import psycopg2
 import subprocess
+import tempfile
 from datetime import datetime, timedelta
 from cryptography.fernet import Fernet
 from base64 import urlsafe_b64encode
 from hashlib import sha256
 from minio import Minio
 from minio.error import S3Error
-from io import BytesIO
 from config import Config
 from services.db_service import db_service
+from services.object_cleanup import delete_objects
+from services.backup_stream import (
+    stream_command_to_object, stream_object_to_command, BackupStreamError,
+    COMPRESSION_SUFFIXES, ZSTD_AVAILABLE
+)
 from models.db_admin import DBCredential, DBBackupJob
 from sqlalchemy import select, text
 import uuid
@@ -325,14 +330,16 @@ class DBAdminService:
                 conn.close()
     
     def backup_database(self, db_credential_id: uuid.UUID, backup_type: str = 'full', 
-                       compression: str = 'gzip') -> dict:
+                       compression: str = 'gzip', parallel_jobs: int = None) -> dict:
         """
         Create a database backup using pg_dump
         
         Args:
             db_credential_id: ID of database credential
             backup_type: Type of backup ('full', 'schema_only', 'data_only')
-            compression: Compression type ('gzip', 'none')
+            compression: Compression type ('gzip', 'zstd', 'none')
+            parallel_jobs: pg_dump worker count; more than one dumps in
+                directory format (default from config)
             
         Returns:
             Dict with backup job information
@@ -344,6 +351,20 @@ class DBAdminService:
                     'error': 'Database service not available'
                 }
             
+            if compression not in COMPRESSION_SUFFIXES:
+                return {
+                    'success': False,
+                    'error': f'Unsupported compression: {compression}'
+                }
+            
+            if compression == 'zstd' and not ZSTD_AVAILABLE:
+                return {
+                    'success': False,
+                    'error': 'zstd compression requires the zstandard package'
+                }
+            
+            parallel_jobs = max(1, parallel_jobs or Config.DB_BACKUP_PARALLEL_JOBS)
+            
             with db_service.get_session() as session:
                 credential = session.execute(
                     select(DBCredential).where(DBCredential.id == db_credential_id)
@@ -360,10 +381,12 @@ class DBAdminService:
                     backup_type=backup_type,
                     status='pending',
                     compression=compression,
-                    metadata={
+                    backup_metadata={
                         'db_credential_id': str(db_credential_id),
                         'host': credential.host,
-                        'port': credential.port
+                        'port': credential.port,
+                        'format': 'directory' if parallel_jobs > 1 else 'custom',
+                        'parallel_jobs': parallel_jobs
                     }
                 )
                 
@@ -418,7 +441,7 @@ class DBAdminService:
                 backup_job.started_at = datetime.utcnow()
                 session.commit()
                 
-                db_credential_id = uuid.UUID(backup_job.metadata['db_credential_id'])
+                db_credential_id = uuid.UUID(backup_job.backup_metadata['db_credential_id'])
                 credential = session.execute(
                     select(DBCredential).where(DBCredential.id == db_credential_id)
                 ).scalar_one_or_none()
@@ -433,19 +456,22 @@ class DBAdminService:
                     }
                 
                 password = self.decrypt_password(credential.password_hash)
+                metadata = dict(backup_job.backup_metadata or {})
+                parallel_jobs = int(metadata.get('parallel_jobs') or 1)
+                compression = backup_job.compression or 'none'
                 
                 timestamp = datetime.utcnow().strftime('%Y%m%d_%H%M%S')
-                filename = f"{credential.db_name}_{backup_job.backup_type}_{timestamp}.sql"
-                if backup_job.compression == 'gzip':
-                    filename += '.gz'
+                extension = '.tar' if parallel_jobs > 1 else '.sql'
+                filename = f"{credential.db_name}_{backup_job.backup_type}_{timestamp}{extension}"
+                filename += COMPRESSION_SUFFIXES.get(compression, '')
+                storage_path = f"{credential.db_name}/{filename}"
                 
                 pg_dump_cmd = [
                     'pg_dump',
                     '-h', credential.host,
                     '-p', str(credential.port),
                     '-U', credential.username,
-                    '-d', credential.db_name,
-                    '-F', 'c'
+                    '-d', credential.db_name
                 ]
                 
                 if backup_job.backup_type == 'schema_only':
@@ -456,15 +482,42 @@ class DBAdminService:
                 env = os.environ.copy()
                 env['PGPASSWORD'] = password
                 
-                result = subprocess.run(
-                    pg_dump_cmd,
-                    env=env,
-                    capture_output=True,
-                    timeout=3600
-                )
-                
-                if result.returncode != 0:
-                    error_msg = result.stderr.decode() if result.stderr else 'Unknown error'
+                try:
+                    if parallel_jobs > 1:
+                        # Parallel dumps need directory format, which pg_dump cannot
+                        # write to stdout; spool to disk and stream it out as a tar
+                        with tempfile.TemporaryDirectory(dir=Config.DB_BACKUP_SPOOL_DIR) as spool:
+                            dump_dir = os.path.join(spool, 'dump')
+                            result = subprocess.run(
+                                pg_dump_cmd + ['-F', 'd', '-j', str(parallel_jobs), '-f', dump_dir],
+                                env=env,
+                                capture_output=True,
+                                timeout=Config.DB_BACKUP_TIMEOUT
+                            )
+                            if result.returncode != 0:
+                                raise BackupStreamError(result.stderr.decode() if result.stderr else 'Unknown error')
+                            upload = stream_command_to_object(
+                                ['tar', '-C', dump_dir, '-cf', '-', '.'],
+                                self.minio_client,
+                                self._backup_bucket,
+                                storage_path,
+                                compression=compression,
+                                part_size=Config.DB_BACKUP_PART_SIZE,
+                                timeout=Config.DB_BACKUP_TIMEOUT
+                            )
+                    else:
+                        upload = stream_command_to_object(
+                            pg_dump_cmd + ['-F', 'c'],
+                            self.minio_client,
+                            self._backup_bucket,
+                            storage_path,
+                            compression=compression,
+                            part_size=Config.DB_BACKUP_PART_SIZE,
+                            env=env,
+                            timeout=Config.DB_BACKUP_TIMEOUT
+                        )
+                except BackupStreamError as e:
+                    error_msg = str(e)
                     backup_job.status = 'failed'
                     backup_job.error_message = error_msg
                     backup_job.completed_at = datetime.utcnow()
@@ -474,29 +527,19 @@ class DBAdminService:
                         'error': error_msg
                     }
                 
-                backup_data = result.stdout
-                
-                if backup_job.compression == 'gzip':
-                    import gzip
-                    backup_data = gzip.compress(backup_data)
-                
-                storage_path = f"{credential.db_name}/{filename}"
-                
-                self.minio_client.put_object(
-                    self._backup_bucket,
-                    storage_path,
-                    BytesIO(backup_data),
-                    len(backup_data),
-                    content_type='application/octet-stream'
-                )
-                
+                metadata.update({
+                    'sha256': upload['sha256'],
+                    'raw_size_bytes': upload['raw_size_bytes']
+                })
                 backup_job.status = 'completed'
                 backup_job.storage_path = storage_path
-                backup_job.file_size = len(backup_data)
+                backup_job.file_size = upload['size_bytes']
+                backup_job.backup_metadata = metadata
                 backup_job.completed_at = datetime.utcnow()
                 session.commit()
                 
-                logger.info(f"Backup completed: {storage_path} ({len(backup_data)} bytes)")
+                logger.info(f"Backup completed: {storage_path} ({upload['size_bytes']} bytes, "
+                            f"{upload['raw_size_bytes']} uncompressed)")
                 
                 return {
                     'success': True,
@@ -512,7 +555,7 @@ class DBAdminService:
                     ).scalar_one_or_none()
                     if backup_job:
                         backup_job.status = 'failed'
-                        backup_job.error_message = 'Backup timeout (>1 hour)'
+                        backup_job.error_message = f'Backup timeout (>{Config.DB_BACKUP_TIMEOUT}s)'
                         backup_job.completed_at = datetime.utcnow()
                         session.commit()
             return {
@@ -541,6 +584,10 @@ class DBAdminService:
         """
         Restore database from backup using pg_restore
         
+        Backups with a stored checksum are verified before pg_restore
+        touches the target database; older backups without one are
+        restored unverified (``checksum_verified`` is False).
+        
         Args:
             backup_job_id: ID of backup job to restore from
             target_db_credential_id: Optional different target database
@@ -566,7 +613,7 @@ class DBAdminService:
                         'error': 'Backup job not found or not completed'
                     }
                 
-                db_credential_id = target_db_credential_id or uuid.UUID(backup_job.metadata['db_credential_id'])
+                db_credential_id = target_db_credential_id or uuid.UUID(backup_job.backup_metadata['db_credential_id'])
                 
                 credential = session.execute(
                     select(DBCredential).where(DBCredential.id == db_credential_id)
@@ -580,17 +627,7 @@ class DBAdminService:
                 
                 password = self.decrypt_password(credential.password_hash)
                 
-                response = self.minio_client.get_object(
-                    self._backup_bucket,
-                    backup_job.storage_path
-                )
-                backup_data = response.read()
-                response.close()
-                response.release_conn()
-                
-                if backup_job.compression == 'gzip':
-                    import gzip
-                    backup_data = gzip.decompress(backup_data)
+                metadata = backup_job.backup_metadata or {}
                 
                 pg_restore_cmd = [
                     'pg_restore',
@@ -605,16 +642,47 @@ class DBAdminService:
                 env = os.environ.copy()
                 env['PGPASSWORD'] = password
                 
-                result = subprocess.run(
-                    pg_restore_cmd,
-                    env=env,
-                    input=backup_data,
-                    capture_output=True,
-                    timeout=3600
+                stream_args = dict(
+                    compression=backup_job.compression or 'none',
+                    timeout=Config.DB_BACKUP_TIMEOUT,
+                    expected_sha256=metadata.get('sha256'),
+                    spool_dir=Config.DB_BACKUP_SPOOL_DIR
                 )
                 
-                if result.returncode != 0:
-                    error_msg = result.stderr.decode() if result.stderr else 'Unknown error'
+                try:
+                    if metadata.get('format') == 'directory':
+                        # Extracting into scratch space is harmless, so the checksum is
+                        # checked after extraction and before pg_restore runs
+                        with tempfile.TemporaryDirectory(dir=Config.DB_BACKUP_SPOOL_DIR) as spool:
+                            stream_object_to_command(
+                                self.minio_client,
+                                self._backup_bucket,
+                                backup_job.storage_path,
+                                ['tar', '-xf', '-', '-C', spool],
+                                verify_first=False,
+                                **stream_args
+                            )
+                            jobs = str(metadata.get('parallel_jobs') or Config.DB_BACKUP_PARALLEL_JOBS)
+                            result = subprocess.run(
+                                pg_restore_cmd + ['-F', 'd', '-j', jobs, spool],
+                                env=env,
+                                capture_output=True,
+                                timeout=Config.DB_BACKUP_TIMEOUT
+                            )
+                            if result.returncode != 0:
+                                raise BackupStreamError(result.stderr.decode() if result.stderr else 'Unknown error')
+                    else:
+                        # Spooled and verified before pg_restore starts when a checksum is known
+                        stream_object_to_command(
+                            self.minio_client,
+                            self._backup_bucket,
+                            backup_job.storage_path,
+                            pg_restore_cmd,
+                            env=env,
+                            **stream_args
+                        )
+                except BackupStreamError as e:
+                    error_msg = str(e)
                     logger.error(f"Restore failed: {error_msg}")
                     return {
                         'success': False,
@@ -625,7 +693,8 @@ class DBAdminService:
                 
                 return {
                     'success': True,
-                    'message': f'Database {credential.db_name} restored successfully'
+                    'message': f'Database {credential.db_name} restored successfully',
+                    'checksum_verified': bool(metadata.get('sha256'))
                 }
         
         except Exception as e:
@@ -778,23 +847,21 @@ class DBAdminService:
                     )
                 ).scalars().all()
                 
-                deleted_count = 0
-                freed_bytes = 0
+                stored = {
+                    backup.storage_path: backup.file_size or 0
+                    for backup in old_backups if backup.storage_path
+                }
+                totals = delete_objects(self.minio_client, self._backup_bucket, stored.items())
+                for error in totals.errors:
+                    logger.error(f"Error deleting backup from MinIO: {error}")
                 
+                deleted_count = 0
                 for backup in old_backups:
-                    try:
-                        if backup.storage_path:
-                            self.minio_client.remove_object(
-                                self._backup_bucket,
-                                backup.storage_path
-                            )
-                            freed_bytes += backup.file_size or 0
-                        
-                        session.delete(backup)
-                        deleted_count += 1
-                    
-                    except S3Error as e:
-                        logger.error(f"Error deleting backup {backup.id} from MinIO: {e}")
+                    if backup.storage_path in totals.failed:
+                        continue
+                    session.delete(backup)
+                    deleted_count += 1
+                freed_bytes = totals.deleted_bytes
                 
                 session.commit()
                 
@@ -1,221 +1,294 @@
-import subprocess
-import json
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
 from typing import Dict, List, Optional
 import logging
-import os
+
+import docker
+import requests
+from docker.errors import DockerException, NotFound
+
+from config import Config
 
 logger = logging.getLogger(__name__)
 
+_client = None
+_client_lock = threading.Lock()
+
+# Process-wide container snapshot shared by every DockerService instance
+_snapshot: Dict = {'taken_at': 0.0, 'containers': {}, 'aliases': {}}
+_snapshot_lock = threading.Lock()
+
+# Last raw CPU counters per container id (and when they were read), used
+# to compute CPU % from one-shot stats without the daemon's blocking
+# two-sample read
+_previous_cpu: Dict[str, tuple] = {}
+PREVIOUS_CPU_MAX_AGE = 300
+
+
+def _get_client():
+    """Return the shared Docker Engine API client, creating it on first use"""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = docker.from_env(timeout=10)
+    return _client
+
+
+# Errors after which the shared client is dropped; the SDK surfaces a dead
+# daemon socket as a requests ConnectionError rather than a DockerException
+CONNECTION_ERRORS = (DockerException, requests.exceptions.ConnectionError)
+
+
+def _reset_client():
+    """Drop the shared client so the next call reconnects"""
+    global _client
+    with _client_lock:
+        _client = None
+
+
 class DockerService:
+    """
+    Docker container operations over a persistent Engine API connection
+    
+    Container status for every container is collected in one snapshot: one
+    list call, then inspect and stats fetched concurrently. The snapshot is
+    shared by all instances in the process and reused for
+    ``DOCKER_SNAPSHOT_TTL`` seconds, so telemetry, service ops and anomaly
+    detection looping over services cost one Docker round instead of one
+    per container.
+    """
+    
     def __init__(self):
-        # No cached connection check - let each call fail naturally if Docker unavailable
-        # This allows automatic recovery if Docker becomes available later
-        pass
+        # The client is created lazily and dropped on connection errors,
+        # so Docker becoming available later is picked up automatically
+        self.snapshot_ttl = Config.DOCKER_SNAPSHOT_TTL
+        self.max_workers = Config.DOCKER_STATS_WORKERS
     
-    def get_container_status(self, container_name: str) -> Optional[Dict]:
-        """Get detailed status of a specific container"""
+    @property
+    def api(self):
+        return _get_client().api
+    
+    def get_containers_snapshot(self, max_age: Optional[float] = None) -> Dict[str, Dict]:
+        """
+        Get status and resource usage for all containers
         
-        try:
-            # Get container details
-            result = subprocess.run(
-                ['docker', 'inspect', container_name],
-                capture_output=True,
-                text=True,
-                timeout=10
-            )
-            
-            if result.returncode != 0:
-                logger.warning(f"Container {container_name} not found")
-                return None
-            
-            container_data = json.loads(result.stdout)[0]
-            
-            # Get stats
-            stats_result = subprocess.run(
-                ['docker', 'stats', container_name, '--no-stream', '--format', '{{json .}}'],
-                capture_output=True,
-                text=True,
-                timeout=10
-            )
-            
-            stats_data = {}
-            if stats_result.returncode == 0 and stats_result.stdout.strip():
-                stats_data = json.loads(stats_result.stdout.strip())
-            
-            # Parse CPU and memory
-            cpu_percent = 0.0
-            mem_percent = 0.0
-            mem_usage_mb = 0.0
-            mem_limit_mb = 0.0
+        Args:
+            max_age: Seconds an existing snapshot may be reused (default DOCKER_SNAPSHOT_TTL)
+        
+        Returns:
+            Dict mapping container name to the same dict get_container_status returns
+        """
+        max_age = self.snapshot_ttl if max_age is None else max_age
+        if time.monotonic() - _snapshot['taken_at'] < max_age:
+            return _snapshot['containers']
+        
+        with _snapshot_lock:
+            # Another thread may have refreshed while we waited
+            if time.monotonic() - _snapshot['taken_at'] < max_age:
+                return _snapshot['containers']
+            try:
+                containers = self._collect_snapshot()
+            except Exception as e:
+                logger.error(f"Error collecting container snapshot: {e}")
+                _reset_client()
+                return {}
             
-            if stats_data:
-                cpu_str = stats_data.get('CPUPerc', '0%').replace('%', '')
-                mem_str = stats_data.get('MemPerc', '0%').replace('%', '')
-                
-                try:
-                    cpu_percent = float(cpu_str)
-                    mem_percent = float(mem_str)
-                except ValueError:
-                    pass
-                
-                # Parse memory usage (format: "123.4MiB / 1.5GiB")
-                mem_usage_str = stats_data.get('MemUsage', '0B / 0B')
-                if ' / ' in mem_usage_str:
-                    usage_part, limit_part = mem_usage_str.split(' / ')
-                    mem_usage_mb = self._parse_memory(usage_part)
-                    mem_limit_mb = self._parse_memory(limit_part)
+            aliases = {}
+            for name, status in containers.items():
+                aliases[status['id']] = name
+                aliases[status['full_id']] = name
+            _snapshot.update(taken_at=time.monotonic(), containers=containers, aliases=aliases)
+            return containers
+    
+    def invalidate_snapshot(self):
+        """Force the next read to collect a fresh snapshot"""
+        _snapshot['taken_at'] = 0.0
+    
+    def _collect_snapshot(self) -> Dict[str, Dict]:
+        start = time.perf_counter()
+        summaries = self.api.containers(all=True)
+        live_ids = {summary['Id'] for summary in summaries}
+        for container_id in list(_previous_cpu):
+            if container_id not in live_ids:
+                _previous_cpu.pop(container_id, None)
+        if not summaries:
+            return {}
+        
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(summaries))) as executor:
+            results = list(executor.map(self._collect_container, summaries))
+        
+        containers = {status['name']: status for status in results if status}
+        logger.debug(f"Collected {len(containers)} container stats in {(time.perf_counter() - start) * 1000:.0f}ms")
+        return containers
+    
+    def _collect_container(self, summary: Dict) -> Optional[Dict]:
+        """Inspect one container and read its stats (running containers only)"""
+        container_id = summary['Id']
+        try:
+            container_data = self.api.inspect_container(container_id)
+            stats_data = None
+            if container_data['State'].get('Running'):
+                stats_data = self._read_stats(container_id)
+            return self._build_status(container_data, stats_data)
+        except NotFound:
+            # Removed between the list call and inspect
+            return None
+        except Exception as e:
+            logger.warning(f"Error collecting stats for container {container_id[:12]}: {e}")
+            return None
+    
+    def _read_stats(self, container_id: str) -> Dict:
+        """
+        Read one stats sample
+        
+        Once a previous sample exists a one-shot read is used, which returns
+        immediately; CPU usage is then computed against the previous sample.
+        The first read of a container uses the daemon's two-sample mode.
+        """
+        previous = _previous_cpu.get(container_id)
+        if previous is not None and time.monotonic() - previous[1] < PREVIOUS_CPU_MAX_AGE:
+            stats_data = self.api.stats(container_id, stream=False, one_shot=True)
+            stats_data['precpu_stats'] = previous[0]
+        else:
+            stats_data = self.api.stats(container_id, stream=False)
+        _previous_cpu[container_id] = (stats_data.get('cpu_stats') or {}, time.monotonic())
+        return stats_data
+    
+    def _build_status(self, container_data: Dict, stats_data: Optional[Dict]) -> Dict:
+        cpu_percent = 0.0
+        mem_percent = 0.0
+        mem_usage_mb = 0.0
+        mem_limit_mb = 0.0
+        
+        if stats_data:
+            cpu_percent = self._cpu_percent(stats_data.get('cpu_stats') or {}, stats_data.get('precpu_stats') or {})
+            memory = stats_data.get('memory_stats') or {}
+            usage = memory.get('usage', 0)
+            limit = memory.get('limit', 0)
+            # Match `docker stats`: page cache is not counted as used memory
+            mem_stats = memory.get('stats') or {}
+            usage -= mem_stats.get('inactive_file', mem_stats.get('total_inactive_file', 0))
+            usage = max(usage, 0)
+            mem_usage_mb = usage / (1024 * 1024)
+            mem_limit_mb = limit / (1024 * 1024)
+            mem_percent = usage / limit * 100 if limit else 0.0
+        
+        return {
+            'name': container_data['Name'].lstrip('/'),
+            'id': container_data['Id'][:12],
+            'full_id': container_data['Id'],
+            'status': container_data['State']['Status'],
+            'state': container_data['State'],
+            'created': container_data['Created'],
+            'image': container_data['Config']['Image'],
+            'cpu_percent': round(cpu_percent, 2),
+            'memory_percent': round(mem_percent, 2),
+            'memory_usage_mb': round(mem_usage_mb, 2),
+            'memory_limit_mb': round(mem_limit_mb, 2),
+            'ports': self._format_ports(container_data.get('NetworkSettings', {}).get('Ports') or {}),
+            'labels': container_data['Config'].get('Labels') or {}
+        }
+    
+    @staticmethod
+    def _cpu_percent(cpu: Dict, precpu: Dict) -> float:
+        """CPU usage between two samples, scaled like `docker stats` (100% per core)"""
+        try:
+            cpu_delta = cpu['cpu_usage']['total_usage'] - precpu['cpu_usage']['total_usage']
+            system_delta = cpu['system_cpu_usage'] - precpu['system_cpu_usage']
+        except (KeyError, TypeError):
+            return 0.0
+        if cpu_delta <= 0 or system_delta <= 0:
+            return 0.0
+        online_cpus = cpu.get('online_cpus') or len(cpu['cpu_usage'].get('percpu_usage') or []) or 1
+        return cpu_delta / system_delta * online_cpus * 100.0
+    
+    def get_container_status(self, container_name: str) -> Optional[Dict]:
+        """Get detailed status of a specific container (by name or id)"""
+        try:
+            containers = self.get_containers_snapshot()
+            name = container_name if container_name in containers else _snapshot['aliases'].get(container_name)
+            if name:
+                return containers.get(name)
             
-            return {
-                'name': container_data['Name'].lstrip('/'),
-                'id': container_data['Id'][:12],
-                'status': container_data['State']['Status'],
-                'state': container_data['State'],
-                'created': container_data['Created'],
-                'image': container_data['Config']['Image'],
-                'cpu_percent': round(cpu_percent, 2),
-                'memory_percent': round(mem_percent, 2),
-                'memory_usage_mb': round(mem_usage_mb, 2),
-                'memory_limit_mb': round(mem_limit_mb, 2),
-                'ports': self._format_ports(container_data.get('NetworkSettings', {}).get('Ports', {})),
-                'labels': container_data['Config'].get('Labels', {})
-            }
+            # Not in the snapshot (new container or id prefix): fetch it directly
+            container_data = self.api.inspect_container(container_name)
+            stats_data = None
+            if container_data['State'].get('Running'):
+                stats_data = self._read_stats(container_data['Id'])
+            return self._build_status(container_data, stats_data)
+        except NotFound:
+            logger.warning(f"Container {container_name} not found")
+            return None
         except Exception as e:
             logger.error(f"Error getting container status for {container_name}: {e}")
+            if isinstance(e, CONNECTION_ERRORS):
+                _reset_client()
             return None
     
     def list_all_containers(self) -> List[Dict]:
         """List all containers (running and stopped)"""
         try:
-            result = subprocess.run(
-                ['docker', 'ps', '-a', '--format', '{{json .}}'],
-                capture_output=True,
-                text=True,
-                timeout=10
-            )
-            
-            if result.returncode != 0:
-                logger.error(f"Error listing containers: {result.stderr}")
-                return []
-            
             containers = []
-            for line in result.stdout.strip().split('\n'):
-                if line:
-                    data = json.loads(line)
-                    containers.append({
-                        'name': data['Names'],
-                        'id': data['ID'][:12],
-                        'status': data['State'],
-                        'image': data['Image'],
-                        'created': data['CreatedAt']
-                    })
+            for data in self.api.containers(all=True):
+                names = data.get('Names') or ['']
+                containers.append({
+                    'name': names[0].lstrip('/'),
+                    'id': data['Id'][:12],
+                    'status': data['State'],
+                    'image': data['Image'],
+                    'created': datetime.utcfromtimestamp(data['Created']).strftime('%Y-%m-%d %H:%M:%S +0000 UTC')
+                })
             
             return containers
         except Exception as e:
             logger.error(f"Error listing containers: {e}")
+            if isinstance(e, CONNECTION_ERRORS):
+                _reset_client()
             return []
     
-    def start_container(self, container_name: str) -> Dict:
-        """Start a stopped container"""
+    def _container_action(self, container_name: str, action: str, past_tense: str, gerund: str, **kwargs) -> Dict:
         try:
-            result = subprocess.run(
-                ['docker', 'start', container_name],
-                capture_output=True,
-                text=True,
-                timeout=30
-            )
-            
-            if result.returncode == 0:
-                logger.info(f"Started container {container_name}")
-                return {'success': True, 'message': f'Container {container_name} started'}
-            else:
-                error = result.stderr.strip()
-                if 'No such container' in error:
-                    return {'success': False, 'message': f'Container {container_name} not found'}
-                return {'success': False, 'message': error}
+            getattr(self.api, action)(container_name, **kwargs)
+            self.invalidate_snapshot()
+            logger.info(f"{past_tense.capitalize()} container {container_name}")
+            return {'success': True, 'message': f'Container {container_name} {past_tense}'}
+        except NotFound:
+            return {'success': False, 'message': f'Container {container_name} not found'}
         except Exception as e:
-            logger.error(f"Error starting container {container_name}: {e}")
+            logger.error(f"Error {gerund} container {container_name}: {e}")
+            if isinstance(e, CONNECTION_ERRORS):
+                _reset_client()
             return {'success': False, 'message': str(e)}
     
+    def start_container(self, container_name: str) -> Dict:
+        """Start a stopped container"""
+        return self._container_action(container_name, 'start', 'started', 'starting')
+    
     def stop_container(self, container_name: str) -> Dict:
         """Stop a running container"""
-        try:
-            result = subprocess.run(
-                ['docker', 'stop', '-t', '10', container_name],
-                capture_output=True,
-                text=True,
-                timeout=15
-            )
-            
-            if result.returncode == 0:
-                logger.info(f"Stopped container {container_name}")
-                return {'success': True, 'message': f'Container {container_name} stopped'}
-            else:
-                error = result.stderr.strip()
-                if 'No such container' in error:
-                    return {'success': False, 'message': f'Container {container_name} not found'}
-                return {'success': False, 'message': error}
-        except Exception as e:
-            logger.error(f"Error stopping container {container_name}: {e}")
-            return {'success': False, 'message': str(e)}
+        return self._container_action(container_name, 'stop', 'stopped', 'stopping', timeout=10)
     
     def restart_container(self, container_name: str) -> Dict:
         """Restart a container"""
-        try:
-            result = subprocess.run(
-                ['docker', 'restart', '-t', '10', container_name],
-                capture_output=True,
-                text=True,
-                timeout=25
-            )
-            
-            if result.returncode == 0:
-                logger.info(f"Restarted container {container_name}")
-                return {'success': True, 'message': f'Container {container_name} restarted'}
-            else:
-                error = result.stderr.strip()
-                if 'No such container' in error:
-                    return {'success': False, 'message': f'Container {container_name} not found'}
-                return {'success': False, 'message': error}
-        except Exception as e:
-            logger.error(f"Error restarting container {container_name}: {e}")
-            return {'success': False, 'message': str(e)}
+        return self._container_action(container_name, 'restart', 'restarted', 'restarting', timeout=10)
     
     def get_container_logs(self, container_name: str, lines: int = 100) -> Optional[str]:
         """Get logs from a container"""
         try:
-            result = subprocess.run(
-                ['docker', 'logs', '--tail', str(lines), '--timestamps', container_name],
-                capture_output=True,
-                text=True,
-                timeout=10
-            )
-            
-            if result.returncode == 0:
-                return result.stdout
-            else:
-                logger.warning(f"Error getting logs for {container_name}: {result.stderr}")
-                return None
+            logs = self.api.logs(container_name, tail=lines, timestamps=True)
+            return logs.decode('utf-8', errors='replace')
+        except NotFound:
+            logger.warning(f"Error getting logs for {container_name}: container not found")
+            return None
         except Exception as e:
             logger.error(f"Error getting logs for {container_name}: {e}")
+            if isinstance(e, CONNECTION_ERRORS):
+                _reset_client()
             return None
     
-    def _parse_memory(self, mem_str: str) -> float:
-        """Parse memory string like '123.4MiB' or '1.5GiB' to MB"""
-        mem_str = mem_str.strip()
-        try:
-            if 'GiB' in mem_str:
-                return float(mem_str.replace('GiB', '')) * 1024
-            elif 'MiB' in mem_str:
-                return float(mem_str.replace('MiB', ''))
-            elif 'KiB' in mem_str:
-                return float(mem_str.replace('KiB', '')) / 1024
-            elif 'B' in mem_str:
-                return float(mem_str.replace('B', '')) / (1024 * 1024)
-            else:
-                return 0.0
-        except ValueError:
-            return 0.0
-    
     def _format_ports(self, ports_data: Dict) -> Dict:
         """Format port mappings from Docker inspect output"""
         formatted = {}
@@ -3,7 +3,6 @@ Enhanced AI Service
 Multi-model routing, token tracking, offline fallbacks, and response caching
 """
 import logging
-import hashlib
 import time
 import json
 import os
@@ -11,7 +10,9 @@ from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Any, Generator, Tuple
 
 from openai import OpenAI
+from config import Config
 from services.db_service import db_service
+from services.response_cache import AIResponseCache
 
 logger = logging.getLogger(__name__)
 
@@ -64,9 +65,14 @@ class EnhancedAIService:
         self._init_openai()
         self._init_ollama()
         
-        self._response_cache = {}
-        self._cache_max_size = 1000
-        self._cache_default_ttl = 3600
+        self.response_cache = AIResponseCache(
+            max_entries=Config.AI_CACHE_MAX_ENTRIES,
+            default_ttl=Config.AI_CACHE_MEMORY_TTL,
+            negative_ttl=Config.AI_CACHE_NEGATIVE_TTL,
+            embed=self._embed_query if Config.AI_CACHE_SEMANTIC and self.openai_enabled else None,
+            similarity_threshold=Config.AI_CACHE_SEMANTIC_THRESHOLD,
+            hit_flush_interval=Config.AI_CACHE_HIT_FLUSH_INTERVAL
+        )
     
     def _init_openai(self):
         """Initialize OpenAI client"""
@@ -156,50 +162,25 @@ class EnhancedAIService:
         
         return (None, None)
     
+    def _embed_query(self, text: str) -> List[float]:
+        """Embed a normalized query for similarity lookups in the response cache"""
+        result = self.openai_client.embeddings.create(model=Config.AI_CACHE_EMBEDDING_MODEL, input=text)
+        return result.data[0].embedding
+    
     def get_cached_response(self, query: str) -> Optional[str]:
         """
         Check if there's a cached response for a query
         
+        Queries are matched after normalizing case, punctuation and
+        whitespace, and by embedding similarity when AI_CACHE_SEMANTIC is on.
+        
         Args:
             query: The user query
             
         Returns:
             Cached response or None
         """
-        query_hash = hashlib.sha256(query.lower().strip().encode()).hexdigest()
-        
-        if query_hash in self._response_cache:
-            cached = self._response_cache[query_hash]
-            if datetime.utcnow() < cached.get('expires_at', datetime.utcnow()):
-                cached['hit_count'] = cached.get('hit_count', 0) + 1
-                return cached.get('response')
-            else:
-                del self._response_cache[query_hash]
-        
-        try:
-            from models.jarvis_ai import ResponseCache
-            
-            with db_service.get_session() as session:
-                cache_entry = session.query(ResponseCache).filter(
-                    ResponseCache.query_hash == query_hash
-                ).first()
-                
-                if cache_entry:
-                    if cache_entry.expires_at is None or cache_entry.expires_at > datetime.utcnow():
-                        cache_entry.hit_count += 1
-                        cache_entry.last_hit_at = datetime.utcnow()
-                        
-                        self._response_cache[query_hash] = {
-                            'response': cache_entry.response,
-                            'expires_at': cache_entry.expires_at or datetime.utcnow() + timedelta(hours=1),
-                            'hit_count': cache_entry.hit_count
-                        }
-                        
-                        return cache_entry.response
-        except Exception as e:
-            logger.debug(f"Cache lookup failed: {e}")
-        
-        return None
+        return self.response_cache.get(query)
     
     def cache_response(
         self,
@@ -219,48 +200,7 @@ class EnhancedAIService:
             category: Optional category for the query
             ttl_hours: Time to live in hours
         """
-        query_hash = hashlib.sha256(query.lower().strip().encode()).hexdigest()
-        expires_at = datetime.utcnow() + timedelta(hours=ttl_hours)
-        
-        self._response_cache[query_hash] = {
-            'response': response,
-            'expires_at': expires_at,
-            'hit_count': 0
-        }
-        
-        if len(self._response_cache) > self._cache_max_size:
-            oldest_key = min(self._response_cache.keys(), 
-                           key=lambda k: self._response_cache[k].get('hit_count', 0))
-            del self._response_cache[oldest_key]
-        
-        try:
-            from models.jarvis_ai import ResponseCache
-            
-            pattern = query[:100] if len(query) > 100 else query
-            
-            with db_service.get_session() as session:
-                existing = session.query(ResponseCache).filter(
-                    ResponseCache.query_hash == query_hash
-                ).first()
-                
-                if existing:
-                    existing.response = response
-                    existing.response_model = model
-                    existing.updated_at = datetime.utcnow()
-                    existing.expires_at = expires_at
-                else:
-                    cache_entry = ResponseCache(
-                        query_hash=query_hash,
-                        query_pattern=pattern,
-                        query_category=category,
-                        original_query=query,
-                        response=response,
-                        response_model=model,
-                        expires_at=expires_at
-                    )
-                    session.add(cache_entry)
-        except Exception as e:
-            logger.debug(f"Failed to persist cache: {e}")
+        self.response_cache.set(query, response, model, category, ttl_seconds=ttl_hours * 3600)
     
     def get_offline_response(self, message: str) -> Optional[str]:
         """
@@ -441,10 +381,11 @@ class EnhancedAIService:
                     stats['totals']['tokens'] += row.total_tokens or 0
                     stats['totals']['cost_usd'] += float(row.total_cost or 0)
                 
+                stats['cache'] = self.response_cache.get_stats()
                 return stats
         except Exception as e:
             logger.error(f"Failed to get usage stats: {e}")
-            return {'error': str(e)}
+            return {'error': str(e), 'cache': self.response_cache.get_stats()}
     
     def chat(
         self,
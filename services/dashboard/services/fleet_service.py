@@ -3,13 +3,17 @@ Fleet Manager Service
 Remote server management via Tailscale VPN mesh using SSH
 """
 import os
+import json
 import logging
 import time
-from typing import Dict, List, Optional, Any
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from typing import Callable, Dict, List, Optional, Any
 from datetime import datetime, timezone
 import paramiko
 import socket
 
+from services.ssh_pool import SSHConnectionPool
+
 logger = logging.getLogger(__name__)
 
 
@@ -52,11 +56,33 @@ class FleetManager:
         },
     }
     
+    # Everything get_host_status needs, in one round trip; sections are split on the marker
+    STATUS_MARKER = '__fleet_status__'
+    STATUS_COMMANDS = [
+        'uptime -s',
+        # /proc/stat counts since boot; current usage is the change across a short interval
+        "{ head -1 /proc/stat; sleep 0.2; head -1 /proc/stat; } | awk '{idle=$5+$6; total=0; "
+        "for (i=2; i<=9 && i<=NF; i++) total+=$i} NR==1 {idle1=idle; total1=total} "
+        "NR==2 {busy=total-total1-(idle-idle1); print (total>total1 ? busy*100/(total-total1) : 0)}'",
+        'nproc',
+        "free -b | grep Mem | awk '{print $2,$3,$4}'",
+        "df -B1 / | tail -1 | awk '{print $2,$3,$5}'",
+        "docker ps -a --format '{{json .}}' 2>/dev/null || echo ''",
+    ]
+    
     def __init__(self):
         self.ssh_timeout = int(os.environ.get('FLEET_SSH_TIMEOUT', '30'))
         self.command_timeout = int(os.environ.get('FLEET_COMMAND_TIMEOUT', '120'))
-        self._ssh_clients: Dict[str, paramiko.SSHClient] = {}
+        self.health_timeout = int(os.environ.get('FLEET_HEALTH_TIMEOUT', '20'))  # per host in fleet-wide checks
+        self.max_parallel = int(os.environ.get('FLEET_MAX_PARALLEL', '16'))
         self.ssh_key_path = os.environ.get('FLEET_SSH_KEY_PATH', os.path.expanduser('~/.ssh/id_rsa'))
+        self.pool = SSHConnectionPool(
+            self._connect,
+            idle_timeout=int(os.environ.get('FLEET_SSH_IDLE_TIMEOUT', '300')),
+            probe_interval=int(os.environ.get('FLEET_SSH_PROBE_INTERVAL', '30')),
+            keepalive=int(os.environ.get('FLEET_SSH_KEEPALIVE', '30')),
+            max_channels=int(os.environ.get('FLEET_SSH_MAX_CHANNELS', '8')),
+        )
     
     def _get_host_config(self, host_id: str) -> Optional[Dict]:
         """Get host configuration by ID"""
@@ -84,7 +110,16 @@ class FleetManager:
         return None
     
     def _get_ssh_client(self, host_id: str) -> Optional[paramiko.SSHClient]:
-        """Get or create SSH client for a host"""
+        """
+        Get the pooled SSH client for a host, connecting if needed
+        
+        The client is shared; run commands on it but do not close it.
+        """
+        conn = self.pool.get(host_id)
+        return conn.client if conn else None
+    
+    def _connect(self, host_id: str) -> Optional[paramiko.SSHClient]:
+        """Open a new SSH connection to a host (used by the connection pool)"""
         config = self._get_host_config(host_id)
         if not config:
             logger.error(f"Host {host_id} not found or not configured")
@@ -131,31 +166,9 @@ class FleetManager:
             logger.error(f"Failed to connect to {host_id}: {e}")
             return None
     
-    def list_hosts(self) -> List[Dict]:
-        """Get all registered hosts with their connection status"""
-        hosts = []
-        
-        for host_id, config in self.DEFAULT_HOSTS.items():
-            if not config.get('tailscale_ip'):
-                continue
-            
-            host_data = config.copy()
-            host_data['status'] = 'unknown'
-            host_data['online'] = False
-            
-            try:
-                client = self._get_ssh_client(host_id)
-                if client:
-                    host_data['status'] = 'online'
-                    host_data['online'] = True
-                    client.close()
-                else:
-                    host_data['status'] = 'offline'
-            except Exception as e:
-                host_data['status'] = 'error'
-                host_data['error'] = str(e)
-            
-            hosts.append(host_data)
+    def _host_configs(self) -> List[Dict]:
+        """Configured hosts (defaults with a Tailscale IP, then active database hosts)"""
+        hosts = [config.copy() for config in self.DEFAULT_HOSTS.values() if config.get('tailscale_ip')]
         
         try:
             from services.db_service import db_service
@@ -165,60 +178,98 @@ class FleetManager:
             if db_service.is_available:
                 with db_service.get_session() as session:
                     db_hosts = session.execute(select(FleetHost).where(FleetHost.is_active == True)).scalars().all()
+                    known = {h['host_id'] for h in hosts}
                     for host in db_hosts:
-                        if host.host_id not in [h['host_id'] for h in hosts]:
-                            host_data = host.to_dict()
-                            host_data['status'] = 'unknown'
-                            host_data['online'] = False
-                            try:
-                                client = self._get_ssh_client(host.host_id)
-                                if client:
-                                    host_data['status'] = 'online'
-                                    host_data['online'] = True
-                                    client.close()
-                            except:
-                                host_data['status'] = 'offline'
-                            hosts.append(host_data)
+                        if host.host_id not in known:
+                            hosts.append(host.to_dict())
         except Exception as e:
             logger.warning(f"Could not fetch hosts from database: {e}")
         
         return hosts
     
+    def fan_out(self, host_ids: List[str], fn: Callable[[str], Any], timeout: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Call ``fn(host_id)`` for every host concurrently
+        
+        Each host gets ``timeout`` seconds (default FLEET_HEALTH_TIMEOUT);
+        hosts beyond FLEET_MAX_PARALLEL wait for a free worker. A host that
+        raises or runs out of time maps to the exception instead of a
+        result, and a slow host never holds up the others' results.
+        """
+        if not host_ids:
+            return {}
+        timeout = timeout or self.health_timeout
+        workers = min(self.max_parallel, len(host_ids))
+        waves = -(-len(host_ids) // workers)
+        
+        executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='fleet')
+        futures = {host_id: executor.submit(fn, host_id) for host_id in host_ids}
+        deadline = time.monotonic() + timeout * waves
+        
+        results = {}
+        for host_id, future in futures.items():
+            try:
+                results[host_id] = future.result(timeout=max(0.0, deadline - time.monotonic()))
+            except FutureTimeout:
+                results[host_id] = TimeoutError(f"No response from {host_id} within {timeout}s")
+            except Exception as e:
+                results[host_id] = e
+        # Stragglers finish (or hit their SSH timeouts) in the background
+        executor.shutdown(wait=False, cancel_futures=True)
+        return results
+    
+    def list_hosts(self) -> List[Dict]:
+        """Get all registered hosts with their connection status (probed in parallel)"""
+        hosts = self._host_configs()
+        probes = self.fan_out([h['host_id'] for h in hosts], lambda host_id: self.pool.get(host_id) is not None,
+                              timeout=self.ssh_timeout)
+        
+        for host_data in hosts:
+            online = probes.get(host_data['host_id'])
+            if isinstance(online, Exception):
+                host_data['status'] = 'error'
+                host_data['online'] = False
+                host_data['error'] = str(online)
+            else:
+                host_data['status'] = 'online' if online else 'offline'
+                host_data['online'] = bool(online)
+        
+        return hosts
+    
     def get_host_status(self, host_id: str) -> Optional[Dict]:
         """Get detailed host info including CPU, RAM, disk, and containers"""
-        client = self._get_ssh_client(host_id)
-        if not client:
+        command = f"; echo {self.STATUS_MARKER}; ".join(self.STATUS_COMMANDS)
+        try:
+            result = self.pool.run(host_id, command, timeout=self.command_timeout)
+        except Exception as e:
+            logger.error(f"Failed to get status for {host_id}: {e}")
+            return None
+        if result is None:
             return None
         
+        sections = [part.strip() for part in result['output'].split(self.STATUS_MARKER)]
+        sections += [''] * (len(self.STATUS_COMMANDS) - len(sections))
+        uptime_since, cpu_percent, cores, mem, disk, containers_output = sections[:len(self.STATUS_COMMANDS)]
+        
+        status = {
+            'host_id': host_id,
+            'online': True,
+            'timestamp': datetime.now(timezone.utc).isoformat(),
+            'uptime_since': uptime_since,
+        }
+        
         try:
-            status = {
-                'host_id': host_id,
-                'online': True,
-                'timestamp': datetime.now(timezone.utc).isoformat(),
-            }
-            
-            _, stdout, _ = client.exec_command('uptime -s', timeout=self.command_timeout)
-            uptime_since = stdout.read().decode().strip()
-            status['uptime_since'] = uptime_since
-            
-            _, stdout, _ = client.exec_command(
-                "grep 'cpu ' /proc/stat | awk '{usage=($2+$4)*100/($2+$4+$5)} END {print usage}'",
-                timeout=self.command_timeout
-            )
-            cpu_percent = stdout.read().decode().strip()
-            try:
-                status['cpu_percent'] = round(float(cpu_percent), 2)
-            except:
-                status['cpu_percent'] = 0.0
-            
-            _, stdout, _ = client.exec_command("nproc", timeout=self.command_timeout)
-            status['cpu_cores'] = int(stdout.read().decode().strip() or 0)
-            
-            _, stdout, _ = client.exec_command(
-                "free -b | grep Mem | awk '{print $2,$3,$4}'",
-                timeout=self.command_timeout
-            )
-            mem_output = stdout.read().decode().strip().split()
+            status['cpu_percent'] = round(float(cpu_percent), 2)
+        except ValueError:
+            status['cpu_percent'] = 0.0
+        
+        try:
+            status['cpu_cores'] = int(cores or 0)
+        except ValueError:
+            status['cpu_cores'] = 0
+        
+        try:
+            mem_output = mem.split()
             if len(mem_output) >= 3:
                 total = int(mem_output[0])
                 used = int(mem_output[1])
@@ -226,42 +277,27 @@ class FleetManager:
                 status['memory_used_gb'] = round(used / (1024**3), 2)
                 status['memory_percent'] = round((used / total) * 100, 2) if total > 0 else 0
             
-            _, stdout, _ = client.exec_command(
-                "df -B1 / | tail -1 | awk '{print $2,$3,$5}'",
-                timeout=self.command_timeout
-            )
-            disk_output = stdout.read().decode().strip().split()
+            disk_output = disk.split()
             if len(disk_output) >= 3:
                 total = int(disk_output[0])
                 used = int(disk_output[1])
                 status['disk_total_gb'] = round(total / (1024**3), 2)
                 status['disk_used_gb'] = round(used / (1024**3), 2)
                 status['disk_percent'] = int(disk_output[2].replace('%', ''))
-            
-            _, stdout, _ = client.exec_command(
-                "docker ps -a --format '{{json .}}' 2>/dev/null || echo ''",
-                timeout=self.command_timeout
-            )
-            containers_output = stdout.read().decode().strip()
-            containers = []
-            if containers_output:
-                import json
-                for line in containers_output.split('\n'):
-                    if line:
-                        try:
-                            containers.append(json.loads(line))
-                        except:
-                            pass
-            status['container_count'] = len(containers)
-            status['containers_running'] = sum(1 for c in containers if 'Up' in c.get('Status', ''))
-            
-            client.close()
-            return status
-            
-        except Exception as e:
-            logger.error(f"Failed to get status for {host_id}: {e}")
-            client.close()
-            return None
+        except ValueError as e:
+            logger.warning(f"Unexpected memory/disk output from {host_id}: {e}")
+        
+        containers = []
+        for line in containers_output.split('\n'):
+            if line:
+                try:
+                    containers.append(json.loads(line))
+                except ValueError:
+                    pass
+        status['container_count'] = len(containers)
+        status['containers_running'] = sum(1 for c in containers if 'Up' in c.get('Status', ''))
+        
+        return status
     
     # Whitelist of allowed command prefixes for security
     ALLOWED_COMMANDS = [
@@ -342,54 +378,67 @@ class FleetManager:
                     'blocked': True
                 }
         
-        client = self._get_ssh_client(host_id)
-        if not client:
-            return {'success': False, 'error': f'Cannot connect to host {host_id}'}
-        
         try:
-            cmd_timeout = timeout or self.command_timeout
-            _, stdout, stderr = client.exec_command(command, timeout=cmd_timeout)
-            
-            exit_code = stdout.channel.recv_exit_status()
-            output = stdout.read().decode('utf-8', errors='replace')
-            error_output = stderr.read().decode('utf-8', errors='replace')
-            
-            duration_ms = int((time.time() - start_time) * 1000)
-            
-            try:
-                from services.db_service import db_service
-                from models.fleet import FleetCommand
-                
-                if db_service.is_available:
-                    with db_service.get_session() as session:
-                        cmd_log = FleetCommand(
-                            host_id=host_id,
-                            command=command,
-                            output=output[:10000] if output else None,
-                            exit_code=exit_code,
-                            duration_ms=duration_ms,
-                        )
-                        session.add(cmd_log)
-                        session.commit()
-            except Exception as e:
-                logger.warning(f"Could not log command to database: {e}")
-            
-            client.close()
-            
-            return {
-                'success': exit_code == 0,
-                'exit_code': exit_code,
-                'output': output,
-                'error': error_output if error_output else None,
-                'duration_ms': duration_ms,
-            }
-            
+            result = self.pool.run(host_id, command, timeout=timeout or self.command_timeout)
         except socket.timeout:
-            client.close()
             return {'success': False, 'error': 'Command execution timed out'}
         except Exception as e:
-            client.close()
             return {'success': False, 'error': str(e)}
+        
+        if result is None:
+            return {'success': False, 'error': f'Cannot connect to host {host_id}'}
+        
+        exit_code = result['exit_code']
+        output = result['output']
+        error_output = result['error']
+        duration_ms = int((time.time() - start_time) * 1000)
+        
+        try:
+            from services.db_service import db_service
+            from models.fleet import FleetCommand
+            
+            if db_service.is_available:
+                with db_service.get_session() as session:
+                    cmd_log = FleetCommand(
+                        host_id=host_id,
+                        command=command,
+                        output=output[:10000] if output else None,
+                        exit_code=exit_code,
+                        duration_ms=duration_ms,
+                    )
+                    session.add(cmd_log)
+                    session.commit()
+        except Exception as e:
+            logger.warning(f"Could not log command to database: {e}")
+        
+        return {
+            'success': exit_code == 0,
+            'exit_code': exit_code,
+            'output': output,
+            'error': error_output if error_output else None,
+            'duration_ms': duration_ms,
+        }
+    
+    def execute_on_hosts(self, host_ids: List[str], command: str, timeout: Optional[int] = None,
+                         bypass_whitelist: bool = False) -> Dict[str, Dict]:
+        """Run one command on several hosts concurrently; returns a result per host"""
+        if not bypass_whitelist:
+            is_allowed, reason = self._is_command_allowed(command)
+            if not is_allowed:
+                logger.warning(f"Blocked unauthorized fleet command: {command}")
+                blocked = {'success': False, 'error': f'Command not allowed: {reason}', 'blocked': True}
+                return {host_id: dict(blocked) for host_id in host_ids}
+        
+        cmd_timeout = timeout or self.command_timeout
+        results = self.fan_out(
+            host_ids,
+            lambda host_id: self.execute_command(host_id, command, cmd_timeout, bypass_whitelist=True),
+            timeout=cmd_timeout + self.ssh_timeout
+        )
+        return {
+            host_id: {'success': False, 'error': str(result)} if isinstance(result, Exception) else result
+            for host_id, result in results.items()
+        }
     
     def get_containers(self, host_id: str) -> List[Dict]:
         """List Docker containers on a remote host"""
@@ -544,94 +593,109 @@ class FleetManager:
             return {'success': False, 'error': str(e)}
     
     def run_health_check(self, host_ids: Optional[List[str]] = None) -> List[Dict]:
-        """Run health check on all or specified hosts"""
-        results = []
-        hosts = self.list_hosts()
+        """Run health check on all or specified hosts, checking every host concurrently"""
+        hosts = {
+            host['host_id']: host for host in self._host_configs()
+            if not host_ids or host['host_id'] in host_ids
+        }
+        checks = self.fan_out(list(hosts), lambda host_id: self._check_host(hosts[host_id]))
         
-        for host in hosts:
-            if host_ids and host['host_id'] not in host_ids:
-                continue
-            
-            host_id = host['host_id']
-            result = {
-                'host_id': host_id,
-                'name': host.get('name', host_id),
-                'role': host.get('role', 'unknown'),
-                'host_type': host.get('host_type', 'server'),
-                'healthy': False,
-                'checks': {},
-                'alerts': [],
-                'timestamp': datetime.now(timezone.utc).isoformat(),
-            }
-            
-            if not host.get('online'):
-                result['checks']['connectivity'] = {'status': 'fail', 'message': 'Host offline'}
-                result['alerts'].append({'level': 'critical', 'message': 'Host is offline'})
-                results.append(result)
-                continue
-            
-            result['checks']['connectivity'] = {'status': 'pass', 'message': 'Host reachable'}
-            
-            status = self.get_host_status(host_id)
-            if not status:
-                result['checks']['metrics'] = {'status': 'fail', 'message': 'Failed to get metrics'}
-                result['alerts'].append({'level': 'warning', 'message': 'Cannot retrieve system metrics'})
-                results.append(result)
-                continue
-            
-            cpu_pct = status.get('cpu_percent', 0)
-            mem_pct = status.get('memory_percent', 0)
-            disk_pct = status.get('disk_percent', 0)
-            
-            result['metrics'] = {
-                'cpu_percent': cpu_pct,
-                'memory_percent': mem_pct,
-                'disk_percent': disk_pct,
-                'memory_total_gb': status.get('memory_total_gb', 0),
-                'memory_used_gb': status.get('memory_used_gb', 0),
-                'disk_total_gb': status.get('disk_total_gb', 0),
-                'disk_used_gb': status.get('disk_used_gb', 0),
-                'cpu_cores': status.get('cpu_cores', 0),
-                'uptime_since': status.get('uptime_since', ''),
-                'containers_running': status.get('containers_running', 0),
-                'container_count': status.get('container_count', 0),
-            }
-            
-            if cpu_pct > 90:
-                result['checks']['cpu'] = {'status': 'fail', 'message': f'CPU at {cpu_pct}%'}
-                result['alerts'].append({'level': 'critical', 'message': f'CPU usage critical: {cpu_pct}%'})
-            elif cpu_pct > 75:
-                result['checks']['cpu'] = {'status': 'warn', 'message': f'CPU at {cpu_pct}%'}
-                result['alerts'].append({'level': 'warning', 'message': f'CPU usage high: {cpu_pct}%'})
-            else:
-                result['checks']['cpu'] = {'status': 'pass', 'message': f'CPU at {cpu_pct}%'}
-            
-            if mem_pct > 90:
-                result['checks']['memory'] = {'status': 'fail', 'message': f'Memory at {mem_pct}%'}
-                result['alerts'].append({'level': 'critical', 'message': f'Memory usage critical: {mem_pct}%'})
-            elif mem_pct > 80:
-                result['checks']['memory'] = {'status': 'warn', 'message': f'Memory at {mem_pct}%'}
-                result['alerts'].append({'level': 'warning', 'message': f'Memory usage high: {mem_pct}%'})
-            else:
-                result['checks']['memory'] = {'status': 'pass', 'message': f'Memory at {mem_pct}%'}
-            
-            if disk_pct > 90:
-                result['checks']['disk'] = {'status': 'fail', 'message': f'Disk at {disk_pct}%'}
-                result['alerts'].append({'level': 'critical', 'message': f'Disk usage critical: {disk_pct}%'})
-            elif disk_pct > 80:
-                result['checks']['disk'] = {'status': 'warn', 'message': f'Disk at {disk_pct}%'}
-                result['alerts'].append({'level': 'warning', 'message': f'Disk usage high: {disk_pct}%'})
-            else:
-                result['checks']['disk'] = {'status': 'pass', 'message': f'Disk at {disk_pct}%'}
-            
-            critical_alerts = [a for a in result['alerts'] if a['level'] == 'critical']
-            result['healthy'] = len(critical_alerts) == 0
-            result['status'] = 'healthy' if result['healthy'] else ('degraded' if not critical_alerts else 'unhealthy')
-            
+        results = []
+        for host_id, result in checks.items():
+            if isinstance(result, Exception):
+                host = hosts[host_id]
+                result = {
+                    'host_id': host_id,
+                    'name': host.get('name', host_id),
+                    'role': host.get('role', 'unknown'),
+                    'host_type': host.get('host_type', 'server'),
+                    'healthy': False,
+                    'checks': {'connectivity': {'status': 'fail', 'message': str(result)}},
+                    'alerts': [{'level': 'critical', 'message': f'Health check failed: {result}'}],
+                    'timestamp': datetime.now(timezone.utc).isoformat(),
+                }
             results.append(result)
         
         return results
     
+    def _check_host(self, host: Dict) -> Dict:
+        """Connectivity, metrics and threshold checks for one host"""
+        host_id = host['host_id']
+        result = {
+            'host_id': host_id,
+            'name': host.get('name', host_id),
+            'role': host.get('role', 'unknown'),
+            'host_type': host.get('host_type', 'server'),
+            'healthy': False,
+            'checks': {},
+            'alerts': [],
+            'timestamp': datetime.now(timezone.utc).isoformat(),
+        }
+        
+        if self.pool.get(host_id) is None:
+            result['checks']['connectivity'] = {'status': 'fail', 'message': 'Host offline'}
+            result['alerts'].append({'level': 'critical', 'message': 'Host is offline'})
+            return result
+        
+        result['checks']['connectivity'] = {'status': 'pass', 'message': 'Host reachable'}
+        
+        status = self.get_host_status(host_id)
+        if not status:
+            result['checks']['metrics'] = {'status': 'fail', 'message': 'Failed to get metrics'}
+            result['alerts'].append({'level': 'warning', 'message': 'Cannot retrieve system metrics'})
+            return result
+        
+        cpu_pct = status.get('cpu_percent', 0)
+        mem_pct = status.get('memory_percent', 0)
+        disk_pct = status.get('disk_percent', 0)
+        
+        result['metrics'] = {
+            'cpu_percent': cpu_pct,
+            'memory_percent': mem_pct,
+            'disk_percent': disk_pct,
+            'memory_total_gb': status.get('memory_total_gb', 0),
+            'memory_used_gb': status.get('memory_used_gb', 0),
+            'disk_total_gb': status.get('disk_total_gb', 0),
+            'disk_used_gb': status.get('disk_used_gb', 0),
+            'cpu_cores': status.get('cpu_cores', 0),
+            'uptime_since': status.get('uptime_since', ''),
+            'containers_running': status.get('containers_running', 0),
+            'container_count': status.get('container_count', 0),
+        }
+        
+        if cpu_pct > 90:
+            result['checks']['cpu'] = {'status': 'fail', 'message': f'CPU at {cpu_pct}%'}
+            result['alerts'].append({'level': 'critical', 'message': f'CPU usage critical: {cpu_pct}%'})
+        elif cpu_pct > 75:
+            result['checks']['cpu'] = {'status': 'warn', 'message': f'CPU at {cpu_pct}%'}
+            result['alerts'].append({'level': 'warning', 'message': f'CPU usage high: {cpu_pct}%'})
+        else:
+            result['checks']['cpu'] = {'status': 'pass', 'message': f'CPU at {cpu_pct}%'}
+        
+        if mem_pct > 90:
+            result['checks']['memory'] = {'status': 'fail', 'message': f'Memory at {mem_pct}%'}
+            result['alerts'].append({'level': 'critical', 'message': f'Memory usage critical: {mem_pct}%'})
+        elif mem_pct > 80:
+            result['checks']['memory'] = {'status': 'warn', 'message': f'Memory at {mem_pct}%'}
+            result['alerts'].append({'level': 'warning', 'message': f'Memory usage high: {mem_pct}%'})
+        else:
+            result['checks']['memory'] = {'status': 'pass', 'message': f'Memory at {mem_pct}%'}
+        
+        if disk_pct > 90:
+            result['checks']['disk'] = {'status': 'fail', 'message': f'Disk at {disk_pct}%'}
+            result['alerts'].append({'level': 'critical', 'message': f'Disk usage critical: {disk_pct}%'})
+        elif disk_pct > 80:
+            result['checks']['disk'] = {'status': 'warn', 'message': f'Disk at {disk_pct}%'}
+            result['alerts'].append({'level': 'warning', 'message': f'Disk usage high: {disk_pct}%'})
+        else:
+            result['checks']['disk'] = {'status': 'pass', 'message': f'Disk at {disk_pct}%'}
+        
+        critical_alerts = [a for a in result['alerts'] if a['level'] == 'critical']
+        result['healthy'] = len(critical_alerts) == 0
+        result['status'] = 'healthy' if result['healthy'] else ('degraded' if not critical_alerts else 'unhealthy')
+        
+        return result
+    
     def get_command_history(self, host_id: Optional[str] = None, limit: int = 50) -> List[Dict]:
         """Get command execution history"""
         try:
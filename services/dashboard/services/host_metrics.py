@@ -0,0 +1,293 @@
+"""
+Host Metrics Sampler
+One background thread per process samples CPU, memory, disk and network at a
+fixed cadence; request handlers, alert checks and SSE streams read the
+latest sample instead of calling blocking psutil functions themselves.
+"""
+import os
+import queue
+import threading
+import time
+import logging
+from collections import deque
+from datetime import datetime
+from typing import Dict, List, Optional, Any
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+try:
+    import psutil
+    PSUTIL_AVAILABLE = True
+except ImportError:
+    PSUTIL_AVAILABLE = False
+
+
+class HostMetricsSampler:
+    """
+    Samples host metrics into a ring buffer on a background thread
+    
+    CPU usage is read with ``psutil.cpu_percent(interval=None)``, which
+    reports usage since the previous sample and never sleeps. Expensive
+    readings (mounted partitions, socket count) are refreshed every
+    ``slow_every`` samples and carried over in between. The thread is
+    started lazily and restarted after a fork, so each gunicorn worker
+    samples once no matter how many requests or streams it serves.
+    """
+    
+    def __init__(self, interval: Optional[float] = None, history_size: Optional[int] = None,
+                 slow_every: int = 15):
+        self.interval = Config.HOST_METRICS_INTERVAL if interval is None else interval
+        self.history: deque = deque(maxlen=Config.HOST_METRICS_HISTORY if history_size is None else history_size)
+        self.slow_every = slow_every
+        self._subscribers: List[queue.Queue] = []
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._pid: Optional[int] = None
+        self._stop = threading.Event()
+        self._ready = threading.Event()
+        self._ticks = 0
+        self._slow: Dict[str, Any] = {}
+        self._previous_net = None
+        self._previous_time = None
+    
+    def ensure_started(self):
+        """Start the sampler thread in this process if it is not running"""
+        if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+                return
+            # A thread started before fork does not exist in the child
+            self.history.clear()
+            self._subscribers = []
+            self._stop.clear()
+            self._ready.clear()
+            self._pid = os.getpid()
+            self._ticks = 0
+            self._previous_net = None
+            self._thread = threading.Thread(target=self._run, name='host-metrics-sampler', daemon=True)
+            self._thread.start()
+            logger.info(f"Host metrics sampler started (every {self.interval}s)")
+    
+    def stop(self):
+        self._stop.set()
+    
+    def _run(self):
+        if PSUTIL_AVAILABLE:
+            # Prime the CPU counters so the first sample covers a real interval
+            psutil.cpu_percent(interval=None)
+            psutil.cpu_percent(interval=None, percpu=True)
+            self._stop.wait(0.2)
+        while not self._stop.is_set():
+            try:
+                self._publish(self.sample())
+            except Exception as e:
+                logger.error(f"Host metrics sampling failed: {e}")
+            self._stop.wait(self.interval)
+    
+    def _publish(self, sample: Dict):
+        self.history.append(sample)
+        self._ready.set()
+        for subscriber in list(self._subscribers):
+            try:
+                subscriber.put_nowait(sample)
+            except queue.Full:
+                # Slow reader: drop its oldest sample so it always sees the newest
+                try:
+                    subscriber.get_nowait()
+                    subscriber.put_nowait(sample)
+                except (queue.Empty, queue.Full):
+                    pass
+    
+    def latest(self) -> Dict:
+        """Get the most recent sample (waits for the first one right after start-up)"""
+        self.ensure_started()
+        if not self.history:
+            self._ready.wait(timeout=2.0)
+        if self.history:
+            return self.history[-1]
+        return self.sample()
+    
+    def get_history(self, seconds: Optional[float] = None) -> List[Dict]:
+        """Get buffered samples, optionally limited to the last N seconds"""
+        self.ensure_started()
+        samples = list(self.history)
+        if seconds is not None:
+            cutoff = time.time() - seconds
+            samples = [s for s in samples if s['sampled_at'] >= cutoff]
+        return samples
+    
+    def subscribe(self, max_pending: int = 5) -> queue.Queue:
+        """Register a queue that receives every new sample"""
+        self.ensure_started()
+        subscriber = queue.Queue(maxsize=max_pending)
+        with self._lock:
+            self._subscribers.append(subscriber)
+        return subscriber
+    
+    def unsubscribe(self, subscriber: queue.Queue):
+        with self._lock:
+            if subscriber in self._subscribers:
+                self._subscribers.remove(subscriber)
+    
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+    
+    def sample(self) -> Dict:
+        """Take one sample; never blocks on a CPU measurement interval"""
+        now = time.time()
+        if not PSUTIL_AVAILABLE:
+            error = {'error': 'psutil not available'}
+            return {'sampled_at': now, 'timestamp': datetime.now().isoformat(),
+                    'cpu': error, 'memory': error, 'disk': error, 'network': error}
+        
+        if self._ticks % self.slow_every == 0 or not self._slow:
+            self._slow = self._sample_slow()
+        self._ticks += 1
+        
+        return {
+            'sampled_at': now,
+            'timestamp': datetime.now().isoformat(),
+            'cpu': self._sample_cpu(),
+            'memory': self._sample_memory(),
+            'disk': self._sample_disk(),
+            'network': self._sample_network(now)
+        }
+    
+    def _sample_slow(self) -> Dict[str, Any]:
+        partitions = []
+        try:
+            for partition in psutil.disk_partitions(all=False):
+                try:
+                    usage = psutil.disk_usage(partition.mountpoint)
+                    partitions.append({
+                        'device': partition.device,
+                        'mountpoint': partition.mountpoint,
+                        'fstype': partition.fstype,
+                        'total': usage.total,
+                        'used': usage.used,
+                        'free': usage.free,
+                        'percent': usage.percent,
+                        'total_gb': round(usage.total / (1024**3), 2),
+                        'used_gb': round(usage.used / (1024**3), 2),
+                        'free_gb': round(usage.free / (1024**3), 2)
+                    })
+                except (PermissionError, OSError):
+                    continue
+        except Exception as e:
+            logger.debug(f"Error reading disk partitions: {e}")
+        
+        try:
+            connections = len(psutil.net_connections(kind='inet'))
+        except (psutil.AccessDenied, OSError):
+            connections = None
+        
+        return {'partitions': partitions, 'connections': connections}
+    
+    def _sample_cpu(self) -> Dict:
+        cpu_freq = psutil.cpu_freq()
+        return {
+            'total_percent': psutil.cpu_percent(interval=None),
+            'per_core': psutil.cpu_percent(interval=None, percpu=True),
+            'frequency': {
+                'current': cpu_freq.current,
+                'min': cpu_freq.min,
+                'max': cpu_freq.max
+            } if cpu_freq else None,
+            'cores_physical': psutil.cpu_count(logical=False),
+            'cores_logical': psutil.cpu_count(logical=True),
+            'load_avg': list(psutil.getloadavg()) if hasattr(psutil, 'getloadavg') else None
+        }
+    
+    def _sample_memory(self) -> Dict:
+        mem = psutil.virtual_memory()
+        swap = psutil.swap_memory()
+        return {
+            'ram': {
+                'total': mem.total,
+                'available': mem.available,
+                'used': mem.used,
+                'free': mem.free,
+                'percent': mem.percent,
+                'total_gb': round(mem.total / (1024**3), 2),
+                'used_gb': round(mem.used / (1024**3), 2),
+                'available_gb': round(mem.available / (1024**3), 2)
+            },
+            'swap': {
+                'total': swap.total,
+                'used': swap.used,
+                'free': swap.free,
+                'percent': swap.percent,
+                'total_gb': round(swap.total / (1024**3), 2),
+                'used_gb': round(swap.used / (1024**3), 2)
+            }
+        }
+    
+    def _sample_disk(self) -> Dict:
+        root = psutil.disk_usage('/')
+        disk_io = psutil.disk_io_counters()
+        io_stats = None
+        if disk_io:
+            io_stats = {
+                'read_bytes': disk_io.read_bytes,
+                'write_bytes': disk_io.write_bytes,
+                'read_count': disk_io.read_count,
+                'write_count': disk_io.write_count,
+                'read_gb': round(disk_io.read_bytes / (1024**3), 2),
+                'write_gb': round(disk_io.write_bytes / (1024**3), 2)
+            }
+        return {
+            'root': {
+                'total': root.total,
+                'used': root.used,
+                'free': root.free,
+                'percent': root.percent
+            },
+            'partitions': self._slow.get('partitions', []),
+            'io': io_stats
+        }
+    
+    def _sample_network(self, now: float) -> Dict:
+        net_io = psutil.net_io_counters()
+        interfaces = []
+        for nic, stats in psutil.net_io_counters(pernic=True).items():
+            interfaces.append({
+                'name': nic,
+                'bytes_sent': stats.bytes_sent,
+                'bytes_recv': stats.bytes_recv,
+                'packets_sent': stats.packets_sent,
+                'packets_recv': stats.packets_recv,
+                'sent_mb': round(stats.bytes_sent / (1024**2), 2),
+                'recv_mb': round(stats.bytes_recv / (1024**2), 2)
+            })
+        
+        rates = None
+        if self._previous_net is not None and now > self._previous_time:
+            elapsed = now - self._previous_time
+            rates = {
+                'sent_bytes_per_sec': round((net_io.bytes_sent - self._previous_net.bytes_sent) / elapsed, 1),
+                'recv_bytes_per_sec': round((net_io.bytes_recv - self._previous_net.bytes_recv) / elapsed, 1)
+            }
+        self._previous_net, self._previous_time = net_io, now
+        
+        return {
+            'total': {
+                'bytes_sent': net_io.bytes_sent,
+                'bytes_recv': net_io.bytes_recv,
+                'packets_sent': net_io.packets_sent,
+                'packets_recv': net_io.packets_recv,
+                'sent_gb': round(net_io.bytes_sent / (1024**3), 2),
+                'recv_gb': round(net_io.bytes_recv / (1024**3), 2)
+            },
+            'rates': rates,
+            'interfaces': interfaces,
+            'connections': self._slow.get('connections')
+        }
+
+
+host_metrics_sampler = HostMetricsSampler()
+
+__all__ = ['HostMetricsSampler', 'host_metrics_sampler', 'PSUTIL_AVAILABLE']
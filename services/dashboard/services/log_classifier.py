@@ -0,0 +1,135 @@
+"""
+Log Classifier - Shared single-pass level and timestamp detection
+Used by LogService and UnifiedLoggingService on the ingestion hot path
+"""
+import re
+import threading
+from datetime import datetime, timezone
+from typing import Optional, Dict
+
+
+class LogClassifier:
+    """
+    Classifies raw log lines by level and extracts their timestamp.
+    
+    Levels are matched with one compiled alternation regex; the highest
+    priority keyword found in the line wins. Timestamps are located with one
+    alternation regex, and the format that matched is remembered per source
+    so later lines from the same source try that single pattern first.
+    """
+    
+    LEVEL_PRIORITY = ['fatal', 'error', 'warning', 'debug', 'info']
+    LEVEL_RANK = {level: rank for rank, level in enumerate(LEVEL_PRIORITY)}
+    
+    LEVEL_REGEX = re.compile(
+        r'\b(?:'
+        r'(?P<fatal>fatal|critical)'
+        r'|(?P<error>error|err|exception|fail(?:ed)?)'
+        r'|(?P<warning>warn(?:ing)?|caution)'
+        r'|(?P<debug>debug|trace|verbose)'
+        r'|(?P<info>info|notice)'
+        r')\b',
+        re.I
+    )
+    
+    TIMESTAMP_FORMATS = {
+        'iso': r'\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}:\d{2}(?:[.,]\d+)?(?:Z|[+-]\d{2}:?\d{2})?',
+        'slash': r'\d{4}/\d{2}/\d{2} \d{2}:\d{2}:\d{2}',
+        'clf': r'\d{2}/[A-Za-z]{3}/\d{4}:\d{2}:\d{2}:\d{2}',
+        'syslog': r'[A-Za-z]{3}\s+\d{1,2}\s+\d{2}:\d{2}:\d{2}',
+    }
+    
+    STRPTIME_FORMATS = {
+        'slash': '%Y/%m/%d %H:%M:%S',
+        'clf': '%d/%b/%Y:%H:%M:%S',
+        'syslog': '%b %d %H:%M:%S',
+    }
+    
+    TIMESTAMP_REGEX = re.compile(
+        '|'.join(f'(?P<{kind}>{pattern})' for kind, pattern in TIMESTAMP_FORMATS.items())
+    )
+    
+    KIND_REGEXES = {kind: re.compile(pattern) for kind, pattern in TIMESTAMP_FORMATS.items()}
+    
+    MAX_CACHED_SOURCES = 1024
+    
+    def __init__(self):
+        self._source_formats: Dict[str, str] = {}
+        self._lock = threading.Lock()
+    
+    def detect_level(self, message: str) -> Optional[str]:
+        """
+        Detect the log level of a message
+        
+        Returns:
+            One of LEVEL_PRIORITY, or None when no level keyword is present
+        """
+        best = None
+        best_rank = len(self.LEVEL_PRIORITY)
+        for match in self.LEVEL_REGEX.finditer(message):
+            level = match.lastgroup
+            rank = self.LEVEL_RANK[level]
+            if rank < best_rank:
+                best, best_rank = level, rank
+                if rank == 0:
+                    break
+        return best
+    
+    def parse_timestamp(self, line: str, source: Optional[str] = None) -> Optional[datetime]:
+        """
+        Extract a timestamp from a log line
+        
+        Args:
+            line: Raw log line
+            source: Log source name, used to remember the winning format
+        
+        Returns:
+            Naive UTC datetime, or None if no timestamp was found
+        """
+        kind = self._source_formats.get(source) if source else None
+        if kind:
+            match = self.KIND_REGEXES[kind].search(line)
+            if match:
+                parsed = self._convert(kind, match.group(0))
+                if parsed:
+                    return parsed
+        
+        match = self.TIMESTAMP_REGEX.search(line)
+        if not match:
+            return None
+        
+        kind = match.lastgroup
+        parsed = self._convert(kind, match.group(0))
+        if parsed and source:
+            self._remember(source, kind)
+        return parsed
+    
+    def _remember(self, source: str, kind: str):
+        if self._source_formats.get(source) == kind:
+            return
+        with self._lock:
+            if len(self._source_formats) >= self.MAX_CACHED_SOURCES:
+                self._source_formats.clear()
+            self._source_formats[source] = kind
+    
+    def _convert(self, kind: str, value: str) -> Optional[datetime]:
+        try:
+            if kind == 'iso':
+                parsed = datetime.fromisoformat(value.replace(',', '.', 1))
+                if parsed.tzinfo is not None:
+                    parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+                return parsed
+            
+            value = ' '.join(value.split())
+            if kind == 'syslog':
+                return datetime.strptime(f'{datetime.utcnow().year} {value}', '%Y ' + self.STRPTIME_FORMATS[kind])
+            return datetime.strptime(value, self.STRPTIME_FORMATS[kind])
+        except ValueError:
+            return None
+    
+    def get_cached_formats(self) -> Dict[str, str]:
+        """Get the learned timestamp format per source"""
+        return dict(self._source_formats)
+
+
+log_classifier = LogClassifier()
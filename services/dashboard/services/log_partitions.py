@@ -0,0 +1,226 @@
+"""
+Log Partition Manager
+Daily range partitions for the high-volume log tables (PostgreSQL only)
+"""
+import logging
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional, Any
+
+from sqlalchemy import func, select, text
+
+from config import Config
+from services.db_service import db_service
+
+logger = logging.getLogger(__name__)
+
+
+class LogPartitionManager:
+    """
+    Creates and drops daily partitions of the log tables
+    
+    Tables are converted to RANGE (timestamp) partitioning by migration
+    032. Partitions are named ``<table>_pYYYYMMDD`` and cover one UTC day;
+    rows outside every daily range land in ``<table>_default``. Retention
+    drops whole partitions instead of deleting rows, so cleanup does not
+    bloat or lock the table.
+    
+    Retention of the log tables comes from ``LogRetentionService``;
+    ``log_entries`` is only expired once a retention is configured for it,
+    and never sooner than the longest ``LogStream.retention_days``.
+    """
+    
+    PARTITIONED_TABLES = ('unified_logs', 'log_entries')
+    
+    def __init__(self, days_ahead: Optional[int] = None, tables: Optional[Dict[str, int]] = None):
+        self.days_ahead = Config.LOG_PARTITION_DAYS_AHEAD if days_ahead is None else days_ahead
+        # Table name -> retention days for other daily-partitioned tables that reuse
+        # this manager; None resolves the log tables' retention on every run
+        self.tables = dict(tables) if tables is not None else None
+    
+    @staticmethod
+    def partition_name(table: str, day: date) -> str:
+        return f"{table}_p{day:%Y%m%d}"
+    
+    @staticmethod
+    def _partition_day(table: str, name: str) -> Optional[date]:
+        prefix = f"{table}_p"
+        if not name.startswith(prefix):
+            return None
+        try:
+            return datetime.strptime(name[len(prefix):], '%Y%m%d').date()
+        except ValueError:
+            return None
+    
+    def is_partitioned(self, session, table: str) -> bool:
+        if session.get_bind().dialect.name != 'postgresql':
+            return False
+        return session.execute(text("""
+            SELECT 1 FROM pg_partitioned_table pt
+            JOIN pg_class c ON c.oid = pt.partrelid
+            WHERE c.relname = :table
+        """), {'table': table}).first() is not None
+    
+    def list_partitions(self, session, table: str) -> List[Dict[str, Any]]:
+        """List daily partitions of a table with their day and estimated rows"""
+        rows = session.execute(text("""
+            SELECT child.relname, child.reltuples
+            FROM pg_inherits i
+            JOIN pg_class parent ON parent.oid = i.inhparent
+            JOIN pg_class child ON child.oid = i.inhrelid
+            WHERE parent.relname = :table
+        """), {'table': table}).all()
+        
+        partitions = []
+        for name, estimated_rows in rows:
+            partitions.append({
+                'name': name,
+                'day': self._partition_day(table, name),
+                'estimated_rows': max(int(estimated_rows), 0)
+            })
+        return sorted(partitions, key=lambda p: (p['day'] is None, p['day'] or date.min))
+    
+    def retention_policy(self, session) -> Dict[str, Optional[int]]:
+        """
+        Retention days per table; None means partitions are created but
+        never dropped
+        """
+        if self.tables is not None:
+            return dict(self.tables)
+        
+        from services.log_retention import log_retention_service
+        configured = log_retention_service.get_retention_config()
+        policy = {'unified_logs': configured.get('unified_logs'), 'log_entries': None}
+        
+        if configured.get('log_entries') is not None:
+            longest_stream = None
+            try:
+                from models.logs import LogStream
+                with session.begin_nested():
+                    longest_stream = session.execute(select(func.max(LogStream.retention_days))).scalar()
+            except Exception as e:
+                logger.warning(f"Could not read log stream retention: {e}")
+            policy['log_entries'] = max(configured['log_entries'], longest_stream or 0)
+        
+        return policy
+    
+    def ensure_partitions(self, session, table: str, start: Optional[date] = None,
+                          days_ahead: Optional[int] = None) -> List[str]:
+        """
+        Create any missing daily partitions from ``start`` (default today)
+        through ``days_ahead`` days in the future
+        
+        Returns:
+            Names of partitions that were created
+        """
+        start = start or datetime.utcnow().date()
+        days_ahead = self.days_ahead if days_ahead is None else days_ahead
+        existing = {p['name'] for p in self.list_partitions(session, table)}
+        
+        created = []
+        for offset in range((datetime.utcnow().date() - start).days + days_ahead + 1):
+            day = start + timedelta(days=offset)
+            name = self.partition_name(table, day)
+            if name in existing:
+                continue
+            try:
+                with session.begin_nested():
+                    session.execute(text(
+                        f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF {table} "
+                        f"FOR VALUES FROM ('{day.isoformat()}') TO ('{(day + timedelta(days=1)).isoformat()}')"
+                    ))
+                created.append(name)
+            except Exception as e:
+                # Fails when the default partition already holds rows for this day
+                logger.error(f"Could not create partition {name}: {e}")
+        
+        if created:
+            logger.info(f"Created {len(created)} partitions for {table}: {', '.join(created)}")
+        return created
+    
+    def drop_expired_partitions(self, session, table: str, retention_days: int,
+                                dry_run: bool = False) -> Dict[str, Any]:
+        """
+        Drop daily partitions that end on or before the retention cutoff
+        
+        Rows that landed in the default partition are cleaned with a DELETE,
+        which stays cheap because only out-of-range rows end up there.
+        ``deleted_rows`` is an exact count (what would be deleted on a dry run).
+        """
+        cutoff = datetime.utcnow() - timedelta(days=retention_days)
+        expired = [
+            p for p in self.list_partitions(session, table)
+            if p['day'] is not None and p['day'] + timedelta(days=1) <= cutoff.date()
+        ]
+        partition_rows = sum(
+            session.execute(text(f"SELECT count(*) FROM {p['name']}")).scalar() or 0
+            for p in expired
+        )
+        
+        result = {
+            'table': table,
+            'cutoff_date': cutoff.isoformat(),
+            'retention_days': retention_days,
+            'partitions': [p['name'] for p in expired],
+            'dry_run': dry_run
+        }
+        if dry_run:
+            default_rows = session.execute(
+                text(f"SELECT count(*) FROM {table}_default WHERE timestamp < :cutoff"),
+                {'cutoff': cutoff}
+            ).scalar() or 0
+            result['deleted_rows'] = partition_rows + default_rows
+            return result
+        
+        for partition in expired:
+            session.execute(text(f"DROP TABLE IF EXISTS {partition['name']}"))
+        
+        default_deleted = session.execute(
+            text(f"DELETE FROM {table}_default WHERE timestamp < :cutoff"),
+            {'cutoff': cutoff}
+        ).rowcount
+        
+        result['default_deleted'] = default_deleted
+        result['deleted_rows'] = partition_rows + default_deleted
+        logger.info(
+            f"Dropped {len(expired)} partitions ({partition_rows} rows) from {table}, "
+            f"deleted {default_deleted} rows from {table}_default"
+        )
+        return result
+    
+    def maintain(self, retention: Optional[Dict[str, int]] = None) -> Dict[str, Any]:
+        """
+        Pre-create upcoming partitions and drop expired ones for every table
+        
+        Args:
+            retention: Optional retention days per table, overriding the policy
+        """
+        if not db_service.is_available:
+            return {'success': False, 'error': 'Database not available'}
+        
+        with db_service.get_session() as session:
+            policy = self.retention_policy(session)
+        retention = {**policy, **(retention or {})}
+        results = {}
+        
+        for table, retention_days in retention.items():
+            try:
+                with db_service.get_session() as session:
+                    if not self.is_partitioned(session, table):
+                        results[table] = {'partitioned': False}
+                        continue
+                    created = self.ensure_partitions(session, table)
+                    if retention_days is None:
+                        results[table] = {'partitioned': True, 'created': created, 'retention_days': None}
+                        continue
+                    dropped = self.drop_expired_partitions(session, table, retention_days)
+                    results[table] = {'partitioned': True, 'created': created, **dropped}
+            except Exception as e:
+                logger.error(f"Partition maintenance failed for {table}: {e}")
+                results[table] = {'error': str(e)}
+        
+        return {'success': True, 'tables': results}
+
+
+log_partition_manager = LogPartitionManager()
+
+__all__ = ['LogPartitionManager', 'log_partition_manager']
@@ -204,6 +204,25 @@ class LogRetentionService:
             
             with db_service.get_session() as session:
                 from sqlalchemy import func
+                from services.log_partitions import log_partition_manager
+                
+                table_name = model_class.__tablename__
+                if log_partition_manager.is_partitioned(session, table_name):
+                    retention_days = (datetime.utcnow() - cutoff_date).days
+                    result = log_partition_manager.drop_expired_partitions(
+                        session, table_name, retention_days, dry_run=dry_run
+                    )
+                    if dry_run:
+                        return {
+                            'would_delete': result['deleted_rows'],
+                            'partitions': result['partitions'],
+                            'dry_run': True
+                        }
+                    return {
+                        'deleted': result['deleted_rows'],
+                        'partitions': result['partitions'],
+                        'dry_run': False
+                    }
                 
                 timestamp_attr = getattr(model_class, timestamp_col)
                 
@@ -9,9 +9,17 @@ import json
 import queue
 import threading
 import subprocess
+import time
+import atexit
+import heapq
 from datetime import datetime, timedelta
 from typing import Optional, List, Dict, Any, Generator
 from collections import deque
+from functools import lru_cache
+
+from config import Config
+from services.log_classifier import log_classifier
+from services.pagination import count_rows, apply_keyset, split_keyset_page
 
 logger = logging.getLogger(__name__)
 
@@ -25,6 +33,136 @@ except ImportError:
         logger.warning("Docker SDK not available - Docker log parsing disabled")
 
 
+@lru_cache(maxsize=256)
+def _compile_search(pattern: str):
+    """Compile a case-insensitive search pattern, None if it is not a valid regex"""
+    try:
+        return re.compile(pattern, re.IGNORECASE)
+    except re.error:
+        return None
+
+
+class LogFilter:
+    """
+    Compiled source/level/search filter for log entries.
+    
+    Filters with the same normalized ``key`` behave identically, so callers
+    can evaluate one filter per distinct key instead of one per client.
+    """
+    
+    def __init__(self, source: str = None, level=None, search: str = None):
+        self.source = source or None
+        if isinstance(level, str):
+            level = level.split(',')
+        self.levels = frozenset(l.strip().lower() for l in level if l.strip()) if level else None
+        self.search = search or None
+        self._pattern = _compile_search(search) if search else None
+        self._needle = search.lower() if search and self._pattern is None else None
+        self.key = (self.source, self.levels, self.search)
+    
+    @classmethod
+    def from_dict(cls, filters: dict = None) -> 'LogFilter':
+        filters = filters or {}
+        return cls(filters.get('source'), filters.get('level'), filters.get('search'))
+    
+    @property
+    def is_empty(self) -> bool:
+        return self.source is None and self.levels is None and self.search is None
+    
+    def matches_message(self, entry: dict) -> bool:
+        if self.search is None:
+            return True
+        message = entry.get('message', '')
+        if self._pattern is not None:
+            return self._pattern.search(message) is not None
+        return self._needle in message.lower()
+    
+    def matches(self, entry: dict) -> bool:
+        if self.source is not None and entry.get('source') != self.source:
+            return False
+        if self.levels is not None and (entry.get('level') or '').lower() not in self.levels:
+            return False
+        return self.matches_message(entry)
+
+
+class LogRingBuffer:
+    """
+    Fixed-size in-memory log buffer with per-source and per-level indexes.
+    
+    Entries are addressed by a monotonically increasing sequence number, so
+    evicting the oldest entry and trimming the indexes is O(1). Queries walk
+    the narrowest index newest-first and stop once enough matches are found,
+    instead of copying and filtering the whole buffer.
+    """
+    
+    def __init__(self, capacity: int = 1000):
+        self.capacity = capacity
+        self._slots: List[Optional[dict]] = [None] * capacity
+        self._next_seq = 0
+        self._by_source: Dict[str, deque] = {}
+        self._by_level: Dict[str, deque] = {}
+        self._lock = threading.Lock()
+    
+    def __len__(self) -> int:
+        return min(self._next_seq, self.capacity)
+    
+    @property
+    def maxlen(self) -> int:
+        return self.capacity
+    
+    def _trim_index(self, index: Dict[str, deque], key: str, seq: int):
+        seqs = index.get(key)
+        if seqs and seqs[0] == seq:
+            seqs.popleft()
+            if not seqs:
+                del index[key]
+    
+    def append(self, entry: dict):
+        with self._lock:
+            seq = self._next_seq
+            slot = seq % self.capacity
+            evicted = self._slots[slot]
+            if evicted is not None:
+                evicted_seq = seq - self.capacity
+                self._trim_index(self._by_source, evicted.get('source'), evicted_seq)
+                self._trim_index(self._by_level, evicted.get('level'), evicted_seq)
+            
+            self._slots[slot] = entry
+            self._by_source.setdefault(entry.get('source'), deque()).append(seq)
+            self._by_level.setdefault(entry.get('level'), deque()).append(seq)
+            self._next_seq = seq + 1
+    
+    def _candidate_seqs(self, log_filter: LogFilter):
+        if log_filter.source is not None:
+            return reversed(self._by_source.get(log_filter.source, ()))
+        if log_filter.levels is not None:
+            indexes = [self._by_level[l] for l in log_filter.levels if l in self._by_level]
+            if len(indexes) == 1:
+                return reversed(indexes[0])
+            return heapq.merge(*(reversed(seqs) for seqs in indexes), reverse=True)
+        return range(self._next_seq - 1, self._next_seq - 1 - len(self), -1)
+    
+    def query(self, log_filter: LogFilter, limit: int = 100, offset: int = 0) -> List[dict]:
+        """Return matching entries newest-first"""
+        wanted = offset + limit
+        results = []
+        with self._lock:
+            for seq in self._candidate_seqs(log_filter):
+                entry = self._slots[seq % self.capacity]
+                if log_filter.matches(entry):
+                    results.append(entry)
+                    if len(results) >= wanted:
+                        break
+        return results[offset:wanted]
+    
+    def get_index_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'sources': {k: len(v) for k, v in self._by_source.items()},
+                'levels': {k: len(v) for k, v in self._by_level.items()},
+            }
+
+
 class SSELogClient:
     """Server-Sent Events client for log streaming"""
     def __init__(self, client_id: str, filters: dict = None):
@@ -32,68 +170,224 @@ class SSELogClient:
         self.queue = queue.Queue(maxsize=1000)
         self.connected = True
         self.filters = filters or {}
+        self.log_filter = LogFilter.from_dict(self.filters)
         self.created_at = datetime.now()
+        self.dropped = 0
     
     def send(self, log_entry: dict) -> bool:
         if not self.connected:
             return False
         if not self._matches_filters(log_entry):
             return False
+        return self.deliver(log_entry)
+    
+    def deliver(self, log_entry: dict) -> bool:
+        """Queue an entry that is already known to match this client's filter"""
         try:
             self.queue.put_nowait(log_entry)
             return True
         except queue.Full:
+            self.dropped += 1
             return False
     
     def _matches_filters(self, entry: dict) -> bool:
-        if 'source' in self.filters and self.filters['source']:
-            if entry.get('source') != self.filters['source']:
-                return False
-        if 'level' in self.filters and self.filters['level']:
-            levels = self.filters['level'] if isinstance(self.filters['level'], list) else [self.filters['level']]
-            if entry.get('level', '').lower() not in [l.lower() for l in levels]:
+        return self.log_filter.matches(entry)
+    
+    def disconnect(self):
+        self.connected = False
+
+
+class LogWriteBuffer:
+    """
+    Bounded write-behind queue for log persistence.
+    
+    Producers enqueue rows without touching the database; a background flusher
+    hands them to ``flush_fn`` in batches once ``batch_size`` rows are pending or
+    ``flush_interval`` seconds have passed. When the queue is full a producer
+    waits up to ``block_timeout`` seconds (backpressure) and the row is dropped
+    and counted after that.
+    """
+    
+    def __init__(
+        self,
+        flush_fn,
+        max_size: int = 20000,
+        batch_size: int = 500,
+        flush_interval: float = 1.0,
+        block_timeout: float = 0.0
+    ):
+        self.flush_fn = flush_fn
+        self.max_size = max_size
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.block_timeout = block_timeout
+        self._queue = queue.Queue(maxsize=max_size)
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._thread_lock = threading.Lock()
+        self._atexit_registered = False
+        self._stats_lock = threading.Lock()
+        self._stats = {
+            'enqueued': 0,
+            'written': 0,
+            'failed': 0,
+            'dropped': 0,
+            'blocked': 0,
+            'batches': 0,
+        }
+        self.last_batch_size = 0
+        self.last_flush_ms = 0.0
+        self.last_flush_at: Optional[datetime] = None
+    
+    def _count(self, key: str, amount: int = 1):
+        with self._stats_lock:
+            self._stats[key] += amount
+    
+    def _ensure_started(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._thread_lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop_event.clear()
+            self._thread = threading.Thread(
+                target=self._run,
+                name='log-write-buffer',
+                daemon=True
+            )
+            self._thread.start()
+            if not self._atexit_registered:
+                atexit.register(self.stop)
+                self._atexit_registered = True
+    
+    def submit(self, row: dict) -> bool:
+        """Enqueue a row for persistence, returns False if it was dropped"""
+        self._ensure_started()
+        try:
+            self._queue.put_nowait(row)
+        except queue.Full:
+            if self.block_timeout <= 0:
+                self._count('dropped')
                 return False
-        if 'search' in self.filters and self.filters['search']:
-            pattern = self.filters['search']
-            message = entry.get('message', '')
+            self._count('blocked')
             try:
-                if not re.search(pattern, message, re.IGNORECASE):
-                    return False
-            except re.error:
-                if pattern.lower() not in message.lower():
-                    return False
+                self._queue.put(row, timeout=self.block_timeout)
+            except queue.Full:
+                self._count('dropped')
+                return False
+        self._count('enqueued')
         return True
     
-    def disconnect(self):
-        self.connected = False
+    def _collect_batch(self) -> List[dict]:
+        try:
+            batch = [self._queue.get(timeout=self.flush_interval)]
+        except queue.Empty:
+            return []
+        
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size and not self._stop_event.is_set():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+    
+    def _drain(self) -> List[dict]:
+        batch = []
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+    
+    def _write(self, batch: List[dict]):
+        started = time.monotonic()
+        try:
+            written = self.flush_fn(batch)
+            written = len(batch) if written is None else written
+        except Exception as e:
+            logger.error(f"Failed to persist batch of {len(batch)} log entries: {e}")
+            written = 0
+        
+        with self._stats_lock:
+            self._stats['written'] += written
+            self._stats['failed'] += len(batch) - written
+            self._stats['batches'] += 1
+            self.last_batch_size = len(batch)
+            self.last_flush_ms = round((time.monotonic() - started) * 1000, 2)
+            self.last_flush_at = datetime.utcnow()
+    
+    def _run(self):
+        while not self._stop_event.is_set():
+            batch = self._collect_batch()
+            if batch:
+                self._write(batch)
+    
+    def flush(self) -> int:
+        """Synchronously write everything currently queued"""
+        total = 0
+        while True:
+            batch = self._drain()
+            if not batch:
+                return total
+            self._write(batch)
+            total += len(batch)
+    
+    def stop(self, timeout: float = 5.0):
+        """Stop the flusher thread and write any remaining rows"""
+        self._stop_event.set()
+        if self._thread is not None and self._thread.is_alive():
+            self._thread.join(timeout=timeout)
+        self.flush()
+    
+    def get_stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            stats = dict(self._stats)
+            stats.update({
+                'queue_depth': self._queue.qsize(),
+                'queue_max': self.max_size,
+                'batch_size': self.batch_size,
+                'flush_interval': self.flush_interval,
+                'last_batch_size': self.last_batch_size,
+                'last_flush_ms': self.last_flush_ms,
+                'last_flush_at': self.last_flush_at.isoformat() if self.last_flush_at else None,
+                'running': self._thread is not None and self._thread.is_alive(),
+            })
+        return stats
 
 
 class LogService:
     """Unified log aggregation service"""
     
-    LEVEL_PATTERNS = {
-        'error': re.compile(r'\b(error|err|fatal|critical|exception|fail(ed)?)\b', re.I),
-        'warning': re.compile(r'\b(warn(ing)?|caution)\b', re.I),
-        'debug': re.compile(r'\b(debug|trace|verbose)\b', re.I),
-        'info': re.compile(r'\b(info|notice)\b', re.I),
+    LEVEL_MAP = {
+        'fatal': 'error',
+        'error': 'error',
+        'warning': 'warning',
+        'debug': 'debug',
+        'info': 'info',
     }
     
-    TIMESTAMP_PATTERNS = [
-        re.compile(r'(\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}:\d{2}(?:\.\d+)?(?:Z|[+-]\d{2}:?\d{2})?)', re.I),
-        re.compile(r'(\w{3}\s+\d{1,2}\s+\d{2}:\d{2}:\d{2})', re.I),
-        re.compile(r'(\d{2}/\w{3}/\d{4}:\d{2}:\d{2}:\d{2})', re.I),
-    ]
-    
     def __init__(self, max_buffer=1000):
         self.max_buffer = max_buffer
-        self.log_buffer = deque(maxlen=max_buffer)
-        self.buffer_lock = threading.Lock()
+        self.log_buffer = LogRingBuffer(max_buffer)
         self.sse_clients: Dict[str, SSELogClient] = {}
+        self._sse_filter_groups: Dict[tuple, Dict[str, Any]] = {}
         self.sse_lock = threading.Lock()
         self.docker_client = None
         self._init_docker()
         self.watching_files: Dict[str, threading.Thread] = {}
         self.watch_stop_events: Dict[str, threading.Event] = {}
+        self.write_buffer = LogWriteBuffer(
+            self._persist_entries,
+            max_size=Config.LOG_PERSIST_QUEUE_SIZE,
+            batch_size=Config.LOG_PERSIST_BATCH_SIZE,
+            flush_interval=Config.LOG_PERSIST_FLUSH_INTERVAL,
+            block_timeout=Config.LOG_PERSIST_BLOCK_TIMEOUT
+        )
     
     def _init_docker(self):
         if DOCKER_AVAILABLE:
@@ -117,30 +411,10 @@ class LogService:
             return None
     
     def _detect_level(self, message: str, source: str = None) -> str:
-        for level, pattern in self.LEVEL_PATTERNS.items():
-            if pattern.search(message):
-                return level
-        return 'info'
-    
-    def _parse_timestamp(self, line: str) -> Optional[datetime]:
-        for pattern in self.TIMESTAMP_PATTERNS:
-            match = pattern.search(line)
-            if match:
-                ts_str = match.group(1)
-                for fmt in [
-                    '%Y-%m-%dT%H:%M:%S.%fZ',
-                    '%Y-%m-%dT%H:%M:%S.%f%z',
-                    '%Y-%m-%dT%H:%M:%S%z',
-                    '%Y-%m-%d %H:%M:%S.%f',
-                    '%Y-%m-%d %H:%M:%S',
-                    '%b %d %H:%M:%S',
-                    '%d/%b/%Y:%H:%M:%S',
-                ]:
-                    try:
-                        return datetime.strptime(ts_str, fmt)
-                    except ValueError:
-                        continue
-        return None
+        return self.LEVEL_MAP.get(log_classifier.detect_level(message), 'info')
+    
+    def _parse_timestamp(self, line: str, source: str = None) -> Optional[datetime]:
+        return log_classifier.parse_timestamp(line, source)
     
     def add_log_entry(
         self,
@@ -157,7 +431,7 @@ class LogService:
         if level is None:
             level = self._detect_level(message, source)
         if timestamp is None:
-            timestamp = self._parse_timestamp(message) or datetime.utcnow()
+            timestamp = self._parse_timestamp(message, source) or datetime.utcnow()
         
         entry = {
             'id': None,
@@ -171,54 +445,77 @@ class LogService:
             'stream_id': stream_id
         }
         
-        with self.buffer_lock:
-            self.log_buffer.append(entry)
+        self.log_buffer.append(entry)
         
         self._broadcast_to_sse(entry)
         
         if persist:
-            self._persist_entry(entry)
+            ingested_at = datetime.utcnow()
+            self.write_buffer.submit({
+                'source': entry['source'],
+                'level': entry['level'],
+                'message': entry['message'],
+                'container_name': container_name,
+                'host': host,
+                'metadata_json': metadata,
+                'stream_id': stream_id,
+                'timestamp': ingested_at,
+                'year_month': ingested_at.strftime('%Y-%m'),
+            })
         
         return entry
     
-    def _persist_entry(self, entry: dict):
-        try:
-            from models.logs import LogEntry
-            session = self._get_db_session()
-            if not session:
-                return
-            
-            with session:
-                log_entry = LogEntry.create_entry(
-                    source=entry['source'],
-                    level=entry['level'],
-                    message=entry['message'],
-                    container_name=entry.get('container_name'),
-                    host=entry.get('host'),
-                    metadata_json=entry.get('metadata'),
-                    stream_id=entry.get('stream_id')
-                )
-                session.add(log_entry)
-                session.commit()
-                entry['id'] = log_entry.id
-        except Exception as e:
-            logger.error(f"Failed to persist log entry: {e}")
+    def _persist_entries(self, rows: List[dict]) -> int:
+        from sqlalchemy import insert
+        from models.logs import LogEntry
+        session_cm = self._get_db_session()
+        if not session_cm:
+            return 0
+        
+        # get_session() commits when the block exits
+        with session_cm as session:
+            session.execute(insert(LogEntry), rows)
+        return len(rows)
+    
+    def flush_persisted_logs(self) -> int:
+        """Write all queued log entries to the database immediately"""
+        return self.write_buffer.flush()
     
     def _broadcast_to_sse(self, entry: dict):
+        """Evaluate each distinct client filter once, then fan out to its clients"""
         with self.sse_lock:
             disconnected = []
-            for client_id, client in self.sse_clients.items():
-                if not client.connected:
-                    disconnected.append(client_id)
-                else:
-                    client.send(entry)
+            for group in self._sse_filter_groups.values():
+                if not group['filter'].matches(entry):
+                    continue
+                for client in group['clients'].values():
+                    if not client.connected:
+                        disconnected.append(client.client_id)
+                    else:
+                        client.deliver(entry)
             for client_id in disconnected:
-                del self.sse_clients[client_id]
+                self._remove_sse_client(client_id)
+    
+    def _remove_sse_client(self, client_id: str):
+        client = self.sse_clients.pop(client_id, None)
+        if client is None:
+            return
+        key = client.log_filter.key
+        group = self._sse_filter_groups.get(key)
+        if group:
+            group['clients'].pop(client_id, None)
+            if not group['clients']:
+                del self._sse_filter_groups[key]
     
     def register_sse_client(self, client_id: str, filters: dict = None) -> SSELogClient:
         with self.sse_lock:
             client = SSELogClient(client_id, filters)
             self.sse_clients[client_id] = client
+            group = self._sse_filter_groups.setdefault(
+                client.log_filter.key,
+                {'filter': client.log_filter, 'clients': {}}
+            )
+            group['clients'][client_id] = client
             logger.info(f"SSE client registered: {client_id}")
             return client
     
@@ -226,7 +523,7 @@ class LogService:
         with self.sse_lock:
             if client_id in self.sse_clients:
                 self.sse_clients[client_id].disconnect()
-                del self.sse_clients[client_id]
+                self._remove_sse_client(client_id)
                 logger.info(f"SSE client unregistered: {client_id}")
     
     def get_buffered_logs(
@@ -237,23 +534,33 @@ class LogService:
         limit: int = 100,
         offset: int = 0
     ) -> List[dict]:
-        with self.buffer_lock:
-            logs = list(self.log_buffer)
+        return self.log_buffer.query(LogFilter(source, level, search), limit, offset)
+    
+    def _query_buffer_fallback(self, source, level, search, limit, offset, cursor, error: str = None) -> Dict[str, Any]:
+        """
+        Answer query_logs from the in-memory buffer when the database is unavailable
         
-        if source:
-            logs = [l for l in logs if l.get('source') == source]
-        if level:
-            levels = level.split(',') if isinstance(level, str) else level
-            logs = [l for l in logs if l.get('level', '').lower() in [lv.lower() for lv in levels]]
-        if search:
-            try:
-                pattern = re.compile(search, re.IGNORECASE)
-                logs = [l for l in logs if pattern.search(l.get('message', ''))]
-            except re.error:
-                logs = [l for l in logs if search.lower() in l.get('message', '').lower()]
+        Buffered entries have no row ids, so keyset cursors cannot be resumed
+        against them; cursor requests get an error instead of a wrong page.
+        """
+        if cursor is not None:
+            return {
+                'logs': [],
+                'source': 'buffer',
+                'limit': limit,
+                'next_cursor': None,
+                'has_more': False,
+                'error': f"Cursor pagination requires the database{': ' + error if error else ''}"
+            }
         
-        logs.reverse()
-        return logs[offset:offset + limit]
+        result = {
+            'logs': self.get_buffered_logs(source, level, search, limit, offset),
+            'total': len(self.log_buffer),
+            'source': 'buffer'
+        }
+        if error:
+            result['error'] = error
+        return result
     
     def query_logs(
         self,
@@ -265,19 +572,16 @@ class LogService:
         container_name: str = None,
         limit: int = 100,
         offset: int = 0,
-        stream_id: int = None
+        stream_id: int = None,
+        cursor: str = None
     ) -> Dict[str, Any]:
         try:
             from models.logs import LogEntry
-            session = self._get_db_session()
-            if not session:
-                return {
-                    'logs': self.get_buffered_logs(source, level, search, limit, offset),
-                    'total': len(self.log_buffer),
-                    'source': 'buffer'
-                }
+            session_cm = self._get_db_session()
+            if not session_cm:
+                return self._query_buffer_fallback(source, level, search, limit, offset, cursor)
             
-            with session:
+            with session_cm as session:
                 query = session.query(LogEntry)
                 
                 if source:
@@ -296,24 +600,31 @@ class LogService:
                 if stream_id:
                     query = query.filter(LogEntry.stream_id == stream_id)
                 
-                total = query.count()
+                if cursor is not None:
+                    logs = apply_keyset(query, LogEntry.timestamp, LogEntry.id, cursor, limit).all()
+                    logs, next_cursor = split_keyset_page(logs, LogEntry.timestamp, LogEntry.id, limit)
+                    return {
+                        'logs': [log.to_dict() for log in logs],
+                        'source': 'database',
+                        'limit': limit,
+                        'next_cursor': next_cursor,
+                        'has_more': next_cursor is not None
+                    }
+                
+                total, estimated = count_rows(session, query.statement)
                 logs = query.order_by(LogEntry.timestamp.desc()).offset(offset).limit(limit).all()
                 
                 return {
                     'logs': [log.to_dict() for log in logs],
                     'total': total,
+                    'total_estimated': estimated,
                     'source': 'database',
                     'limit': limit,
                     'offset': offset
                 }
         except Exception as e:
             logger.error(f"Query logs error: {e}")
-            return {
-                'logs': self.get_buffered_logs(source, level, search, limit, offset),
-                'total': len(self.log_buffer),
-                'source': 'buffer',
-                'error': str(e)
-            }
+            return self._query_buffer_fallback(source, level, search, limit, offset, cursor, str(e))
     
     def full_text_search(
         self,
@@ -325,15 +636,15 @@ class LogService:
     ) -> Dict[str, Any]:
         try:
             from models.logs import LogEntry
-            session = self._get_db_session()
-            if not session:
+            session_cm = self._get_db_session()
+            if not session_cm:
                 return {
                     'results': self.get_buffered_logs(source, level, query, limit),
                     'query': query,
                     'source': 'buffer'
                 }
             
-            with session:
+            with session_cm as session:
                 db_query = session.query(LogEntry)
                 
                 if source:
@@ -703,16 +1014,20 @@ class LogService:
             'buffer_size': len(self.log_buffer),
             'buffer_max': self.max_buffer,
             'sse_clients': len(self.sse_clients),
+            'sse_filter_groups': len(self._sse_filter_groups),
             'docker_available': self.docker_client is not None,
             'docker_containers': len(self.get_docker_containers()) if self.docker_client else 0,
+            'persistence': self.write_buffer.get_stats(),
         }
         
         try:
             from models.logs import LogEntry, LogStream
-            session = self._get_db_session()
-            if session:
-                with session:
-                    stats['total_logs'] = session.query(LogEntry).count()
+            session_cm = self._get_db_session()
+            if session_cm:
+                with session_cm as session:
+                    stats['total_logs'], stats['total_logs_estimated'] = count_rows(
+                        session, session.query(LogEntry.id).statement
+                    )
                     stats['total_streams'] = session.query(LogStream).count()
                     
                     since_hour = datetime.utcnow() - timedelta(hours=1)
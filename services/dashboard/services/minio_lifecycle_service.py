@@ -13,6 +13,7 @@ from minio.commonconfig import Filter
 import json
 
 from config import Config
+from services.object_cleanup import cleanup_prefix
 
 logger = logging.getLogger(__name__)
 
@@ -218,6 +219,30 @@ class MinIOLifecycleService:
         if not self.is_available():
             return {"success": False, "error": "MinIO client not available"}
         
+        try:
+            from services.bucket_stats_index import bucket_stats_index
+            indexed = bucket_stats_index.get_bucket('local', bucket, self.client)
+        except Exception as e:
+            logger.warning(f"Bucket stats index unavailable for {bucket}: {e}")
+            indexed = None
+        
+        if indexed is not None:
+            prefix_stats = {
+                prefix: {**stats, "size_gb": round(stats["size_bytes"] / (1024**3), 2)}
+                for prefix, stats in indexed["prefixes"].items()
+            }
+            return {
+                "success": True,
+                "bucket": bucket,
+                "total_size_bytes": indexed["size_bytes"],
+                "total_size_gb": round(indexed["size_bytes"] / (1024**3), 2),
+                "object_count": indexed["object_count"],
+                "prefix_breakdown": prefix_stats,
+                "indexed_at": indexed["scanned_at"],
+                "pending": indexed.get("pending", False),
+                "timestamp": datetime.utcnow().isoformat()
+            }
+        
         try:
             total_size = 0
             object_count = 0
@@ -263,14 +288,19 @@ class MinIOLifecycleService:
             logger.error(f"Error getting stats for {bucket}: {e}")
             return {"success": False, "error": str(e)}
     
-    def cleanup_old_files(self, bucket: str, prefix: str, days: int) -> Dict[str, Any]:
+    def cleanup_old_files(self, bucket: str, prefix: str, days: int, dry_run: bool = False) -> Dict[str, Any]:
         """
         Manually trigger cleanup of files older than specified days
         
+        Matching objects are deleted in multi-object requests of up to
+        STORAGE_DELETE_BATCH_SIZE keys, with the prefix's sub-prefixes
+        cleaned concurrently.
+        
         Args:
             bucket: Bucket name
             prefix: Object prefix to filter
             days: Delete objects older than this many days
+            dry_run: Only count what would be deleted
         
         Returns:
             Dict with cleanup results
@@ -280,37 +310,35 @@ class MinIOLifecycleService:
         
         try:
             cutoff_date = datetime.utcnow() - timedelta(days=days)
-            deleted_count = 0
-            deleted_size = 0
-            errors = []
             
-            # List objects with prefix
-            objects = self.client.list_objects(bucket, prefix=prefix, recursive=True)
+            def is_expired(obj):
+                return obj.last_modified is not None and obj.last_modified.replace(tzinfo=None) < cutoff_date
             
-            for obj in objects:
-                # Check if object is older than cutoff
-                if obj.last_modified and obj.last_modified.replace(tzinfo=None) < cutoff_date:
-                    try:
-                        self.client.remove_object(bucket, obj.object_name)
-                        deleted_count += 1
-                        deleted_size += obj.size
-                        logger.debug(f"Deleted old object: {obj.object_name}")
-                    except Exception as e:
-                        error_msg = f"Failed to delete {obj.object_name}: {str(e)}"
-                        errors.append(error_msg)
-                        logger.error(error_msg)
+            result = cleanup_prefix(
+                self.client,
+                bucket,
+                prefix,
+                is_expired,
+                workers=Config.STORAGE_CLEANUP_WORKERS,
+                batch_size=Config.STORAGE_DELETE_BATCH_SIZE,
+                dry_run=dry_run
+            )
             
-            logger.info(f"Cleanup completed: {deleted_count} objects deleted from {bucket}/{prefix}")
+            if dry_run:
+                logger.info(f"Cleanup dry run: {result['matched_count']} objects in {bucket}/{prefix} would be deleted")
+            else:
+                result["deleted_size_gb"] = round(result["deleted_size_bytes"] / (1024**3), 2)
+                logger.info(
+                    f"Cleanup completed: {result['deleted_count']} objects deleted from {bucket}/{prefix} "
+                    f"in {result['duration_seconds']}s ({result['delete_requests']} requests)"
+                )
             
             return {
                 "success": True,
                 "bucket": bucket,
                 "prefix": prefix,
-                "deleted_count": deleted_count,
-                "deleted_size_bytes": deleted_size,
-                "deleted_size_gb": round(deleted_size / (1024**3), 2),
                 "cutoff_date": cutoff_date.isoformat(),
-                "errors": errors
+                **result
             }
         
         except S3Error as e:
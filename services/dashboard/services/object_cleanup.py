@@ -0,0 +1,159 @@
+"""
+Object Cleanup Pipeline
+Bulk deletion of S3/MinIO objects: listing candidates are streamed into
+multi-object delete requests of up to 1000 keys, with prefixes cleaned
+concurrently
+"""
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from minio import Minio
+from minio.deleteobjects import DeleteObject
+
+logger = logging.getLogger(__name__)
+
+MAX_DELETE_BATCH = 1000  # S3 DeleteObjects limit
+
+
+class CleanupTotals:
+    """Running counts shared by the threads of one cleanup"""
+    
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.candidates = 0
+        self.candidate_bytes = 0
+        self.deleted = 0
+        self.deleted_bytes = 0
+        self.requests = 0
+        self.errors: List[str] = []
+        self.failed: Set[str] = set()
+    
+    def add(self, **amounts):
+        with self.lock:
+            for name, amount in amounts.items():
+                setattr(self, name, getattr(self, name) + amount)
+    
+    def error(self, message: str):
+        with self.lock:
+            self.errors.append(message)
+
+
+def _delete_batch(client: Minio, bucket: str, batch: List[Tuple[str, int]], totals: CleanupTotals):
+    """Delete one batch in a single request; failures are reported per key"""
+    sizes = dict(batch)
+    failed = set()
+    try:
+        # remove_objects is lazy: the request is only sent while the errors are consumed
+        for error in client.remove_objects(bucket, (DeleteObject(name) for name, _ in batch)):
+            failed.add(error.name)
+            totals.error(f"Failed to delete {error.name}: {error.code} {error.message}")
+    except Exception as e:
+        failed = set(sizes)
+        totals.error(f"Failed to delete batch of {len(batch)} objects from {bucket}: {e}")
+    with totals.lock:
+        totals.failed.update(failed)
+    totals.add(
+        requests=1,
+        deleted=len(sizes) - len(failed),
+        deleted_bytes=sum(size for name, size in sizes.items() if name not in failed)
+    )
+
+
+def _count_batch(client: Minio, bucket: str, batch: List[Tuple[str, int]], totals: CleanupTotals):
+    """Dry-run stand-in for _delete_batch: the request is counted, not sent"""
+    totals.add(requests=1)
+
+
+def delete_objects(client: Minio, bucket: str, objects: Iterable[Tuple[str, int]],
+                   batch_size: int = MAX_DELETE_BATCH, dry_run: bool = False,
+                   totals: Optional[CleanupTotals] = None) -> CleanupTotals:
+    """
+    Delete ``(name, size)`` pairs as they arrive, ``batch_size`` keys per request
+    
+    Only one batch is held in memory, so a listing of any length can be
+    streamed straight in. With ``dry_run`` the batches are formed the same
+    way but only counted, so ``requests`` is what a real run would send.
+    """
+    totals = totals or CleanupTotals()
+    batch_size = max(1, min(batch_size, MAX_DELETE_BATCH))
+    send = _count_batch if dry_run else _delete_batch
+    batch: List[Tuple[str, int]] = []
+    for name, size in objects:
+        totals.add(candidates=1, candidate_bytes=size or 0)
+        batch.append((name, size or 0))
+        if len(batch) >= batch_size:
+            send(client, bucket, batch, totals)
+            batch = []
+    if batch:
+        send(client, bucket, batch, totals)
+    return totals
+
+
+def cleanup_prefix(client: Minio, bucket: str, prefix: str, predicate: Callable[[Any], bool],
+                   workers: int = 8, batch_size: int = MAX_DELETE_BATCH, dry_run: bool = False) -> Dict[str, Any]:
+    """
+    Delete every object under ``prefix`` for which ``predicate(obj)`` is true
+    
+    The prefix is split into its immediate sub-prefixes, which are listed
+    and deleted concurrently by up to ``workers`` threads; objects directly
+    under ``prefix`` are handled as one more unit of work. With
+    ``dry_run`` nothing is deleted and the result estimates the work: how
+    many objects and bytes match and how many delete requests it takes.
+    """
+    started = time.monotonic()
+    totals = CleanupTotals()
+    batch_size = max(1, min(batch_size, MAX_DELETE_BATCH))
+    
+    sub_prefixes = []
+    direct = []
+    for entry in client.list_objects(bucket, prefix=prefix or None, recursive=False):
+        if entry.is_dir:
+            sub_prefixes.append(entry.object_name)
+        elif predicate(entry):
+            direct.append((entry.object_name, entry.size))
+    
+    def clean(sub_prefix: str):
+        try:
+            candidates = (
+                (obj.object_name, obj.size)
+                for obj in client.list_objects(bucket, prefix=sub_prefix, recursive=True)
+                if predicate(obj)
+            )
+            delete_objects(client, bucket, candidates, batch_size, dry_run, totals)
+        except Exception as e:
+            logger.error(f"Cleanup of {bucket}/{sub_prefix} failed: {e}")
+            totals.error(f"Failed to clean {sub_prefix}: {e}")
+    
+    delete_objects(client, bucket, direct, batch_size, dry_run, totals)
+    if sub_prefixes:
+        with ThreadPoolExecutor(max_workers=max(1, min(workers, len(sub_prefixes))),
+                                thread_name_prefix='object-cleanup') as executor:
+            list(executor.map(clean, sub_prefixes))
+    
+    elapsed = time.monotonic() - started
+    result = {
+        "dry_run": dry_run,
+        "prefixes_scanned": len(sub_prefixes) + 1,
+        "matched_count": totals.candidates,
+        "matched_size_bytes": totals.candidate_bytes,
+        "duration_seconds": round(elapsed, 3),
+        "errors": totals.errors
+    }
+    if dry_run:
+        # Each unit of work flushes its own partial batch, so this can exceed candidates / batch_size
+        result["estimated_delete_requests"] = totals.requests
+    else:
+        result.update({
+            "deleted_count": totals.deleted,
+            "deleted_size_bytes": totals.deleted_bytes,
+            "delete_requests": totals.requests,
+            "objects_per_second": round(totals.deleted / elapsed, 1) if elapsed > 0 else None,
+            "bytes_per_second": round(totals.deleted_bytes / elapsed) if elapsed > 0 else None
+        })
+    return result
+
+
+__all__ = ['delete_objects', 'cleanup_prefix', 'CleanupTotals', 'MAX_DELETE_BATCH']
@@ -0,0 +1,128 @@
+"""
+Pagination helpers shared by list/query services
+Cheap row counts for large tables and opaque keyset (seek) cursors
+"""
+import base64
+import json
+import logging
+from datetime import datetime
+from typing import Any, List, Optional, Tuple
+
+from sqlalchemy import select, func, and_, or_
+
+logger = logging.getLogger(__name__)
+
+EXACT_COUNT_THRESHOLD = 10000
+
+
+def supports_estimates(session) -> bool:
+    """Whether the session's database can produce planner row estimates"""
+    return session.get_bind().dialect.name == 'postgresql'
+
+
+def estimate_count(session, stmt) -> int:
+    """
+    Return the PostgreSQL planner's row estimate for a SELECT statement
+    
+    Runs EXPLAIN only, so the query itself is never executed. The EXPLAIN
+    runs in a savepoint so a failure does not abort the caller's transaction.
+    
+    Raises:
+        ValueError: If the database is not PostgreSQL
+    """
+    bind = session.get_bind()
+    if not supports_estimates(session):
+        raise ValueError(f"Row estimates not supported for {bind.dialect.name}")
+    
+    compiled = stmt.compile(dialect=bind.dialect, compile_kwargs={'render_postcompile': True})
+    with session.begin_nested():
+        plan = session.connection().exec_driver_sql(
+            f"EXPLAIN (FORMAT JSON) {compiled}",
+            compiled.params
+        ).scalar()
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+def exact_count(session, stmt) -> int:
+    """Run COUNT(*) over a SELECT statement"""
+    return session.execute(
+        select(func.count()).select_from(stmt.order_by(None).subquery())
+    ).scalar() or 0
+
+
+def count_rows(session, stmt, exact_threshold: int = EXACT_COUNT_THRESHOLD) -> Tuple[int, bool]:
+    """
+    Count rows matched by a SELECT statement as cheaply as possible
+    
+    Uses the planner estimate when it is above ``exact_threshold`` and falls
+    back to an exact COUNT(*) for small results or non-PostgreSQL databases.
+    
+    Returns:
+        Tuple of (count, is_estimate)
+    """
+    if supports_estimates(session):
+        try:
+            estimate = estimate_count(session, stmt)
+            if estimate > exact_threshold:
+                return estimate, True
+        except Exception as e:
+            logger.debug(f"Row estimate failed, using exact count: {e}")
+    
+    return exact_count(session, stmt), False
+
+
+def encode_cursor(timestamp: datetime, row_id: Any) -> str:
+    """Encode a (timestamp, id) position as an opaque URL-safe cursor"""
+    payload = json.dumps([timestamp.isoformat(), str(row_id)], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, str]:
+    """
+    Decode a cursor produced by encode_cursor
+    
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        timestamp, row_id = json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+        return datetime.fromisoformat(timestamp), row_id
+    except Exception as e:
+        raise ValueError(f"Invalid pagination cursor: {cursor}") from e
+
+
+def apply_keyset(query, timestamp_col, id_col, cursor: Optional[str], limit: int):
+    """
+    Restrict a newest-first query to the page after ``cursor``
+    
+    Works with both ORM Query objects and select() statements. One extra row
+    is fetched so split_keyset_page can tell whether another page exists.
+    An empty or None cursor returns the first page.
+    """
+    if cursor:
+        timestamp, row_id = decode_cursor(cursor)
+        try:
+            row_id = id_col.type.python_type(row_id)
+        except (NotImplementedError, TypeError, ValueError):
+            pass
+        # The leading "timestamp <= X" keeps the timestamp index usable
+        query = query.where(and_(
+            timestamp_col <= timestamp,
+            or_(timestamp_col < timestamp, id_col < row_id)
+        ))
+    return query.order_by(timestamp_col.desc(), id_col.desc()).limit(limit + 1)
+
+
+def split_keyset_page(rows: List[Any], timestamp_col, id_col, limit: int) -> Tuple[List[Any], Optional[str]]:
+    """
+    Trim the extra row fetched by apply_keyset and build the next cursor
+    
+    Returns:
+        Tuple of (rows, next_cursor); next_cursor is None on the last page
+    """
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    last = rows[-1]
+    return rows, encode_cursor(getattr(last, timestamp_col.key), getattr(last, id_col.key))
@@ -0,0 +1,499 @@
+"""
+AI Response Cache
+Bounded in-memory LRU with TTLs in front of the ``response_cache`` table,
+keyed on normalized queries with an optional embedding-similarity lookup
+"""
+import os
+import time
+import heapq
+import atexit
+import hashlib
+import logging
+import threading
+import unicodedata
+from collections import OrderedDict, Counter
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Punctuation that also reads as an operator ('2*2', '5 - 3', 'a/b') is part of the question
+_OPERATOR_PUNCTUATION = frozenset('*/%&#@\\-')
+
+
+def _is_punctuation(char: str) -> bool:
+    return unicodedata.category(char).startswith('P') and char not in _OPERATOR_PUNCTUATION
+
+
+def _strip_punctuation(word: str) -> str:
+    start, end = 0, len(word)
+    while start < end and _is_punctuation(word[start]):
+        start += 1
+    while end > start and _is_punctuation(word[end - 1]):
+        end -= 1
+    return word[start:end]
+
+
+def normalize_query(query: str) -> str:
+    """
+    Case-fold, collapse whitespace and trim punctuation from the ends of
+    words, so trivially different phrasings share a key
+    
+    Only Unicode punctuation (categories P*) is trimmed, and never
+    operator-like characters: symbols such as ``+``, ``<`` and ``=``
+    stay in the key, since queries differing by one ask different things.
+    """
+    text = unicodedata.normalize('NFKC', query or '').casefold()
+    words = (_strip_punctuation(word) for word in text.split())
+    return ' '.join(word for word in words if word)
+
+
+def query_key(query: str) -> str:
+    return hashlib.sha256(normalize_query(query).encode()).hexdigest()
+
+
+def legacy_query_key(query: str) -> str:
+    """Hash used before normalization, so rows cached by older releases still hit"""
+    return hashlib.sha256(query.lower().strip().encode()).hexdigest()
+
+
+class TTLLRUCache:
+    """
+    LRU map whose entries also expire
+    
+    Reads and writes are O(1) on an OrderedDict; expiry deadlines sit in a
+    heap so ``purge_expired`` drops dead entries in O(log n) each without
+    scanning the map. ``on_evict`` is called with the key of every entry
+    that leaves the cache other than by being overwritten.
+    """
+    
+    def __init__(self, max_entries: int, on_evict: Optional[Callable[[str], None]] = None):
+        self.max_entries = max_entries
+        self.on_evict = on_evict
+        self._entries: 'OrderedDict[str, Tuple[Any, float]]' = OrderedDict()
+        self._deadlines: List[Tuple[float, str]] = []
+        self.evictions = 0
+        self.expirations = 0
+    
+    def __len__(self):
+        return len(self._entries)
+    
+    def __contains__(self, key):
+        return key in self._entries
+    
+    def get(self, key: str, now: Optional[float] = None) -> Any:
+        item = self._entries.get(key)
+        if item is None:
+            return None
+        value, expires_at = item
+        if expires_at <= (now if now is not None else time.time()):
+            self._remove(key)
+            self.expirations += 1
+            return None
+        self._entries.move_to_end(key)
+        return value
+    
+    def set(self, key: str, value: Any, ttl: float, now: Optional[float] = None):
+        expires_at = (now if now is not None else time.time()) + ttl
+        self._entries[key] = (value, expires_at)
+        self._entries.move_to_end(key)
+        heapq.heappush(self._deadlines, (expires_at, key))
+        
+        self.purge_expired(now)
+        while len(self._entries) > self.max_entries:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.evictions += 1
+        
+        # Overwrites leave stale deadlines behind; rebuild before the heap outgrows the map
+        if len(self._deadlines) > 2 * len(self._entries) + 64:
+            self._deadlines = [(exp, k) for k, (_, exp) in self._entries.items()]
+            heapq.heapify(self._deadlines)
+    
+    def pop(self, key: str):
+        if key in self._entries:
+            self._remove(key)
+    
+    def purge_expired(self, now: Optional[float] = None) -> int:
+        now = now if now is not None else time.time()
+        purged = 0
+        while self._deadlines and self._deadlines[0][0] <= now:
+            expires_at, key = heapq.heappop(self._deadlines)
+            item = self._entries.get(key)
+            if item is not None and item[1] == expires_at:
+                self._remove(key)
+                purged += 1
+        self.expirations += purged
+        return purged
+    
+    def _remove(self, key: str):
+        del self._entries[key]
+        if self.on_evict:
+            self.on_evict(key)
+
+
+class VectorIndex:
+    """
+    Brute-force cosine similarity over unit vectors in one numpy matrix
+    
+    A cache of a thousand responses is a single matrix-vector product per
+    lookup, which is cheaper than the embedding call that precedes it.
+    """
+    
+    def __init__(self):
+        self._keys: List[str] = []
+        self._rows: Dict[str, int] = {}
+        self._matrix: Optional[np.ndarray] = None
+    
+    def __len__(self):
+        return len(self._keys)
+    
+    @staticmethod
+    def _unit(vector) -> Optional[np.ndarray]:
+        vector = np.asarray(vector, dtype=np.float32)
+        norm = float(np.linalg.norm(vector))
+        return vector / norm if norm else None
+    
+    def add(self, key: str, vector):
+        vector = self._unit(vector)
+        if vector is None:
+            return
+        if self._matrix is None or self._matrix.shape[1] != vector.shape[0]:
+            # A different embedding model; earlier vectors are not comparable
+            self._keys, self._rows = [], {}
+            self._matrix = np.empty((16, vector.shape[0]), dtype=np.float32)
+        
+        row = self._rows.get(key)
+        if row is None:
+            row = len(self._keys)
+            if row == self._matrix.shape[0]:
+                self._matrix = np.vstack([self._matrix, np.empty_like(self._matrix)])
+            self._keys.append(key)
+            self._rows[key] = row
+        self._matrix[row] = vector
+    
+    def remove(self, key: str):
+        row = self._rows.pop(key, None)
+        if row is None:
+            return
+        last = len(self._keys) - 1
+        if row != last:
+            moved = self._keys[last]
+            self._keys[row] = moved
+            self._rows[moved] = row
+            self._matrix[row] = self._matrix[last]
+        self._keys.pop()
+    
+    def search(self, vector, threshold: float) -> Optional[Tuple[str, float]]:
+        """Return the most similar key and its score, if it reaches ``threshold``"""
+        vector = self._unit(vector)
+        if vector is None or not self._keys or vector.shape[0] != self._matrix.shape[1]:
+            return None
+        scores = self._matrix[:len(self._keys)] @ vector
+        best = int(np.argmax(scores))
+        score = float(scores[best])
+        return (self._keys[best], score) if score >= threshold else None
+
+
+class HitCountFlusher:
+    """
+    Accumulates cache hits in memory and writes them to ``response_cache``
+    on a background thread, one UPDATE per row per flush however many hits
+    it took
+    """
+    
+    def __init__(self, flush_interval: float = 5.0):
+        self.flush_interval = flush_interval
+        self._pending: Counter = Counter()
+        self._last_hit: Dict[str, datetime] = {}
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._pid = os.getpid()
+        self._atexit_registered = False
+        self.flushed = 0
+        self.failed = 0
+    
+    def record(self, key: str):
+        with self._lock:
+            self._pending[key] += 1
+            self._last_hit[key] = datetime.utcnow()
+        self._ensure_started()
+    
+    @property
+    def pending(self) -> int:
+        return sum(self._pending.values())
+    
+    def _ensure_started(self):
+        if self._pid != os.getpid():
+            # The parent's thread did not survive the fork
+            self._pid = os.getpid()
+            self._thread = None
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop_event.clear()
+            self._thread = threading.Thread(target=self._run, name='response-cache-hits', daemon=True)
+            self._thread.start()
+            if not self._atexit_registered:
+                atexit.register(self.stop)
+                self._atexit_registered = True
+    
+    def _run(self):
+        while not self._stop_event.wait(self.flush_interval):
+            self.flush()
+    
+    def flush(self) -> int:
+        with self._lock:
+            pending, self._pending = self._pending, Counter()
+            last_hit, self._last_hit = self._last_hit, {}
+        if not pending:
+            return 0
+        
+        try:
+            from sqlalchemy import text
+            from services.db_service import db_service
+            
+            if not db_service.is_available:
+                return 0
+            with db_service.get_session() as session:
+                session.execute(
+                    text(
+                        "UPDATE response_cache SET hit_count = COALESCE(hit_count, 0) + :hits, "
+                        "last_hit_at = :last_hit_at WHERE query_hash = :query_hash"
+                    ),
+                    [
+                        {'query_hash': key, 'hits': hits, 'last_hit_at': last_hit[key]}
+                        for key, hits in pending.items()
+                    ]
+                )
+            self.flushed += len(pending)
+            return len(pending)
+        except Exception as e:
+            logger.error(f"Failed to persist response cache hits: {e}")
+            self.failed += len(pending)
+            return 0
+    
+    def stop(self, timeout: float = 5.0):
+        self._stop_event.set()
+        if self._thread is not None and self._thread.is_alive():
+            self._thread.join(timeout=timeout)
+        self.flush()
+
+
+class AIResponseCache:
+    """
+    Two-tier cache for AI responses
+    
+    Lookups go memory, then the database by exact normalized key, then
+    (when an ``embed`` function is given) the nearest cached query by
+    embedding similarity. Database misses are remembered for
+    ``negative_ttl`` seconds so a burst of new questions does not turn into
+    a burst of queries, and hits are counted in memory and persisted in
+    batches by ``HitCountFlusher`` instead of one UPDATE per hit.
+    """
+    
+    def __init__(self, max_entries: int = 1000, default_ttl: float = 3600, negative_ttl: float = 60,
+                 embed: Optional[Callable[[str], Any]] = None, similarity_threshold: float = 0.95,
+                 hit_flush_interval: float = 5.0, use_db: bool = True):
+        self.default_ttl = default_ttl
+        self.negative_ttl = negative_ttl
+        self.embed = embed
+        self.similarity_threshold = similarity_threshold
+        self.use_db = use_db
+        self._lock = threading.RLock()
+        self._index = VectorIndex()
+        self._entries = TTLLRUCache(max_entries, on_evict=self._index.remove)
+        self._misses = TTLLRUCache(max_entries)
+        self._vectors = TTLLRUCache(64)
+        self.hits = HitCountFlusher(hit_flush_interval)
+        self._stats = Counter()
+    
+    def _count(self, key: str):
+        with self._lock:
+            self._stats[key] += 1
+    
+    def _session(self):
+        if not self.use_db:
+            return None
+        from services.db_service import db_service
+        if not db_service.is_available:
+            return None
+        return db_service.get_session()
+    
+    def get(self, query: str) -> Optional[str]:
+        normalized = normalize_query(query)
+        key = query_key(query)
+        
+        with self._lock:
+            entry = self._entries.get(key)
+            negative = entry is None and self._misses.get(key) is not None
+        if entry is not None:
+            response, row_key = entry
+            self._count('memory_hits')
+            self.hits.record(row_key)
+            return response
+        
+        if not negative:
+            response = self._get_from_db(query, key)
+            if response is not None:
+                self._count('db_hits')
+                return response
+            with self._lock:
+                self._misses.set(key, True, self.negative_ttl)
+        
+        response = self._get_similar(normalized)
+        if response is not None:
+            self._count('semantic_hits')
+            return response
+        
+        self._count('misses')
+        return None
+    
+    def _get_from_db(self, query: str, key: str) -> Optional[str]:
+        try:
+            from models.jarvis_ai import ResponseCache
+            
+            session_cm = self._session()
+            if session_cm is None:
+                return None
+            with session_cm as session:
+                rows = session.query(ResponseCache).filter(
+                    ResponseCache.query_hash.in_({key, legacy_query_key(query)})
+                ).all()
+                now = datetime.utcnow()
+                for row in sorted(rows, key=lambda r: r.query_hash != key):
+                    if row.expires_at is not None and row.expires_at <= now:
+                        continue
+                    ttl = (row.expires_at - now).total_seconds() if row.expires_at else self.default_ttl
+                    with self._lock:
+                        # Later hits are counted against the row that matched, which may be a legacy key
+                        self._entries.set(key, (row.response, row.query_hash), min(ttl, self.default_ttl))
+                    self.hits.record(row.query_hash)
+                    return row.response
+        except Exception as e:
+            logger.debug(f"Cache lookup failed: {e}")
+        return None
+    
+    def _embedding(self, normalized: str):
+        with self._lock:
+            vector = self._vectors.get(normalized)
+        if vector is not None:
+            return vector
+        try:
+            vector = self.embed(normalized)
+        except Exception as e:
+            logger.debug(f"Query embedding failed: {e}")
+            return None
+        if vector is not None:
+            with self._lock:
+                self._vectors.set(normalized, vector, self.negative_ttl)
+        return vector
+    
+    def _get_similar(self, normalized: str) -> Optional[str]:
+        if self.embed is None or not normalized:
+            return None
+        with self._lock:
+            if not len(self._index):
+                return None
+        vector = self._embedding(normalized)
+        if vector is None:
+            return None
+        with self._lock:
+            match = self._index.search(vector, self.similarity_threshold)
+            if match is None:
+                return None
+            entry = self._entries.get(match[0])
+        if entry is None:
+            return None
+        response, row_key = entry
+        self.hits.record(row_key)
+        return response
+    
+    def set(self, query: str, response: str, model: str, category: str = None, ttl_seconds: float = None):
+        normalized = normalize_query(query)
+        key = query_key(query)
+        ttl_seconds = ttl_seconds or self.default_ttl
+        expires_at = datetime.utcnow() + timedelta(seconds=ttl_seconds)
+        
+        with self._lock:
+            self._entries.set(key, (response, key), min(ttl_seconds, self.default_ttl))
+            self._misses.pop(key)
+        if self.embed is not None and normalized:
+            vector = self._embedding(normalized)
+            if vector is not None:
+                with self._lock:
+                    if key in self._entries:
+                        self._index.add(key, vector)
+        
+        try:
+            from models.jarvis_ai import ResponseCache
+            
+            session_cm = self._session()
+            if session_cm is None:
+                return
+            pattern = query[:100] if len(query) > 100 else query
+            
+            with session_cm as session:
+                existing = session.query(ResponseCache).filter(
+                    ResponseCache.query_hash == key
+                ).first()
+                
+                if existing:
+                    existing.response = response
+                    existing.response_model = model
+                    existing.updated_at = datetime.utcnow()
+                    existing.expires_at = expires_at
+                else:
+                    session.add(ResponseCache(
+                        query_hash=key,
+                        query_pattern=pattern,
+                        query_category=category,
+                        original_query=query,
+                        response=response,
+                        response_model=model,
+                        expires_at=expires_at
+                    ))
+        except Exception as e:
+            logger.debug(f"Failed to persist cache: {e}")
+    
+    def purge_expired(self) -> int:
+        with self._lock:
+            self._misses.purge_expired()
+            return self._entries.purge_expired()
+    
+    def get_stats(self) -> Dict[str, Any]:
+        self.purge_expired()
+        with self._lock:
+            stats = {
+                name: self._stats[name]
+                for name in ('memory_hits', 'db_hits', 'semantic_hits', 'misses')
+            }
+            hits = stats['memory_hits'] + stats['db_hits'] + stats['semantic_hits']
+            lookups = hits + stats['misses']
+            stats.update({
+                'hits': hits,
+                'lookups': lookups,
+                'hit_rate': round(hits / lookups, 4) if lookups else None,
+                'entries': len(self._entries),
+                'max_entries': self._entries.max_entries,
+                'evictions': self._entries.evictions,
+                'expirations': self._entries.expirations,
+                'negative_entries': len(self._misses),
+                'semantic_enabled': self.embed is not None,
+                'indexed_vectors': len(self._index),
+                'pending_hit_updates': self.hits.pending,
+                'hit_updates_flushed': self.hits.flushed,
+                'hit_updates_failed': self.hits.failed
+            })
+        return stats
+
+
+__all__ = [
+    'AIResponseCache', 'TTLLRUCache', 'VectorIndex', 'HitCountFlusher',
+    'normalize_query', 'query_key', 'legacy_query_key'
+]
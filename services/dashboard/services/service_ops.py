@@ -181,36 +181,57 @@ class ServiceOpsService:
         Returns:
             True if successful, False otherwise
         """
-        try:
-            stats = self.collect_container_stats(service_name, container_name)
-            if not stats:
-                return False
-            
-            session = db_service.get_session()
-            
-            telemetry = ServiceTelemetry(
-                service_name=stats['service_name'],
-                container_id=stats['container_id'],
-                status=stats['status'],
-                cpu_percent=stats['cpu_percent'],
-                memory_usage=stats['memory_usage'],
-                memory_limit=stats['memory_limit'],
-                health_status=stats['health_status'],
-                uptime_seconds=stats['uptime_seconds'],
-                restart_count=stats['restart_count'],
-                service_metadata=stats['metadata']
-            )
-            
-            session.add(telemetry)
-            session.commit()
-            session.close()
-            
-            logger.debug(f"Stored telemetry for {service_name}")
-            return True
+        return self.store_all_telemetry({service_name: container_name}).get(service_name, False)
+    
+    def store_all_telemetry(self, containers: Dict[str, str]) -> Dict[str, bool]:
+        """
+        Collect and store telemetry for several services in one pass
+        
+        Stats for every container come from one shared Docker snapshot and
+        all rows are written in a single transaction.
+        
+        Args:
+            containers: Mapping of service name to container name
             
+        Returns:
+            Dict mapping service name to whether telemetry was stored
+        """
+        results = {}
+        rows = []
+        for service_name, container_name in containers.items():
+            try:
+                stats = self.collect_container_stats(service_name, container_name)
+                results[service_name] = stats is not None
+                if not stats:
+                    continue
+                rows.append(ServiceTelemetry(
+                    service_name=stats['service_name'],
+                    container_id=stats['container_id'],
+                    status=stats['status'],
+                    cpu_percent=stats['cpu_percent'],
+                    memory_usage=stats['memory_usage'],
+                    memory_limit=stats['memory_limit'],
+                    health_status=stats['health_status'],
+                    uptime_seconds=stats['uptime_seconds'],
+                    restart_count=stats['restart_count'],
+                    service_metadata=stats['metadata']
+                ))
+            except Exception as e:
+                logger.error(f"Error collecting telemetry for {service_name}: {e}")
+                results[service_name] = False
+        
+        if not rows:
+            return results
+        
+        try:
+            with db_service.get_session() as session:
+                session.add_all(rows)
+            logger.debug(f"Stored telemetry for {len(rows)} services")
         except Exception as e:
-            logger.error(f"Error storing telemetry for {service_name}: {e}")
-            return False
+            logger.error(f"Error storing telemetry: {e}")
+            return {service_name: False for service_name in results}
+        
+        return results
     
     def get_all_service_statuses(self) -> List[Dict]:
         """
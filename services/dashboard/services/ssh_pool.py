@@ -0,0 +1,216 @@
+"""
+SSH Connection Pool
+Keeps one authenticated SSH transport per host and multiplexes commands
+over it as separate channels
+"""
+import os
+import time
+import logging
+import threading
+from typing import Callable, Dict, Optional, Any
+
+import paramiko
+
+logger = logging.getLogger(__name__)
+
+
+class _PooledConnection:
+    def __init__(self, client: paramiko.SSHClient, max_channels: int):
+        self.client = client
+        self.channels = threading.BoundedSemaphore(max_channels)
+        self.created_at = time.monotonic()
+        self.last_used = self.created_at
+        self.last_checked = self.created_at
+        self.active = 0
+    
+    @property
+    def transport(self) -> Optional[paramiko.Transport]:
+        return self.client.get_transport()
+    
+    def close(self):
+        try:
+            self.client.close()
+        except Exception:
+            pass
+
+
+class SSHConnectionPool:
+    """
+    Keep-alive SSH connections keyed by host
+    
+    The first command to a host pays for the TCP connect, key exchange
+    and authentication; later commands open a channel on the same
+    transport, which costs one round trip. Up to ``max_channels`` commands
+    run on a host at once (sshd's MaxSessions defaults to 10). Transports
+    send keepalives, are probed with an SSH ignore message when they have
+    been idle for ``probe_interval``, and are closed once idle for
+    ``idle_timeout``. A dead transport is replaced on the next lease.
+    Paramiko transports own a thread, so the pool starts empty again in a
+    forked child.
+    """
+    
+    def __init__(self, connect: Callable[[str], Optional[paramiko.SSHClient]], idle_timeout: float = 300,
+                 probe_interval: float = 30, keepalive: int = 30, max_channels: int = 8):
+        self._connect = connect
+        self.idle_timeout = idle_timeout
+        self.probe_interval = probe_interval
+        self.keepalive = keepalive
+        self.max_channels = max_channels
+        self._lock = threading.Lock()
+        self._host_locks: Dict[str, threading.Lock] = {}
+        self._connections: Dict[str, _PooledConnection] = {}
+        self._pid = os.getpid()
+        self.stats = {'connects': 0, 'reuses': 0, 'evictions': 0, 'failed_probes': 0}
+    
+    def _check_fork(self):
+        if self._pid != os.getpid():
+            # Transport threads did not survive the fork; never touch the parent's sockets
+            self._pid = os.getpid()
+            self._lock = threading.Lock()
+            self._host_locks = {}
+            self._connections = {}
+    
+    def _is_healthy(self, conn: _PooledConnection) -> bool:
+        transport = conn.transport
+        if transport is None or not transport.is_active():
+            return False
+        now = time.monotonic()
+        if now - conn.last_checked >= self.probe_interval:
+            try:
+                transport.send_ignore()
+            except Exception:
+                self.stats['failed_probes'] += 1
+                return False
+            conn.last_checked = now
+        return True
+    
+    def get(self, host_id: str) -> Optional[_PooledConnection]:
+        """Return a healthy pooled connection to a host, connecting if needed"""
+        self._check_fork()
+        self.evict_idle()
+        
+        with self._lock:
+            host_lock = self._host_locks.setdefault(host_id, threading.Lock())
+        
+        # One connect per host at a time; other hosts are not held up
+        with host_lock:
+            with self._lock:
+                conn = self._connections.get(host_id)
+            if conn is not None:
+                if self._is_healthy(conn):
+                    self.stats['reuses'] += 1
+                    conn.last_used = time.monotonic()
+                    return conn
+                logger.info(f"Pooled SSH connection to {host_id} is dead, reconnecting")
+                self.invalidate(host_id, conn)
+            
+            client = self._connect(host_id)
+            if client is None:
+                return None
+            transport = client.get_transport()
+            if transport is not None and self.keepalive:
+                transport.set_keepalive(self.keepalive)
+            conn = _PooledConnection(client, self.max_channels)
+            self.stats['connects'] += 1
+            with self._lock:
+                self._connections[host_id] = conn
+            return conn
+    
+    def run(self, host_id: str, command: str, timeout: Optional[float] = None,
+            retry: bool = True) -> Optional[Dict[str, Any]]:
+        """
+        Run a command on its own channel of the host's pooled transport
+        
+        Returns:
+            ``{'exit_code', 'output', 'error'}``, or None when the host
+            cannot be reached. If the channel cannot be opened because the
+            transport dropped between the health check and the call, the
+            command is retried once on a fresh connection. Once the command
+            has started it is never re-run; a later failure is raised.
+        """
+        conn = self.get(host_id)
+        if conn is None:
+            return None
+        
+        failure = None
+        with conn.channels:
+            with self._lock:
+                conn.active += 1
+            channel = None
+            try:
+                try:
+                    _, stdout, stderr = conn.client.exec_command(command, timeout=timeout)
+                except (paramiko.SSHException, EOFError, ConnectionError) as e:
+                    # The channel never opened, so the command did not run
+                    self.invalidate(host_id, conn)
+                    if not retry:
+                        raise
+                    failure = e
+                else:
+                    channel = stdout.channel
+                    try:
+                        output = stdout.read().decode('utf-8', errors='replace')
+                        error_output = stderr.read().decode('utf-8', errors='replace')
+                        exit_code = channel.recv_exit_status()
+                    except (paramiko.SSHException, EOFError, ConnectionError):
+                        self.invalidate(host_id, conn)
+                        raise
+            finally:
+                if channel is not None:
+                    channel.close()
+                with self._lock:
+                    conn.active -= 1
+                    conn.last_used = time.monotonic()
+        
+        if failure is not None:
+            logger.info(f"SSH channel to {host_id} failed to open ({failure}), retrying on a new connection")
+            return self.run(host_id, command, timeout, retry=False)
+        return {'exit_code': exit_code, 'output': output, 'error': error_output}
+    
+    def invalidate(self, host_id: str, conn: Optional[_PooledConnection] = None):
+        """Drop a host's connection (only ``conn``, if given, so a newer one survives)"""
+        with self._lock:
+            current = self._connections.get(host_id)
+            if current is None or (conn is not None and current is not conn):
+                return
+            del self._connections[host_id]
+        current.close()
+    
+    def evict_idle(self) -> int:
+        """Close connections that have been idle longer than idle_timeout"""
+        now = time.monotonic()
+        with self._lock:
+            idle = [
+                (host_id, conn) for host_id, conn in self._connections.items()
+                if conn.active == 0 and now - conn.last_used > self.idle_timeout
+            ]
+            for host_id, _ in idle:
+                del self._connections[host_id]
+        for host_id, conn in idle:
+            logger.debug(f"Closing idle SSH connection to {host_id}")
+            conn.close()
+        self.stats['evictions'] += len(idle)
+        return len(idle)
+    
+    def close_all(self):
+        with self._lock:
+            connections = list(self._connections.values())
+            self._connections.clear()
+        for conn in connections:
+            conn.close()
+    
+    def get_stats(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        with self._lock:
+            hosts = {
+                host_id: {
+                    'age_seconds': round(now - conn.created_at, 1),
+                    'idle_seconds': round(now - conn.last_used, 1),
+                    'active_channels': conn.active
+                }
+                for host_id, conn in self._connections.items()
+            }
+        return {**self.stats, 'connections': hosts}
+
+
+__all__ = ['SSHConnectionPool']
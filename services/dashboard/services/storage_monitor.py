@@ -208,19 +208,26 @@ class StorageMonitorService:
         results = {}
         
         try:
+            from services.bucket_stats_index import bucket_stats_index
+            
             buckets = self.minio_client.list_buckets()
+            indexed = bucket_stats_index.get_buckets('local') or {}
             
             for bucket in buckets:
                 try:
-                    total_size = 0
-                    object_count = 0
-                    
-                    # List all objects in bucket
-                    objects = self.minio_client.list_objects(bucket.name, recursive=True)
-                    
-                    for obj in objects:
-                        total_size += obj.size
-                        object_count += 1
+                    stats = indexed.get(bucket.name) or bucket_stats_index.get_bucket(
+                        'local', bucket.name, self.minio_client
+                    )
+                    if stats is not None:
+                        total_size = stats['size_bytes']
+                        object_count = stats['object_count']
+                    else:
+                        # Index unavailable; sum the listing directly
+                        total_size = 0
+                        object_count = 0
+                        for obj in self.minio_client.list_objects(bucket.name, recursive=True):
+                            total_size += obj.size
+                            object_count += 1
                     
                     results[bucket.name] = {
                         'size_bytes': total_size,
@@ -7,7 +7,7 @@ import os
 import io
 import logging
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Union, BinaryIO, Tuple
+from typing import Callable, Dict, List, Optional, Union, BinaryIO, Tuple
 from dataclasses import dataclass
 from enum import Enum
 from minio import Minio
@@ -25,6 +25,9 @@ except ImportError:
         LIFECYCLE_SUPPORT = False
 
 from config import Config
+from services.bucket_stats_index import bucket_stats_index
+from services.bucket_sync import BucketSyncEngine, SyncManifest
+from services.cache_service import cache_service
 
 logger = logging.getLogger(__name__)
 
@@ -146,13 +149,14 @@ class UnifiedStorageService:
         if backend in ["local", "all"] and self.local_client:
             try:
                 buckets = self.local_client.list_buckets()
+                indexed = bucket_stats_index.get_buckets("local")
                 for bucket in buckets:
                     bucket_info = BucketInfo(
                         name=bucket.name,
                         backend="local",
                         creation_date=bucket.creation_date
                     )
-                    size_bytes, object_count = self._get_bucket_stats(bucket.name, "local")
+                    size_bytes, object_count = self._get_bucket_stats(bucket.name, "local", indexed)
                     bucket_info.size_bytes = size_bytes
                     bucket_info.object_count = object_count
                     results["local"].append(bucket_info)
@@ -163,13 +167,14 @@ class UnifiedStorageService:
         if backend in ["cloud", "all"] and self.cloud_client:
             try:
                 buckets = self.cloud_client.list_buckets()
+                indexed = bucket_stats_index.get_buckets("cloud")
                 for bucket in buckets:
                     bucket_info = BucketInfo(
                         name=bucket.name,
                         backend="cloud",
                         creation_date=bucket.creation_date
                     )
-                    size_bytes, object_count = self._get_bucket_stats(bucket.name, "cloud")
+                    size_bytes, object_count = self._get_bucket_stats(bucket.name, "cloud", indexed)
                     bucket_info.size_bytes = size_bytes
                     bucket_info.object_count = object_count
                     results["cloud"].append(bucket_info)
@@ -179,12 +184,29 @@ class UnifiedStorageService:
         
         return results
     
-    def _get_bucket_stats(self, bucket: str, backend: str) -> Tuple[int, int]:
-        """Get total size and object count for a bucket"""
+    def _get_bucket_stats(self, bucket: str, backend: str,
+                          indexed: Optional[Dict[str, Dict]] = None) -> Tuple[int, int]:
+        """
+        Get total size and object count for a bucket
+        
+        Served from the bucket stats index (``indexed`` is a prefetched
+        ``get_buckets`` result); a bucket not yet indexed is queued for
+        scanning and reported from its partial sums, and the objects are
+        only summed here when the index is unavailable.
+        """
         client = self._get_client(backend)
         if not client:
             return 0, 0
         
+        stats = (indexed or {}).get(bucket)
+        if stats is None:
+            try:
+                stats = bucket_stats_index.get_bucket(backend, bucket, client)
+            except Exception as e:
+                logger.warning(f"Bucket stats index unavailable for {bucket}: {e}")
+        if stats is not None:
+            return stats['size_bytes'], stats['object_count']
+        
         total_size = 0
         object_count = 0
         
@@ -252,6 +274,7 @@ class UnifiedStorageService:
                     client.remove_object(name, obj.object_name)
             
             client.remove_bucket(name)
+            bucket_stats_index.forget(backend, [name])
             logger.info(f"Deleted bucket '{name}' from {backend} storage")
             return {"success": True, "message": f"Bucket '{name}' deleted successfully"}
         except S3Error as e:
@@ -380,6 +403,7 @@ class UnifiedStorageService:
                 file_data.seek(0)
                 data = file_data
             
+            previous_size = self._object_size(client, bucket, key)
             result = client.put_object(
                 bucket,
                 key,
@@ -389,6 +413,11 @@ class UnifiedStorageService:
                 metadata=metadata
             )
             
+            bucket_stats_index.apply_delta(
+                backend, bucket, key,
+                length - (previous_size or 0),
+                0 if previous_size is not None else 1
+            )
             logger.info(f"Uploaded '{key}' to {bucket} ({backend})")
             return {
                 "success": True,
@@ -402,6 +431,13 @@ class UnifiedStorageService:
             logger.error(f"Error uploading '{key}' to {bucket}: {e}")
             return {"success": False, "error": str(e)}
     
+    def _object_size(self, client: Minio, bucket: str, key: str) -> Optional[int]:
+        """Size of an existing object, or None if it does not exist"""
+        try:
+            return client.stat_object(bucket, key).size
+        except S3Error:
+            return None
+    
     def download_file(self, bucket: str, key: str, backend: str) -> Dict:
         """
         Download a file from storage
@@ -462,7 +498,10 @@ class UnifiedStorageService:
             return {"success": False, "error": f"{backend} storage not available"}
         
         try:
+            size = self._object_size(client, bucket, key)
             client.remove_object(bucket, key)
+            if size is not None:
+                bucket_stats_index.apply_delta(backend, bucket, key, -size, -1)
             logger.info(f"Deleted '{key}' from {bucket} ({backend})")
             return {
                 "success": True,
@@ -549,25 +588,58 @@ class UnifiedStorageService:
                 }
             return upload_result
     
+    def _endpoint(self, backend: str) -> Tuple[str, str]:
+        """S3 endpoint and access key a backend's client talks to"""
+        if backend == "cloud":
+            return Config.CLOUD_S3_ENDPOINT, Config.CLOUD_S3_ACCESS_KEY
+        return Config.MINIO_ENDPOINT, Config.MINIO_ACCESS_KEY
+    
+    def _same_server(self, source: str, destination: str) -> bool:
+        """Whether both backends are the same S3 endpoint and account, allowing server-side copies"""
+        endpoint, access_key = self._endpoint(source)
+        return bool(endpoint) and (endpoint, access_key) == self._endpoint(destination)
+    
+    def _sync_manifest(self, bucket: str, source: str, destination: str,
+                       dst_bucket: Optional[str] = None) -> SyncManifest:
+        name = bucket if not dst_bucket or dst_bucket == bucket else f"{bucket}:{dst_bucket}"
+        return SyncManifest(
+            name, source, destination,
+            redis_client=cache_service.redis_client,
+            breaker=cache_service.breaker,
+            ttl=Config.STORAGE_SYNC_MANIFEST_TTL
+        )
+    
     def sync_bucket(
         self,
         bucket: str,
         source: str,
         destination: str,
-        delete_extra: bool = False
+        delete_extra: bool = False,
+        on_progress: Optional[Callable[[Dict], None]] = None,
+        dst_bucket: Optional[str] = None
     ) -> Dict:
         """
         Sync a bucket between local and cloud storage
         
+        Objects are streamed from source to destination by
+        STORAGE_SYNC_WORKERS threads in STORAGE_SYNC_PART_SIZE multipart
+        parts, or copied server side when both backends are the same
+        server, e.g. between two buckets of one backend. Copies are
+        recorded in a manifest, so rerunning an interrupted sync only
+        copies what is still missing.
+        
         Args:
-            bucket: Bucket name
+            bucket: Source bucket name
             source: Source backend ('local' or 'cloud')
             destination: Destination backend ('local' or 'cloud')
             delete_extra: Whether to delete objects that exist only in destination
+            on_progress: Optional callback receiving progress snapshots
+            dst_bucket: Destination bucket name (default: same as ``bucket``)
             
         Returns:
             Dict with sync results
         """
+        dst_bucket = dst_bucket or bucket
         src_client = self._get_client(source)
         dst_client = self._get_client(destination)
         
@@ -575,90 +647,63 @@ class UnifiedStorageService:
             return {"success": False, "error": f"Source {source} storage not available"}
         if not dst_client:
             return {"success": False, "error": f"Destination {destination} storage not available"}
+        same_server = self._same_server(source, destination)
+        if dst_bucket == bucket and (source == destination or same_server):
+            return {"success": False, "error": "Source and destination are the same bucket"}
+        
+        engine = BucketSyncEngine(
+            src_client,
+            dst_client,
+            self._sync_manifest(bucket, source, destination, dst_bucket),
+            workers=Config.STORAGE_SYNC_WORKERS,
+            part_size=Config.STORAGE_SYNC_PART_SIZE,
+            bandwidth_limit=Config.STORAGE_SYNC_BANDWIDTH_LIMIT,
+            same_server=same_server,
+            on_progress=on_progress
+        )
         
         try:
-            if not dst_client.bucket_exists(bucket):
-                dst_client.make_bucket(bucket)
-            
-            src_objects = {}
-            for obj in src_client.list_objects(bucket, recursive=True):
-                src_objects[obj.object_name] = {
-                    "size": obj.size,
-                    "etag": obj.etag,
-                    "last_modified": obj.last_modified
-                }
-            
-            dst_objects = {}
-            if dst_client.bucket_exists(bucket):
-                for obj in dst_client.list_objects(bucket, recursive=True):
-                    dst_objects[obj.object_name] = {
-                        "size": obj.size,
-                        "etag": obj.etag,
-                        "last_modified": obj.last_modified
-                    }
-            
-            copied = 0
-            skipped = 0
-            deleted = 0
-            errors = []
-            
-            for key, src_info in src_objects.items():
-                if key in dst_objects:
-                    if dst_objects[key]["etag"] == src_info["etag"]:
-                        skipped += 1
-                        continue
-                
-                try:
-                    response = src_client.get_object(bucket, key)
-                    data = response.read()
-                    
-                    dst_client.put_object(
-                        bucket,
-                        key,
-                        io.BytesIO(data),
-                        len(data)
-                    )
-                    copied += 1
-                    
-                    response.close()
-                    response.release_conn()
-                except Exception as e:
-                    errors.append({"key": key, "error": str(e)})
-            
-            if delete_extra:
-                for key in dst_objects:
-                    if key not in src_objects:
-                        try:
-                            dst_client.remove_object(bucket, key)
-                            deleted += 1
-                        except Exception as e:
-                            errors.append({"key": key, "error": str(e)})
-            
-            logger.info(f"Synced bucket '{bucket}' from {source} to {destination}: {copied} copied, {skipped} skipped, {deleted} deleted")
-            
-            return {
-                "success": True,
-                "bucket": bucket,
-                "source": source,
-                "destination": destination,
-                "copied": copied,
-                "skipped": skipped,
-                "deleted": deleted,
-                "errors": errors,
-                "total_source_objects": len(src_objects),
-                "total_dest_objects": len(dst_objects) + copied - deleted
-            }
+            result = engine.run(bucket, delete_extra=delete_extra, dst_bucket=dst_bucket)
         except S3Error as e:
             logger.error(f"Error syncing bucket '{bucket}': {e}")
             return {"success": False, "error": str(e)}
+        
+        logger.info(
+            f"Synced bucket '{bucket}' from {source} to {destination}: {result['copied']} copied, "
+            f"{result['skipped']} skipped, {result['deleted']} deleted, {len(result['errors'])} failed "
+            f"in {result['duration_seconds']}s"
+        )
+        
+        return {
+            "success": True,
+            "source": source,
+            "destination": destination,
+            "dst_bucket": dst_bucket,
+            "total_source_objects": result['scanned'],
+            **result
+        }
     
-    def mirror_to_cloud(self, bucket: str, create_if_missing: bool = True) -> Dict:
+    def get_sync_status(self, bucket: str, source: str, destination: str,
+                        dst_bucket: Optional[str] = None) -> Dict:
+        """Progress of the running or most recent sync of a bucket"""
+        status = self._sync_manifest(bucket, source, destination, dst_bucket).get_status()
+        if status is None:
+            return {"success": False, "error": f"No sync recorded for '{bucket}' from {source} to {destination}"}
+        return {"success": True, "source": source, "destination": destination, **status}
+    
+    def mirror_to_cloud(
+        self,
+        bucket: str,
+        create_if_missing: bool = True,
+        on_progress: Optional[Callable[[Dict], None]] = None
+    ) -> Dict:
         """
         Mirror a local bucket to cloud storage
         
         Args:
             bucket: Bucket name to mirror
             create_if_missing: Create bucket in cloud if it doesn't exist
+            on_progress: Optional callback receiving progress snapshots
             
         Returns:
             Dict with mirror results
@@ -675,7 +720,7 @@ class UnifiedStorageService:
         except S3Error as e:
             return {"success": False, "error": f"Cannot access local bucket: {e}"}
         
-        return self.sync_bucket(bucket, "local", "cloud", delete_extra=False)
+        return self.sync_bucket(bucket, "local", "cloud", delete_extra=False, on_progress=on_progress)
     
     def get_storage_stats(self, backend: str = "all") -> Dict:
         """
@@ -700,8 +745,9 @@ class UnifiedStorageService:
                 )
                 
                 buckets = self.local_client.list_buckets()
+                indexed = bucket_stats_index.get_buckets("local")
                 for bucket in buckets:
-                    size_bytes, object_count = self._get_bucket_stats(bucket.name, "local")
+                    size_bytes, object_count = self._get_bucket_stats(bucket.name, "local", indexed)
                     local_stats.total_buckets += 1
                     local_stats.total_objects += object_count
                     local_stats.total_size_bytes += size_bytes
@@ -741,8 +787,9 @@ class UnifiedStorageService:
                 )
                 
                 buckets = self.cloud_client.list_buckets()
+                indexed = bucket_stats_index.get_buckets("cloud")
                 for bucket in buckets:
-                    size_bytes, object_count = self._get_bucket_stats(bucket.name, "cloud")
+                    size_bytes, object_count = self._get_bucket_stats(bucket.name, "cloud", indexed)
                     cloud_stats.total_buckets += 1
                     cloud_stats.total_objects += object_count
                     cloud_stats.total_size_bytes += size_bytes
@@ -0,0 +1,296 @@
+"""
+Streaming Statistics
+Constant-time, mergeable summaries of a metric stream: Welford mean and
+variance with an exponentially weighted average, and a log-bucketed
+quantile sketch. Both serialize to plain dicts for JSON columns and can
+be merged, so per-process partial summaries combine exactly.
+"""
+import math
+from typing import Dict, List, Optional
+
+import numpy as np
+
+
+def merge_moments(count_a, mean_a, m2_a, count_b, mean_b, m2_b):
+    """
+    Combine count/mean/M2 summaries element-wise (Chan et al.)
+    
+    Works on scalars or NumPy arrays, e.g. one entry per seasonal bucket.
+    """
+    count_a, mean_a, m2_a = (np.asarray(x, dtype=float) for x in (count_a, mean_a, m2_a))
+    count_b, mean_b, m2_b = (np.asarray(x, dtype=float) for x in (count_b, mean_b, m2_b))
+    count = count_a + count_b
+    safe = np.where(count > 0, count, 1.0)
+    delta = mean_b - mean_a
+    mean = mean_a + delta * count_b / safe
+    m2 = m2_a + m2_b + delta * delta * count_a * count_b / safe
+    return count, mean, m2
+
+
+class RunningStats:
+    """
+    Welford mean/variance, min/max and EWMA over a stream of values
+    
+    ``count`` and ``m2`` are floats so the summary can be down-weighted
+    with ``scale`` to forget old samples. The EWMA is kept as a weighted
+    sum plus the decay applied to whatever came before, which makes
+    ``merge`` exact when the merged summary covers later samples.
+    """
+    
+    def __init__(self, ewma_alpha: float = 0.05):
+        self.ewma_alpha = ewma_alpha
+        self.count = 0.0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min: Optional[float] = None
+        self.max: Optional[float] = None
+        self.last: Optional[float] = None
+        self.ewma_sum = 0.0
+        self.ewma_decay = 1.0
+    
+    def update(self, value: float):
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+        self.last = value
+        self.ewma_sum = self.ewma_sum * (1 - self.ewma_alpha) + self.ewma_alpha * value
+        self.ewma_decay *= (1 - self.ewma_alpha)
+    
+    def update_many(self, values: np.ndarray):
+        """Add a batch of values (in arrival order) with vectorized arithmetic"""
+        values = np.asarray(values, dtype=float)
+        if values.size == 0:
+            return
+        batch = RunningStats(self.ewma_alpha)
+        batch.count = float(values.size)
+        batch.mean = float(values.mean())
+        batch.m2 = float(((values - batch.mean) ** 2).sum())
+        batch.min = float(values.min())
+        batch.max = float(values.max())
+        batch.last = float(values[-1])
+        keep = 1 - self.ewma_alpha
+        weights = keep ** np.arange(values.size - 1, -1, -1)
+        batch.ewma_sum = float(self.ewma_alpha * np.dot(weights, values))
+        batch.ewma_decay = keep ** values.size
+        self.merge(batch)
+    
+    def merge(self, other: 'RunningStats'):
+        """Fold in a summary of samples that arrived after this one's"""
+        if other.count <= 0:
+            return
+        if self.count <= 0:
+            self.count, self.mean, self.m2 = other.count, other.mean, other.m2
+            self.min, self.max = other.min, other.max
+        else:
+            total = self.count + other.count
+            delta = other.mean - self.mean
+            self.mean += delta * other.count / total
+            self.m2 += other.m2 + delta * delta * self.count * other.count / total
+            self.count = total
+            self.min = min(self.min, other.min)
+            self.max = max(self.max, other.max)
+        self.last = other.last
+        self.ewma_sum = self.ewma_sum * other.ewma_decay + other.ewma_sum
+        self.ewma_decay *= other.ewma_decay
+    
+    def scale(self, factor: float):
+        """Down-weight everything seen so far, keeping mean and variance"""
+        self.count *= factor
+        self.m2 *= factor
+    
+    @property
+    def variance(self) -> float:
+        # Population variance, as the batch baseline computed it
+        return self.m2 / self.count if self.count > 1 else 0.0
+    
+    @property
+    def std_dev(self) -> float:
+        return math.sqrt(max(self.variance, 0.0))
+    
+    @property
+    def ewma(self) -> Optional[float]:
+        if self.ewma_decay >= 1.0:
+            return None
+        # Bias-corrected so early values are not pulled towards zero
+        return self.ewma_sum / (1 - self.ewma_decay)
+    
+    @classmethod
+    def from_values(cls, values, ewma_alpha: float = 0.05) -> 'RunningStats':
+        stats = cls(ewma_alpha)
+        stats.update_many(values)
+        return stats
+    
+    @classmethod
+    def from_summary(cls, count: float, mean: float, std_dev: float, min_value: Optional[float] = None,
+                     max_value: Optional[float] = None, last: Optional[float] = None,
+                     ewma_alpha: float = 0.05) -> 'RunningStats':
+        """Rebuild stats from stored mean/std columns (no EWMA history)"""
+        stats = cls(ewma_alpha)
+        stats.count = float(count or 0)
+        stats.mean = float(mean or 0.0)
+        stats.m2 = float(std_dev or 0.0) ** 2 * stats.count
+        stats.min, stats.max, stats.last = min_value, max_value, last
+        return stats
+    
+    def to_dict(self) -> Dict:
+        return {
+            'alpha': self.ewma_alpha,
+            'count': self.count,
+            'mean': self.mean,
+            'm2': self.m2,
+            'min': self.min,
+            'max': self.max,
+            'last': self.last,
+            'ewma_sum': self.ewma_sum,
+            'ewma_decay': self.ewma_decay
+        }
+    
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'RunningStats':
+        stats = cls(data.get('alpha', 0.05))
+        stats.count = data.get('count', 0.0)
+        stats.mean = data.get('mean', 0.0)
+        stats.m2 = data.get('m2', 0.0)
+        stats.min = data.get('min')
+        stats.max = data.get('max')
+        stats.last = data.get('last')
+        stats.ewma_sum = data.get('ewma_sum', 0.0)
+        stats.ewma_decay = data.get('ewma_decay', 1.0)
+        return stats
+
+
+class QuantileSketch:
+    """
+    Mergeable quantile sketch with relative-error guarantees
+    
+    Values are counted in logarithmic buckets (as in DDSketch): any
+    quantile is returned within ``relative_accuracy`` of a value at that
+    rank. Adding is O(1), merging adds bucket counts, and memory stays
+    bounded by ``max_bins`` by collapsing the smallest buckets.
+    """
+    
+    ZERO_THRESHOLD = 1e-9
+    
+    def __init__(self, relative_accuracy: float = 0.01, max_bins: int = 2048):
+        self.relative_accuracy = relative_accuracy
+        self.max_bins = max_bins
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.positive: Dict[int, float] = {}
+        self.negative: Dict[int, float] = {}
+        self.zero_count = 0.0
+        self.count = 0.0
+    
+    def _index(self, magnitude: float) -> int:
+        return math.ceil(math.log(magnitude) / self._log_gamma)
+    
+    def _bucket_value(self, index: int) -> float:
+        return 2 * self.gamma ** index / (self.gamma + 1)
+    
+    def add(self, value: float, weight: float = 1.0):
+        if value > self.ZERO_THRESHOLD:
+            bins = self.positive
+            index = self._index(value)
+        elif value < -self.ZERO_THRESHOLD:
+            bins = self.negative
+            index = self._index(-value)
+        else:
+            self.zero_count += weight
+            self.count += weight
+            return
+        bins[index] = bins.get(index, 0.0) + weight
+        self.count += weight
+        if len(bins) > self.max_bins:
+            self._collapse(bins)
+    
+    def add_many(self, values):
+        values = np.asarray(values, dtype=float)
+        if values.size == 0:
+            return
+        for bins, magnitudes in ((self.positive, values[values > self.ZERO_THRESHOLD]),
+                                 (self.negative, -values[values < -self.ZERO_THRESHOLD])):
+            if magnitudes.size:
+                indexes, counts = np.unique(np.ceil(np.log(magnitudes) / self._log_gamma).astype(np.int64),
+                                            return_counts=True)
+                for index, count in zip(indexes.tolist(), counts.tolist()):
+                    bins[index] = bins.get(index, 0.0) + count
+                if len(bins) > self.max_bins:
+                    self._collapse(bins)
+        self.zero_count += float(np.count_nonzero(np.abs(values) <= self.ZERO_THRESHOLD))
+        self.count += float(values.size)
+    
+    def _collapse(self, bins: Dict[int, float]):
+        # Fold the lowest-magnitude buckets together; high quantiles stay exact
+        indexes = sorted(bins)
+        excess = indexes[:len(indexes) - self.max_bins + 1]
+        target = excess[-1]
+        for index in excess[:-1]:
+            bins[target] += bins.pop(index)
+    
+    def merge(self, other: 'QuantileSketch'):
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError("Cannot merge sketches with different accuracy")
+        for bins, other_bins in ((self.positive, other.positive), (self.negative, other.negative)):
+            for index, count in other_bins.items():
+                bins[index] = bins.get(index, 0.0) + count
+            if len(bins) > self.max_bins:
+                self._collapse(bins)
+        self.zero_count += other.zero_count
+        self.count += other.count
+    
+    def scale(self, factor: float):
+        for bins in (self.positive, self.negative):
+            for index in bins:
+                bins[index] *= factor
+        self.zero_count *= factor
+        self.count *= factor
+    
+    def quantile(self, q: float) -> Optional[float]:
+        return self.quantiles([q])[0]
+    
+    def quantiles(self, qs: List[float]) -> List[Optional[float]]:
+        """Estimate several quantiles (0..1) in one ordered pass over the buckets"""
+        if self.count <= 0:
+            return [None] * len(qs)
+        ordered = [(-self._bucket_value(i), self.negative[i]) for i in sorted(self.negative, reverse=True)]
+        if self.zero_count:
+            ordered.append((0.0, self.zero_count))
+        ordered.extend((self._bucket_value(i), self.positive[i]) for i in sorted(self.positive))
+        
+        results: List[Optional[float]] = [None] * len(qs)
+        order = sorted(range(len(qs)), key=lambda k: qs[k])
+        cumulative = 0.0
+        position = 0
+        for value, count in ordered:
+            cumulative += count
+            while position < len(order) and qs[order[position]] * (self.count - 1) < cumulative:
+                results[order[position]] = value
+                position += 1
+        while position < len(order):
+            results[order[position]] = ordered[-1][0]
+            position += 1
+        return results
+    
+    def to_dict(self) -> Dict:
+        # JSON object keys must be strings
+        return {
+            'accuracy': self.relative_accuracy,
+            'positive': {str(i): c for i, c in self.positive.items()},
+            'negative': {str(i): c for i, c in self.negative.items()},
+            'zero': self.zero_count
+        }
+    
+    @classmethod
+    def from_dict(cls, data: Dict, max_bins: int = 2048) -> 'QuantileSketch':
+        sketch = cls(data.get('accuracy', 0.01), max_bins)
+        sketch.positive = {int(i): c for i, c in (data.get('positive') or {}).items()}
+        sketch.negative = {int(i): c for i, c in (data.get('negative') or {}).items()}
+        sketch.zero_count = data.get('zero', 0.0)
+        sketch.count = sketch.zero_count + sum(sketch.positive.values()) + sum(sketch.negative.values())
+        return sketch
+
+
+__all__ = ['RunningStats', 'QuantileSketch', 'merge_moments']
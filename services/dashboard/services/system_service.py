@@ -1,46 +1,50 @@
 import psutil
 import platform
+import time
 from typing import Dict
 import logging
 
+from services.host_metrics import host_metrics_sampler
+
 logger = logging.getLogger(__name__)
 
 class SystemService:
     @staticmethod
     def get_system_info() -> Dict:
         try:
-            cpu_percent = psutil.cpu_percent(interval=1, percpu=False)
-            cpu_per_core = psutil.cpu_percent(interval=1, percpu=True)
-            memory = psutil.virtual_memory()
-            disk = psutil.disk_usage('/')
-            net_io = psutil.net_io_counters()
+            # Read from the shared sampler instead of blocking on cpu_percent
+            sample = host_metrics_sampler.latest()
+            cpu = sample['cpu']
+            memory = sample['memory']['ram']
+            disk = sample['disk']['root']
+            net_io = sample['network']['total']
             
             boot_time = psutil.boot_time()
             
             return {
                 'cpu': {
-                    'percent': cpu_percent,
-                    'per_core': cpu_per_core,
-                    'count': psutil.cpu_count(),
-                    'physical_count': psutil.cpu_count(logical=False)
+                    'percent': cpu['total_percent'],
+                    'per_core': cpu['per_core'],
+                    'count': cpu['cores_logical'],
+                    'physical_count': cpu['cores_physical']
                 },
                 'memory': {
-                    'total_gb': round(memory.total / (1024**3), 2),
-                    'available_gb': round(memory.available / (1024**3), 2),
-                    'used_gb': round(memory.used / (1024**3), 2),
-                    'percent': memory.percent
+                    'total_gb': round(memory['total'] / (1024**3), 2),
+                    'available_gb': round(memory['available'] / (1024**3), 2),
+                    'used_gb': round(memory['used'] / (1024**3), 2),
+                    'percent': memory['percent']
                 },
                 'disk': {
-                    'total_gb': round(disk.total / (1024**3), 2),
-                    'used_gb': round(disk.used / (1024**3), 2),
-                    'free_gb': round(disk.free / (1024**3), 2),
-                    'percent': disk.percent
+                    'total_gb': round(disk['total'] / (1024**3), 2),
+                    'used_gb': round(disk['used'] / (1024**3), 2),
+                    'free_gb': round(disk['free'] / (1024**3), 2),
+                    'percent': disk['percent']
                 },
                 'network': {
-                    'bytes_sent_mb': round(net_io.bytes_sent / (1024**2), 2),
-                    'bytes_recv_mb': round(net_io.bytes_recv / (1024**2), 2),
-                    'packets_sent': net_io.packets_sent,
-                    'packets_recv': net_io.packets_recv
+                    'bytes_sent_mb': round(net_io['bytes_sent'] / (1024**2), 2),
+                    'bytes_recv_mb': round(net_io['bytes_recv'] / (1024**2), 2),
+                    'packets_sent': net_io['packets_sent'],
+                    'packets_recv': net_io['packets_recv']
                 },
                 'system': {
                     'platform': platform.system(),
@@ -72,24 +76,21 @@ class SystemService:
     def get_realtime_stats() -> Dict:
         """Lightweight stats for dashboard real-time monitoring"""
         try:
-            cpu_percent = psutil.cpu_percent(interval=1)
-            memory = psutil.virtual_memory()
-            disk = psutil.disk_usage('/')
-            net_io = psutil.net_io_counters()
-            boot_time = psutil.boot_time()
-            import time
-            uptime = int(time.time() - boot_time)
+            sample = host_metrics_sampler.latest()
+            memory = sample['memory']['ram']
+            net_io = sample['network']['total']
+            uptime = int(time.time() - psutil.boot_time())
             
             return {
-                'cpu_percent': round(cpu_percent, 1),
-                'cpu_count': psutil.cpu_count(),
-                'memory_percent': round(memory.percent, 1),
-                'memory_total': memory.total,
-                'memory_used': memory.used,
-                'memory_available': memory.available,
-                'disk_percent': round(disk.percent, 1),
-                'network_sent_mb': round(net_io.bytes_sent / (1024**2), 2),
-                'network_recv_mb': round(net_io.bytes_recv / (1024**2), 2),
+                'cpu_percent': round(sample['cpu']['total_percent'], 1),
+                'cpu_count': sample['cpu']['cores_logical'],
+                'memory_percent': round(memory['percent'], 1),
+                'memory_total': memory['total'],
+                'memory_used': memory['used'],
+                'memory_available': memory['available'],
+                'disk_percent': round(sample['disk']['root']['percent'], 1),
+                'network_sent_mb': round(net_io['bytes_sent'] / (1024**2), 2),
+                'network_recv_mb': round(net_io['bytes_recv'] / (1024**2), 2),
                 'hostname': platform.node(),
                 'platform': platform.system(),
                 'architecture': platform.machine(),
@@ -5,13 +5,15 @@ Centralized log collection and management for all homelab services
 
 import logging
 import os
-import re
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Any
 from sqlalchemy import select, func, and_, or_, delete, text
 import docker
 
 from services.db_service import db_service
+from services.log_classifier import log_classifier
+from services.pagination import count_rows, apply_keyset, split_keyset_page
+from services.log_partitions import log_partition_manager
 from models.unified_log import UnifiedLog
 
 logger = logging.getLogger(__name__)
@@ -21,6 +23,13 @@ class UnifiedLoggingService:
     """Service for managing unified logging across all services"""
     
     LOG_LEVELS = ['DEBUG', 'INFO', 'WARN', 'WARNING', 'ERROR', 'FATAL', 'CRITICAL']
+    LEVEL_MAP = {
+        'fatal': 'FATAL',
+        'error': 'ERROR',
+        'warning': 'WARN',
+        'debug': 'DEBUG',
+        'info': 'INFO',
+    }
     LOG_RETENTION_DAYS = 30
     
     def __init__(self):
@@ -54,48 +63,20 @@ class UnifiedLoggingService:
         Returns:
             Log level (DEBUG, INFO, WARN, ERROR, FATAL) or INFO as default
         """
-        message_upper = message.upper()
-        
-        for level in self.LOG_LEVELS:
-            if level in message_upper:
-                if level == 'WARNING':
-                    return 'WARN'
-                elif level == 'CRITICAL':
-                    return 'FATAL'
-                return level
-        
-        return 'INFO'
+        return self.LEVEL_MAP.get(log_classifier.detect_level(message), 'INFO')
     
-    def parse_timestamp(self, log_line: str) -> Optional[datetime]:
+    def parse_timestamp(self, log_line: str, service: Optional[str] = None) -> Optional[datetime]:
         """
         Extract timestamp from log line
         
         Args:
             log_line: Raw log line
+            service: Service name, used to remember the timestamp format per source
         
         Returns:
             Parsed datetime or None
         """
-        timestamp_patterns = [
-            r'\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}:\d{2}',
-            r'\d{4}/\d{2}/\d{2} \d{2}:\d{2}:\d{2}',
-            r'\w{3} \d{1,2} \d{2}:\d{2}:\d{2}',
-        ]
-        
-        for pattern in timestamp_patterns:
-            match = re.search(pattern, log_line)
-            if match:
-                timestamp_str = match.group(0)
-                try:
-                    for fmt in ['%Y-%m-%d %H:%M:%S', '%Y-%m-%dT%H:%M:%S', '%Y/%m/%d %H:%M:%S', '%b %d %H:%M:%S']:
-                        try:
-                            return datetime.strptime(timestamp_str, fmt)
-                        except ValueError:
-                            continue
-                except Exception:
-                    pass
-        
-        return None
+        return log_classifier.parse_timestamp(log_line, service)
     
     def store_log(self, service: str, message: str, container_id: Optional[str] = None,
                   log_level: Optional[str] = None, timestamp: Optional[datetime] = None,
@@ -122,7 +103,7 @@ class UnifiedLoggingService:
                 log_level = self.parse_log_level(message)
             
             if timestamp is None:
-                parsed_ts = self.parse_timestamp(message)
+                parsed_ts = self.parse_timestamp(message, service)
                 timestamp = parsed_ts if parsed_ts else datetime.utcnow()
             
             log_entry = UnifiedLog(
@@ -167,7 +148,7 @@ class UnifiedLoggingService:
                 
                 timestamp = entry.get('timestamp')
                 if timestamp is None:
-                    parsed_ts = self.parse_timestamp(entry.get('message', ''))
+                    parsed_ts = self.parse_timestamp(entry.get('message', ''), entry.get('service'))
                     timestamp = parsed_ts if parsed_ts else datetime.utcnow()
                 
                 log = UnifiedLog(
@@ -190,9 +171,60 @@ class UnifiedLoggingService:
             logger.error(f"Error storing batch logs: {e}")
             return 0
     
+    def get_latest_timestamps(self, services: Optional[List[str]] = None) -> Dict[str, datetime]:
+        """
+        Get the newest stored log timestamp per service
+        
+        Used by the log collector as a persisted high-water mark so that
+        restarts resume where the previous run stopped.
+        
+        Args:
+            services: Restrict to these service names (all services if None)
+        
+        Returns:
+            Dict mapping service name to its newest log timestamp
+        """
+        if not db_service.is_available:
+            return {}
+        
+        try:
+            with db_service.get_session() as session:
+                query = select(UnifiedLog.service, func.max(UnifiedLog.timestamp))
+                if services:
+                    query = query.where(UnifiedLog.service.in_(services))
+                query = query.group_by(UnifiedLog.service)
+                return {service: latest for service, latest in session.execute(query).all() if latest}
+        
+        except Exception as e:
+            logger.error(f"Error getting latest log timestamps: {e}")
+            return {}
+    
+    def get_messages_at(self, service: str, timestamp: datetime) -> List[str]:
+        """
+        Get the stored messages of a service at exactly ``timestamp``
+        
+        Lets the log collector tell lines it already stored apart from new
+        lines that share the high-water mark timestamp.
+        """
+        if not db_service.is_available:
+            return []
+        
+        try:
+            with db_service.get_session() as session:
+                query = select(UnifiedLog.message).where(
+                    UnifiedLog.service == service,
+                    UnifiedLog.timestamp == timestamp
+                )
+                return list(session.execute(query).scalars().all())
+        
+        except Exception as e:
+            logger.error(f"Error getting log messages at {timestamp} for {service}: {e}")
+            return []
+    
     def get_logs(self, service: Optional[str] = None, log_level: Optional[str] = None,
                  start_date: Optional[datetime] = None, end_date: Optional[datetime] = None,
-                 search: Optional[str] = None, limit: int = 100, offset: int = 0) -> Dict[str, Any]:
+                 search: Optional[str] = None, limit: int = 100, offset: int = 0,
+                 cursor: Optional[str] = None) -> Dict[str, Any]:
         """
         Retrieve logs with filtering
         
@@ -204,6 +236,9 @@ class UnifiedLoggingService:
             search: Search in message content
             limit: Maximum number of logs to return
             offset: Offset for pagination
+            cursor: Keyset cursor from a previous page's next_cursor; pass an
+                empty string for the first page. Replaces offset and skips
+                the total count.
         
         Returns:
             Dict with logs and pagination info
@@ -230,10 +265,21 @@ class UnifiedLoggingService:
                 if filters:
                     query = query.where(and_(*filters))
                 
-                count_query = select(func.count()).select_from(UnifiedLog)
-                if filters:
-                    count_query = count_query.where(and_(*filters))
-                total = session.execute(count_query).scalar()
+                if cursor is not None:
+                    query = apply_keyset(query, UnifiedLog.timestamp, UnifiedLog.id, cursor, limit)
+                    logs = session.execute(query).scalars().all()
+                    logs, next_cursor = split_keyset_page(logs, UnifiedLog.timestamp, UnifiedLog.id, limit)
+                    return {
+                        'success': True,
+                        'logs': [log.to_dict() for log in logs],
+                        'pagination': {
+                            'limit': limit,
+                            'next_cursor': next_cursor,
+                            'has_more': next_cursor is not None
+                        }
+                    }
+                
+                total, estimated = count_rows(session, query)
                 
                 query = query.order_by(UnifiedLog.timestamp.desc()).offset(offset).limit(limit)
                 
@@ -246,7 +292,8 @@ class UnifiedLoggingService:
                         'total': total,
                         'limit': limit,
                         'offset': offset,
-                        'pages': (total + limit - 1) // limit if limit > 0 else 0
+                        'pages': (total + limit - 1) // limit if limit > 0 else 0,
+                        'estimated': estimated
                     }
                 }
         
@@ -280,9 +327,7 @@ class UnifiedLoggingService:
                         stats_by_service[service] = {}
                     stats_by_service[service][level] = count
                 
-                total_logs = session.execute(
-                    select(func.count()).select_from(UnifiedLog)
-                ).scalar()
+                total_logs, total_estimated = count_rows(session, select(UnifiedLog.id))
                 
                 oldest_log = session.execute(
                     select(UnifiedLog.timestamp).order_by(UnifiedLog.timestamp.asc()).limit(1)
@@ -295,6 +340,7 @@ class UnifiedLoggingService:
                 return {
                     'success': True,
                     'total_logs': total_logs,
+                    'total_estimated': total_estimated,
                     'stats_by_service': stats_by_service,
                     'oldest_log': oldest_log.isoformat() if oldest_log else None,
                     'newest_log': newest_log.isoformat() if newest_log else None
@@ -324,6 +370,20 @@ class UnifiedLoggingService:
             cutoff_date = datetime.utcnow() - timedelta(days=retention_days)
             
             with db_service.get_session() as session:
+                if log_partition_manager.is_partitioned(session, UnifiedLog.__tablename__):
+                    result = log_partition_manager.drop_expired_partitions(
+                        session, UnifiedLog.__tablename__, retention_days
+                    )
+                    session.commit()
+                    logger.info(f"Log rotation: dropped partitions {result['partitions']}")
+                    return {
+                        'success': True,
+                        'deleted_count': result['deleted_rows'],
+                        'dropped_partitions': result['partitions'],
+                        'cutoff_date': cutoff_date.isoformat(),
+                        'retention_days': retention_days
+                    }
+                
                 result = session.execute(
                     delete(UnifiedLog).where(UnifiedLog.timestamp < cutoff_date)
                 )
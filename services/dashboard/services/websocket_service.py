@@ -1,13 +1,16 @@
 from flask_sock import Sock
 import json
 import logging
+import queue
 import time
 import secrets
-from typing import Dict, Set, Optional, Tuple
+from typing import Dict, List, Set, Optional, Tuple
 from threading import Lock, Thread
 from datetime import datetime, timedelta
 from enum import Enum
 
+from config import Config
+
 logger = logging.getLogger(__name__)
 
 
@@ -20,17 +23,125 @@ class ConnectionState(Enum):
     ERROR = "error"
 
 
+_CLOSE = object()
+
+
+class WebSocketConnection:
+    """
+    Outbound side of one WebSocket connection
+    
+    Messages are queued on a bounded queue and written by a dedicated
+    writer thread, so a slow client only ever delays its own messages.
+    The writer is also the only thread that sends on the socket, which
+    keeps frames from different senders from interleaving.
+    """
+    
+    def __init__(self, ws, user_id: str, room_type: str, room_id: Optional[str],
+                 room_stats: Dict[str, int], max_queue: int, on_error=None):
+        self.ws = ws
+        self.user_id = user_id
+        self.room_type = room_type
+        self.room_id = room_id
+        self.connected_at = datetime.utcnow()
+        self.last_ping = datetime.utcnow()
+        self.room_stats = room_stats
+        self.sent = 0
+        self.closed = False
+        self._send_started: Optional[float] = None
+        self._on_error = on_error
+        self._queue: queue.Queue = queue.Queue(maxsize=max_queue)
+        self._writer = Thread(target=self._drain, daemon=True)
+        self._writer.start()
+    
+    @property
+    def room_key(self) -> Tuple[str, Optional[str]]:
+        return (self.room_type, self.room_id)
+    
+    @property
+    def queue_depth(self) -> int:
+        return self._queue.qsize()
+    
+    def enqueue(self, payload: str) -> bool:
+        """Queue a serialized message; False when the connection is closed or backlogged"""
+        if self.closed:
+            return False
+        try:
+            self._queue.put_nowait(payload)
+            return True
+        except queue.Full:
+            return False
+    
+    def send_stalled(self, timeout: float) -> bool:
+        """True when the message currently being written has blocked for over timeout seconds"""
+        started = self._send_started
+        return started is not None and time.monotonic() - started > timeout
+    
+    def close(self, close_socket: bool = False):
+        """
+        Stop the writer after the messages already queued
+        
+        With close_socket the backlog is discarded and the writer closes
+        the socket, so the caller never blocks on a stalled client.
+        """
+        if self.closed:
+            return
+        self.closed = True
+        if close_socket:
+            while True:
+                try:
+                    self._queue.get_nowait()
+                except queue.Empty:
+                    break
+        try:
+            self._queue.put_nowait((_CLOSE, close_socket))
+        except queue.Full:
+            pass
+    
+    def _drain(self):
+        while True:
+            try:
+                item = self._queue.get(timeout=1.0)
+            except queue.Empty:
+                if self.closed:
+                    return
+                continue
+            if isinstance(item, tuple) and item[0] is _CLOSE:
+                if item[1]:
+                    try:
+                        self.ws.close()
+                    except Exception as e:
+                        logger.debug(f"Error closing evicted connection: {e}")
+                return
+            
+            self._send_started = time.monotonic()
+            try:
+                self.ws.send(item)
+                self.sent += 1
+                self.room_stats['sent'] += 1
+            except Exception as e:
+                logger.warning(f"Failed to send to connection: {e}")
+                self.room_stats['failed'] += 1
+                self.closed = True
+                if self._on_error:
+                    self._on_error(self)
+                return
+            finally:
+                self._send_started = None
+
+
 class WebSocketService:
     """WebSocket service for real-time workflow and system updates with authentication"""
     
+    ROOM_TYPES = ('workflows', 'tasks', 'deployments', 'system')
+    ROOMS_WITH_ID = ('workflows', 'deployments')
+    
     def __init__(self):
         self.sock = None
-        self.connections: Dict[str, Dict] = {
-            'workflows': {},
-            'tasks': {},
-            'deployments': {},
-            'system': {}
-        }
+        # (room_type, room_id) -> {id(ws): connection}; room_id is None for tasks/system
+        self.rooms: Dict[Tuple[str, Optional[str]], Dict[int, WebSocketConnection]] = {}
+        self.room_stats: Dict[Tuple[str, Optional[str]], Dict[str, int]] = {}
+        self._ws_index: Dict[int, WebSocketConnection] = {}
+        self._user_index: Dict[str, Set[int]] = {}
         self.lock = Lock()
         self.auth_tokens: Dict[str, Dict] = {}
         self.heartbeat_interval = 30
@@ -41,6 +152,8 @@ class WebSocketService:
         self.max_reconnect_attempts = 5
         self.reconnect_delay_base = 1
         self.reconnect_delay_max = 30
+        self.send_queue_size = Config.WEBSOCKET_SEND_QUEUE_SIZE
+        self.send_stall_timeout = Config.WEBSOCKET_SEND_STALL_TIMEOUT
         
     def init_app(self, app):
         """Initialize Flask-Sock with the Flask app"""
@@ -76,51 +189,84 @@ class WebSocketService:
             
             return token_data['user_id']
     
+    def _room_key(self, room_type: str, room_id: Optional[str]) -> Tuple[str, Optional[str]]:
+        return (room_type, room_id if room_type in self.ROOMS_WITH_ID else None)
+    
+    @staticmethod
+    def _room_label(room_key: Tuple[str, Optional[str]]) -> str:
+        room_type, room_id = room_key
+        return f"{room_type}/{room_id}" if room_id is not None else room_type
+    
     def add_connection(self, room_type: str, ws, user_id: str, room_id: str = None):
         """Add an authenticated WebSocket connection to a room"""
+        room_key = self._room_key(room_type, room_id)
         with self.lock:
-            conn_data = {
-                'ws': ws,
-                'user_id': user_id,
-                'connected_at': datetime.utcnow(),
-                'last_ping': datetime.utcnow()
-            }
-            
-            if room_type in ['workflows', 'deployments']:
-                if room_id not in self.connections[room_type]:
-                    self.connections[room_type][room_id] = []
-                self.connections[room_type][room_id].append(conn_data)
-                logger.info(f"Added connection for user {user_id} to {room_type}/{room_id}")
-            else:
-                if room_type not in self.connections:
-                    self.connections[room_type] = []
-                if not isinstance(self.connections[room_type], list):
-                    self.connections[room_type] = []
-                self.connections[room_type].append(conn_data)
-                logger.info(f"Added connection for user {user_id} to {room_type}")
+            previous = self._detach(id(ws))
+            stats = self.room_stats.setdefault(room_key, {
+                'messages': 0, 'enqueued': 0, 'sent': 0, 'failed': 0, 'dropped': 0, 'evicted': 0
+            })
+            conn = WebSocketConnection(
+                ws, user_id, room_type, room_key[1], stats,
+                max_queue=self.send_queue_size, on_error=self._on_send_error
+            )
+            self.rooms.setdefault(room_key, {})[id(ws)] = conn
+            self._ws_index[id(ws)] = conn
+            self._user_index.setdefault(user_id, set()).add(id(ws))
+        if previous:
+            previous.close()
+        logger.info(f"Added connection for user {user_id} to {self._room_label(room_key)}")
+    
+    def _detach(self, ws_id: int) -> Optional[WebSocketConnection]:
+        """Remove a connection from every index; caller holds self.lock"""
+        conn = self._ws_index.pop(ws_id, None)
+        if conn is None:
+            return None
+        
+        room = self.rooms.get(conn.room_key)
+        if room is not None:
+            room.pop(ws_id, None)
+            if not room:
+                del self.rooms[conn.room_key]
+                self.room_stats.pop(conn.room_key, None)
+        
+        user_conns = self._user_index.get(conn.user_id)
+        if user_conns is not None:
+            user_conns.discard(ws_id)
+            if not user_conns:
+                del self._user_index[conn.user_id]
+        return conn
     
     def remove_connection(self, room_type: str, ws, room_id: str = None):
         """Remove a WebSocket connection from a room"""
         with self.lock:
-            try:
-                if room_type in ['workflows', 'deployments']:
-                    if room_id in self.connections[room_type]:
-                        self.connections[room_type][room_id] = [
-                            conn for conn in self.connections[room_type][room_id]
-                            if conn['ws'] != ws
-                        ]
-                        if not self.connections[room_type][room_id]:
-                            del self.connections[room_type][room_id]
-                        logger.info(f"Removed connection from {room_type}/{room_id}")
-                else:
-                    if isinstance(self.connections[room_type], list):
-                        self.connections[room_type] = [
-                            conn for conn in self.connections[room_type]
-                            if conn['ws'] != ws
-                        ]
-                    logger.info(f"Removed connection from {room_type}")
-            except Exception as e:
-                logger.error(f"Error removing connection: {e}")
+            conn = self._ws_index.get(id(ws))
+            if conn is None or conn.room_key != self._room_key(room_type, room_id):
+                return
+            self._detach(id(ws))
+        conn.close()
+        logger.info(f"Removed connection from {self._room_label(conn.room_key)}")
+    
+    def _evict(self, conn: WebSocketConnection, reason: str):
+        """Drop a slow or broken client without waiting on its socket"""
+        with self.lock:
+            if self._ws_index.get(id(conn.ws)) is not conn:
+                return
+            self._detach(id(conn.ws))
+        conn.room_stats['evicted'] += 1
+        conn.close(close_socket=True)
+        logger.warning(f"Evicted connection for user {conn.user_id} from {self._room_label(conn.room_key)}: {reason}")
+    
+    def _on_send_error(self, conn: WebSocketConnection):
+        with self.lock:
+            if self._ws_index.get(id(conn.ws)) is conn:
+                self._detach(id(conn.ws))
+    
+    def _connections(self, room_key: Optional[Tuple[str, Optional[str]]] = None) -> List[WebSocketConnection]:
+        """Snapshot of connections in one room, or all connections"""
+        with self.lock:
+            if room_key is None:
+                return list(self._ws_index.values())
+            return list(self.rooms.get(room_key, {}).values())
     
     def broadcast_to_workflow(self, workflow_id: str, message: dict):
         """Broadcast message to all connections subscribed to a workflow"""
@@ -139,65 +285,50 @@ class WebSocketService:
         self._broadcast('system', message)
     
     def _broadcast(self, room_type: str, message: dict, room_id: str = None, user_filter: Optional[str] = None):
-        """Internal method to broadcast messages to a room with optional user filtering"""
-        with self.lock:
-            try:
-                message_json = json.dumps(message)
-                
-                if room_type in ['workflows', 'deployments']:
-                    if room_id in self.connections[room_type]:
-                        connections = list(self.connections[room_type][room_id])
-                        dead_connections = []
-                        successful = 0
-                        
-                        for conn_data in connections:
-                            if user_filter and conn_data['user_id'] != user_filter:
-                                continue
-                            
-                            try:
-                                conn_data['ws'].send(message_json)
-                                successful += 1
-                            except Exception as e:
-                                logger.warning(f"Failed to send to connection: {e}")
-                                dead_connections.append(conn_data['ws'])
-                        
-                        self.connections[room_type][room_id] = [
-                            conn for conn in connections
-                            if conn['ws'] not in dead_connections
-                        ]
-                        
-                        if not self.connections[room_type][room_id]:
-                            del self.connections[room_type][room_id]
-                        
-                        logger.debug(f"Broadcast to {room_type}/{room_id}: {successful}/{len(connections)} connections")
-                else:
-                    if not isinstance(self.connections[room_type], list):
-                        return
-                    
-                    connections = list(self.connections[room_type])
-                    dead_connections = []
-                    successful = 0
-                    
-                    for conn_data in connections:
-                        if user_filter and conn_data['user_id'] != user_filter:
-                            continue
-                        
-                        try:
-                            conn_data['ws'].send(message_json)
-                            successful += 1
-                        except Exception as e:
-                            logger.warning(f"Failed to send to connection: {e}")
-                            dead_connections.append(conn_data['ws'])
-                    
-                    self.connections[room_type] = [
-                        conn for conn in connections
-                        if conn['ws'] not in dead_connections
-                    ]
-                    
-                    logger.debug(f"Broadcast to {room_type}: {successful}/{len(connections)} connections")
-                    
-            except Exception as e:
-                logger.error(f"Error broadcasting message: {e}")
+        """
+        Internal method to broadcast messages to a room with optional user filtering
+        
+        The message is serialized once and queued on each connection; the
+        lock is only held to snapshot the room. Clients whose queue is full
+        are evicted as slow consumers.
+        """
+        try:
+            room_key = self._room_key(room_type, room_id)
+            connections = self._connections(room_key)
+            if not connections:
+                return
+            
+            message_json = json.dumps(message)
+            stats = connections[0].room_stats
+            stats['messages'] += 1
+            queued = 0
+            
+            for conn in connections:
+                if user_filter and conn.user_id != user_filter:
+                    continue
+                if conn.enqueue(message_json):
+                    queued += 1
+                elif not conn.closed:
+                    stats['dropped'] += 1
+                    self._evict(conn, f"send queue full ({self.send_queue_size} messages)")
+            
+            stats['enqueued'] += queued
+            logger.debug(f"Broadcast to {self._room_label(room_key)}: {queued}/{len(connections)} connections")
+        
+        except Exception as e:
+            logger.error(f"Error broadcasting message: {e}")
+    
+    def send(self, ws, message: dict) -> bool:
+        """Queue a message for a single connection (e.g. a pong reply)"""
+        conn = self._ws_index.get(id(ws))
+        if conn is None:
+            ws.send(json.dumps(message))
+            return True
+        if conn.enqueue(json.dumps(message)):
+            return True
+        if not conn.closed:
+            self._evict(conn, f"send queue full ({self.send_queue_size} messages)")
+        return False
     
     def start_heartbeat(self):
         """Start heartbeat thread to ping connections and clean up stale ones"""
@@ -217,80 +348,60 @@ class WebSocketService:
                 logger.error(f"Error in heartbeat loop: {e}")
     
     def _send_heartbeat(self):
-        """Send ping to all connections"""
+        """Queue a ping on all connections"""
         ping_message = json.dumps({'type': 'ping', 'timestamp': datetime.utcnow().isoformat()})
         
-        with self.lock:
-            for room_type in self.connections:
-                if isinstance(self.connections[room_type], dict):
-                    for room_id, connections in list(self.connections[room_type].items()):
-                        for conn_data in connections:
-                            try:
-                                conn_data['ws'].send(ping_message)
-                            except Exception as e:
-                                logger.debug(f"Failed to send ping: {e}")
-                elif isinstance(self.connections[room_type], list):
-                    for conn_data in self.connections[room_type]:
-                        try:
-                            conn_data['ws'].send(ping_message)
-                        except Exception as e:
-                            logger.debug(f"Failed to send ping: {e}")
+        for conn in self._connections():
+            if not conn.enqueue(ping_message) and not conn.closed:
+                self._evict(conn, "send queue full at heartbeat")
     
     def _cleanup_stale_connections(self):
-        """Remove connections that haven't responded to pings"""
+        """Remove connections that haven't responded to pings or whose writes have stalled"""
         stale_threshold = datetime.utcnow() - timedelta(seconds=self.heartbeat_interval * 3)
         
-        with self.lock:
-            for room_type in self.connections:
-                if isinstance(self.connections[room_type], dict):
-                    for room_id in list(self.connections[room_type].keys()):
-                        self.connections[room_type][room_id] = [
-                            conn for conn in self.connections[room_type][room_id]
-                            if conn['last_ping'] > stale_threshold
-                        ]
-                        if not self.connections[room_type][room_id]:
-                            del self.connections[room_type][room_id]
-                elif isinstance(self.connections[room_type], list):
-                    self.connections[room_type] = [
-                        conn for conn in self.connections[room_type]
-                        if conn['last_ping'] > stale_threshold
-                    ]
+        for conn in self._connections():
+            if conn.last_ping <= stale_threshold:
+                self._evict(conn, "no ping received")
+            elif conn.send_stalled(self.send_stall_timeout):
+                self._evict(conn, f"send blocked for over {self.send_stall_timeout}s")
     
     def update_ping_time(self, ws):
         """Update last ping time for a connection"""
-        with self.lock:
-            for room_type in self.connections:
-                if isinstance(self.connections[room_type], dict):
-                    for connections in self.connections[room_type].values():
-                        for conn_data in connections:
-                            if conn_data['ws'] == ws:
-                                conn_data['last_ping'] = datetime.utcnow()
-                                return
-                elif isinstance(self.connections[room_type], list):
-                    for conn_data in self.connections[room_type]:
-                        if conn_data['ws'] == ws:
-                            conn_data['last_ping'] = datetime.utcnow()
-                            return
+        conn = self._ws_index.get(id(ws))
+        if conn is not None:
+            conn.last_ping = datetime.utcnow()
     
     def get_connection_count(self) -> dict:
         """Get the number of active connections per room type"""
+        counts = {room_type: 0 for room_type in self.ROOM_TYPES}
         with self.lock:
-            workflows_count = sum(len(conns) for conns in self.connections.get('workflows', {}).values()) if isinstance(self.connections.get('workflows'), dict) else 0
-            tasks_count = len(self.connections.get('tasks', [])) if isinstance(self.connections.get('tasks'), list) else 0
-            deployments_count = sum(len(conns) for conns in self.connections.get('deployments', {}).values()) if isinstance(self.connections.get('deployments'), dict) else 0
-            system_count = len(self.connections.get('system', [])) if isinstance(self.connections.get('system'), list) else 0
-            
-            return {
-                'workflows': workflows_count,
-                'tasks': tasks_count,
-                'deployments': deployments_count,
-                'system': system_count
+            for (room_type, _), room in self.rooms.items():
+                counts[room_type] = counts.get(room_type, 0) + len(room)
+        return counts
+    
+    def get_room_metrics(self) -> Dict[str, Dict]:
+        """Get per-room send counters, connection count and queued backlog"""
+        with self.lock:
+            rooms = {key: list(room.values()) for key, room in self.rooms.items()}
+            stats = {key: dict(self.room_stats.get(key, {})) for key in rooms}
+        
+        metrics = {}
+        for key, connections in rooms.items():
+            depths = [conn.queue_depth for conn in connections]
+            metrics[self._room_label(key)] = {
+                **stats[key],
+                'connections': len(connections),
+                'queued': sum(depths),
+                'max_queue_depth': max(depths) if depths else 0
             }
+        return metrics
     
     def shutdown(self):
         """Shutdown the WebSocket service"""
         self.running = False
         self._broadcast_connection_state('all', ConnectionState.DISCONNECTED, 'Service shutting down')
+        for conn in self._connections():
+            conn.close()
         logger.info("WebSocket service shutdown")
     
     def _start_state_broadcaster(self):
@@ -398,11 +509,11 @@ class WebSocketService:
             logger.warning(f"Max reconnection attempts reached for {conn_id}")
             self.update_connection_state(ws, user_id, ConnectionState.ERROR)
             try:
-                ws.send(json.dumps({
+                self.send(ws, {
                     'type': 'reconnect_failed',
                     'message': 'Maximum reconnection attempts reached',
                     'timestamp': datetime.utcnow().isoformat()
-                }))
+                })
             except Exception:
                 pass
             return False
@@ -416,13 +527,14 @@ class WebSocketService:
             self.add_connection(room_type, ws, user_id, room_id)
             self.update_connection_state(ws, user_id, ConnectionState.CONNECTED)
             
-            ws.send(json.dumps({
+            # Queued so the connection's writer thread stays the only sender
+            self.send(ws, {
                 'type': 'reconnected',
                 'room_type': room_type,
                 'room_id': room_id,
                 'user_id': user_id,
                 'timestamp': datetime.utcnow().isoformat()
-            }))
+            })
             
             return True
             
@@ -432,9 +544,10 @@ class WebSocketService:
     
     def get_all_connection_states(self) -> Dict:
         """Get state information for all connections"""
+        total_connections = self.get_connection_count()
         with self.lock:
             return {
-                'total_connections': self.get_connection_count(),
+                'total_connections': total_connections,
                 'connection_states': {
                     conn_id: {
                         'state': state['state'].value,
@@ -449,31 +562,19 @@ class WebSocketService:
     def send_to_user(self, user_id: str, message: dict):
         """Send a message to all connections for a specific user"""
         with self.lock:
-            message_json = json.dumps(message)
-            sent_count = 0
-            
-            for room_type in self.connections:
-                if isinstance(self.connections[room_type], dict):
-                    for room_id, connections in self.connections[room_type].items():
-                        for conn_data in connections:
-                            if conn_data['user_id'] == user_id:
-                                try:
-                                    conn_data['ws'].send(message_json)
-                                    sent_count += 1
-                                except Exception as e:
-                                    logger.warning(f"Failed to send to user {user_id}: {e}")
-                elif isinstance(self.connections[room_type], list):
-                    for conn_data in self.connections[room_type]:
-                        if conn_data['user_id'] == user_id:
-                            try:
-                                conn_data['ws'].send(message_json)
-                                sent_count += 1
-                            except Exception as e:
-                                logger.warning(f"Failed to send to user {user_id}: {e}")
-            
-            return sent_count
+            connections = [self._ws_index[ws_id] for ws_id in self._user_index.get(user_id, ())]
+        
+        message_json = json.dumps(message)
+        sent_count = 0
+        for conn in connections:
+            if conn.enqueue(message_json):
+                sent_count += 1
+            elif not conn.closed:
+                self._evict(conn, f"send queue full ({self.send_queue_size} messages)")
+        
+        return sent_count
 
 
 websocket_service = WebSocketService()
 
-__all__ = ['websocket_service', 'WebSocketService', 'ConnectionState']
+__all__ = ['websocket_service', 'WebSocketService', 'WebSocketConnection', 'ConnectionState']
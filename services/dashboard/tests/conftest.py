@@ -0,0 +1,177 @@
+import hashlib
+import io
+import threading
+from datetime import datetime, timezone
+
+import pytest
+from minio.datatypes import Object
+from minio.deleteobjects import DeleteError
+from minio.error import S3Error
+from minio.helpers import ObjectWriteResult
+
+
+class FakeResponse(io.BytesIO):
+    """Object body shaped like the urllib3 response get_object returns"""
+    
+    def __init__(self, data, content_type):
+        super().__init__(data)
+        self.headers = {'Content-Type': content_type}
+    
+    def stream(self, amt=64 * 1024):
+        while True:
+            data = self.read(amt)
+            if not data:
+                return
+            yield data
+    
+    def release_conn(self):
+        pass
+
+
+class FakeMinio:
+    """
+    In-memory bucket store with the real ``Minio`` method signatures
+    
+    ``objects`` maps names to bytes and ``modified`` to last-modified
+    times. Uploads are read part by part as the real client reads them,
+    recording the largest read of each in ``reads``; ``puts``,
+    ``removed`` and ``requests`` (keys per multi-object delete) record
+    what was sent. Keys in ``fail`` are refused by ``remove_objects``.
+    Etags end in ``etag_suffix`` so two stores can disagree, as
+    multipart etags do.
+    """
+    
+    def __init__(self, objects=None, etag_suffix='', fail=()):
+        self.objects = {}
+        self.modified = {}
+        self.content_types = {}
+        self.etag_suffix = etag_suffix
+        self.fail = set(fail)
+        self.reads = []
+        self.puts = []
+        self.removed = []
+        self.requests = []
+        self.lock = threading.Lock()
+        for name, data in (objects or {}).items():
+            self.add(name, data)
+    
+    def add(self, name, data, last_modified=None, content_type='application/octet-stream'):
+        with self.lock:
+            self.objects[name] = data
+            self.modified[name] = last_modified or datetime.now(timezone.utc)
+            self.content_types[name] = content_type
+    
+    def etag(self, data):
+        return hashlib.md5(data).hexdigest() + self.etag_suffix
+    
+    def _missing(self, bucket_name, object_name):
+        return S3Error('NoSuchKey', 'Object does not exist', object_name, None, None, None,
+                       bucket_name=bucket_name, object_name=object_name)
+    
+    def bucket_exists(self, bucket_name):
+        return True
+    
+    def make_bucket(self, bucket_name, location=None, object_lock=False):
+        pass
+    
+    def put_object(self, bucket_name, object_name, data, length, content_type='application/octet-stream',
+                   metadata=None, sse=None, progress=None, part_size=0, num_parallel_uploads=3,
+                   tags=None, retention=None, legal_hold=False):
+        if length == -1 and not part_size:
+            raise ValueError('valid part size must be provided when object size is unknown')
+        parts = []
+        while True:
+            part = data.read(part_size or length)
+            if not part:
+                break
+            parts.append(part)
+        body = b''.join(parts)
+        if length != -1 and len(body) != length:
+            raise ValueError(f'read {len(body)} bytes, expected {length}')
+        self.add(object_name, body, content_type=content_type)
+        with self.lock:
+            self.reads.append(max(map(len, parts), default=0))
+            self.puts.append(object_name)
+        return ObjectWriteResult(bucket_name, object_name, None, self.etag(body), {})
+    
+    def get_object(self, bucket_name, object_name, offset=0, length=0, request_headers=None, ssec=None,
+                   version_id=None, extra_query_params=None):
+        if object_name not in self.objects:
+            raise self._missing(bucket_name, object_name)
+        data = self.objects[object_name]
+        end = offset + length if length else len(data)
+        return FakeResponse(data[offset:end], self.content_types.get(object_name, 'application/octet-stream'))
+    
+    def stat_object(self, bucket_name, object_name, ssec=None, version_id=None, extra_query_params=None):
+        if object_name not in self.objects:
+            raise self._missing(bucket_name, object_name)
+        data = self.objects[object_name]
+        return Object(bucket_name, object_name, last_modified=self.modified.get(object_name),
+                      etag=self.etag(data), size=len(data),
+                      content_type=self.content_types.get(object_name))
+    
+    def list_objects(self, bucket_name, prefix=None, recursive=False, start_after=None,
+                     include_user_meta=False, include_version=False, use_api_v1=False,
+                     use_url_encoding_type=True, fetch_owner=False):
+        prefix = prefix or ''
+        seen = set()
+        with self.lock:
+            names = sorted(self.objects)
+        for name in names:
+            if not name.startswith(prefix) or (start_after is not None and name <= start_after):
+                continue
+            rest = name[len(prefix):]
+            if not recursive and '/' in rest:
+                sub_prefix = prefix + rest.split('/', 1)[0] + '/'
+                if sub_prefix not in seen:
+                    seen.add(sub_prefix)
+                    yield Object(bucket_name, sub_prefix)
+                continue
+            data = self.objects.get(name)
+            if data is None:
+                continue
+            yield Object(bucket_name, name, last_modified=self.modified.get(name),
+                         etag=self.etag(data), size=len(data))
+    
+    def remove_object(self, bucket_name, object_name, version_id=None):
+        with self.lock:
+            self.objects.pop(object_name, None)
+            self.modified.pop(object_name, None)
+            self.removed.append(object_name)
+    
+    def remove_objects(self, bucket_name, delete_object_list, bypass_governance_mode=False):
+        def errors():
+            names = [item._name for item in delete_object_list]
+            with self.lock:
+                self.requests.append(len(names))
+            for name in names:
+                if name in self.fail:
+                    yield DeleteError('AccessDenied', 'Access Denied', name, None)
+                else:
+                    self.remove_object(bucket_name, name)
+        # Like the real client, nothing is sent until the errors are consumed
+        return errors()
+
+
+@pytest.fixture
+def log_database(monkeypatch):
+    """db_service pointed at an in-memory SQLite database holding the log tables"""
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    from sqlalchemy.pool import StaticPool
+    from models.logs import LogEntry, LogStream
+    from services.db_service import db_service
+    
+    engine = create_engine('sqlite://', poolclass=StaticPool, connect_args={'check_same_thread': False})
+    LogEntry.__table__.create(engine)
+    LogStream.__table__.create(engine)
+    monkeypatch.setattr(db_service, '_engine', engine)
+    monkeypatch.setattr(db_service, '_session_factory', sessionmaker(bind=engine))
+    yield db_service
+    engine.dispose()
+
+
+@pytest.fixture
+def make_minio():
+    """Factory for in-memory MinIO clients"""
+    return FakeMinio
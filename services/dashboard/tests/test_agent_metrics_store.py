@@ -0,0 +1,102 @@
+from datetime import datetime, timedelta
+from services.agent_metrics_store import AgentMetricsStore, extract_points, bucket_start
+
+
+def make_report(cpu, memory=40.0, bytes_sent=0):
+    return {
+        'hostname': 'node-1',
+        'agent_version': '1.0.0',
+        'cpu': {'percent': cpu, 'load_avg_1m': 0.5},
+        'memory': {'ram': {'percent': memory}, 'swap': {'percent': 0}},
+        'disk': {'partitions': [{'mountpoint': '/', 'percent': 71.5}]},
+        'network': {'bytes_sent': bytes_sent, 'bytes_recv': 10},
+        'temperatures': {'available': True, 'sensors': {'coretemp': [{'current': 48.0}, {'current': 55.0}]}},
+        'docker': {'error': 'Docker not available or not running'}
+    }
+
+
+class TestAgentMetricsStore:
+    """Tests for agent report flattening, rollups and range queries (local store)"""
+    
+    def make_store(self):
+        return AgentMetricsStore(retention_days={'1m': 2, '5m': 14, '1h': 180}, local_max_buckets=100)
+    
+    def test_extract_points_flattens_numeric_metrics(self):
+        """Test reports are flattened into named numeric points"""
+        points = extract_points(make_report(12.5))
+        
+        assert points['cpu.percent'] == 12.5
+        assert points['memory.percent'] == 40.0
+        assert points['disk.percent:/'] == 71.5
+        assert points['temperature.max'] == 55.0
+        assert 'docker.running' not in points
+    
+    def test_rollups_at_every_resolution(self):
+        """Test reports in the same bucket fold into count/sum/min/max/last"""
+        store = self.make_store()
+        start = bucket_start(datetime.utcnow() - timedelta(minutes=10), 3600)
+        for i, cpu in enumerate([10.0, 30.0, 20.0, 50.0]):
+            store.ingest('node-1', make_report(cpu), received_at=start + timedelta(seconds=15 * i))
+        
+        minute = store.query_range('node-1', ['cpu.percent'], start, start + timedelta(minutes=5), resolution='1m')
+        assert minute['source'] == 'local'
+        assert [p['count'] for p in minute['series']['cpu.percent']] == [4]
+        point = minute['series']['cpu.percent'][0]
+        assert (point['avg'], point['min'], point['max'], point['last']) == (27.5, 10.0, 50.0, 50.0)
+        
+        hour = store.query_range('node-1', ['cpu.percent'], start, start + timedelta(hours=1), resolution='1h')
+        assert hour['series']['cpu.percent'][0]['count'] == 4
+        assert store.latest('node-1')['cpu']['percent'] == 50.0
+    
+    def test_counter_rates_skip_resets(self):
+        """Test counters report a per-second rate and ignore counter resets"""
+        store = self.make_store()
+        start = bucket_start(datetime.utcnow() - timedelta(hours=1), 3600)
+        for minute, sent in enumerate([0, 6000, 12000, 100]):
+            store.ingest('node-1', make_report(1.0, bytes_sent=sent), received_at=start + timedelta(minutes=minute))
+        
+        result = store.query_range('node-1', ['network.bytes_sent'], start, start + timedelta(minutes=4),
+                                   resolution='1m')
+        rates = [p['rate'] for p in result['series']['network.bytes_sent']]
+        assert rates == [None, 100.0, 100.0, None]
+    
+    def test_resolution_follows_range_and_retention(self):
+        """Test the finest resolution within max points and retention is picked"""
+        store = self.make_store()
+        now = datetime.utcnow()
+        
+        assert store.pick_resolution(now - timedelta(hours=1), now) == '1m'
+        assert store.pick_resolution(now - timedelta(days=1), now) == '5m'
+        assert store.pick_resolution(now - timedelta(days=7), now) == '1h'
+        assert store.pick_resolution(now - timedelta(days=3), now - timedelta(days=3) + timedelta(hours=1)) == '5m'
+    
+    def test_late_batch_keeps_newer_last_value(self):
+        """Test a batch sampled earlier than one already stored does not replace ``last``"""
+        store = self.make_store()
+        start = bucket_start(datetime.utcnow() - timedelta(minutes=10), 3600)
+        store.ingest_many('node-1', [(start + timedelta(seconds=40), make_report(70.0))])
+        store.ingest_many('node-1', [(start + timedelta(seconds=10), make_report(20.0)),
+                                     (start + timedelta(seconds=20), make_report(30.0))])
+        
+        minute = store.query_range('node-1', ['cpu.percent'], start, start + timedelta(minutes=1), resolution='1m')
+        point = minute['series']['cpu.percent'][0]
+        assert (point['count'], point['min'], point['last']) == (3, 20.0, 70.0)
+    
+    def test_upsert_replaces_last_only_when_newer(self):
+        """Test the rollup upsert guards ``last`` with the stored sample time"""
+        from sqlalchemy.dialects import postgresql
+        store = self.make_store()
+        statements = []
+        
+        class Session:
+            def execute(self, statement):
+                statements.append(str(statement.compile(dialect=postgresql.dialect())))
+        
+        sampled_at = datetime(2026, 1, 1, 12, 0, 30)
+        store._write(Session(), 'node-1', make_report(5.0), sampled_at, None,
+                     store._rollup([(sampled_at, {'cpu.percent': 5.0})]))
+        
+        rollup = statements[1]
+        assert ('last = CASE WHEN (agent_metrics_1m.last_at IS NULL '
+                'OR excluded.last_at >= agent_metrics_1m.last_at)') in rollup
+        assert 'last_at = greatest(agent_metrics_1m.last_at, excluded.last_at)' in rollup
@@ -0,0 +1,43 @@
+import time
+from config import Config
+from services.agent_orchestrator import AgentOrchestrator, AgentProfile
+
+
+def make_specialist(agent_id, name):
+    return AgentProfile(agent_id, name, name.lower(), 'You are a specialist.', 'gpt-4o')
+
+
+class TestSpecialistConsultation:
+    """Tests for concurrent specialist consultation"""
+    
+    def test_specialists_consulted_concurrently_with_timeouts(self, monkeypatch):
+        """Test specialists answer in one round trip and a slow one times out"""
+        monkeypatch.setattr(Config, 'AGENT_CONSULT_TIMEOUT', 0.5)
+        monkeypatch.setattr(Config, 'AGENT_CONSULT_MAX_WORKERS', 4)
+        orchestrator = AgentOrchestrator()
+        
+        def think(agent, problem, context):
+            if agent.name == 'Slow':
+                time.sleep(2)
+            elif agent.name == 'Broken':
+                raise RuntimeError('model unavailable')
+            else:
+                time.sleep(0.2)
+            return f"{agent.name} says check {problem}"
+        
+        monkeypatch.setattr(orchestrator, '_agent_think', think)
+        events = []
+        monkeypatch.setattr(orchestrator, '_publish_task_event',
+                            lambda task_id, event, agent=None, **data: events.append((agent.name, data)))
+        specialists = [make_specialist(i, name) for i, name in enumerate(['Athena', 'Slow', 'Mercury', 'Broken'])]
+        
+        begin = time.monotonic()
+        responses, errors = orchestrator._consult_specialists(7, specialists, 'disk', {})
+        elapsed = time.monotonic() - begin
+        
+        assert list(responses) == ['Athena', 'Mercury']
+        assert responses['Athena'] == 'Athena says check disk'
+        assert set(errors) == {'Slow', 'Broken'}
+        assert 'Timed out' in errors['Slow']
+        assert sorted(name for name, _ in events) == ['Athena', 'Broken', 'Mercury', 'Slow']
+        assert elapsed < 1.0
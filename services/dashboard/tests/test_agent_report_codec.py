@@ -0,0 +1,86 @@
+import gzip
+import json
+from datetime import datetime
+import pytest
+from services.agent_report_codec import (
+    AgentReportError, DeltaBaseMismatch, decode_body, apply_delta, expand_reports, sampled_at
+)
+
+
+def make_report(seq, cpu, disks=('/',)):
+    return {
+        'seq': seq,
+        'timestamp': f'2026-01-20T10:00:{seq:02d}',
+        'hostname': 'node-1',
+        'cpu': {'percent': cpu, 'cores': 8},
+        'memory': {'ram': {'percent': 40.0}},
+        'disk': {'partitions': [{'mountpoint': d, 'percent': 50.0} for d in disks]}
+    }
+
+
+class TestAgentReportCodec:
+    """Tests for decoding compressed, delta-encoded agent batches"""
+    
+    def test_gzip_json_body_is_decoded(self):
+        """Test gzip-compressed JSON uploads decode to the original payload"""
+        payload = {'v': 2, 'hostname': 'node-1', 'reports': [{'full': make_report(1, 5.0)}]}
+        body = gzip.compress(json.dumps(payload).encode())
+        
+        assert decode_body(body, 'application/json', 'gzip') == payload
+    
+    def test_decompressed_size_is_capped(self):
+        """Test a small gzip body cannot expand past the size limit"""
+        body = gzip.compress(b' ' * 100000)
+        
+        with pytest.raises(AgentReportError) as excinfo:
+            decode_body(body, 'application/json', 'gzip', max_bytes=1000)
+        assert excinfo.value.status_code == 413
+    
+    def test_deltas_chain_from_stored_base(self):
+        """Test a batch of deltas rebuilds each report without touching the base"""
+        base = dict(make_report(1, 5.0), received_at='2026-01-20T10:00:01')
+        payload = {'v': 2, 'reports': [
+            {'base': 1, 'set': [[['seq'], 2], [['cpu', 'percent'], 7.5]], 'unset': []},
+            {'base': 2, 'set': [[['seq'], 3], [['disk', 'partitions'], []]], 'unset': [['memory', 'ram']]}
+        ]}
+        
+        second, third = expand_reports(payload, base)
+        
+        assert second['cpu'] == {'percent': 7.5, 'cores': 8}
+        assert second['disk'] is base['disk']
+        assert third['seq'] == 3 and third['memory'] == {} and third['disk']['partitions'] == []
+        assert base['cpu']['percent'] == 5.0 and base['memory'] == {'ram': {'percent': 40.0}}
+    
+    def test_unknown_base_requests_resync(self):
+        """Test a delta against a report the dashboard does not hold is rejected"""
+        payload = {'v': 2, 'reports': [{'base': 4, 'set': [[['seq'], 5]], 'unset': []}]}
+        
+        with pytest.raises(DeltaBaseMismatch) as excinfo:
+            expand_reports(payload, make_report(3, 1.0))
+        assert excinfo.value.status_code == 409
+        with pytest.raises(DeltaBaseMismatch):
+            expand_reports(payload, None)
+        
+        resent = expand_reports({'v': 2, 'reports': [{'full': make_report(5, 1.0)}]}, None)
+        assert resent[0]['seq'] == 5
+    
+    def test_sample_time_is_clamped(self):
+        """Test report timestamps are used for bucketing but never in the future"""
+        now = datetime(2026, 1, 20, 10, 0, 30)
+        
+        assert sampled_at({'timestamp': '2026-01-20T10:00:05'}, now) == datetime(2026, 1, 20, 10, 0, 5)
+        assert sampled_at({'timestamp': '2026-01-20T11:00:00+01:00'}, now) == datetime(2026, 1, 20, 10, 0, 0)
+        assert sampled_at({'timestamp': '2026-01-21T00:00:00'}, now) == now
+        assert sampled_at({}, now) == now
+    
+    def test_apply_delta_matches_agent_encoding(self):
+        """Test nested changes, additions and removals round-trip"""
+        base = make_report(1, 5.0, disks=('/', '/data'))
+        delta = {'set': [[['seq'], 2], [['docker'], {'running': 3}], [['cpu', 'percent'], 9.0]],
+                 'unset': [['memory']]}
+        
+        result = apply_delta(base, delta)
+        
+        assert result['docker'] == {'running': 3}
+        assert 'memory' not in result and 'memory' in base
+        assert result['cpu']['percent'] == 9.0
@@ -0,0 +1,117 @@
+import threading
+import time
+from services.alert_service import AlertService, AlertRule
+
+
+def make_rule(rule_id, alert_type='cpu', condition='gt', threshold=80.0, target=None, cooldown=300,
+              notifications=None):
+    return AlertRule(
+        id=rule_id,
+        name=f'rule {rule_id}',
+        alert_type=alert_type,
+        condition=condition,
+        threshold=threshold,
+        target=target,
+        cooldown_seconds=cooldown,
+        notifications=notifications or []
+    )
+
+
+class TestAlertEngine:
+    """Tests for cached rule evaluation, cooldowns and batched firing"""
+    
+    def make_service(self, rules):
+        service = AlertService()
+        service._rules = rules
+        service._rules_version = 0
+        service._rules_loaded_at = time.monotonic()
+        service.batches = []
+        
+        def record(firing):
+            service.batches.append(firing)
+            return [{'id': f'00000000-0000-0000-0000-{i:012d}'} for i in range(len(firing))]
+        service._record_firings = record
+        return service
+    
+    def test_metrics_sampled_once_and_written_in_one_batch(self):
+        """Test many rules share one sample per metric and fire in a single write"""
+        rules = [make_rule(f'cpu-{i}', threshold=float(i)) for i in range(100)]
+        rules.append(make_rule('mem', alert_type='memory', threshold=99.0))
+        service = self.make_service(rules)
+        calls = []
+        service.get_metric_value = lambda alert_type, target=None: calls.append(alert_type) or 50.0
+        
+        result = service.check_all_alerts()
+        
+        assert sorted(calls) == ['cpu', 'memory']
+        assert result['checked'] == 101
+        assert result['triggered'] == 50
+        assert len(service.batches) == 1
+        
+        # Cooldown (in-memory fallback without Redis) suppresses the next cycle
+        assert service.check_all_alerts()['triggered'] == 0
+    
+    def test_failed_write_releases_cooldown(self):
+        """Test a firing that could not be recorded does not start the cooldown"""
+        service = self.make_service([make_rule('cpu', threshold=10.0)])
+        service.get_metric_value = lambda alert_type, target=None: 50.0
+        record = service._record_firings
+        service._record_firings = lambda firing: None
+        
+        assert service.check_all_alerts()['triggered'] == 0
+        service._record_firings = record
+        assert service.check_all_alerts()['triggered'] == 1
+    
+    def test_expired_cooldowns_evicted(self):
+        """Test in-process cooldowns are dropped once they end instead of piling up per subject"""
+        service = self.make_service([make_rule('cpu', threshold=10.0, cooldown=300)])
+        service.get_metric_value = lambda alert_type, target=None: 50.0
+        now = time.time()
+        service._cooldown_until = {('disk', f'web-{i}:/'): now - 1 for i in range(1000)}
+        service._cooldown_until[('host', 'web-cpu')] = now + 60
+        
+        assert service.check_all_alerts()['triggered'] == 1
+        
+        assert set(service._cooldown_until) == {('cpu', ''), ('host', 'web-cpu')}
+        assert service.check_all_alerts()['triggered'] == 0
+    
+    def test_agent_rules_fan_out_per_host_and_mount(self):
+        """Test wildcard agent rules evaluate each reporting host and partition"""
+        service = self.make_service([
+            make_rule('disk', alert_type='disk', threshold=90.0, target='agent:*'),
+            make_rule('cpu', threshold=50.0, target='agent:nas'),
+            make_rule('local', threshold=0.0)
+        ])
+        report = {
+            'cpu': {'percent': 75.0},
+            'disk': {'partitions': [{'mountpoint': '/', 'percent': 95.0},
+                                    {'mountpoint': '/data', 'percent': 40.0}]}
+        }
+        
+        assert service.evaluate_agent_metrics('web', report)['triggered'] == 1
+        assert service.evaluate_agent_metrics('nas', report)['triggered'] == 2
+        subjects = [subject for batch in service.batches for _, subject, _ in batch]
+        assert subjects == ['web:/', 'nas:/', 'nas']
+    
+    def test_notifications_are_dispatched_off_thread(self):
+        """Test firing returns before a slow notification completes"""
+        service = self.make_service([make_rule('cpu', threshold=10.0, notifications=[('discord_webhook', 'x')])])
+        service.get_metric_value = lambda alert_type, target=None: 50.0
+        release, sent = threading.Event(), threading.Event()
+        
+        def send_notification(**kwargs):
+            release.wait(5)
+            sent.set()
+            return {'success': True}
+        service.send_notification = send_notification
+        recorded = []
+        service._record_notification_results = recorded.extend
+        
+        assert service.check_all_alerts()['triggered'] == 1
+        assert not sent.is_set()
+        release.set()
+        assert sent.wait(2)
+        deadline = time.monotonic() + 2
+        while not recorded and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert recorded[0][1] == [{'success': True}]
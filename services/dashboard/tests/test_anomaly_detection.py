@@ -0,0 +1,109 @@
+import time
+import numpy as np
+import pytest
+from services.anomaly_detection import AnomalyDetector
+
+
+def make_baseline(mean, std, sensitivity=2.0):
+    return {
+        'statistics': {'mean': mean, 'std_dev': std},
+        'thresholds': {'low': max(0, mean - sensitivity * std), 'high': mean + sensitivity * std,
+                       'sensitivity': sensitivity}
+    }
+
+
+class TestAnomalyDetector:
+    """Tests for vectorized anomaly scoring"""
+    
+    def test_detect_all_scores_in_one_pass(self):
+        """Test detection over several services matches per-metric z-score rules"""
+        detector = AnomalyDetector()
+        detector._baseline_cache = {
+            ('web', 'cpu_percent'): make_baseline(20.0, 5.0),
+            ('web', 'memory_percent'): make_baseline(50.0, 2.0),
+            ('db', 'cpu_percent'): make_baseline(10.0, 0.0)
+        }
+        detector._cache_loaded_at = time.monotonic()
+        recorded = []
+        detector._record_anomaly_events = lambda anomalies: recorded.extend(anomalies) or len(anomalies)
+        
+        anomalies = detector.detect_all_anomalies({
+            'web': {'cpu_percent': 45.0, 'memory_percent': 51.0},
+            'db': {'cpu_percent': 99.0},
+            'cache': {'cpu_percent': 80.0}
+        })
+        
+        assert [(a['service_name'], a['metric_name']) for a in anomalies] == [('web', 'cpu_percent')]
+        assert anomalies[0]['anomaly_score'] == 5.0
+        assert anomalies[0]['severity'] == 'critical'
+        assert anomalies[0]['direction'] == 'above'
+        assert recorded == anomalies
+        assert detector.detect_anomaly('db', 'cpu_percent', 99.0) == (False, 0.0, 'unknown', 'normal')
+        assert detector.detect_anomaly('web', 'memory_percent', 45.5) == (True, 2.25, 'medium', 'below')
+    
+    def test_observe_keeps_pending_summaries(self):
+        """Test observed samples accumulate in memory until persisted"""
+        detector = AnomalyDetector()
+        for value in (10.0, 20.0, 30.0):
+            detector.observe_metrics({'web': {'cpu_percent': value, 'status': 'running'}})
+        
+        stats, sketch = detector._pending[('web', 'cpu_percent')]
+        assert stats.count == 3 and stats.mean == 20.0
+        assert sketch.count == 3
+        assert detector.persist_baselines() == 0
+    
+    def test_seasonal_buckets_from_telemetry_batches(self):
+        """Test batched accumulation matches per-bucket statistics and drives seasonal scoring"""
+        detector = AnomalyDetector()
+        rng = np.random.default_rng(4)
+        epochs = np.arange(0, 14 * 86400, 60.0)
+        # Nightly spike at 03:00: cpu ~80 instead of ~10
+        nightly = (epochs // 3600) % 24 == 3
+        cpu = np.where(nightly, 80.0, 10.0) + rng.normal(0, 2, epochs.size)
+        rows = [('plex', e, c, 512, 1024, 0) for e, c in zip(epochs, cpu)]
+        
+        totals = {}
+        for start in range(0, len(rows), 5000):
+            detector._accumulate_seasonal(rows[start:start + 5000], totals, {}, 168)
+        counts, means, m2s = totals[('plex', 'cpu_percent')]
+        
+        bucket = 3  # epoch hour 3 (Thursday 03:00 UTC)
+        in_bucket = ((epochs // 3600) % 168) == bucket
+        assert counts[bucket] == in_bucket.sum()
+        assert means[bucket] == pytest.approx(cpu[in_bucket].mean())
+        assert m2s[bucket] / counts[bucket] == pytest.approx(cpu[in_bucket].var())
+        assert totals[('plex', 'memory_percent')][1][bucket] == pytest.approx(50.0)
+        
+        baseline = make_baseline(float(cpu.mean()), float(cpu.std()))
+        baseline['seasonal'] = {'period_hours': 168, 'count': counts.tolist(), 'mean': means.tolist(),
+                                'std': np.sqrt(m2s / np.maximum(counts, 1)).tolist()}
+        detector._baseline_cache = {('plex', 'cpu_percent'): baseline}
+        detector._cache_loaded_at = time.monotonic()
+        at = 7 * 86400 + bucket * 3600 + 60
+        
+        assert detector._evaluate([('plex', 'cpu_percent', 82.0)], at=at)[0][0] is True
+        detector.detection_mode = 'seasonal'
+        assert detector._evaluate([('plex', 'cpu_percent', 82.0)], at=at)[0][0] is False
+        assert detector._evaluate([('plex', 'cpu_percent', 82.0)], at=at + 3600)[0][0] is True
+    
+    def test_incremental_watermarks_per_metric(self):
+        """Test each (service, metric) only merges rows past its own watermark"""
+        detector = AnomalyDetector()
+        rows = [('plex', float(e), 10.0, 512, 1024, 0) for e in range(0, 10 * 3600, 3600)]
+        rows += [('n8n', float(e), 5.0, 0, 0, 0) for e in range(0, 10 * 3600, 3600)]
+        through = {
+            ('plex', 'cpu_percent'): 5 * 3600.0,
+            ('plex', 'memory_percent'): 2 * 3600.0,
+            ('plex', 'restart_count'): 8 * 3600.0
+        }
+        
+        totals = {}
+        detector._accumulate_seasonal(rows, totals, through, 168)
+        
+        assert totals[('plex', 'cpu_percent')][0].sum() == 4
+        assert totals[('plex', 'memory_percent')][0].sum() == 7
+        assert totals[('plex', 'restart_count')][0].sum() == 1
+        assert totals[('n8n', 'cpu_percent')][0].sum() == 10
+        assert detector._service_watermarks(through) == {'plex': 2 * 3600.0}
+        del through[('plex', 'restart_count')]
+        assert detector._service_watermarks(through) == {}
@@ -0,0 +1,73 @@
+import gzip
+import hashlib
+import sys
+import pytest
+from services.backup_stream import (
+    stream_command_to_object, stream_object_to_command, BackupStreamError
+)
+
+PART_SIZE = 5 * 1024 * 1024
+PAYLOAD_SIZE = 12 * 1024 * 1024
+
+WRITER = (
+    "import os, sys\n"
+    "block = os.urandom(64 * 1024)\n"
+    f"for _ in range({PAYLOAD_SIZE} // len(block)):\n"
+    "    sys.stdout.buffer.write(block)\n"
+)
+
+
+class TestBackupStream:
+    """Tests for streaming dumps to and from object storage"""
+    
+    def test_dump_is_compressed_while_uploading(self, make_minio):
+        """Test command output is gzipped into the object part by part with a checksum"""
+        client = make_minio()
+        
+        result = stream_command_to_object([sys.executable, '-c', WRITER], client, 'backups', 'db.sql.gz',
+                                          compression='gzip', part_size=PART_SIZE)
+        
+        stored = client.objects['db.sql.gz']
+        assert len(gzip.decompress(stored)) == PAYLOAD_SIZE
+        assert result['raw_size_bytes'] == PAYLOAD_SIZE
+        assert result['size_bytes'] == len(stored)
+        assert result['sha256'] == hashlib.sha256(stored).hexdigest()
+        assert max(client.reads) <= PART_SIZE
+    
+    def test_failed_dump_removes_object(self, make_minio):
+        """Test a failing command raises with its stderr and leaves no object behind"""
+        client = make_minio()
+        failing = "import sys; sys.stdout.write('partial'); sys.stderr.write('connection refused'); sys.exit(1)"
+        
+        with pytest.raises(BackupStreamError, match='connection refused'):
+            stream_command_to_object([sys.executable, '-c', failing], client, 'backups', 'db.sql')
+        
+        assert client.objects == {}
+    
+    def test_restore_streams_decompressed_object(self, tmp_path, make_minio):
+        """Test an object is decompressed into a command's stdin and verified"""
+        client = make_minio()
+        upload = stream_command_to_object([sys.executable, '-c', WRITER], client, 'backups', 'db.sql.gz',
+                                          part_size=PART_SIZE)
+        target = tmp_path / 'restored'
+        reader = f"import shutil, sys; shutil.copyfileobj(sys.stdin.buffer, open({str(target)!r}, 'wb'))"
+        
+        result = stream_object_to_command(client, 'backups', 'db.sql.gz', [sys.executable, '-c', reader],
+                                          expected_sha256=upload['sha256'], spool_dir=str(tmp_path))
+        
+        assert target.stat().st_size == PAYLOAD_SIZE
+        assert result['raw_size_bytes'] == PAYLOAD_SIZE
+        assert result['verified'] is True
+    
+    def test_corrupt_object_never_reaches_command(self, tmp_path, make_minio):
+        """Test a checksum mismatch is caught before the restore command starts"""
+        client = make_minio()
+        client.objects['db.sql.gz'] = gzip.compress(b'select 1;')
+        target = tmp_path / 'restored'
+        reader = f"open({str(target)!r}, 'wb').write(b'applied')"
+        
+        with pytest.raises(BackupStreamError, match='Checksum mismatch'):
+            stream_object_to_command(client, 'backups', 'db.sql.gz', [sys.executable, '-c', reader],
+                                     expected_sha256='0' * 64, spool_dir=str(tmp_path))
+        
+        assert not target.exists()
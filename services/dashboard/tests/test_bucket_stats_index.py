@@ -0,0 +1,58 @@
+import sys
+import time
+from types import SimpleNamespace
+from services.bucket_stats_index import BucketStatsIndex, scan_page, prefix_of
+from services.cache_service import cache_service
+
+
+def listing(keys):
+    return iter(SimpleNamespace(object_name=key, size=size, is_dir=False) for key, size in keys)
+
+
+class TestBucketStatsScan:
+    """Tests for incremental bucket listing aggregation"""
+    
+    def test_scan_resumes_from_marker(self):
+        """Test a paused scan continues where it stopped and sums every prefix once"""
+        keys = [('Movies/a.mkv', 100), ('Movies/b.mkv', 200), ('TV/s01e01.mkv', 50), ('readme.txt', 5)]
+        partial = {}
+        
+        marker, folded, complete = scan_page(listing(keys), partial, 2, time.monotonic() + 60, 100)
+        assert (marker, folded, complete) == ('Movies/b.mkv', 2, False)
+        
+        remaining = [k for k in keys if k[0] > marker]
+        marker, folded, complete = scan_page(listing(remaining), partial, 2, time.monotonic() + 60, 100)
+        assert complete is False and folded == 2
+        assert scan_page(listing([]), partial, 2, time.monotonic() + 60, 100) == (None, 0, True)
+        
+        assert partial == {'Movies': [300, 2], 'TV': [50, 1], 'root': [5, 1]}
+    
+    def test_prefixes_capped(self):
+        """Test prefixes beyond the cap are summed together"""
+        keys = [(f'dir{i}/file', 10) for i in range(5)]
+        partial = {}
+        
+        _, _, complete = scan_page(listing(keys), partial, 100, time.monotonic() + 60, 3)
+        
+        assert complete
+        assert partial['(other)'] == [20, 2]
+        assert len(partial) == 4
+        assert prefix_of('top.txt') == 'root'
+    
+    def test_unindexed_bucket_queued_once(self, monkeypatch):
+        """Test requests for an unindexed bucket never list it and queue a single scan"""
+        index = BucketStatsIndex(scan_batch=10, scan_seconds=1, max_prefixes=10)
+        pending = {'size_bytes': 5, 'object_count': 1, 'pending': True, 'prefixes': {}}
+        monkeypatch.setattr(index, 'get_buckets', lambda backend: {})
+        monkeypatch.setattr(index, '_db_available', lambda: True)
+        monkeypatch.setattr(index, '_pending', lambda backend, bucket: pending)
+        claims, queued = set(), []
+        monkeypatch.setattr(cache_service, 'claim', lambda key, ttl: key not in claims and not claims.add(key))
+        monkeypatch.setitem(sys.modules, 'workers.storage_worker', SimpleNamespace(
+            refresh_bucket_stats=SimpleNamespace(delay=lambda **kwargs: queued.append(kwargs))
+        ))
+        client = SimpleNamespace(list_objects=lambda *args, **kwargs: 1 / 0)
+        
+        assert index.get_bucket('local', 'media', client) is pending
+        assert index.get_bucket('local', 'media', client) is pending
+        assert queued == [{'backend': 'local', 'bucket': 'media'}]
@@ -0,0 +1,81 @@
+import time
+from config import Config
+from services.bucket_sync import BucketSyncEngine, BandwidthLimiter, SyncManifest
+
+
+class TestBucketSyncEngine:
+    """Tests for streaming, resumable bucket sync"""
+    
+    def make_engine(self, src, dst, **kwargs):
+        manifest = SyncManifest(f"bucket-{id(src)}", 'local', 'cloud')
+        return BucketSyncEngine(src, dst, manifest, workers=4, part_size=6 * 1024 * 1024, **kwargs)
+    
+    def test_objects_streamed_in_parts_and_extras_deleted(self, make_minio):
+        """Test large objects are copied part by part and extras removed"""
+        big = b'x' * (13 * 1024 * 1024)
+        src = make_minio({'media/movie.mkv': big, 'a.txt': b'alpha'})
+        dst = make_minio({'a.txt': b'alpha', 'old.txt': b'stale'})
+        progress = []
+        
+        result = self.make_engine(src, dst, on_progress=progress.append).run('media', delete_extra=True)
+        
+        assert dst.objects['media/movie.mkv'] == big
+        assert max(dst.reads) <= 6 * 1024 * 1024
+        assert (result['copied'], result['skipped'], result['deleted']) == (1, 1, 1)
+        assert result['bytes_copied'] == len(big)
+        assert dst.removed == ['old.txt']
+        assert dst.requests == [1]
+        assert progress[-1]['state'] == 'completed'
+    
+    def test_rerun_skips_objects_recorded_in_manifest(self, make_minio):
+        """Test objects whose destination etag differs are skipped once recorded as synced"""
+        src = make_minio({f'backup-{i}.tar': bytes([i]) * 100 for i in range(10)})
+        dst = make_minio(etag_suffix='-1')
+        
+        first = self.make_engine(src, dst).run('backups')
+        dst.puts.clear()
+        src.objects['backup-3.tar'] = b'changed'
+        second = self.make_engine(src, dst).run('backups')
+        
+        assert first['copied'] == 10
+        assert dst.puts == ['backup-3.tar']
+        assert (second['copied'], second['resumed']) == (1, 9)
+    
+    def test_bandwidth_limiter_paces_transfers(self):
+        """Test consumption beyond the rate is delayed"""
+        limiter = BandwidthLimiter(bytes_per_second=1000)
+        begin = time.monotonic()
+        for _ in range(3):
+            limiter.consume(100)
+        
+        assert time.monotonic() - begin >= 0.25
+    
+    def test_same_server_requires_distinct_buckets(self, monkeypatch, make_minio):
+        """Test server-side sync is only offered between different buckets of one endpoint"""
+        from services.storage_service import UnifiedStorageService
+        monkeypatch.setattr(Config, 'CLOUD_S3_ENDPOINT', 's3.example.com')
+        monkeypatch.setattr(Config, 'CLOUD_S3_ACCESS_KEY', 'cloud-key')
+        monkeypatch.setattr(UnifiedStorageService, '_init_clients', lambda self: None)
+        service = UnifiedStorageService()
+        service.local_client = service.cloud_client = make_minio({'a.txt': b'alpha'})
+        
+        assert service._same_server('local', 'local')
+        assert not service._same_server('local', 'cloud')
+        assert 'same bucket' in service.sync_bucket('media', 'local', 'local')['error']
+    
+    def test_manifest_redis_errors_reach_breaker(self):
+        """Test a failing Redis falls back to memory and trips the shared circuit breaker"""
+        from services.cache_service import CircuitBreaker
+        
+        class BrokenRedis:
+            def __getattr__(self, name):
+                raise ConnectionError('connection refused')
+        
+        breaker = CircuitBreaker(threshold=1, cooldown=60)
+        manifest = SyncManifest('media', 'local', 'cloud', redis_client=BrokenRedis(), breaker=breaker)
+        
+        assert manifest.load() == {}
+        manifest.record('a.txt', 'etag-a', 'etag-b')
+        
+        assert manifest.matches('a.txt', 'etag-a', 'etag-b')
+        assert not breaker.allow()
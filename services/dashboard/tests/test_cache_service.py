@@ -0,0 +1,156 @@
+import threading
+import time
+import pytest
+from flask import Flask, jsonify
+from services.cache_service import CacheService, CircuitBreaker, LocalLRUCache
+
+
+class TestCacheService:
+    """Tests for the two-tier cache running on its local tier (Redis unreachable)"""
+    
+    @pytest.fixture
+    def cache(self):
+        """Cache pointed at a closed port so only the local tier is used"""
+        return CacheService(redis_url='redis://127.0.0.1:1/0', local_max_entries=16, local_ttl=60)
+    
+    def test_local_tier_serves_copies(self, cache):
+        """Test values round-trip through the local tier without shared mutation"""
+        cache.set('storage:metrics:current', {'used': [1, 2]}, ttl=60)
+        value = cache.get('storage:metrics:current')
+        value['used'].append(3)
+        
+        assert cache.get('storage:metrics:current') == {'used': [1, 2]}
+        assert cache.get_stats()['local_hits'] == 2
+    
+    def test_lru_evicts_oldest(self):
+        """Test the local tier stays bounded and evicts least recently used keys"""
+        lru = LocalLRUCache(max_entries=2)
+        lru.set('a', '1', 60)
+        lru.set('b', '2', 60)
+        lru.get('a')
+        lru.set('c', '3', 60)
+        
+        assert lru.get('b') is None
+        assert lru.get('a') == '1'
+        assert lru.evictions == 1
+    
+    def test_breaker_opens_after_failed_connect(self, cache):
+        """Test an unreachable Redis opens the breaker instead of retrying per call"""
+        assert cache.breaker.state == 'open'
+        assert cache.is_available is False
+    
+    def test_breaker_half_opens_after_cooldown(self):
+        """Test the breaker lets a probe through after its cooldown"""
+        breaker = CircuitBreaker(threshold=2, cooldown=0.05)
+        breaker.record_failure()
+        assert breaker.allow()
+        breaker.record_failure()
+        assert not breaker.allow()
+        
+        time.sleep(0.06)
+        assert breaker.state == 'half_open'
+        breaker.record_success()
+        assert breaker.state == 'closed'
+    
+    def test_get_or_set_single_flight(self, cache):
+        """Test concurrent misses on one key run the computation once"""
+        calls = []
+        
+        def compute():
+            calls.append(1)
+            time.sleep(0.05)
+            return {'value': 42}
+        
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(cache.get_or_set('k', compute, ttl=60)))
+            for _ in range(8)
+        ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        
+        assert len(calls) == 1
+        assert results == [{'value': 42}] * 8
+    
+    def test_key_locks_released_after_use(self, cache):
+        """Test per-key recompute locks do not accumulate for every key seen"""
+        for i in range(100):
+            cache.get_or_set(f'key:{i}', lambda: i, ttl=60)
+        cache.set('k', 'old', ttl=1, compute_time=100.0)
+        cache.get_or_set('k', lambda: 'new', ttl=60)
+        
+        assert len(cache._key_locks) == 0
+    
+    def test_early_refresh_near_expiry(self, cache):
+        """Test an expensive value close to expiry is recomputed early"""
+        cache.set('k', 'old', ttl=1, compute_time=100.0)
+        
+        assert cache.get_or_set('k', lambda: 'new', ttl=60) == 'new'
+        assert cache.get_stats()['early_refreshes'] == 1
+    
+    def test_cached_decorator_skips_error_responses(self, cache):
+        """Test view responses are cached on success and error tuples are not"""
+        app = Flask(__name__)
+        calls = []
+        
+        @cache.cached(ttl=60, key='view:{name}')
+        def view(name):
+            calls.append(name)
+            if name == 'bad':
+                return jsonify({'success': False}), 500
+            return jsonify({'success': True, 'name': name})
+        
+        with app.app_context():
+            assert view(name='ok').get_json() == {'success': True, 'name': 'ok'}
+            assert view(name='ok').get_json() == {'success': True, 'name': 'ok'}
+            assert view(name='bad')[1] == 500
+            assert view(name='bad')[1] == 500
+        
+        assert calls == ['ok', 'bad', 'bad']
+    
+    def test_namespace_invalidation_hides_old_entries(self, cache):
+        """Test invalidating a namespace drops its keys and leaves siblings alone"""
+        cache.set('storage:metrics:current', {'used': 1}, ttl=60)
+        cache.set('storage:alerts:open', ['disk'], ttl=60)
+        
+        assert cache.delete_pattern('storage:metrics:*') == 0
+        assert cache.get('storage:metrics:current') is None
+        assert cache.get('storage:alerts:open') == ['disk']
+        
+        cache.invalidate_namespace('storage')
+        assert cache.get('storage:alerts:open') is None
+    
+    def test_delete_exact_key_pattern(self, cache):
+        """Test an exact namespaced key pattern deletes its versioned entry"""
+        cache.set('storage:metrics:current', {'used': 1}, ttl=60)
+        cache.set('storage:metrics:history', [], ttl=60)
+        
+        assert cache.delete_pattern('storage:metrics:current') == 1
+        assert cache.get('storage:metrics:current') is None
+        assert cache.get('storage:metrics:history') == []
+    
+    def test_delete_wildcard_inside_key(self, cache):
+        """Test patterns with a wildcard segment match versioned keys"""
+        cache.set('agents:a1:status', 'up', ttl=60)
+        cache.set('agents:a2:status', 'down', ttl=60)
+        cache.set('agents:a2:tasks', [], ttl=60)
+        
+        assert cache.delete_pattern('agents:*:status') == 2
+        assert cache.get('agents:a1:status') is None
+        assert cache.get('agents:a2:tasks') == []
+    
+    def test_namespace_stats(self, cache):
+        """Test hits, misses and invalidations are counted per namespace"""
+        cache.set('agents:tasks:status=all', [], ttl=60)
+        cache.get('agents:tasks:status=all')
+        cache.get('agents:tasks:status=done')
+        cache.invalidate_agent_tasks()
+        
+        stats = cache.get_namespace_stats()['agents:tasks']
+        assert stats['local_hits'] == 1
+        assert stats['misses'] == 1
+        assert stats['sets'] == 1
+        assert stats['invalidations'] == 1
+        assert stats['hit_rate'] == 50.0
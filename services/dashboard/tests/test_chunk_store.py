@@ -0,0 +1,98 @@
+import io
+import os
+import random
+from datetime import datetime, timedelta, timezone
+import pytest
+from services.chunk_store import ChunkStore, RepositoryLockedError, iter_chunks
+
+SMALL = dict(min_size=4 * 1024, max_size=64 * 1024, mask_bits=13)
+
+
+def random_bytes(size, seed):
+    return random.Random(seed).randbytes(size)
+
+
+class TestChunkStore:
+    """Tests for content-defined chunking and deduplicated snapshots"""
+    
+    def test_boundaries_survive_insertions(self):
+        """Test inserting bytes near the start only changes the chunks around the edit"""
+        data = random_bytes(1024 * 1024, 1)
+        original = list(iter_chunks(io.BytesIO(data), **SMALL))
+        edited = list(iter_chunks(io.BytesIO(data[:1000] + b'inserted' + data[1000:]), **SMALL))
+        
+        assert b''.join(original) == data
+        assert all(SMALL['min_size'] <= len(c) <= SMALL['max_size'] for c in original[:-1])
+        assert len(set(original) & set(edited)) >= len(original) - 2
+    
+    def test_incremental_snapshot_uploads_only_changes(self, tmp_path, make_minio):
+        """Test a second snapshot reuses unchanged files and stores only new chunks"""
+        source = tmp_path / 'project'
+        source.mkdir()
+        (source / 'keep.bin').write_bytes(random_bytes(300 * 1024, 2))
+        (source / 'edit.bin').write_bytes(random_bytes(300 * 1024, 3))
+        (source / 'copy.bin').write_bytes((source / 'keep.bin').read_bytes())
+        client = make_minio()
+        store = ChunkStore(client, 'backups', workers=2, io_workers=4, **SMALL)
+        
+        first = store.backup(str(source))
+        content = bytearray((source / 'edit.bin').read_bytes())
+        content[150 * 1024:150 * 1024 + 10] = b'0123456789'
+        (source / 'edit.bin').write_bytes(bytes(content))
+        os.utime(source / 'edit.bin', ns=(1, 1))
+        client.puts.clear()
+        second = store.backup(str(source), parent=first['snapshot_id'])
+        
+        first_stats, second_stats = first['stats'], second['stats']
+        assert first_stats['new_chunk_bytes'] == 2 * 300 * 1024
+        assert second_stats['reused_files'] == 2
+        assert second_stats['bytes_read'] == 300 * 1024
+        assert 1 <= second_stats['new_chunks'] <= 2
+        assert len([name for name in client.puts if '/locks/' not in name]) == second_stats['new_chunks'] + 1
+        
+        restored = store.restore(second['snapshot_id'], str(tmp_path / 'restore'))
+        assert restored['file_count'] == 3
+        for name in ('keep.bin', 'edit.bin', 'copy.bin'):
+            assert (tmp_path / 'restore' / 'project' / name).read_bytes() == (source / name).read_bytes()
+    
+    def test_prune_removes_unreferenced_chunks(self, tmp_path, make_minio):
+        """Test chunks only used by a deleted snapshot are pruned"""
+        source = tmp_path / 'data'
+        source.mkdir()
+        (source / 'a.bin').write_bytes(random_bytes(100 * 1024, 4))
+        client = make_minio()
+        store = ChunkStore(client, 'backups', workers=1, **SMALL)
+        old = store.backup(str(source))
+        (source / 'a.bin').write_bytes(random_bytes(100 * 1024, 5))
+        os.utime(source / 'a.bin', ns=(1, 1))
+        new = store.backup(str(source), parent=old['snapshot_id'])
+        
+        del client.objects[old['object_name']]
+        result = store.prune(grace=timedelta(0))
+        
+        assert result['deleted_chunks'] == old['stats']['new_chunks']
+        assert store.restore(new['snapshot_id'], str(tmp_path / 'out'))['file_count'] == 1
+        assert not any('/locks/' in name for name in client.objects)
+    
+    def test_prune_refuses_while_backup_holds_lock(self, tmp_path, make_minio):
+        """Test prune cannot delete chunks a running backup may be reusing"""
+        source = tmp_path / 'data'
+        source.mkdir()
+        (source / 'a.bin').write_bytes(random_bytes(100 * 1024, 6))
+        client = make_minio()
+        store = ChunkStore(client, 'backups', workers=1, **SMALL)
+        old = store.backup(str(source))
+        del client.objects[old['object_name']]
+        
+        with store.lock():
+            with pytest.raises(RepositoryLockedError):
+                store.prune(grace=timedelta(0))
+            chunks = [name for name in client.objects if '/chunks/' in name]
+            assert len(chunks) == old['stats']['new_chunks']
+        
+        with store.lock(exclusive=True):
+            with pytest.raises(RepositoryLockedError):
+                store.backup(str(source))
+        
+        client.add(f'{store.prefix}/locks/shared-dead', b'{}', last_modified=datetime.now(timezone.utc) - timedelta(hours=1))
+        assert store.prune(grace=timedelta(0))['deleted_chunks'] == old['stats']['new_chunks']
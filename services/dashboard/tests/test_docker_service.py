@@ -0,0 +1,56 @@
+from types import SimpleNamespace
+import requests
+from services import docker_service
+from services.docker_service import DockerService
+
+
+class TestDockerService:
+    """Tests for turning Engine API inspect/stats payloads into container status"""
+    
+    INSPECT = {
+        'Name': '/plex-server',
+        'Id': 'abcdef0123456789',
+        'Created': '2024-05-01T12:00:00Z',
+        'State': {'Status': 'running', 'Running': True},
+        'Config': {'Image': 'plexinc/pms-docker', 'Labels': None},
+        'NetworkSettings': {'Ports': {'32400/tcp': [{'HostIp': '0.0.0.0', 'HostPort': '32400'}]}}
+    }
+    
+    def test_cpu_percent_from_two_samples(self):
+        """Test CPU usage is scaled per core like docker stats"""
+        precpu = {'cpu_usage': {'total_usage': 1_000}, 'system_cpu_usage': 10_000}
+        cpu = {'cpu_usage': {'total_usage': 1_500}, 'system_cpu_usage': 12_000, 'online_cpus': 4}
+        
+        assert DockerService._cpu_percent(cpu, precpu) == 100.0
+        assert DockerService._cpu_percent(cpu, {}) == 0.0
+    
+    def test_build_status_excludes_page_cache(self):
+        """Test memory usage subtracts inactive file cache and ports are flattened"""
+        stats = {
+            'cpu_stats': {},
+            'precpu_stats': {},
+            'memory_stats': {
+                'usage': 300 * 1024 * 1024,
+                'limit': 1024 * 1024 * 1024,
+                'stats': {'inactive_file': 100 * 1024 * 1024}
+            }
+        }
+        
+        status = DockerService()._build_status(self.INSPECT, stats)
+        
+        assert status['name'] == 'plex-server'
+        assert status['id'] == 'abcdef012345'
+        assert status['memory_usage_mb'] == 200.0
+        assert status['memory_percent'] == 19.53
+        assert status['ports'] == {'32400/tcp': '32400'}
+        assert status['labels'] == {}
+    
+    def test_connection_error_resets_client(self, monkeypatch):
+        """Test a dead daemon socket drops the shared client so the next call reconnects"""
+        def refuse(**kwargs):
+            raise requests.exceptions.ConnectionError('Connection refused')
+        
+        monkeypatch.setattr(docker_service, '_client', SimpleNamespace(api=SimpleNamespace(containers=refuse)))
+        
+        assert DockerService().list_all_containers() == []
+        assert docker_service._client is None
@@ -0,0 +1,39 @@
+import pytest
+from services.host_metrics import HostMetricsSampler, PSUTIL_AVAILABLE
+
+
+@pytest.mark.skipif(not PSUTIL_AVAILABLE, reason="psutil not installed")
+class TestHostMetricsSampler:
+    """Tests for the shared host metrics sampler"""
+    
+    @pytest.fixture
+    def sampler(self):
+        sampler = HostMetricsSampler(interval=0.05, history_size=10)
+        yield sampler
+        sampler.stop()
+    
+    def test_latest_has_route_shapes(self, sampler):
+        """Test a sample carries the fields the monitoring routes return"""
+        sample = sampler.latest()
+        
+        assert 0 <= sample['cpu']['total_percent'] <= 100
+        assert len(sample['cpu']['per_core']) == sample['cpu']['cores_logical']
+        assert 'percent' in sample['memory']['ram']
+        assert 'percent' in sample['disk']['root']
+        assert 'bytes_sent' in sample['network']['total']
+    
+    def test_subscribers_share_samples(self, sampler):
+        """Test every subscriber receives the same sample objects and history is bounded"""
+        first, second = sampler.subscribe(), sampler.subscribe()
+        
+        a, b = first.get(timeout=2), second.get(timeout=2)
+        assert a is b or a['sampled_at'] < b['sampled_at']
+        assert sampler.subscriber_count == 2
+        
+        sampler.unsubscribe(first)
+        assert sampler.subscriber_count == 1
+        
+        for _ in range(15):
+            second.get(timeout=2)
+        assert len(sampler.get_history()) == 10
+        assert sampler.get_history(seconds=0) == []
@@ -0,0 +1,43 @@
+from datetime import datetime
+import pytest
+from services.log_classifier import LogClassifier
+
+
+class TestLogClassifier:
+    """Tests for the shared log level and timestamp classifier"""
+    
+    @pytest.fixture
+    def classifier(self):
+        """Create a classifier with an empty format cache"""
+        return LogClassifier()
+    
+    def test_highest_priority_level_wins(self, classifier):
+        """Test the most severe keyword wins regardless of position"""
+        assert classifier.detect_level('INFO request failed with exception') == 'error'
+        assert classifier.detect_level('debug: CRITICAL error in worker') == 'fatal'
+        assert classifier.detect_level('Warning: cache miss') == 'warning'
+        assert classifier.detect_level('information only') is None
+    
+    def test_iso_timestamp_normalized_to_utc(self, classifier):
+        """Test ISO-8601 offsets are converted to naive UTC"""
+        parsed = classifier.parse_timestamp('2024-05-01T12:00:00.5+02:00 started')
+        assert parsed == datetime(2024, 5, 1, 10, 0, 0, 500000)
+        assert parsed.tzinfo is None
+    
+    def test_other_formats(self, classifier):
+        """Test slash, common log format and syslog timestamps"""
+        assert classifier.parse_timestamp('2024/05/01 12:00:00 msg') == datetime(2024, 5, 1, 12, 0, 0)
+        assert classifier.parse_timestamp('[01/May/2024:12:00:03 +0000] GET') == datetime(2024, 5, 1, 12, 0, 3)
+        parsed = classifier.parse_timestamp('May  1 12:00:04 host sshd')
+        assert (parsed.month, parsed.day, parsed.year) == (5, 1, datetime.utcnow().year)
+        assert classifier.parse_timestamp('no timestamp here') is None
+    
+    def test_format_is_learned_per_source(self, classifier):
+        """Test the winning format is cached per source"""
+        classifier.parse_timestamp('2024-05-01 12:00:00 hello', 'docker:web')
+        classifier.parse_timestamp('May  1 12:00:04 host sshd', 'systemd')
+        assert classifier.get_cached_formats() == {'docker:web': 'iso', 'systemd': 'syslog'}
+        
+        parsed = classifier.parse_timestamp('2024/05/01 12:00:00 switched format', 'docker:web')
+        assert parsed == datetime(2024, 5, 1, 12, 0, 0)
+        assert classifier.get_cached_formats()['docker:web'] == 'slash'
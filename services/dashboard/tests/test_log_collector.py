@@ -0,0 +1,112 @@
+import threading
+from collections import Counter
+from datetime import datetime
+from types import SimpleNamespace
+from workers import log_collector as log_collector_module
+from workers.log_collector import LogCollector
+
+T1 = '2024-05-01T10:00:00.000000000Z'
+T2 = '2024-05-01T10:00:01.000000000Z'
+
+
+class FakeContainer:
+    """Serves a fixed log, either at once or as a follow stream"""
+    
+    def __init__(self, lines, on_end=None):
+        self.id = 'abc123'
+        self.lines = lines
+        self.on_end = on_end
+        self.calls = []
+    
+    def logs(self, **kwargs):
+        self.calls.append(kwargs)
+        if not kwargs.get('stream'):
+            return '\n'.join(self.lines).encode()
+        return self._stream()
+    
+    def _stream(self):
+        for line in self.lines:
+            yield line.encode()
+        if self.on_end:
+            self.on_end()
+
+
+def make_collector(container):
+    collector = LogCollector()
+    collector.docker_client = SimpleNamespace(containers=SimpleNamespace(get=lambda name: container))
+    collector.last_timestamps = {name: None for name in collector.CONTAINERS_TO_MONITOR}
+    return collector
+
+
+class TestLogCollector:
+    """Tests for resuming, buffering and counting in the log collector"""
+    
+    def test_lines_sharing_resume_timestamp_are_kept(self):
+        """Test only already-stored lines at the high-water mark are skipped"""
+        container = FakeContainer([f'{T1} stored', f'{T1} new at same time', f'{T2} later'])
+        collector = make_collector(container)
+        collector.last_timestamps['plex'] = datetime(2024, 5, 1, 10, 0, 0)
+        collector._stored_lines['plex'] = Counter(['stored'])
+        
+        logs = collector.collect_logs_from_container('plex')
+        
+        assert [log['message'] for log in logs] == ['new at same time', 'later']
+        assert collector.last_timestamps['plex'] == datetime(2024, 5, 1, 10, 0, 1)
+        assert collector.collect_logs_from_container('plex') == []
+    
+    def test_stream_reconnect_does_not_duplicate(self):
+        """Test a reconnected stream resumes from its read cursor without repeats"""
+        collector = None
+        container = FakeContainer(
+            [f'{T1} a', f'{T1} b'],
+            on_end=lambda: collector._stream_stop.set()
+        )
+        collector = make_collector(container)
+        
+        collector._stream_container('plex')
+        container.lines = [f'{T1} a', f'{T1} b', f'{T1} c', f'{T2} d']
+        collector._stream_stop.clear()
+        collector._stream_container('plex')
+        
+        assert [entry['message'] for entry in collector._pending] == ['a', 'b', 'c', 'd']
+        assert container.calls[1]['since'] == datetime(2024, 5, 1, 10, 0, 0)
+        assert collector.get_stream_status()['lines_skipped'] == 2
+    
+    def test_failed_store_requeues_within_limit(self, monkeypatch):
+        """Test a failed batch goes back in front and overflow drops its oldest lines"""
+        monkeypatch.setattr(LogCollector, 'STREAM_MAX_PENDING', 5)
+        monkeypatch.setattr(LogCollector, 'BATCH_SIZE', 3)
+        collector = make_collector(FakeContainer([]))
+        for i in range(7):
+            collector._enqueue_streamed({'service': 'plex', 'message': str(i)})
+        
+        def failing_store(batch):
+            # Stream threads keep reading while the store is failing
+            for message in ('7', '8'):
+                collector._enqueue_streamed({'service': 'plex', 'message': message})
+            return 0
+        
+        monkeypatch.setattr(log_collector_module.unified_logging_service, 'store_logs_batch', failing_store)
+        
+        assert collector._store_pending() is None
+        assert [entry['message'] for entry in collector._pending] == ['4', '5', '6', '7', '8']
+        assert collector.get_stream_status()['dropped'] == 4
+        assert collector.get_stream_status()['store_failures'] == 1
+    
+    def test_stats_are_exact_under_concurrency(self, monkeypatch):
+        """Test counters updated from many threads lose no increments"""
+        monkeypatch.setattr(LogCollector, 'STREAM_MAX_PENDING', 10)
+        collector = make_collector(FakeContainer([]))
+        
+        def produce():
+            for i in range(5000):
+                collector._enqueue_streamed({'service': 'plex', 'message': str(i)})
+        
+        threads = [threading.Thread(target=produce) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        assert len(collector._pending) == 10
+        assert collector.get_stream_status()['dropped'] == 4 * 5000 - 10
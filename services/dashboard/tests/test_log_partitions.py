@@ -0,0 +1,43 @@
+from contextlib import nullcontext
+from types import SimpleNamespace
+from services.log_partitions import LogPartitionManager
+from services.log_retention import log_retention_service
+
+
+class FakeSession:
+    """Answers the longest log stream retention query"""
+    
+    def __init__(self, longest_stream):
+        self.longest_stream = longest_stream
+    
+    def begin_nested(self):
+        return nullcontext()
+    
+    def execute(self, statement):
+        return SimpleNamespace(scalar=lambda: self.longest_stream)
+
+
+class TestLogPartitionManager:
+    """Tests for the retention applied by partition maintenance"""
+    
+    def test_policy_follows_retention_service(self, monkeypatch):
+        """Test unified_logs uses the configured retention and log_entries is kept by default"""
+        monkeypatch.setitem(log_retention_service.retention_days, 'unified_logs', 45)
+        monkeypatch.delitem(log_retention_service.retention_days, 'log_entries', raising=False)
+        
+        policy = LogPartitionManager().retention_policy(FakeSession(90))
+        
+        assert policy == {'unified_logs': 45, 'log_entries': None}
+    
+    def test_log_entries_kept_for_longest_stream(self, monkeypatch):
+        """Test a configured log_entries retention never undercuts a stream's retention"""
+        monkeypatch.setitem(log_retention_service.retention_days, 'log_entries', 14)
+        
+        assert LogPartitionManager().retention_policy(FakeSession(60))['log_entries'] == 60
+        assert LogPartitionManager().retention_policy(FakeSession(7))['log_entries'] == 14
+    
+    def test_explicit_tables_override_policy(self):
+        """Test managers built for other tables keep their own retention"""
+        manager = LogPartitionManager(tables={'agent_metrics': 7})
+        
+        assert manager.retention_policy(FakeSession(None)) == {'agent_metrics': 7}
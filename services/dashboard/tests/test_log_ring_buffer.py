@@ -0,0 +1,68 @@
+from services.log_service import LogRingBuffer, LogFilter, LogService
+
+
+def make_entry(i, source='app', level='info'):
+    return {'source': source, 'level': level, 'message': f'message {i}'}
+
+
+class TestLogRingBuffer:
+    """Tests for the indexed in-memory log buffer"""
+    
+    def test_eviction_trims_indexes(self):
+        """Test old entries drop out of the buffer and its indexes"""
+        buffer = LogRingBuffer(capacity=5)
+        for i in range(12):
+            buffer.append(make_entry(i, source=f'src{i % 2}', level='error' if i % 3 == 0 else 'info'))
+        
+        assert len(buffer) == 5
+        stats = buffer.get_index_stats()
+        assert sum(stats['sources'].values()) == 5
+        assert sum(stats['levels'].values()) == 5
+        assert [e['message'] for e in buffer.query(LogFilter())] == [f'message {i}' for i in range(11, 6, -1)]
+    
+    def test_query_by_index_newest_first(self):
+        """Test source and multi-level queries return newest matches first"""
+        buffer = LogRingBuffer(capacity=100)
+        for i in range(30):
+            buffer.append(make_entry(i, source='a' if i % 2 else 'b', level=['info', 'warning', 'error'][i % 3]))
+        
+        by_source = buffer.query(LogFilter(source='a'), limit=3)
+        assert [e['message'] for e in by_source] == ['message 29', 'message 27', 'message 25']
+        
+        by_levels = buffer.query(LogFilter(level='warning,error'), limit=4, offset=1)
+        assert [e['message'] for e in by_levels] == ['message 28', 'message 26', 'message 25', 'message 23']
+    
+    def test_search_filter_regex_and_fallback(self):
+        """Test search uses a regex and falls back to substring on invalid patterns"""
+        assert LogFilter(search=r'message \d+5').matches(make_entry(15))
+        assert not LogFilter(search=r'message \d+5').matches(make_entry(14))
+        assert LogFilter(search='message 1[').matches({'message': 'MESSAGE 1[x'})
+
+
+class TestSSEFanOut:
+    """Tests for grouped SSE broadcast"""
+    
+    def test_clients_with_same_filter_share_a_group(self):
+        """Test identical filters are evaluated once and delivered to every client"""
+        service = LogService(max_buffer=10)
+        a = service.register_sse_client('a', {'level': 'error'})
+        b = service.register_sse_client('b', {'level': ['ERROR']})
+        c = service.register_sse_client('c', {'source': 'other'})
+        assert len(service._sse_filter_groups) == 2
+        
+        service.add_log_entry(source='app', message='boom', level='error')
+        assert a.queue.qsize() == 1 and b.queue.qsize() == 1 and c.queue.qsize() == 0
+        
+        service.unregister_sse_client('a')
+        service.unregister_sse_client('b')
+        assert len(service._sse_filter_groups) == 1
+    
+    def test_buffer_fallback_rejects_cursor(self):
+        """Test cursor queries without a database return an error instead of the first page"""
+        service = LogService(max_buffer=10)
+        service.add_log_entry(source='app', message='hello', level='info')
+        
+        assert service.query_logs()['logs'][0]['message'] == 'hello'
+        result = service.query_logs(cursor='abc')
+        assert result['logs'] == [] and result['has_more'] is False
+        assert 'database' in result['error']
@@ -0,0 +1,57 @@
+from datetime import datetime, timedelta
+import pytest
+from models.logs import LogEntry
+from services.log_service import LogService
+
+
+class TestLogServiceQueries:
+    """Tests for the database paths of log queries and search"""
+    
+    @pytest.fixture
+    def service(self, log_database):
+        """Service over a database of 25 entries, three per minute"""
+        with log_database.get_session() as session:
+            base = datetime(2024, 1, 1)
+            for i in range(25):
+                session.add(LogEntry.create_entry(
+                    source='app', level='error' if i % 5 == 0 else 'info',
+                    message=f'line {i} disk full' if i % 5 == 0 else f'line {i}',
+                    timestamp=base + timedelta(minutes=i // 3)
+                ))
+        return LogService(max_buffer=10)
+    
+    def test_query_reads_database(self, service):
+        """Test filtered queries are answered from the database with a count"""
+        result = service.query_logs(level='error', limit=2)
+        
+        assert result['source'] == 'database'
+        assert 'error' not in result
+        assert (result['total'], result['total_estimated']) == (5, False)
+        assert [log['message'] for log in result['logs']] == ['line 20 disk full', 'line 15 disk full']
+    
+    def test_search_reads_database(self, service):
+        """Test full text search matches stored messages"""
+        result = service.full_text_search('DISK full', limit=10)
+        
+        assert result['source'] == 'database'
+        assert result['count'] == 5
+        assert service.get_stats()['total_logs'] == 25
+    
+    def test_cursor_pages_through_database(self, service):
+        """Test keyset pages cover every row once, even when a timestamp spans a page boundary"""
+        first = service.query_logs(limit=2, cursor='')
+        assert first['source'] == 'database'
+        assert [log['message'] for log in first['logs']] == ['line 24', 'line 23']
+        
+        second = service.query_logs(limit=2, cursor=first['next_cursor'])
+        # line 23 and line 22 share a timestamp; the id breaks the tie
+        assert [log['message'] for log in second['logs']] == ['line 22', 'line 21']
+        
+        seen, cursor = [], ''
+        while cursor is not None:
+            page = service.query_logs(level='info', limit=3, cursor=cursor)
+            assert page['source'] == 'database'
+            seen.extend(log['id'] for log in page['logs'])
+            cursor = page['next_cursor']
+        assert len(seen) == len(set(seen)) == 20
+        assert seen == sorted(seen, reverse=True)
@@ -0,0 +1,73 @@
+import threading
+import pytest
+from models.logs import LogEntry
+from services.log_service import LogService, LogWriteBuffer
+
+
+class TestLogWriteBuffer:
+    """Tests for the batched write-behind log persistence queue"""
+    
+    @pytest.fixture
+    def written(self):
+        """Collect batches handed to the flush callback"""
+        return []
+    
+    def test_flush_groups_rows_into_batches(self, written):
+        """Test queued rows are written in batch_size groups"""
+        buffer = LogWriteBuffer(written.append, max_size=100, batch_size=4, flush_interval=60)
+        for i in range(10):
+            buffer._queue.put_nowait({'message': str(i)})
+        
+        assert buffer.flush() == 10
+        assert [len(b) for b in written] == [4, 4, 2]
+        assert buffer.get_stats()['written'] == 10
+        assert buffer.get_stats()['batches'] == 3
+    
+    def test_overflow_drops_and_counts(self, written):
+        """Test a full queue drops rows instead of blocking when block_timeout is 0"""
+        release = threading.Event()
+        buffer = LogWriteBuffer(lambda batch: release.wait(5), max_size=2, batch_size=1, flush_interval=0.01)
+        
+        results = [buffer.submit({'message': str(i)}) for i in range(10)]
+        release.set()
+        buffer.stop()
+        
+        stats = buffer.get_stats()
+        assert results.count(False) == stats['dropped']
+        assert stats['dropped'] > 0
+        assert stats['enqueued'] + stats['dropped'] == 10
+    
+    def test_failed_flush_is_counted(self):
+        """Test exceptions in the flush callback are counted as failures"""
+        def boom(batch):
+            raise RuntimeError('db down')
+        
+        buffer = LogWriteBuffer(boom, max_size=10, batch_size=10, flush_interval=60)
+        buffer._queue.put_nowait({'message': 'x'})
+        buffer.flush()
+        
+        assert buffer.get_stats()['failed'] == 1
+        assert buffer.get_stats()['written'] == 0
+    
+    def test_background_flusher_writes_by_age(self, written):
+        """Test the flusher writes a partial batch once flush_interval elapses"""
+        buffer = LogWriteBuffer(written.append, max_size=100, batch_size=1000, flush_interval=0.05)
+        buffer.submit({'message': 'a'})
+        buffer.submit({'message': 'b'})
+        buffer.stop()
+        
+        assert sum(len(b) for b in written) == 2
+    
+    def test_entries_persisted_through_session(self, log_database):
+        """Test persisted entries reach the database through db_service.get_session()"""
+        service = LogService(max_buffer=10)
+        for i in range(3):
+            service.add_log_entry('app', f'line {i}', level='info', metadata={'n': i}, persist=True)
+        
+        assert service.flush_persisted_logs() == 3
+        assert service.write_buffer.get_stats()['failed'] == 0
+        with log_database.get_session() as session:
+            rows = session.query(LogEntry).order_by(LogEntry.id).all()
+            assert [(row.message, row.metadata_json) for row in rows] == [
+                (f'line {i}', {'n': i}) for i in range(3)
+            ]
@@ -0,0 +1,56 @@
+from datetime import datetime
+import pytest
+from services.object_cleanup import cleanup_prefix, delete_objects
+
+
+def is_old(obj):
+    return obj.last_modified < datetime(2024, 1, 1)
+
+
+class TestObjectCleanup:
+    """Tests for batched, concurrent object cleanup"""
+    
+    @pytest.fixture
+    def client(self, make_minio):
+        old = datetime(2023, 6, 1)
+        new = datetime(2024, 6, 1)
+        client = make_minio()
+        for d in ('a', 'b', 'c'):
+            for i in range(1200):
+                client.add(f'logs/{d}/{i}.log', b'x' * 10, last_modified=old)
+        for i in range(5):
+            client.add(f'logs/a/new-{i}.log', b'x' * 10, last_modified=new)
+        client.add('logs/top.log', b'x' * 7, last_modified=old)
+        return client
+    
+    def test_old_objects_deleted_in_batches(self, client):
+        """Test matches are deleted in requests of at most 1000 keys across prefixes"""
+        result = cleanup_prefix(client, 'logs-bucket', 'logs/', is_old, workers=3)
+        
+        assert result['deleted_count'] == 3601
+        assert result['deleted_size_bytes'] == 36007
+        assert result['delete_requests'] == 7
+        assert max(client.requests) <= 1000
+        assert sorted(client.objects) == [f'logs/a/new-{i}.log' for i in range(5)]
+        assert result['objects_per_second'] > 0
+    
+    def test_dry_run_estimates_without_deleting(self, client):
+        """Test a dry run reports matches and the request count of a real run but deletes nothing"""
+        result = cleanup_prefix(client, 'logs-bucket', 'logs/', is_old, batch_size=500, dry_run=True)
+        
+        assert (result['matched_count'], result['estimated_delete_requests']) == (3601, 10)
+        assert client.requests == []
+        assert len(client.objects) == 3606
+        
+        real = cleanup_prefix(client, 'logs-bucket', 'logs/', is_old, batch_size=500)
+        assert real['delete_requests'] == result['estimated_delete_requests']
+    
+    def test_failed_keys_are_reported(self, make_minio):
+        """Test per-key delete errors are excluded from the deleted totals"""
+        client = make_minio({'a': b'x' * 5, 'b': b'x' * 5, 'c': b'x' * 5}, fail={'b'})
+        
+        totals = delete_objects(client, 'bucket', [('a', 5), ('b', 5), ('c', 5)], batch_size=2)
+        
+        assert (totals.deleted, totals.deleted_bytes, totals.requests) == (2, 10, 2)
+        assert totals.failed == {'b'}
+        assert 'b' in client.objects
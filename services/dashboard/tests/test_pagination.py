@@ -0,0 +1,64 @@
+from datetime import datetime, timedelta
+import pytest
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import sessionmaker
+from models.logs import LogEntry
+from services.pagination import (
+    apply_keyset, split_keyset_page, encode_cursor, decode_cursor, count_rows, estimate_count
+)
+
+
+class TestKeysetPagination:
+    """Tests for opaque cursor pagination helpers"""
+    
+    @pytest.fixture
+    def session(self):
+        """In-memory database with log entries sharing timestamps"""
+        engine = create_engine('sqlite://')
+        LogEntry.__table__.create(engine)
+        session = sessionmaker(bind=engine)()
+        base = datetime(2024, 1, 1)
+        for i in range(25):
+            session.add(LogEntry.create_entry(
+                source='app', level='info', message=f'line {i}',
+                timestamp=base + timedelta(minutes=i // 3)
+            ))
+        session.commit()
+        yield session
+        session.close()
+    
+    def test_cursor_roundtrip(self):
+        """Test cursors decode to the encoded position"""
+        ts = datetime(2024, 1, 1, 12, 30, 5, 123)
+        assert decode_cursor(encode_cursor(ts, 42)) == (ts, '42')
+    
+    def test_invalid_cursor(self):
+        """Test malformed cursors raise ValueError"""
+        with pytest.raises(ValueError):
+            decode_cursor('not-a-cursor')
+    
+    def test_pages_cover_all_rows_once(self, session):
+        """Test walking pages returns every row exactly once, newest first"""
+        seen = []
+        cursor = ''
+        while cursor is not None:
+            rows = session.execute(
+                apply_keyset(select(LogEntry), LogEntry.timestamp, LogEntry.id, cursor, 4)
+            ).scalars().all()
+            rows, cursor = split_keyset_page(rows, LogEntry.timestamp, LogEntry.id, 4)
+            seen.extend(rows)
+        
+        assert len(seen) == 25
+        assert len({row.id for row in seen}) == 25
+        keys = [(row.timestamp, row.id) for row in seen]
+        assert keys == sorted(keys, reverse=True)
+    
+    def test_count_rows_falls_back_to_exact(self, session):
+        """Test non-PostgreSQL databases use an exact count"""
+        stmt = select(LogEntry).where(LogEntry.message.like('line 1%'))
+        assert count_rows(session, stmt) == (11, False)
+    
+    def test_estimate_rejects_other_dialects(self, session):
+        """Test planner estimates are refused outside PostgreSQL"""
+        with pytest.raises(ValueError, match='sqlite'):
+            estimate_count(session, select(LogEntry))
@@ -0,0 +1,114 @@
+import numpy as np
+from services.response_cache import (
+    AIResponseCache, TTLLRUCache, VectorIndex, legacy_query_key, normalize_query, query_key
+)
+
+
+class TestTTLLRUCache:
+    """Tests for the bounded, expiring LRU map"""
+    
+    def test_least_recently_used_evicted(self):
+        """Test the entry read least recently leaves first when full"""
+        evicted = []
+        cache = TTLLRUCache(2, on_evict=evicted.append)
+        cache.set('a', 1, ttl=60, now=0)
+        cache.set('b', 2, ttl=60, now=0)
+        assert cache.get('a', now=1) == 1
+        
+        cache.set('c', 3, ttl=60, now=2)
+        
+        assert evicted == ['b']
+        assert cache.get('b', now=2) is None
+        assert cache.evictions == 1
+    
+    def test_expired_entries_purged(self):
+        """Test expired entries are dropped without being read"""
+        cache = TTLLRUCache(10)
+        cache.set('short', 1, ttl=5, now=0)
+        cache.set('long', 2, ttl=50, now=0)
+        cache.set('short', 3, ttl=30, now=1)
+        
+        assert cache.purge_expired(now=10) == 0
+        assert cache.purge_expired(now=40) == 1
+        assert 'short' not in cache and cache.get('long', now=40) == 2
+
+
+class TestAIResponseCache:
+    """Tests for query normalization, similarity lookups and statistics (no database)"""
+    
+    def test_normalized_queries_share_a_key(self):
+        """Test casing, punctuation and whitespace do not change the key"""
+        assert normalize_query('  How do I RESTART   plex?! ') == 'how do i restart plex'
+        assert query_key('Restart Plex?') == query_key('restart  plex')
+        
+        cache = AIResponseCache(use_db=False)
+        cache.set('What is the status of Plex?', 'Plex is running', 'gpt-4o-mini')
+        
+        assert cache.get('what is the status of plex') == 'Plex is running'
+        assert cache.get('Something else entirely') is None
+        stats = cache.get_stats()
+        assert (stats['memory_hits'], stats['misses'], stats['hit_rate']) == (1, 1, 0.5)
+        assert stats['pending_hit_updates'] == 1
+    
+    def test_operators_stay_in_the_key(self):
+        """Test queries differing only by an operator or symbol get different keys"""
+        assert normalize_query('What is 2+2?') == 'what is 2+2'
+        assert query_key('what is 2+2?') != query_key('what is 2*2?')
+        assert query_key('is 5 > 3') != query_key('is 5 < 3')
+        assert query_key('what is 10 - 4') != query_key('what is 10 / 4')
+        assert query_key('"Restart" (plex)') == query_key('restart plex')
+    
+    def test_similar_query_served_from_index(self):
+        """Test a query whose embedding is close enough reuses a cached response"""
+        vectors = {
+            'show plex logs': [1.0, 0.0, 0.0],
+            'show me the plex logs': [0.99, 0.05, 0.0],
+            'restart discord bot': [0.0, 1.0, 0.0]
+        }
+        cache = AIResponseCache(use_db=False, embed=vectors.get, similarity_threshold=0.95)
+        cache.set('Show Plex logs', 'Here are the logs', 'gpt-4o-mini')
+        
+        assert cache.get('Show me the Plex logs') == 'Here are the logs'
+        assert cache.get('Restart discord bot') is None
+        assert cache.get_stats()['semantic_hits'] == 1
+    
+    def test_vector_index_remove_keeps_rows_aligned(self):
+        """Test removing a key moves the last row into its slot"""
+        index = VectorIndex()
+        for key, vector in [('a', [1, 0]), ('b', [0, 1]), ('c', [1, 1])]:
+            index.add(key, vector)
+        index.remove('a')
+        
+        assert len(index) == 2
+        assert index.search(np.array([1, 1]), 0.99)[0] == 'c'
+        assert index.search(np.array([1, 0]), 0.99) is None
+
+
+class TestAIResponseCacheDatabase:
+    """Tests for lookups that reach the response_cache table"""
+    
+    def test_legacy_row_hits_counted_under_its_own_key(self, monkeypatch):
+        """Test hits on a row stored under the legacy key are recorded against that key"""
+        from sqlalchemy import create_engine
+        from sqlalchemy.orm import sessionmaker
+        from sqlalchemy.pool import StaticPool
+        from models.jarvis_ai import ResponseCache
+        from services.db_service import db_service
+        
+        engine = create_engine('sqlite://', poolclass=StaticPool)
+        ResponseCache.__table__.create(engine)
+        monkeypatch.setattr(db_service, '_engine', engine)
+        monkeypatch.setattr(db_service, '_session_factory', sessionmaker(bind=engine))
+        with db_service.get_session() as session:
+            session.add(ResponseCache(query_hash=legacy_query_key('Restart Plex?'), original_query='Restart Plex?',
+                                      response='Plex restarted'))
+        
+        cache = AIResponseCache()
+        assert cache.get('Restart Plex?') == 'Plex restarted'
+        assert cache.get('restart plex') == 'Plex restarted'
+        
+        assert dict(cache.hits._pending) == {legacy_query_key('Restart Plex?'): 2}
+        assert cache.hits.flush() == 1
+        with db_service.get_session() as session:
+            assert session.query(ResponseCache.hit_count).scalar() == 3
+        engine.dispose()
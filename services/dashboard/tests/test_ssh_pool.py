@@ -0,0 +1,154 @@
+import time
+import threading
+import pytest
+from types import SimpleNamespace
+from services.ssh_pool import SSHConnectionPool
+from services.fleet_service import FleetManager
+
+
+class FakeTransport:
+    def __init__(self):
+        self.active = True
+        self.keepalive = None
+    
+    def is_active(self):
+        return self.active
+    
+    def set_keepalive(self, interval):
+        self.keepalive = interval
+    
+    def send_ignore(self):
+        if not self.active:
+            raise EOFError()
+
+
+class FakeStream:
+    def __init__(self, data, fail=False):
+        self.data = data
+        self.fail = fail
+        self.channel = SimpleNamespace(recv_exit_status=lambda: 0, close=lambda: None)
+    
+    def read(self):
+        if self.fail:
+            raise EOFError()
+        return self.data
+
+
+class FakeClient:
+    def __init__(self, fail_exec=False, fail_read=False):
+        self.transport = FakeTransport()
+        self.closed = False
+        self.fail_exec = fail_exec
+        self.fail_read = fail_read
+        self.commands = []
+    
+    def exec_command(self, command, timeout=None):
+        if self.fail_exec:
+            raise EOFError()
+        self.commands.append(command)
+        return None, FakeStream(b'ok', fail=self.fail_read), FakeStream(b'')
+    
+    def get_transport(self):
+        return self.transport
+    
+    def close(self):
+        self.closed = True
+        self.transport.active = False
+
+
+class TestSSHConnectionPool:
+    """Tests for pooled SSH connection reuse, health probing and eviction"""
+    
+    def make_pool(self, clients=None, **kwargs):
+        self.connects = []
+        clients = list(clients or [])
+        
+        def connect(host_id):
+            client = clients.pop(0) if clients else FakeClient()
+            self.connects.append((host_id, client))
+            return client
+        return SSHConnectionPool(connect, **kwargs)
+    
+    def test_connection_reused_per_host(self):
+        """Test repeated leases share one transport per host with keepalives on"""
+        pool = self.make_pool(keepalive=15)
+        
+        first = pool.get('linode')
+        assert pool.get('linode') is first
+        assert pool.get('local') is not first
+        assert [host for host, _ in self.connects] == ['linode', 'local']
+        assert first.transport.keepalive == 15
+    
+    def test_dead_transport_replaced(self):
+        """Test a dropped or unresponsive transport is closed and reconnected"""
+        pool = self.make_pool(probe_interval=0)
+        first = pool.get('linode')
+        first.transport.active = False
+        
+        second = pool.get('linode')
+        
+        assert second is not first
+        assert first.client.closed
+        assert len(self.connects) == 2
+    
+    def test_idle_connections_evicted(self):
+        """Test connections idle past the timeout are closed"""
+        pool = self.make_pool(idle_timeout=60)
+        conn = pool.get('linode')
+        conn.last_used -= 120
+        
+        assert pool.evict_idle() == 1
+        assert conn.client.closed
+        assert pool.get_stats()['connections'] == {}
+    
+    def test_channel_open_failure_retried(self):
+        """Test a command whose channel never opened is retried on a new connection"""
+        pool = self.make_pool(clients=[FakeClient(fail_exec=True)])
+        
+        assert pool.run('linode', 'uptime') == {'exit_code': 0, 'output': 'ok', 'error': ''}
+        assert len(self.connects) == 2
+    
+    def test_started_command_not_rerun(self):
+        """Test a failure after the command started is raised instead of running it twice"""
+        failing = FakeClient(fail_read=True)
+        pool = self.make_pool(clients=[failing])
+        
+        with pytest.raises(EOFError):
+            pool.run('linode', 'apt-get upgrade -y')
+        
+        assert failing.commands == ['apt-get upgrade -y']
+        assert len(self.connects) == 1
+        assert pool.get_stats()['connections'] == {}
+    
+    def test_unreachable_host_not_pooled(self):
+        """Test a failed connect returns None and is retried next time"""
+        pool = SSHConnectionPool(lambda host_id: None)
+        
+        assert pool.get('linode') is None
+        assert pool.run('linode', 'uptime') is None
+
+
+class TestFleetFanOut:
+    """Tests for concurrent fleet-wide operations"""
+    
+    def test_hosts_run_concurrently_with_timeouts(self):
+        """Test slow hosts time out without delaying the others"""
+        manager = FleetManager()
+        started = threading.Barrier(3, timeout=2)
+        
+        def check(host_id):
+            started.wait()
+            if host_id == 'slow':
+                time.sleep(1.0)
+            if host_id == 'broken':
+                raise RuntimeError('boom')
+            return host_id.upper()
+        
+        begin = time.monotonic()
+        results = manager.fan_out(['a', 'slow', 'broken'], check, timeout=0.3)
+        elapsed = time.monotonic() - begin
+        
+        assert results['a'] == 'A'
+        assert isinstance(results['slow'], TimeoutError)
+        assert isinstance(results['broken'], RuntimeError)
+        assert elapsed < 0.8
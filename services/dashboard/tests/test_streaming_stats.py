@@ -0,0 +1,80 @@
+import numpy as np
+import pytest
+from services.streaming_stats import RunningStats, QuantileSketch
+
+
+class TestRunningStats:
+    """Tests for Welford/EWMA streaming statistics"""
+    
+    def test_matches_batch_statistics(self):
+        """Test incremental updates agree with NumPy over the same values"""
+        values = np.random.default_rng(1).normal(50, 10, 5000)
+        stats = RunningStats()
+        for value in values:
+            stats.update(value)
+        
+        assert stats.mean == pytest.approx(values.mean())
+        assert stats.std_dev == pytest.approx(values.std())
+        assert stats.min == values.min() and stats.max == values.max()
+    
+    def test_merge_equals_sequential(self):
+        """Test merging two partial summaries equals one summary of both"""
+        values = np.random.default_rng(2).exponential(5, 1000)
+        whole = RunningStats.from_values(values)
+        first = RunningStats.from_values(values[:300])
+        second = RunningStats()
+        for value in values[300:]:
+            second.update(value)
+        first.merge(second)
+        
+        assert first.count == whole.count
+        assert first.mean == pytest.approx(whole.mean)
+        assert first.variance == pytest.approx(whole.variance)
+        assert first.ewma == pytest.approx(whole.ewma)
+        assert first.last == values[-1]
+    
+    def test_round_trip_and_scale(self):
+        """Test serialization and forgetting keep mean and variance"""
+        stats = RunningStats.from_values([1.0, 2.0, 3.0, 4.0])
+        restored = RunningStats.from_dict(stats.to_dict())
+        restored.scale(0.5)
+        
+        assert restored.count == 2.0
+        assert restored.mean == stats.mean
+        assert restored.variance == pytest.approx(stats.variance)
+
+
+class TestQuantileSketch:
+    """Tests for the mergeable quantile sketch"""
+    
+    def test_quantiles_within_relative_accuracy(self):
+        """Test sketch quantiles stay within 1% of exact percentiles"""
+        values = np.random.default_rng(3).lognormal(2, 1, 20000)
+        sketch = QuantileSketch(relative_accuracy=0.01)
+        sketch.add_many(values)
+        
+        for q, estimate in zip([0.25, 0.5, 0.95, 0.99], sketch.quantiles([0.25, 0.5, 0.95, 0.99])):
+            exact = np.quantile(values, q, method='lower')
+            assert abs(estimate - exact) / exact < 0.02
+    
+    def test_merge_and_zero_values(self):
+        """Test merged sketches and zero/negative values order correctly"""
+        left, right = QuantileSketch(), QuantileSketch()
+        for value in [0, 0, 0, 5]:
+            left.add(value)
+        right.add_many([-2.0, 10.0])
+        left.merge(right)
+        restored = QuantileSketch.from_dict(left.to_dict())
+        
+        assert restored.count == 6
+        assert restored.quantile(0.0) == pytest.approx(-2.0, rel=0.01)
+        assert restored.quantile(0.5) == 0.0
+        assert restored.quantile(1.0) == pytest.approx(10.0, rel=0.01)
+    
+    def test_bins_are_bounded(self):
+        """Test the sketch collapses low buckets past max_bins"""
+        sketch = QuantileSketch(max_bins=32)
+        sketch.add_many(np.geomspace(1e-3, 1e6, 2000))
+        
+        assert len(sketch.positive) <= 32
+        assert sketch.quantile(0.99) == pytest.approx(np.quantile(np.geomspace(1e-3, 1e6, 2000), 0.99), rel=0.05)
@@ -0,0 +1,98 @@
+import threading
+import time
+import pytest
+from services.websocket_service import WebSocketService
+
+
+class FakeSocket:
+    """Records sent frames; optionally blocks every send until released"""
+    
+    def __init__(self, block: bool = False):
+        self.sent = []
+        self.closed = False
+        self.release = threading.Event()
+        if not block:
+            self.release.set()
+    
+    def send(self, payload):
+        self.release.wait(5)
+        self.sent.append(payload)
+    
+    def close(self):
+        self.closed = True
+
+
+def wait_for(predicate, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+class TestWebSocketService:
+    """Tests for queued WebSocket fan-out"""
+    
+    @pytest.fixture
+    def service(self):
+        service = WebSocketService()
+        service.send_queue_size = 4
+        yield service
+        service.shutdown()
+    
+    def test_slow_client_does_not_block_room(self, service):
+        """Test a blocked socket neither delays other clients nor survives its backlog"""
+        fast, slow = FakeSocket(), FakeSocket(block=True)
+        service.add_connection('deployments', fast, 'alice', 'd1')
+        service.add_connection('deployments', slow, 'bob', 'd1')
+        
+        for i in range(10):
+            service.broadcast_to_deployment('d1', {'seq': i})
+            assert wait_for(lambda: len(fast.sent) == i + 1)
+        
+        metrics = service.get_room_metrics()['deployments/d1']
+        assert metrics['evicted'] == 1
+        assert metrics['connections'] == 1
+        
+        slow.release.set()
+        assert wait_for(lambda: slow.closed)
+    
+    def test_rooms_are_isolated(self, service):
+        """Test broadcasts only reach their own room"""
+        ws1, ws2 = FakeSocket(), FakeSocket()
+        service.add_connection('workflows', ws1, 'alice', 'w1')
+        service.add_connection('workflows', ws2, 'alice', 'w2')
+        
+        service.broadcast_to_workflow('w1', {'type': 'update'})
+        
+        assert wait_for(lambda: len(ws1.sent) == 1)
+        assert ws2.sent == []
+        assert service.get_connection_count()['workflows'] == 2
+    
+    def test_ping_and_remove_use_index(self, service):
+        """Test ping updates and removal find the connection by socket"""
+        ws = FakeSocket()
+        service.add_connection('system', ws, 'alice')
+        conn = service._ws_index[id(ws)]
+        conn.last_ping = conn.last_ping.replace(year=2000)
+        
+        service.update_ping_time(ws)
+        assert conn.last_ping.year > 2000
+        
+        service.remove_connection('system', ws)
+        assert service.get_connection_count()['system'] == 0
+        assert service.send_to_user('alice', {'type': 'note'}) == 0
+    
+    def test_reconnect_notice_goes_through_writer(self, service):
+        """Test the reconnected message is sent by the writer thread, not the caller"""
+        senders = []
+        ws = FakeSocket()
+        ws.send = lambda payload: senders.append((threading.current_thread(), payload))
+        service.reconnect_delay_base = 0
+        
+        assert service.handle_reconnection(ws, 'alice', 'system') is True
+        assert wait_for(lambda: len(senders) == 1)
+        thread, payload = senders[0]
+        assert thread is not threading.current_thread()
+        assert '"reconnected"' in payload
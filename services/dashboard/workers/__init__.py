@@ -16,7 +16,8 @@ from .storage_worker import (
     scan_plex_directories,
     check_database_sizes,
     check_alert_thresholds,
-    cleanup_old_metrics
+    cleanup_old_metrics,
+    refresh_bucket_stats
 )
 
 __all__ = [
@@ -31,5 +32,6 @@ __all__ = [
     'scan_plex_directories',
     'check_database_sizes',
     'check_alert_thresholds',
-    'cleanup_old_metrics'
+    'cleanup_old_metrics',
+    'refresh_bucket_stats'
 ]
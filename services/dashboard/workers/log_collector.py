@@ -5,9 +5,12 @@ Collects logs from Docker containers and stores them in unified logging system
 
 import logging
 import os
+import signal
+import threading
 import time
+from collections import Counter, deque
 from datetime import datetime
-from typing import List, Dict, Any, Optional
+from typing import Callable, Deque, List, Dict, Any, Optional
 import docker
 from celery import shared_task
 
@@ -36,10 +39,38 @@ class LogCollector:
     POLL_INTERVAL = 10
     BATCH_SIZE = 100
     
+    STREAM_INITIAL_TAIL = 1000
+    STREAM_FLUSH_INTERVAL = 2.0
+    STREAM_RECONNECT_DELAY = 5.0
+    STREAM_MAX_PENDING = 10000
+    
     def __init__(self):
         self.docker_client = None
         self.last_timestamps = {}
         self.is_dev_mode = os.environ.get('FLASK_ENV') == 'development' or os.environ.get('REPLIT_DEPLOYMENT') is None
+        
+        # Messages already consumed at last_timestamps / _read_cursors, so lines
+        # sharing the resume timestamp are de-duplicated instead of skipped
+        self._stored_lines: Dict[str, Counter] = {}
+        self._marks_lock = threading.Lock()
+        self._read_cursors: Dict[str, datetime] = {}
+        self._read_lines: Dict[str, Counter] = {}
+        self._pending: Deque[Dict[str, Any]] = deque(maxlen=self.STREAM_MAX_PENDING)
+        self._pending_cond = threading.Condition()
+        self._stream_stop = threading.Event()
+        self._stream_threads: Dict[str, threading.Thread] = {}
+        self._open_streams: Dict[str, Any] = {}
+        self._flush_thread: Optional[threading.Thread] = None
+        self.stream_stats = {
+            'lines_read': 0,
+            'lines_skipped': 0,
+            'logs_stored': 0,
+            'batches_stored': 0,
+            'store_failures': 0,
+            'dropped': 0,
+            'reconnects': 0,
+        }
+        self._stats_lock = threading.Lock()
         self._init_docker()
     
     def _init_docker(self):
@@ -128,6 +159,39 @@ class LogCollector:
             'message': message
         }
     
+    @staticmethod
+    def _advance(marks: Dict[str, datetime], lines: Dict[str, Counter], container_name: str,
+                 timestamp: datetime, message: str):
+        """Move a container's resume point forward past ``message``"""
+        current = marks.get(container_name)
+        if current is None or timestamp > current:
+            marks[container_name] = timestamp
+            lines[container_name] = Counter()
+        if timestamp == marks[container_name]:
+            lines.setdefault(container_name, Counter())[message] += 1
+    
+    @staticmethod
+    def _resume_filter(since: Optional[datetime], seen: Optional[Counter]) -> Callable[[Dict[str, Any]], bool]:
+        """
+        Build a predicate that is True for parsed lines consumed before
+        
+        Lines older than ``since`` are always consumed; lines at ``since``
+        only as often as they appear in ``seen``.
+        """
+        remaining = Counter(seen or ())
+        
+        def consumed(parsed: Dict[str, Any]) -> bool:
+            if since is None or parsed['timestamp'] > since:
+                return False
+            if parsed['timestamp'] < since:
+                return True
+            if remaining[parsed['message']] > 0:
+                remaining[parsed['message']] -= 1
+                return True
+            return False
+        
+        return consumed
+    
     def collect_logs_from_container(self, container_name: str) -> List[Dict[str, Any]]:
         """
         Collect and parse logs from a single container
@@ -138,7 +202,7 @@ class LogCollector:
         Returns:
             List of parsed log entries
         """
-        since = self.last_timestamps.get(container_name)
+        since = self.get_high_water_mark(container_name)
         
         log_lines = self.get_container_logs(container_name, since)
         
@@ -146,7 +210,7 @@ class LogCollector:
             return []
         
         parsed_logs = []
-        latest_timestamp = since or datetime.min
+        consumed = self._resume_filter(since, self._stored_lines.get(container_name))
         
         try:
             container = self.docker_client.containers.get(container_name)
@@ -157,8 +221,12 @@ class LogCollector:
         for log_line in log_lines:
             parsed = self.parse_docker_log_line(log_line)
             
-            if parsed['timestamp'] > latest_timestamp:
-                latest_timestamp = parsed['timestamp']
+            if consumed(parsed):
+                continue
+            
+            with self._marks_lock:
+                self._advance(self.last_timestamps, self._stored_lines, container_name,
+                              parsed['timestamp'], parsed['message'])
             
             parsed_logs.append({
                 'service': container_name,
@@ -169,10 +237,32 @@ class LogCollector:
                 'extra_metadata': None
             })
         
-        self.last_timestamps[container_name] = latest_timestamp
-        
         return parsed_logs
     
+    def get_high_water_mark(self, container_name: str) -> Optional[datetime]:
+        """
+        Get the timestamp of the newest stored log line for a container
+        
+        Falls back to the newest row in unified_logs so that a restarted
+        collector resumes without re-inserting lines it already stored.
+        """
+        with self._marks_lock:
+            if container_name not in self.last_timestamps:
+                stored = unified_logging_service.get_latest_timestamps(self.CONTAINERS_TO_MONITOR)
+                for name in self.CONTAINERS_TO_MONITOR:
+                    if name in self.last_timestamps:
+                        continue
+                    self.last_timestamps[name] = stored.get(name)
+                    if stored.get(name):
+                        self._stored_lines[name] = Counter(
+                            unified_logging_service.get_messages_at(name, stored[name])
+                        )
+            return self.last_timestamps.get(container_name)
+    
+    def _count(self, stat: str, amount: int = 1):
+        with self._stats_lock:
+            self.stream_stats[stat] += amount
+    
     def collect_all_logs(self) -> int:
         """
         Collect logs from all monitored containers
@@ -205,6 +295,205 @@ class LogCollector:
         logger.info(f"Collected {len(all_logs)} logs from {len(self.CONTAINERS_TO_MONITOR)} containers")
         return len(all_logs)
 
+    
+    def _enqueue_streamed(self, entry: Dict[str, Any]):
+        with self._pending_cond:
+            if len(self._pending) == self._pending.maxlen:
+                self._count('dropped')
+            # A full deque discards its oldest entry
+            self._pending.append(entry)
+            if len(self._pending) >= self.BATCH_SIZE:
+                self._pending_cond.notify()
+    
+    def _stream_container(self, container_name: str):
+        """Follow a single container's log stream, reconnecting until stopped"""
+        while not self._stream_stop.is_set():
+            try:
+                container = self.docker_client.containers.get(container_name)
+                if container_name not in self._read_cursors:
+                    stored_mark = self.get_high_water_mark(container_name)
+                    if stored_mark:
+                        self._read_cursors[container_name] = stored_mark
+                        self._read_lines[container_name] = Counter(self._stored_lines.get(container_name, ()))
+                since = self._read_cursors.get(container_name)
+                consumed = self._resume_filter(since, self._read_lines.get(container_name))
+                
+                kwargs = {
+                    'stdout': True,
+                    'stderr': True,
+                    'timestamps': True,
+                    'stream': True,
+                    'follow': True
+                }
+                if since:
+                    kwargs['since'] = since
+                else:
+                    kwargs['tail'] = self.STREAM_INITIAL_TAIL
+                
+                stream = container.logs(**kwargs)
+                self._open_streams[container_name] = stream
+                
+                for raw_line in stream:
+                    if self._stream_stop.is_set():
+                        break
+                    line = raw_line.decode('utf-8', errors='ignore').strip() if isinstance(raw_line, bytes) else raw_line.strip()
+                    if not line:
+                        continue
+                    
+                    parsed = self.parse_docker_log_line(line)
+                    self._count('lines_read')
+                    if consumed(parsed):
+                        self._count('lines_skipped')
+                        continue
+                    
+                    self._advance(self._read_cursors, self._read_lines, container_name,
+                                  parsed['timestamp'], parsed['message'])
+                    self._enqueue_streamed({
+                        'service': container_name,
+                        'container_id': container.id,
+                        'message': parsed['message'],
+                        'timestamp': parsed['timestamp'],
+                        'log_level': None,
+                        'extra_metadata': None
+                    })
+            
+            except docker.errors.NotFound:
+                logger.debug(f"Container not found: {container_name}")
+            except Exception as e:
+                if not self._stream_stop.is_set():
+                    logger.error(f"Log stream error for {container_name}: {e}")
+            finally:
+                self._open_streams.pop(container_name, None)
+            
+            if self._stream_stop.wait(self.STREAM_RECONNECT_DELAY):
+                break
+            self._count('reconnects')
+    
+    def _store_pending(self) -> Optional[int]:
+        with self._pending_cond:
+            batch = [self._pending.popleft() for _ in range(min(self.BATCH_SIZE, len(self._pending)))]
+        
+        if not batch:
+            return 0
+        
+        count = unified_logging_service.store_logs_batch(batch)
+        if count != len(batch):
+            self._count('store_failures')
+            with self._pending_cond:
+                # Put the batch back in front, dropping its oldest lines if newer ones filled the queue
+                overflow = len(batch) + len(self._pending) - self.STREAM_MAX_PENDING
+                if overflow > 0:
+                    del batch[:overflow]
+                    self._count('dropped', overflow)
+                self._pending.extendleft(reversed(batch))
+            return None
+        
+        with self._marks_lock:
+            for entry in batch:
+                self._advance(self.last_timestamps, self._stored_lines, entry['service'],
+                              entry['timestamp'], entry['message'])
+        
+        self._count('logs_stored', count)
+        self._count('batches_stored')
+        return count
+    
+    def _flush_loop(self):
+        """Store pending lines whenever a full batch is ready or the flush interval passes"""
+        while not self._stream_stop.is_set():
+            with self._pending_cond:
+                if len(self._pending) < self.BATCH_SIZE:
+                    self._pending_cond.wait(self.STREAM_FLUSH_INTERVAL)
+            
+            stored = self._store_pending()
+            while stored == self.BATCH_SIZE and not self._stream_stop.is_set():
+                stored = self._store_pending()
+            
+            if stored is None:
+                self._stream_stop.wait(self.STREAM_FLUSH_INTERVAL)
+        
+        while self._store_pending():
+            pass
+    
+    def start_streaming(self) -> bool:
+        """
+        Start one follow-stream thread per monitored container
+        
+        Lines are stored in BATCH_SIZE batches by a single flush thread.
+        The persisted high-water mark only advances after a batch is stored,
+        so a restart resumes from the last stored line without duplicates.
+        
+        Returns:
+            True if streaming was started
+        """
+        if not self.is_available():
+            logger.warning("Log collector not available")
+            return False
+        
+        if self._flush_thread and self._flush_thread.is_alive():
+            return True
+        
+        self._stream_stop.clear()
+        self._flush_thread = threading.Thread(target=self._flush_loop, name='log-collector-flush', daemon=True)
+        self._flush_thread.start()
+        
+        for container_name in self.CONTAINERS_TO_MONITOR:
+            thread = threading.Thread(
+                target=self._stream_container,
+                args=(container_name,),
+                name=f'log-stream-{container_name}',
+                daemon=True
+            )
+            self._stream_threads[container_name] = thread
+            thread.start()
+        
+        logger.info(f"Streaming logs from {len(self.CONTAINERS_TO_MONITOR)} containers")
+        return True
+    
+    def stop_streaming(self, timeout: float = 10.0):
+        """Stop all stream threads and store whatever is still pending"""
+        self._stream_stop.set()
+        
+        for stream in list(self._open_streams.values()):
+            try:
+                stream.close()
+            except Exception:
+                pass
+        
+        with self._pending_cond:
+            self._pending_cond.notify_all()
+        
+        for thread in self._stream_threads.values():
+            thread.join(timeout=timeout)
+        self._stream_threads.clear()
+        
+        if self._flush_thread:
+            self._flush_thread.join(timeout=timeout)
+            self._flush_thread = None
+        
+        with self._stats_lock:
+            stats = dict(self.stream_stats)
+        logger.info(f"Log streaming stopped: {stats}")
+    
+    def get_stream_status(self) -> Dict[str, Any]:
+        """Get streaming collector status and counters"""
+        with self._pending_cond:
+            pending = len(self._pending)
+        with self._stats_lock:
+            stats = dict(self.stream_stats)
+        return {
+            'streaming': self._flush_thread is not None and self._flush_thread.is_alive(),
+            'containers': {
+                name: {
+                    'connected': name in self._open_streams,
+                    'read_cursor': self._read_cursors[name].isoformat() if self._read_cursors.get(name) else None,
+                    'high_water_mark': self.last_timestamps[name].isoformat() if self.last_timestamps.get(name) else None
+                }
+                for name in self.CONTAINERS_TO_MONITOR
+            },
+            'pending': pending,
+            **stats
+        }
+
 
 log_collector = LogCollector()
 
@@ -252,3 +541,46 @@ def rotate_old_logs(retention_days: int = 30):
             'success': False,
             'error': str(e)
         }
+
+
+@shared_task(name='workers.log_collector.maintain_log_partitions')
+def maintain_log_partitions():
+    """
+    Celery beat task to pre-create upcoming daily log partitions and drop
+    partitions past their retention period
+    """
+    from services.log_partitions import log_partition_manager
+    
+    try:
+        result = log_partition_manager.maintain()
+        logger.info(f"Log partition maintenance completed: {result}")
+        return result
+    except Exception as e:
+        logger.error(f"Error in log partition maintenance task: {e}")
+        return {
+            'success': False,
+            'error': str(e)
+        }
+
+
+def run_streaming_collector():
+    """Run the streaming collector in the foreground until SIGTERM/SIGINT"""
+    stop_event = threading.Event()
+    
+    def _handle_signal(signum, frame):
+        stop_event.set()
+    
+    signal.signal(signal.SIGTERM, _handle_signal)
+    signal.signal(signal.SIGINT, _handle_signal)
+    
+    if not log_collector.start_streaming():
+        return 1
+    
+    stop_event.wait()
+    log_collector.stop_streaming()
+    return 0
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    raise SystemExit(run_streaming_collector())
@@ -36,23 +36,22 @@ def collect_telemetry():
     failed_count = 0
     
     try:
+        containers = {}
         for service_key, service_info in Config.SERVICES.items():
             container_name = service_info.get('container')
             if not container_name:
                 logger.debug(f"Skipping {service_key}: no container defined")
                 continue
-            
-            try:
-                success = service_ops.store_telemetry(service_key, container_name)
-                if success:
-                    collected_count += 1
-                    logger.debug(f"Collected telemetry for {service_key}")
-                else:
-                    failed_count += 1
-                    logger.warning(f"Failed to collect telemetry for {service_key}")
-            except Exception as e:
+            containers[service_key] = container_name
+        
+        # One Docker snapshot and one transaction for the whole cycle
+        results = service_ops.store_all_telemetry(containers)
+        for service_key, success in results.items():
+            if success:
+                collected_count += 1
+            else:
                 failed_count += 1
-                logger.error(f"Error collecting telemetry for {service_key}: {e}")
+                logger.warning(f"Failed to collect telemetry for {service_key}")
         
         logger.info(f"Telemetry collection complete: {collected_count} succeeded, {failed_count} failed")
         
@@ -196,6 +195,69 @@ def cleanup_old_telemetry(days: int = 7):
         raise
 
 
+@celery_app.task(name='workers.service_ops_worker.update_anomaly_baselines', ignore_result=True)
+def update_anomaly_baselines():
+    """
+    Feed current container metrics into the streaming anomaly baselines
+    Runs every ANOMALY_SAMPLE_INTERVAL seconds via Celery Beat
+    
+    Sampling only updates in-memory summaries; they are merged into the
+    database at most once per ANOMALY_PERSIST_INTERVAL. Not retried: the
+    next run takes a fresh sample anyway.
+    """
+    from services.anomaly_detection import anomaly_detector
+    
+    try:
+        metrics = anomaly_detector.collect_current_metrics()
+        observed = anomaly_detector.observe_metrics(metrics)
+        persisted = anomaly_detector.persist_baselines()
+        
+        return {
+            'success': True,
+            'observed': observed,
+            'persisted': persisted
+        }
+        
+    except Exception as e:
+        logger.error(f"Anomaly baseline update failed: {e}")
+        return {'success': False, 'error': str(e)}
+
+
+@celery_app.task(base=ServiceOpsTask, name='workers.service_ops_worker.rebuild_seasonal_baselines')
+def rebuild_seasonal_baselines():
+    """
+    Merge telemetry collected since the last build into the seasonal
+    (hour-of-week) anomaly baselines
+    Runs daily via Celery Beat, ahead of telemetry cleanup
+    """
+    from services.anomaly_detection import anomaly_detector
+    
+    logger.info("Starting seasonal baseline build")
+    
+    result = anomaly_detector.build_seasonal_baselines()
+    if not result.get('success'):
+        raise RuntimeError(result.get('error', 'Seasonal baseline build failed'))
+    
+    return result
+
+
+@celery_app.task(base=ServiceOpsTask, name='workers.service_ops_worker.maintain_agent_metric_partitions')
+def maintain_agent_metric_partitions():
+    """
+    Pre-create upcoming daily partitions of the agent metric rollup tables
+    and drop partitions past each resolution's retention
+    Runs hourly via Celery Beat
+    """
+    from services.agent_metrics_store import agent_metrics_store
+    
+    result = agent_metrics_store.maintain()
+    if not result.get('success'):
+        raise RuntimeError(result.get('error', 'Agent metric partition maintenance failed'))
+    
+    logger.info(f"Agent metric partition maintenance completed: {result}")
+    return result
+
+
 # Configure Celery Beat schedule
 celery_app.conf.beat_schedule = {
     'collect-service-telemetry': {
@@ -211,6 +273,26 @@ celery_app.conf.beat_schedule = {
         'schedule': 86400.0,  # Once per day
         'kwargs': {'days': 7}
     },
+    'rebuild-seasonal-baselines': {
+        'task': 'workers.service_ops_worker.rebuild_seasonal_baselines',
+        'schedule': 86400.0,  # Once per day
+    },
+    'update-anomaly-baselines': {
+        'task': 'workers.service_ops_worker.update_anomaly_baselines',
+        'schedule': Config.ANOMALY_SAMPLE_INTERVAL,
+    },
+    'maintain-agent-metric-partitions': {
+        'task': 'workers.service_ops_worker.maintain_agent_metric_partitions',
+        'schedule': 3600.0,  # Every hour
+    },
+    'maintain-log-partitions': {
+        'task': 'workers.log_collector.maintain_log_partitions',
+        'schedule': 3600.0,  # Every hour
+    },
+    'refresh-bucket-stats': {
+        'task': 'workers.storage_worker.refresh_bucket_stats',
+        'schedule': Config.BUCKET_STATS_REFRESH_INTERVAL,
+    },
 }
 
 logger.info("Service Operations worker initialized with beat schedule")
@@ -388,6 +388,53 @@ def cleanup_old_metrics(retention_days: int = 90):
         raise
 
 
+@celery_app.task(base=StorageTask, name='workers.storage_worker.refresh_bucket_stats')
+def refresh_bucket_stats(backend=None, bucket=None):
+    """
+    Advance the incremental bucket statistics scans for local and cloud storage
+    Runs every BUCKET_STATS_REFRESH_INTERVAL seconds via Celery Beat
+    
+    Each run lists at most BUCKET_STATS_SCAN_SECONDS worth of objects and
+    resumes from the stored marker on the next run.
+    
+    Queued with ``backend`` and ``bucket`` when a request finds a bucket
+    that was never indexed; that bucket alone is then scanned to
+    completion within the task's soft time limit.
+    """
+    from services.storage_service import storage_service
+    from services.bucket_stats_index import bucket_stats_index, scan_claim_key
+    from services.cache_service import cache_service
+    
+    if not db_service.is_available:
+        logger.warning("Database not available, skipping bucket stats refresh")
+        return {
+            'success': False,
+            'error': 'Database service not available'
+        }
+    
+    if bucket:
+        client = storage_service.local_client if backend == 'local' else storage_service.cloud_client
+        try:
+            if client is None:
+                return {'success': False, 'error': f'No {backend} storage client'}
+            completed = bucket_stats_index.index_bucket(
+                backend, client, bucket, time_budget=Config.CELERY_TASK_SOFT_TIME_LIMIT * 0.8
+            )
+        finally:
+            cache_service.release(scan_claim_key(backend, bucket))
+        logger.info(f"Bucket stats scan of {backend} bucket '{bucket}' "
+                    f"{'completed' if completed else 'paused'}")
+        return {'success': True, 'backend': backend, 'bucket': bucket, 'completed': completed}
+    
+    results = {}
+    for backend, client in (('local', storage_service.local_client), ('cloud', storage_service.cloud_client)):
+        if client is not None:
+            results[backend] = bucket_stats_index.refresh(backend, client)
+    
+    logger.info(f"Bucket stats refresh completed: {results}")
+    return {'success': True, 'backends': results}
+
+
 # Celery Beat schedule configuration
 # Add these tasks to the beat schedule in celery_app.py:
 STORAGE_BEAT_SCHEDULE = {
@@ -399,6 +446,10 @@ STORAGE_BEAT_SCHEDULE = {
         'task': 'workers.storage_worker.check_alert_thresholds',
         'schedule': 1800.0,  # Every 30 minutes
     },
+    'refresh-bucket-stats': {
+        'task': 'workers.storage_worker.refresh_bucket_stats',
+        'schedule': Config.BUCKET_STATS_REFRESH_INTERVAL,
+    },
     'cleanup-old-storage-metrics': {
         'task': 'workers.storage_worker.cleanup_old_metrics',
         'schedule': 86400.0,  # Daily
@@ -413,5 +464,6 @@ __all__ = [
     'check_database_sizes',
     'check_alert_thresholds',
     'cleanup_old_metrics',
+    'refresh_bucket_stats',
     'STORAGE_BEAT_SCHEDULE'
 ]